@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+
+"""
+Benchmark sequence generation, mutation, sections, ratchet, and writing.
+
+Each benchmark case is run in a fresh Python process, so that its peak
+memory use (RSS) can be measured. Results (bases/s, reads/s, and peak RSS)
+can be saved as a baseline and later runs compared against it, with
+regressions beyond a threshold reported (and a non-zero exit status).
+
+Baselines are machine-specific, so save one on the machine you will compare
+on (e.g., before making a change).
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from json import dump, dumps, load, loads
+
+TOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(TOP, "benchmarks", "baseline.json")
+
+QUICK = {
+    "lengths": [1000, 100000],
+    "counts": [1, 1000],
+    "rates": [0.01, 0.1],
+    "sections": [1, 10],
+    "alphabets": ["nt", "aa"],
+    "formats": ["fasta", "fastq"],
+}
+
+FULL = {
+    "lengths": [1000, 100000, 10000000, 100000000],
+    "counts": [1, 1000, 100000],
+    "rates": [0.001, 0.01, 0.1],
+    "sections": [1, 10, 100],
+    "alphabets": ["nt", "aa"],
+    "formats": ["fasta", "fastq"],
+}
+
+# The total number of bases a case should (approximately) produce when it
+# is not the length or count that is being varied.
+BASES = 10**6
+
+
+def makeCase(
+    kind, length=1000, count=None, rate=0.01, sections=1, alphabet="nt", format_="fasta"
+):
+    """
+    Make a benchmark case.
+
+    @param kind: The C{str} kind of case: one of 'generate', 'mutate',
+        'sections', or 'ratchet'.
+    @param length: The C{int} length of each sequence.
+    @param count: The C{int} number of sequences to generate, or C{None} to
+        generate about L{BASES} bases.
+    @param rate: The C{float} mutation rate (for 'mutate' and 'ratchet').
+    @param sections: The C{int} number of sections (for 'sections').
+    @param alphabet: Either 'nt' or 'aa'.
+    @param format_: Either 'fasta' or 'fastq'.
+    @return: A C{dict} describing the case, including its specification.
+    """
+    if count is None:
+        count = max(1, BASES // length)
+
+    random = {"length": length}
+    if alphabet == "aa":
+        random["random aa"] = True
+
+    if kind == "generate":
+        specs = [dict(random, count=count)]
+        params = dict(length=length, count=count)
+    elif kind == "mutate":
+        specs = [
+            dict(random, id="parent", skip=True),
+            {"from id": "parent", "count": count, "mutation rate": rate},
+        ]
+        params = dict(length=length, count=count, rate=rate)
+    elif kind == "sections":
+        sectionLength = max(1, length // sections)
+        specs = [
+            dict(random, id="parent", skip=True),
+            {
+                "count": count,
+                "sections": [
+                    {
+                        "from id": "parent",
+                        "start": index * sectionLength + 1,
+                        "length": sectionLength,
+                    }
+                    for index in range(sections)
+                ],
+            },
+        ]
+        params = dict(length=length, count=count, sections=sections)
+    elif kind == "ratchet":
+        specs = [
+            dict(random, id="parent", skip=True),
+            {
+                "from id": "parent",
+                "count": max(2, count),
+                "mutation rate": rate,
+                "ratchet": True,
+            },
+        ]
+        count = max(2, count)
+        params = dict(length=length, count=count, rate=rate)
+    else:
+        raise ValueError("Unknown benchmark kind %r." % kind)
+
+    for spec in specs:
+        spec["format"] = format_
+
+    params.update(alphabet=alphabet, format=format_)
+    name = kind + " " + " ".join("%s=%s" % item for item in sorted(params.items()))
+
+    return {"name": name, "spec": specs, "reads": count, "bases": count * length}
+
+
+def makeCases(grid):
+    """
+    Make benchmark cases, varying one parameter at a time.
+
+    @param grid: A C{dict} of parameter values, like L{QUICK}.
+    @return: A C{list} of case C{dict}s (see L{makeCase}), without duplicates.
+    """
+    cases = []
+    for length in grid["lengths"]:
+        cases.append(makeCase("generate", length=length))
+    for count in grid["counts"]:
+        cases.append(makeCase("generate", count=count))
+    for alphabet in grid["alphabets"]:
+        for format_ in grid["formats"]:
+            cases.append(makeCase("generate", alphabet=alphabet, format_=format_))
+    for rate in grid["rates"]:
+        cases.append(makeCase("mutate", rate=rate))
+        cases.append(makeCase("ratchet", rate=rate, count=100))
+    for length in grid["lengths"]:
+        cases.append(makeCase("mutate", length=length))
+    for sections in grid["sections"]:
+        cases.append(makeCase("sections", length=10000, sections=sections))
+
+    seen = set()
+    result = []
+    for case in cases:
+        if case["name"] not in seen:
+            seen.add(case["name"])
+            result.append(case)
+    return result
+
+
+def runCase(case):
+    """
+    Run a benchmark case in this process.
+
+    @param case: A case C{dict} (see L{makeCase}).
+    @return: A C{dict} of results.
+    """
+    import resource
+    from time import perf_counter
+
+    from seqgen import Sequences
+
+    with open(os.devnull, "w") as fp:
+        start = perf_counter()
+        Sequences(case["spec"]).write(fp)
+        elapsed = perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        maxrss *= 1024
+
+    return {
+        "seconds": elapsed,
+        "bases/s": case["bases"] / elapsed,
+        "reads/s": case["reads"] / elapsed,
+        "peak RSS MB": maxrss / 2**20,
+    }
+
+
+def runCaseInSubprocess(case):
+    """
+    Run a benchmark case in a new Python process.
+
+    @param case: A case C{dict} (see L{makeCase}).
+    @return: A C{dict} of results.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = TOP + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--runCase", dumps(case)],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return loads(result.stdout)
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline.
+
+    @param results: A C{dict} mapping case names to result C{dict}s.
+    @param baseline: A C{dict} mapping case names to result C{dict}s.
+    @param threshold: The C{float} fractional slowdown (or increase in peak
+        RSS) beyond which a case is considered to have regressed.
+    @return: A C{list} of C{str} regression descriptions.
+    """
+    regressions = []
+    for name, result in results.items():
+        try:
+            old = baseline[name]
+        except KeyError:
+            continue
+
+        if result["bases/s"] < old["bases/s"] * (1.0 - threshold):
+            regressions.append(
+                "%s: bases/s fell from %.0f to %.0f (%.1f%%)"
+                % (
+                    name,
+                    old["bases/s"],
+                    result["bases/s"],
+                    100.0 * (result["bases/s"] / old["bases/s"] - 1.0),
+                )
+            )
+
+        if result["peak RSS MB"] > old["peak RSS MB"] * (1.0 + threshold):
+            regressions.append(
+                "%s: peak RSS rose from %.1f MB to %.1f MB"
+                % (name, old["peak RSS MB"], result["peak RSS MB"])
+            )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Benchmark seqgen.",
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Run the full (slow) set of cases, with lengths up to 10^8.",
+    )
+
+    for option, dest, type_ in (
+        ("--lengths", "lengths", int),
+        ("--counts", "counts", int),
+        ("--rates", "rates", float),
+        ("--sections", "sections", int),
+        ("--alphabets", "alphabets", str),
+        ("--formats", "formats", str),
+    ):
+        parser.add_argument(
+            option,
+            nargs="+",
+            type=type_,
+            dest=dest,
+            help="Values to use (overriding those for the chosen set of cases).",
+        )
+
+    parser.add_argument(
+        "--match",
+        metavar="STRING",
+        help="Only run cases whose names contain this string.",
+    )
+
+    parser.add_argument(
+        "--baseline",
+        metavar="FILENAME",
+        default=DEFAULT_BASELINE,
+        help="The baseline results file.",
+    )
+
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="Save the results as the new baseline.",
+    )
+
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help=(
+            "The fractional slowdown (or increase in peak RSS) relative to the "
+            "baseline that is considered a regression."
+        ),
+    )
+
+    parser.add_argument("--runCase", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.runCase:
+        print(dumps(runCase(loads(args.runCase))))
+        return
+
+    grid = dict(FULL if args.full else QUICK)
+    for key in grid:
+        if getattr(args, key):
+            grid[key] = getattr(args, key)
+
+    cases = makeCases(grid)
+    if args.match:
+        cases = [case for case in cases if args.match in case["name"]]
+
+    results = {}
+    for case in cases:
+        result = results[case["name"]] = runCaseInSubprocess(case)
+        print(
+            "%-70s %12.0f bases/s %10.0f reads/s %8.1f MB"
+            % (
+                case["name"],
+                result["bases/s"],
+                result["reads/s"],
+                result["peak RSS MB"],
+            ),
+            flush=True,
+        )
+
+    if args.save:
+        with open(args.baseline, "w") as fp:
+            dump(results, fp, indent=2, sort_keys=True)
+        print("Baseline saved to %s." % args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            baseline = load(fp)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions (threshold %.0f%%):" % (100 * args.threshold))
+            for regression in regressions:
+                print("  " + regression)
+            sys.exit(1)
+        else:
+            print("No regressions relative to %s." % args.baseline)
+    else:
+        print("No baseline found (use --save to make one).")
+
+
+if __name__ == "__main__":
+    main()
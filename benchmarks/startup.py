@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""
+Measure the startup time of seqgen: importing the package and running
+seq-gen.py on a tiny specification. Each measurement is made in a fresh
+Python process.
+
+Also check that running seq-gen.py on a tiny specification (with the
+default, automatic, backend) does not import the slow to load packages
+(NumPy, Numba, dark) and is not much slower than with the python backend,
+and exit with a non-zero status if it is.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from statistics import mean
+from time import perf_counter
+
+TOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEQ_GEN = os.path.join(TOP, "bin", "seq-gen.py")
+
+# Packages that must not be imported when making a tiny specification.
+SLOW_PACKAGES = ("numpy", "numba", "dark")
+
+# Run seq-gen.py (on a tiny specification, from standard input) and print
+# the slow packages that were imported.
+IMPORTED = """
+import runpy, sys
+sys.argv = [%r]
+try:
+    runpy.run_path(%r, run_name="__main__")
+finally:
+    print(" ".join(name for name in %r if name in sys.modules), file=sys.stderr)
+""" % (
+    SEQ_GEN,
+    SEQ_GEN,
+    SLOW_PACKAGES,
+)
+
+
+def environment():
+    """
+    Get the environment to run commands in, so that they use this seqgen.
+
+    @return: A C{dict} of environment variables.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = TOP + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def timeCommand(command, repeat, input_=None):
+    """
+    Time a command.
+
+    @param command: A C{list} of C{str} command arguments.
+    @param repeat: The C{int} number of times to run the command.
+    @param input_: A C{str} to pass to the command on standard input.
+    @return: A C{list} of C{float} elapsed times, in seconds.
+    """
+    env = environment()
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run(
+            command,
+            input=input_,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            text=True,
+        )
+        times.append(perf_counter() - start)
+    return times
+
+
+def slowImports(input_):
+    """
+    Find the slow to load packages imported by seq-gen.py.
+
+    @param input_: The C{str} specification to pass to seq-gen.py on
+        standard input.
+    @return: A C{list} of C{str} package names.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORTED],
+        input=input_,
+        env=environment(),
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return result.stderr.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Measure the startup time of seqgen.",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        metavar="N",
+        type=int,
+        default=10,
+        help="The number of times to run each command.",
+    )
+
+    parser.add_argument(
+        "--maxRatio",
+        metavar="RATIO",
+        type=float,
+        default=1.5,
+        help=(
+            "The largest acceptable ratio of the mean time of seq-gen.py on a "
+            "tiny specification with the default backend to that with the "
+            "python backend."
+        ),
+    )
+
+    args = parser.parse_args()
+
+    commands = (
+        ("python (no imports)", [sys.executable, "-c", "pass"], None),
+        ("import seqgen", [sys.executable, "-c", "import seqgen"], None),
+        ("seq-gen.py '[{}]'", [sys.executable, SEQ_GEN], "[{}]"),
+        (
+            "... --backend python",
+            [sys.executable, SEQ_GEN, "--backend", "python"],
+            "[{}]",
+        ),
+    )
+
+    means = []
+    for name, command, input_ in commands:
+        times = timeCommand(command, args.repeat, input_)
+        means.append(mean(times))
+        print(
+            "%-22s mean %.3fs  min %.3fs  (%d runs)"
+            % (name, mean(times), min(times), args.repeat)
+        )
+
+    failed = False
+    imported = slowImports("[{}]")
+    if imported:
+        print(
+            "FAIL: seq-gen.py on a tiny specification imported %s."
+            % ", ".join(imported)
+        )
+        failed = True
+
+    ratio = means[2] / means[3]
+    if ratio > args.maxRatio:
+        print(
+            "FAIL: seq-gen.py on a tiny specification took %.2f times as long "
+            "with the default backend as with the python backend (the maximum "
+            "is %.2f)." % (ratio, args.maxRatio)
+        )
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+import sys
+import argparse
+from json.decoder import JSONDecodeError
+from seqgen import Sequences
+from seqgen.partition import Plan
+from seqgen.writers import FORMATS
+
+parser = argparse.ArgumentParser(
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    description=(
+        "Split the generation of genetic sequences from a JSON specification "
+        "into units of work that can be run separately (e.g., as the jobs of a "
+        "batch scheduler, on machines that share storage), and merge their "
+        "output. The merged output is identical to that of a single run of "
+        "seq-gen.py with the same specification and options."
+    ),
+)
+
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+plan = subparsers.add_parser(
+    "plan",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    help=(
+        "Split a specification into units and save the plan in a directory. "
+        "The number of units is written to standard output."
+    ),
+)
+
+plan.add_argument(
+    "--specification",
+    metavar="FILENAME",
+    default=sys.stdin,
+    type=open,
+    help=(
+        "The name of the JSON sequence specification file. Standard input "
+        "will be read if no file name is given."
+    ),
+)
+
+plan.add_argument(
+    "--directory",
+    metavar="DIRECTORY",
+    required=True,
+    help=(
+        "The directory to save the plan in. The units write their output "
+        "here, so it must be on storage shared by the machines that run them."
+    ),
+)
+
+plan.add_argument(
+    "--seed",
+    metavar="SEED",
+    required=True,
+    help="A seed for random number generation (see seq-gen.py --help).",
+)
+
+group = plan.add_mutually_exclusive_group()
+
+group.add_argument(
+    "--units",
+    metavar="N",
+    type=int,
+    help="The number of units to aim for.",
+)
+
+group.add_argument(
+    "--readsPerUnit",
+    metavar="N",
+    type=int,
+    help=(
+        "The number of sequences in each unit (rounded up to a multiple of "
+        f"{Sequences.SEED_BLOCK_SIZE}). If neither this nor --units is given, "
+        f"{Plan.DEFAULT_READS_PER_UNIT} is used."
+    ),
+)
+
+plan.add_argument(
+    "--defaultIdPrefix",
+    metavar="PREFIX",
+    default=Sequences.DEFAULT_ID_PREFIX,
+    help=(
+        "The default prefix that sequence ids should have (for those that "
+        "are not named individually in the specification file)."
+    ),
+)
+
+plan.add_argument(
+    "--format",
+    choices=FORMATS,
+    default="fasta",
+    help="Set the default output format.",
+)
+
+plan.add_argument(
+    "--quality",
+    metavar="N",
+    help="The quality value to use for FASTQ output (see seq-gen.py --help).",
+)
+
+plan.add_argument(
+    "--defaultLength",
+    metavar="N",
+    default=Sequences.DEFAULT_LENGTH,
+    type=int,
+    help=(
+        "The default length that sequences should have (for those that do "
+        "not have their length given in the specification file)."
+    ),
+)
+
+group = plan.add_mutually_exclusive_group()
+
+group.add_argument(
+    "--shards",
+    metavar="N",
+    type=int,
+    help=(
+        "The number of shard files to split the reads of a specification into "
+        "(see seq-gen.py --help)."
+    ),
+)
+
+group.add_argument(
+    "--maxReadsPerFile",
+    metavar="N",
+    type=int,
+    help="The maximum number of reads in a shard file (see seq-gen.py --help).",
+)
+
+plan.add_argument(
+    "--cache",
+    metavar="DIRECTORY",
+    help=(
+        "A directory (on shared storage) in which to keep the sequences "
+        "generated for each specification, so that units that need the same "
+        "sequences (e.g., those that other sequences are made from) can "
+        "reuse them."
+    ),
+)
+
+plan.add_argument(
+    "--cacheSize",
+    metavar="BYTES",
+    type=int,
+    help="The maximum size of the --cache directory.",
+)
+
+execute = subparsers.add_parser(
+    "execute",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    help="Run one unit of a plan.",
+)
+
+execute.add_argument(
+    "--directory",
+    metavar="DIRECTORY",
+    required=True,
+    help="The directory holding the plan.",
+)
+
+execute.add_argument(
+    "--unit",
+    metavar="K",
+    type=int,
+    required=True,
+    help="The number of the unit to run (numbered from 0).",
+)
+
+merge = subparsers.add_parser(
+    "merge",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    help=(
+        "Merge the output of the units of a plan into the output files. "
+        "Sequences that have no filename in the specification are written to "
+        "standard output."
+    ),
+)
+
+merge.add_argument(
+    "--directory",
+    metavar="DIRECTORY",
+    required=True,
+    help="The directory holding the plan.",
+)
+
+args = parser.parse_args()
+
+try:
+    if args.command == "plan":
+        try:
+            result = Plan.make(
+                args.specification,
+                args.directory,
+                units=args.units,
+                readsPerUnit=args.readsPerUnit,
+                defaultLength=args.defaultLength,
+                defaultIdPrefix=args.defaultIdPrefix,
+                defaultQuality=args.quality,
+                _format=args.format,
+                defaultShards=args.shards,
+                defaultMaxReadsPerFile=args.maxReadsPerFile,
+                seed=args.seed,
+                cache=args.cache,
+                cacheSize=args.cacheSize,
+            )
+        except JSONDecodeError:
+            print(
+                "Could not parse your specification JSON. Stacktrace:",
+                file=sys.stderr,
+            )
+            raise
+        print(len(result.units))
+    elif args.command == "execute":
+        Plan(args.directory).execute(args.unit)
+    else:
+        Plan(args.directory).merge(sys.stdout)
+except ValueError as e:
+    print(e, file=sys.stderr)
+    sys.exit(1)
@@ -2,8 +2,14 @@
 
 import sys
 import argparse
+from json import dump, load
 from json.decoder import JSONDecodeError
 from seqgen import Sequences
+from seqgen.backends import BACKENDS
+from seqgen.instrumentation import PROFILERS, RunStats
+from seqgen.summary import Summary
+from seqgen.writers import FORMATS
+from seqgen.sweep import Sweep, isSweep
 
 parser = argparse.ArgumentParser(
     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -37,14 +43,16 @@ parser.add_argument(
 
 parser.add_argument(
     "--format",
-    choices=("fasta", "fastq"),
+    choices=FORMATS,
     default="fasta",
     help=(
         f"Set the default output format. The output format can be set (via the "
         f"specification file) for each set of reads, if desired. This option just "
         f"sets the default. If the format is 'fastq', the quality for each "
         f"nucleotide will be a constant, according to the value given to --quality "
-        f"(or {Sequences.DEFAULT_QUALITY} if --quality is not used."
+        f"(or {Sequences.DEFAULT_QUALITY} if --quality is not used. The 'phylip', "
+        f"'phylip-interleaved', 'nexus', and 'npy' alignment formats require all "
+        f"sequences written to a file to have the same length."
     ),
 )
 
@@ -73,18 +81,297 @@ parser.add_argument(
     ),
 )
 
+parser.add_argument(
+    "--serve",
+    metavar="SOCKET",
+    help=(
+        "Run as a server, listening on the given Unix socket path. Clients "
+        "send a JSON specification (or several, in JSON Lines format) and "
+        "receive the resulting sequences. Parsed specifications and "
+        "sequence files are cached between requests. Any --specification "
+        "option is ignored. Note that relative filenames in specifications "
+        "are interpreted relative to the server's working directory."
+    ),
+)
+
+parser.add_argument(
+    "--processes",
+    metavar="N",
+    type=int,
+    help=(
+        "The number of processes to use to generate the datasets of a sweep "
+        "(i.e., when variables in the specification are given a list or a "
+        "range of values). The default is to use one process per CPU."
+    ),
+)
+
+parser.add_argument(
+    "--stats",
+    metavar="FILENAME",
+    help=(
+        "Save per-specification statistics (time spent in generation, "
+        "mutation, formatting, and writing, the number of reads and bases "
+        "produced, and peak memory use) to this file, as JSON."
+    ),
+)
+
+parser.add_argument(
+    "--summary",
+    metavar="FILENAME",
+    help=(
+        "Save per-specification summary statistics of the reads produced "
+        "(composition, length distribution, the substitutions made by "
+        "mutation, and the mean distance between sampled pairs of reads) to "
+        "this file, as JSON. These are collected as the reads are generated, "
+        "so the output does not need to be read again to check them."
+    ),
+)
+
+parser.add_argument(
+    "--progress",
+    metavar="SECONDS",
+    type=float,
+    help="Write a progress and throughput line to standard error this often.",
+)
+
+parser.add_argument(
+    "--profile",
+    choices=PROFILERS,
+    help=(
+        "Profile the run. With 'cprofile', a summary is written to standard "
+        "error (or the full profile is saved to the file given by "
+        "--profileFile). With 'tracemalloc', the peak traced memory for each "
+        "specification is added to the --stats output and the top memory "
+        "allocations are written to standard error."
+    ),
+)
+
+parser.add_argument(
+    "--profileFile",
+    metavar="FILENAME",
+    help="The file to save the cProfile profile to (in pstats format).",
+)
+
+group = parser.add_mutually_exclusive_group()
+
+group.add_argument(
+    "--shards",
+    metavar="N",
+    type=int,
+    help=(
+        "The number of shard files to split the reads of a specification into, "
+        "for specifications whose filename contains a {shard} field (e.g., "
+        "'out-{shard:04d}.fastq') but that do not give 'shards' or 'max reads "
+        "per file'."
+    ),
+)
+
+group.add_argument(
+    "--maxReadsPerFile",
+    metavar="N",
+    type=int,
+    help=(
+        "The maximum number of reads in a shard file, for specifications whose "
+        "filename contains a {shard} field but that do not give 'shards' or "
+        "'max reads per file'."
+    ),
+)
+
+parser.add_argument(
+    "--manifest",
+    metavar="FILENAME",
+    help=(
+        "Write a manifest of the shard files (giving the number of reads and "
+        "the first and last read id in each) to this file, as JSON."
+    ),
+)
+
+parser.add_argument(
+    "--checkpoint",
+    metavar="FILENAME",
+    help=(
+        "Periodically save the progress of the run to this file, so that an "
+        "interrupted run can be continued with --resume. All sequences must be "
+        "written to files given in the specification. The file is removed when "
+        "the run completes."
+    ),
+)
+
+parser.add_argument(
+    "--checkpointInterval",
+    type=float,
+    metavar="SECONDS",
+    help="The minimum number of seconds between checkpoints.",
+)
+
+parser.add_argument(
+    "--resume",
+    action="store_true",
+    help=(
+        "Resume an interrupted run from the --checkpoint file. The same "
+        "specification and options must be given."
+    ),
+)
+
+parser.add_argument(
+    "--seed",
+    metavar="SEED",
+    help=(
+        "A seed for random number generation. Each sequence specification is "
+        "given its own random number generator, seeded from this and from the "
+        "specification (and those it depends on), so its sequences do not "
+        "change when unrelated specifications change."
+    ),
+)
+
+parser.add_argument(
+    "--cache",
+    metavar="DIRECTORY",
+    help=(
+        "A directory in which to keep the sequences generated for each "
+        "specification, so that later runs can reuse them if the specification "
+        "(and those it depends on) has not changed. Requires --seed."
+    ),
+)
+
+parser.add_argument(
+    "--cacheSize",
+    metavar="BYTES",
+    type=int,
+    help=(
+        "The maximum size of the --cache directory. The least recently used "
+        "entries are removed to keep within this size. If not given, 1GiB is "
+        "used."
+    ),
+)
+
+parser.add_argument(
+    "--store",
+    metavar="DIRECTORY",
+    help=(
+        "A directory in which to make a (temporary) file to keep the sequences "
+        "that other specifications refer to (e.g., via 'from id' or 'parent "
+        "prefix'), instead of keeping them all in memory."
+    ),
+)
+
+parser.add_argument(
+    "--storeMemory",
+    metavar="BYTES",
+    type=int,
+    help=(
+        "The maximum number of bytes of recently used sequences from the "
+        "--store to keep in memory. If not given, 256MiB is used."
+    ),
+)
+
+parser.add_argument(
+    "--dryRun",
+    "--dry-run",
+    action="store_true",
+    help=(
+        "Do not generate any sequences. Instead, write (as JSON, to standard "
+        "output) an estimate of the number of reads and bases, the size of each "
+        "output file, the memory needed, and the run time, per specification "
+        "and in total."
+    ),
+)
+
+parser.add_argument(
+    "--backend",
+    choices=["auto"] + list(BACKENDS),
+    default="auto",
+    help=(
+        "The backend to generate and change sequences with. 'auto' uses the "
+        "fastest one whose dependencies (NumPy, Numba) are installed. All "
+        "backends give the same sequences."
+    ),
+)
+
 args = parser.parse_args()
 
+if args.cache and args.seed is None:
+    parser.error("--cache requires --seed.")
+
+if args.storeMemory is not None and not args.store:
+    parser.error("--storeMemory requires --store.")
+
+if (args.resume or args.checkpointInterval is not None) and not args.checkpoint:
+    parser.error("--resume and --checkpointInterval require --checkpoint.")
+
+kwargs = dict(
+    defaultLength=args.defaultLength,
+    defaultIdPrefix=args.defaultIdPrefix,
+    defaultQuality=args.quality,
+    _format=args.format,
+    defaultShards=args.shards,
+    defaultMaxReadsPerFile=args.maxReadsPerFile,
+    seed=args.seed,
+    cache=args.cache,
+    cacheSize=args.cacheSize,
+    backend=args.backend,
+    store=args.store,
+    storeMemory=args.storeMemory,
+)
+
+if args.serve:
+    if args.checkpoint:
+        parser.error("--checkpoint cannot be used with --serve.")
+
+    import signal
+    from seqgen.server import SequencesServer
+
+    # Exit cleanly (removing the socket) when terminated.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    server = SequencesServer(args.serve, **kwargs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
 try:
-    sequences = Sequences(
-        args.specification,
-        defaultLength=args.defaultLength,
-        defaultIdPrefix=args.defaultIdPrefix,
-        defaultQuality=args.quality,
-        _format=args.format,
-    )
+    spec = load(args.specification)
 except JSONDecodeError:
     print("Could not parse your specification JSON. Stacktrace:", file=sys.stderr)
     raise
+
+instrument = args.stats or args.progress or args.profile
+
+if isSweep(spec):
+    if instrument or args.summary or args.manifest or args.checkpoint or args.dryRun:
+        print(
+            "The --stats, --summary, --progress, --profile, --manifest, "
+            "--checkpoint, and --dry-run options cannot be used with a sweep "
+            "specification.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    Sweep(spec, **kwargs).write(processes=args.processes)
+elif args.dryRun:
+    dump(Sequences(spec, **kwargs).estimate(), sys.stdout, indent=2)
+    print()
 else:
-    sequences.write()
+    stats = (
+        RunStats(
+            progressInterval=args.progress,
+            profile=args.profile,
+            profileFile=args.profileFile,
+        )
+        if instrument
+        else None
+    )
+    summary = Summary() if args.summary else None
+    Sequences(spec, stats=stats, summary=summary, **kwargs).write(
+        manifest=args.manifest,
+        checkpoint=args.checkpoint,
+        checkpointInterval=args.checkpointInterval,
+        resume=args.resume,
+    )
+    if args.stats:
+        stats.save(args.stats)
+    if args.summary:
+        summary.save(args.summary)
@@ -0,0 +1,77 @@
+class AliasTable:
+    """
+    Sample from a discrete distribution in constant time per draw, using
+    Vose's alias method.
+
+    The table has a column for each outcome. Each column holds the
+    probability of keeping its own outcome and an alias (another outcome)
+    to take otherwise. A draw takes a single uniform random number: its
+    integer part (when scaled by the number of columns) picks a column and
+    its fractional part decides between the column's outcome and its alias.
+
+    @param weights: An iterable of non-negative C{float} weights, one for
+        each outcome (numbered from 0).
+    @raise ValueError: If there are no weights, any weight is negative, or
+        the weights sum to zero.
+    """
+
+    def __init__(self, weights):
+        weights = list(weights)
+        if not weights:
+            raise ValueError("An alias table needs at least one weight.")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("Alias table weights must not be negative.")
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("Alias table weights must not all be zero.")
+
+        n = len(weights)
+        scaled = [weight * n / total for weight in weights]
+        probabilities = [1.0] * n
+        aliases = list(range(n))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Any columns left (because of rounding) keep their own outcome.
+
+        self.size = n
+        self.probabilities = probabilities
+        self.aliases = aliases
+
+    def draw(self, u):
+        """
+        Turn a uniform random number into an outcome.
+
+        @param u: A C{float} in [0.0, 1.0).
+        @return: The C{int} outcome.
+        """
+        x = u * self.size
+        column = int(x)
+        return (
+            column if x - column < self.probabilities[column] else self.aliases[column]
+        )
+
+    def sample(self, random, count):
+        """
+        Draw outcomes.
+
+        @param random: A random number generator (e.g., the C{random} module
+            or a C{random.Random} instance).
+        @param count: The C{int} number of outcomes to draw.
+        @return: A C{list} of C{int} outcomes.
+        """
+        rand = random.random
+        size, probabilities, aliases = self.size, self.probabilities, self.aliases
+        result = []
+        for _ in range(count):
+            x = rand() * size
+            column = int(x)
+            result.append(
+                column if x - column < probabilities[column] else aliases[column]
+            )
+        return result
@@ -0,0 +1,691 @@
+from bisect import bisect_right
+from functools import lru_cache
+from math import ceil, exp, floor, lgamma, log, log1p, sqrt
+
+from seqgen.read import COMPLEMENT_TABLE
+
+# The number of standard deviations either side of its mean that the
+# distribution of the number of breakpoints in a recombinant is tabulated
+# for (see _binomial).
+_BINOMIAL_WIDTH = 12
+
+
+@lru_cache(maxsize=64)
+def _binomial(n, p):
+    """
+    Tabulate the binomial distribution, for drawing the number of
+    breakpoints in a recombinant.
+
+    @param n: The C{int} number of trials.
+    @param p: The C{float} probability of success of each trial (greater
+        than 0 and less than 1).
+    @return: A 2-C{tuple} with the C{int} smallest number of successes
+        tabulated, and a C{tuple} of the C{float} cumulative probabilities
+        of that number and each larger one (except the largest tabulated).
+        The number of successes for a C{random()} number u is the smallest
+        number plus C{bisect_right} of u in the probabilities.
+    """
+    mean = n * p
+    width = _BINOMIAL_WIDTH * sqrt(mean * (1.0 - p))
+    lo = max(0, floor(mean - width))
+    hi = min(n, ceil(mean + width))
+    logP, logQ, logN = log(p), log1p(-p), lgamma(n + 1)
+    total = 0.0
+    cumulative = []
+    for k in range(lo, hi):
+        total += exp(
+            logN - lgamma(k + 1) - lgamma(n - k + 1) + k * logP + (n - k) * logQ
+        )
+        cumulative.append(total)
+    return lo, tuple(cumulative)
+
+
+class PythonBackend:
+    """
+    Generate and change sequences using only the standard library.
+
+    A backend does the work on sequences that takes most of the time when
+    generating them: filling sequences with random letters, choosing
+    mutations, reverse complementing, slicing, and concatenating. All
+    backends take their random numbers from the same C{random.Random} (or
+    C{random} module) stream, and use exactly the same numbers in the same
+    way, so they produce identical sequences for a given seed. A faster
+    backend can therefore be used without changing seeded output, cache
+    keys, checkpoints, or partitioned runs.
+
+    Random letters are chosen as C{random.choices} does, with
+    C{letters[floor(random() * n)]}. To choose mutations, one C{random()}
+    number is used for each site (the site is changed if it is less than
+    the rate) and then one for each changed site, to choose its new letter.
+
+    The breakpoints and parents of a batch of recombinants are drawn
+    together (see C{recombinants}). If a breakpoint rate is given, one
+    C{random()} number is used for each recombinant, to draw its number of
+    breakpoints, k, from the binomial distribution. Then, for each
+    recombinant in turn, k numbers are used to choose its breakpoints (with
+    Floyd's algorithm) and k + 1 to choose the parent of each part.
+    """
+
+    name = "python"
+
+    def randomSequence(self, random, letters, length):
+        """
+        Make a sequence of letters chosen uniformly at random.
+
+        @param random: A random number generator (e.g., the C{random} module
+            or a C{random.Random} instance).
+        @param letters: A C{str} or C{list} of letters to choose from.
+        @param length: The C{int} length of the sequence.
+        @return: A C{str} sequence.
+        """
+        return "".join(random.choices(letters, k=length))
+
+    def sites(self, random, length, rate):
+        """
+        Choose the sites of a sequence to change.
+
+        @param random: A random number generator.
+        @param length: The C{int} length of the sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @return: A C{list} of the C{int} (0-based) sites to change, in
+            increasing order.
+        """
+        rand = random.random
+        return [site for site in range(length) if rand() < rate]
+
+    def mutations(self, random, sequence, rate, alphabet):
+        """
+        Choose mutations for a sequence. Each changed site gets a letter of
+        the alphabet other than its own, chosen uniformly (or any letter of
+        the alphabet, if its own letter is not in it).
+
+        @param random: A random number generator.
+        @param sequence: A C{str} sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @param alphabet: A C{str} or C{list} of letters.
+        @return: A 2-C{tuple} with a C{list} of the C{int} (0-based) sites
+            to change, in increasing order, and a C{str} of their new bases.
+        """
+        positions = self.sites(random, len(sequence), rate)
+        possibles, others = self.replacements(alphabet)
+        rand = random.random
+        bases = []
+        for position in positions:
+            choices = others.get(sequence[position], possibles)
+            bases.append(choices[floor(rand() * len(choices))])
+        return positions, "".join(bases)
+
+    @staticmethod
+    def replacements(alphabet):
+        """
+        Find the letters that each letter of an alphabet can change to.
+
+        @param alphabet: A C{str} or C{list} of letters.
+        @return: A 2-C{tuple} with a C{list} of the distinct letters of the
+            alphabet, and a C{dict} mapping each of them to a C{list} of the
+            others. The letters are in alphabet order (not set order, which
+            varies between processes), so that seeded runs are repeatable.
+        """
+        possibles = list(dict.fromkeys(alphabet))
+        return possibles, {
+            letter: [other for other in possibles if other != letter]
+            for letter in possibles
+        }
+
+    def breakpointCounts(self, random, count, sites, breakpoints, rate):
+        """
+        Draw the number of breakpoints of each of a batch of recombinants.
+
+        @param random: A random number generator.
+        @param count: The C{int} number of recombinants.
+        @param sites: The C{int} number of sites (between bases) that
+            breakpoints can be at.
+        @param breakpoints: The C{int} number of breakpoints, used if
+            C{rate} is C{None}.
+        @param rate: The C{float} probability of a breakpoint at each site,
+            or C{None}.
+        @return: A C{list} of C{int} numbers of breakpoints.
+        """
+        if rate is None:
+            return [breakpoints] * count
+        if rate >= 1.0:
+            return [sites] * count
+        lo, cumulative = _binomial(sites, rate)
+        rand = random.random
+        return [lo + bisect_right(cumulative, rand()) for _ in range(count)]
+
+    def recombinants(self, random, count, length, parents, breakpoints=1, rate=None):
+        """
+        Draw the breakpoints and the parent of each part of a batch of
+        recombinants. The parent of each part is chosen uniformly from those
+        other than the parent of the part before it.
+
+        @param random: A random number generator.
+        @param count: The C{int} number of recombinants.
+        @param length: The C{int} length of the parents.
+        @param parents: The C{int} number of parents.
+        @param breakpoints: The C{int} number of breakpoints in each
+            recombinant (less than C{length}), used if C{rate} is C{None}.
+        @param rate: The C{float} probability of a breakpoint between each
+            pair of bases, or C{None}.
+        @return: A C{list} with a 2-C{tuple} for each recombinant, holding a
+            C{list} of its C{int} breakpoints (the 0-based starts of all but
+            the first part), in increasing order, and a C{list} of the C{int}
+            index of the parent of each part.
+        """
+        sites = length - 1
+        counts = self.breakpointCounts(random, count, sites, breakpoints, rate)
+        return self._breakpointsAndParents(random, counts, sites, parents)
+
+    def _breakpointsAndParents(self, random, counts, sites, parents):
+        """
+        Draw the breakpoints and parents of a batch of recombinants, given
+        their numbers of breakpoints. See C{recombinants}.
+
+        @param random: A random number generator.
+        @param counts: An iterable of the C{int} number of breakpoints of
+            each recombinant.
+        @param sites: The C{int} number of sites breakpoints can be at.
+        @param parents: The C{int} number of parents.
+        @return: A C{list} of 2-C{tuple}s, as returned by C{recombinants}.
+        """
+        rand = random.random
+        result = []
+        for k in counts:
+            chosen = set()
+            for j in range(sites - k, sites):
+                site = floor(rand() * (j + 1))
+                chosen.add(j if site in chosen else site)
+            choices = [floor(rand() * parents)]
+            for _ in range(k):
+                choice = floor(rand() * (parents - 1))
+                choices.append(choice + (choice >= choices[-1]))
+            result.append((sorted(site + 1 for site in chosen), choices))
+        return result
+
+    def reverseComplement(self, sequence):
+        """
+        Reverse complement a nucleotide sequence.
+
+        @param sequence: A C{str} sequence.
+        @return: The C{str} reverse complemented sequence.
+        """
+        return sequence.translate(COMPLEMENT_TABLE)[::-1]
+
+    def slice(self, sequence, start, length):
+        """
+        Get part of a sequence.
+
+        @param sequence: A C{str} sequence.
+        @param start: The C{int} (0-based) start of the part.
+        @param length: The C{int} length of the part.
+        @return: The C{str} part (which is shorter than C{length} if the
+            sequence is not long enough).
+        """
+        return sequence[start : start + length]
+
+    def concatenate(self, sequences):
+        """
+        Join sequences.
+
+        @param sequences: An iterable of C{str} sequences.
+        @return: The C{str} joined sequence.
+        """
+        return "".join(sequences)
+
+
+class NumpyBackend(PythonBackend):
+    """
+    Generate and change sequences using NumPy arrays.
+
+    The C{random()} numbers that the pure Python backend would use are made
+    in bulk from C{random.randbytes}: C{random()} is made from two 32-bit
+    Mersenne Twister outputs, a and b, as C{(a >> 5) * 2**26 + (b >> 6)}
+    divided by 2**53, and C{randbytes} gives the same outputs, in order. So
+    the results are identical to those of L{PythonBackend}. Sequences shorter
+    than C{MIN_LENGTH} (for which making arrays costs more than it saves) and
+    sequences that are not ASCII are handled as in L{PythonBackend}.
+
+    The breakpoints and parents of a batch of recombinants are drawn with
+    one array operation per breakpoint (for all the recombinants at once),
+    unless a recombinant has more than C{MAX_BREAKPOINTS} breakpoints (when
+    checking that each breakpoint differs from those already chosen costs
+    more than it saves).
+
+    @raise ValueError: If NumPy is not installed.
+    """
+
+    name = "numpy"
+    MIN_LENGTH = 1000
+    MAX_BREAKPOINTS = 64
+
+    def __init__(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise ValueError(
+                "The numpy package must be installed to use the numpy backend "
+                "(try 'pip install numpy')."
+            )
+        self.np = np
+        self._tables = {}
+
+    def uniforms(self, random, count):
+        """
+        Make the next C{random()} numbers of a random number generator.
+
+        @param random: A random number generator.
+        @param count: The C{int} number of numbers to make.
+        @return: A C{float64} array of C{count} numbers in [0.0, 1.0).
+        """
+        np = self.np
+        words = np.frombuffer(random.randbytes(8 * count), dtype="<u4").reshape(
+            count, 2
+        )
+        return ((words[:, 0] >> 5) * 67108864.0 + (words[:, 1] >> 6)) * (
+            1.0 / 9007199254740992.0
+        )
+
+    def randomSequence(self, random, letters, length):
+        """
+        Make a sequence of letters chosen uniformly at random.
+
+        @param random: A random number generator.
+        @param letters: A C{str} or C{list} of letters to choose from.
+        @param length: The C{int} length of the sequence.
+        @return: A C{str} sequence.
+        """
+        letters = "".join(letters)
+        if length < self.MIN_LENGTH or not letters.isascii():
+            return super().randomSequence(random, letters, length)
+        np = self.np
+        codes = np.frombuffer(letters.encode("ascii"), dtype=np.uint8)
+        indices = (self.uniforms(random, length) * float(len(codes))).astype(np.intp)
+        return codes[indices].tobytes().decode("ascii")
+
+    def sites(self, random, length, rate):
+        """
+        Choose the sites of a sequence to change.
+
+        @param random: A random number generator.
+        @param length: The C{int} length of the sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @return: A C{list} of the C{int} (0-based) sites to change, in
+            increasing order.
+        """
+        if length < self.MIN_LENGTH:
+            return super().sites(random, length, rate)
+        return self.np.flatnonzero(self.uniforms(random, length) < rate).tolist()
+
+    def _table(self, alphabet):
+        """
+        Get arrays giving the letters that each letter can change to.
+
+        @param alphabet: A C{str} or C{list} of ASCII letters.
+        @return: A 2-C{tuple} with a C{uint8} array (with a row for each of
+            the 256 byte values) of the letters each can change to, and an
+            array of the number of those letters.
+        """
+        key = "".join(alphabet)
+        try:
+            return self._tables[key]
+        except KeyError:
+            pass
+        np = self.np
+        possibles, others = self.replacements(alphabet)
+        n = len(possibles)
+        table = np.zeros((256, n), dtype=np.uint8)
+        counts = np.full(256, n, dtype=np.intp)
+        table[:] = [ord(letter) for letter in possibles]
+        for letter, choices in others.items():
+            code = ord(letter)
+            table[code, : len(choices)] = [ord(choice) for choice in choices]
+            counts[code] = len(choices)
+        result = self._tables[key] = table, counts
+        return result
+
+    def mutations(self, random, sequence, rate, alphabet):
+        """
+        Choose mutations for a sequence. See L{PythonBackend.mutations}.
+
+        @param random: A random number generator.
+        @param sequence: A C{str} sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @param alphabet: A C{str} or C{list} of letters.
+        @return: A 2-C{tuple} with a C{list} of the C{int} (0-based) sites
+            to change, in increasing order, and a C{str} of their new bases.
+        """
+        if (
+            len(sequence) < self.MIN_LENGTH
+            or not sequence.isascii()
+            or not "".join(alphabet).isascii()
+        ):
+            return super().mutations(random, sequence, rate, alphabet)
+        np = self.np
+        table, counts = self._table(alphabet)
+        positions = np.flatnonzero(self.uniforms(random, len(sequence)) < rate)
+        if not len(positions):
+            return [], ""
+        codes = np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)[positions]
+        choices = (self.uniforms(random, len(positions)) * counts[codes]).astype(
+            np.intp
+        )
+        return (
+            positions.tolist(),
+            table[codes, choices].tobytes().decode("ascii"),
+        )
+
+    def breakpointCounts(self, random, count, sites, breakpoints, rate):
+        """
+        Draw the number of breakpoints of each of a batch of recombinants.
+        See L{PythonBackend.breakpointCounts}.
+
+        @param random: A random number generator.
+        @param count: The C{int} number of recombinants.
+        @param sites: The C{int} number of sites (between bases) that
+            breakpoints can be at.
+        @param breakpoints: The C{int} number of breakpoints, used if
+            C{rate} is C{None}.
+        @param rate: The C{float} probability of a breakpoint at each site,
+            or C{None}.
+        @return: A C{list} of C{int} numbers of breakpoints.
+        """
+        if rate is None or rate >= 1.0:
+            return super().breakpointCounts(random, count, sites, breakpoints, rate)
+        np = self.np
+        lo, cumulative = _binomial(sites, rate)
+        return (
+            lo
+            + np.searchsorted(
+                np.array(cumulative), self.uniforms(random, count), side="right"
+            )
+        ).tolist()
+
+    def _breakpointsAndParents(self, random, counts, sites, parents):
+        """
+        Draw the breakpoints and parents of a batch of recombinants, given
+        their numbers of breakpoints. See L{PythonBackend.recombinants}.
+
+        @param random: A random number generator.
+        @param counts: A C{list} of the C{int} number of breakpoints of each
+            recombinant.
+        @param sites: The C{int} number of sites breakpoints can be at.
+        @param parents: The C{int} number of parents.
+        @return: A C{list} of 2-C{tuple}s, as returned by
+            L{PythonBackend.recombinants}.
+        """
+        width = max(counts)
+        if width > self.MAX_BREAKPOINTS:
+            return super()._breakpointsAndParents(random, counts, sites, parents)
+        np = self.np
+        ks = np.array(counts, dtype=np.intp)
+        # Each recombinant uses k numbers for its breakpoints and then k + 1
+        # for its parents. Rows are padded (with numbers that are not used)
+        # to the largest number of breakpoints.
+        used = 2 * ks + 1
+        starts = np.cumsum(used) - used
+        numbers = self.uniforms(random, int(used.sum()))
+        last = len(numbers) - 1
+        columns = np.arange(width + 1)
+        draws = numbers[np.minimum(starts[:, None] + columns[:width], last)]
+        chosen = np.empty((len(ks), width), dtype=np.intp)
+        for i in range(width):
+            j = sites - ks + i
+            site = (draws[:, i] * (j + 1)).astype(np.intp)
+            chosen[:, i] = np.where((chosen[:, :i] == site[:, None]).any(1), j, site)
+        chosen = np.sort(np.where(columns[:width] < ks[:, None], chosen + 1, sites), 1)
+
+        draws = numbers[np.minimum((starts + ks)[:, None] + columns, last)]
+        choices = np.empty((len(ks), width + 1), dtype=np.intp)
+        choices[:, 0] = (draws[:, 0] * parents).astype(np.intp)
+        for i in range(1, width + 1):
+            choice = (draws[:, i] * (parents - 1)).astype(np.intp)
+            choices[:, i] = choice + (choice >= choices[:, i - 1])
+
+        return [
+            (chosen[row, :k].tolist(), choices[row, : k + 1].tolist())
+            for row, k in enumerate(counts)
+        ]
+
+
+def _fill(words, codes, result):
+    """
+    Choose letters uniformly at random (compiled by L{NumbaBackend}).
+
+    @param words: A C{uint32} array of pairs of Mersenne Twister outputs, one
+        pair for each C{random()} number.
+    @param codes: A C{uint8} array of the letters to choose from.
+    @param result: A C{uint8} array to put the chosen letters in.
+    """
+    n = float(len(codes))
+    for i in range(len(result)):
+        u = ((words[2 * i] >> 5) * 67108864.0 + (words[2 * i + 1] >> 6)) * (
+            1.0 / 9007199254740992.0
+        )
+        result[i] = codes[int(u * n)]
+
+
+def _below(words, rate, result):
+    """
+    Find the sites whose C{random()} number is less than a rate (compiled by
+    L{NumbaBackend}).
+
+    @param words: A C{uint32} array of pairs of Mersenne Twister outputs, one
+        pair for each site.
+    @param rate: The C{float} rate.
+    @param result: An C{intp} array to put the sites in.
+    @return: The C{int} number of sites put in C{result}.
+    """
+    count = 0
+    for i in range(len(words) // 2):
+        u = ((words[2 * i] >> 5) * 67108864.0 + (words[2 * i + 1] >> 6)) * (
+            1.0 / 9007199254740992.0
+        )
+        if u < rate:
+            result[count] = i
+            count += 1
+    return count
+
+
+class NumbaBackend(NumpyBackend):
+    """
+    Generate and change sequences using NumPy arrays and functions compiled
+    with Numba, which choose letters and mutated sites in single passes
+    (without the temporary arrays that NumPy makes). The results are
+    identical to those of L{PythonBackend}.
+
+    @raise ValueError: If NumPy or Numba is not installed.
+    """
+
+    name = "numba"
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import numba
+        except ImportError:
+            raise ValueError(
+                "The numba package must be installed to use the numba backend "
+                "(try 'pip install numba')."
+            )
+
+        self._fill = numba.njit(cache=True)(_fill)
+        self._below = numba.njit(cache=True)(_below)
+
+    def _words(self, random, count):
+        """
+        Get the 32-bit outputs for the next C{random()} numbers of a random
+        number generator.
+
+        @param random: A random number generator.
+        @param count: The C{int} number of C{random()} numbers.
+        @return: A C{uint32} array of C{2 * count} outputs.
+        """
+        return self.np.frombuffer(random.randbytes(8 * count), dtype="<u4")
+
+    def randomSequence(self, random, letters, length):
+        """
+        Make a sequence of letters chosen uniformly at random.
+
+        @param random: A random number generator.
+        @param letters: A C{str} or C{list} of letters to choose from.
+        @param length: The C{int} length of the sequence.
+        @return: A C{str} sequence.
+        """
+        letters = "".join(letters)
+        if length < self.MIN_LENGTH or not letters.isascii():
+            return PythonBackend.randomSequence(self, random, letters, length)
+        np = self.np
+        codes = np.frombuffer(letters.encode("ascii"), dtype=np.uint8)
+        result = np.empty(length, dtype=np.uint8)
+        self._fill(self._words(random, length), codes, result)
+        return result.tobytes().decode("ascii")
+
+    def sites(self, random, length, rate):
+        """
+        Choose the sites of a sequence to change.
+
+        @param random: A random number generator.
+        @param length: The C{int} length of the sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @return: A C{list} of the C{int} (0-based) sites to change, in
+            increasing order.
+        """
+        if length < self.MIN_LENGTH:
+            return PythonBackend.sites(self, random, length, rate)
+        result = self.np.empty(length, dtype=self.np.intp)
+        count = self._below(self._words(random, length), float(rate), result)
+        return result[:count].tolist()
+
+
+# The backends, in order of preference.
+BACKENDS = {
+    backend.name: backend for backend in (NumbaBackend, NumpyBackend, PythonBackend)
+}
+
+
+class AutoBackend(PythonBackend):
+    """
+    Use the fastest backend whose dependencies are installed, but only
+    choose it (and so import NumPy or Numba) the first time it is given a
+    sequence that is at least C{MIN_LENGTH} long. Shorter sequences are
+    handled as in L{PythonBackend}, as the other backends would handle
+    them, so runs that only make short sequences start quickly. The results
+    are identical to those of L{PythonBackend}.
+
+    Likewise, batches of fewer than C{MIN_BATCH} recombinants are drawn as
+    in L{PythonBackend}.
+    """
+
+    name = "auto"
+    MIN_LENGTH = NumpyBackend.MIN_LENGTH
+    MIN_BATCH = 100
+
+    def __init__(self):
+        self._fast = None
+
+    @property
+    def fast(self):
+        """
+        Get the fastest installed backend, choosing it if necessary.
+
+        @return: A backend instance.
+        """
+        if self._fast is None:
+            for backendClass in BACKENDS.values():
+                try:
+                    self._fast = backendClass()
+                except ValueError:
+                    pass
+                else:
+                    break
+        return self._fast
+
+    def randomSequence(self, random, letters, length):
+        """
+        Make a sequence of letters chosen uniformly at random.
+
+        @param random: A random number generator.
+        @param letters: A C{str} or C{list} of letters to choose from.
+        @param length: The C{int} length of the sequence.
+        @return: A C{str} sequence.
+        """
+        if length < self.MIN_LENGTH:
+            return super().randomSequence(random, letters, length)
+        return self.fast.randomSequence(random, letters, length)
+
+    def sites(self, random, length, rate):
+        """
+        Choose the sites of a sequence to change.
+
+        @param random: A random number generator.
+        @param length: The C{int} length of the sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @return: A C{list} of the C{int} (0-based) sites to change, in
+            increasing order.
+        """
+        if length < self.MIN_LENGTH:
+            return super().sites(random, length, rate)
+        return self.fast.sites(random, length, rate)
+
+    def mutations(self, random, sequence, rate, alphabet):
+        """
+        Choose mutations for a sequence. See L{PythonBackend.mutations}.
+
+        @param random: A random number generator.
+        @param sequence: A C{str} sequence.
+        @param rate: The C{float} probability that a site is changed.
+        @param alphabet: A C{str} or C{list} of letters.
+        @return: A 2-C{tuple} with a C{list} of the C{int} (0-based) sites
+            to change, in increasing order, and a C{str} of their new bases.
+        """
+        if len(sequence) < self.MIN_LENGTH:
+            return super().mutations(random, sequence, rate, alphabet)
+        return self.fast.mutations(random, sequence, rate, alphabet)
+
+    def recombinants(self, random, count, length, parents, breakpoints=1, rate=None):
+        """
+        Draw the breakpoints and the parent of each part of a batch of
+        recombinants. See L{PythonBackend.recombinants}.
+
+        @param random: A random number generator.
+        @param count: The C{int} number of recombinants.
+        @param length: The C{int} length of the parents.
+        @param parents: The C{int} number of parents.
+        @param breakpoints: The C{int} number of breakpoints in each
+            recombinant, used if C{rate} is C{None}.
+        @param rate: The C{float} probability of a breakpoint between each
+            pair of bases, or C{None}.
+        @return: A C{list} of 2-C{tuple}s, as returned by
+            L{PythonBackend.recombinants}.
+        """
+        if count < self.MIN_BATCH:
+            return super().recombinants(
+                random, count, length, parents, breakpoints, rate
+            )
+        return self.fast.recombinants(random, count, length, parents, breakpoints, rate)
+
+
+def getBackend(name=None):
+    """
+    Get a backend.
+
+    @param name: The C{str} name of a backend (one of the keys of
+        C{BACKENDS}), or C{None} (or 'auto') to use the first backend in
+        C{BACKENDS} whose dependencies are installed (see L{AutoBackend},
+        which only imports them when they are first needed).
+    @raise ValueError: If the name is not known or the dependencies of the
+        named backend are not installed.
+    @return: A backend instance.
+    """
+    if name is None or name == "auto":
+        return AutoBackend()
+
+    try:
+        backendClass = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            "Unknown backend %r. Use one of: %s."
+            % (name, ", ".join(["auto"] + list(BACKENDS)))
+        )
+    return backendClass()
@@ -0,0 +1,195 @@
+import os
+import pickle
+from array import array
+
+from seqgen.read import Read
+
+
+class ReadCache:
+    """
+    Keep the reads generated for sequence specifications in a directory, so
+    that they can be reused (instead of being generated again) in later runs.
+
+    Each specification has a key (see C{seqgen.sequences.Sequences}) that
+    changes whenever anything that affects its reads changes, and its reads
+    are saved in a file named for the key. Entries are written to a temporary
+    file that is renamed when the last read has been added, so an interrupted
+    run never leaves a partial entry. When the total size of the entries
+    exceeds C{maxBytes}, the least recently used entries are removed.
+
+    @param directory: The C{str} directory to keep entries in. It is created
+        if it does not exist.
+    @param maxBytes: The C{int} maximum total size of the entries, or
+        C{None} to use C{DEFAULT_MAX_BYTES}.
+    """
+
+    DEFAULT_MAX_BYTES = 2**30
+    SUFFIX = ".reads"
+
+    def __init__(self, directory, maxBytes=None):
+        self.directory = directory
+        self.maxBytes = self.DEFAULT_MAX_BYTES if maxBytes is None else maxBytes
+        os.makedirs(directory, exist_ok=True)
+
+    def filename(self, key):
+        """
+        Get the name of the file for an entry.
+
+        @param key: The C{str} key of the entry.
+        @return: The C{str} filename.
+        """
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key, sequences):
+        """
+        Load the reads of an entry.
+
+        @param key: The C{str} key of the entry.
+        @param sequences: A C{dict} of previously generated (or loaded) reads,
+            keyed by C{str} id, holding the reads that mutants were made from.
+        @return: A generator of C{seqgen.read.Read} instances, or C{None} if
+            there is no entry for C{key}.
+        """
+        filename = self.filename(key)
+        try:
+            fp = open(filename, "rb")
+        except FileNotFoundError:
+            return None
+        # Mark the entry as recently used.
+        os.utime(filename)
+        return self._iterReads(fp, sequences)
+
+    @staticmethod
+    def _iterReads(fp, sequences):
+        """
+        Read the reads of an entry.
+
+        A mutant is made from the read its changes are to, which is either a
+        read of an earlier specification (referred to with 'from id') or,
+        in a ratchet, the last read of the entry that was saved in full. The
+        latter is used if the read is not in C{sequences}, because with a
+        store (see C{seqgen.store.ReadStore}) only the reads that later
+        specifications refer to are kept there.
+
+        @param fp: An open (binary) file pointer for the entry.
+        @param sequences: A C{dict} of reads that mutants were made from,
+            keyed by C{str} id.
+        @return: A generator of C{seqgen.read.Read} instances.
+        """
+        lastFull = None
+        with fp:
+            while True:
+                try:
+                    id_, sequence, quality, alphabet, parentId, positions, bases = (
+                        pickle.load(fp)
+                    )
+                except EOFError:
+                    return
+                if parentId is None:
+                    read = lastFull = Read(id_, sequence, quality, alphabet)
+                else:
+                    changes = array("I")
+                    changes.frombytes(positions)
+                    try:
+                        parent = sequences[parentId]
+                    except KeyError:
+                        if lastFull is None or lastFull.id != parentId:
+                            raise
+                        parent = lastFull
+                    read = Read.mutant(parent, changes, bases)
+                    read.id, read.quality, read.alphabet = id_, quality, alphabet
+                yield read
+
+    def writer(self, key):
+        """
+        Get a writer to add the reads of a new entry.
+
+        @param key: The C{str} key of the entry.
+        @return: A L{CacheEntryWriter} instance.
+        """
+        return CacheEntryWriter(self, key)
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the total size of the
+        entries is no more than C{maxBytes}.
+
+        @param keep: The C{str} filename of an entry that should be removed
+            last, or C{None}.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                filename = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(filename)
+                except FileNotFoundError:
+                    continue
+                entries.append((filename == keep, stat.st_mtime_ns, filename))
+                total += stat.st_size
+
+        # Remove the oldest entries first, and the one to keep last.
+        for _, _, filename in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            try:
+                size = os.path.getsize(filename)
+                os.unlink(filename)
+            except FileNotFoundError:
+                continue
+            total -= size
+
+
+class CacheEntryWriter:
+    """
+    Write the reads of a new L{ReadCache} entry.
+
+    @param cache: The L{ReadCache} instance.
+    @param key: The C{str} key of the entry.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.filename = cache.filename(key)
+        self.tmp = "%s.%d.tmp" % (self.filename, os.getpid())
+        self.fp = open(self.tmp, "wb")
+
+    def add(self, read):
+        """
+        Add a read to the entry. Mutants (see C{seqgen.read.Read.mutant})
+        are saved as changes to the read they were made from.
+
+        @param read: A C{seqgen.read.Read} instance.
+        """
+        if read.parent is None:
+            entry = (read.id, read.sequence, read.quality, read.alphabet, None, b"", "")
+        else:
+            entry = (
+                read.id,
+                None,
+                read.quality,
+                read.alphabet,
+                read.parent.id,
+                read.positions.tobytes(),
+                read.bases,
+            )
+        pickle.dump(entry, self.fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def commit(self):
+        """
+        Finish the entry, and remove old entries if the cache is too big.
+        """
+        self.fp.close()
+        os.replace(self.tmp, self.filename)
+        self.cache.evict(keep=self.filename)
+
+    def abort(self):
+        """
+        Abandon the entry.
+        """
+        self.fp.close()
+        try:
+            os.unlink(self.tmp)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,94 @@
+import os
+import pickle
+from time import perf_counter
+
+
+class Checkpointer:
+    """
+    Periodically save the progress of a run to a file, so that an interrupted
+    run can be resumed.
+
+    @param filename: The C{str} file to save checkpoints to.
+    @param interval: The C{float} minimum number of seconds between
+        checkpoints.
+    """
+
+    DEFAULT_INTERVAL = 60.0
+
+    def __init__(self, filename, interval=None):
+        self.filename = filename
+        self.interval = self.DEFAULT_INTERVAL if interval is None else interval
+        self._last = perf_counter()
+
+    def due(self):
+        """
+        Is it time to save a checkpoint?
+
+        @return: C{True} if at least C{interval} seconds have passed since the
+            last checkpoint (or since this instance was created).
+        """
+        return perf_counter() - self._last >= self.interval
+
+    def save(self, state):
+        """
+        Save a checkpoint.
+
+        The checkpoint is written to a temporary file that is then renamed,
+        so an interruption while saving leaves the previous checkpoint intact.
+
+        @param state: A picklable C{dict} with the state of the run.
+        """
+        tmp = self.filename + ".tmp"
+        with open(tmp, "wb") as fp:
+            pickle.dump(state, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, self.filename)
+        self._last = perf_counter()
+
+    def load(self):
+        """
+        Load the last checkpoint.
+
+        @raise ValueError: If there is no checkpoint file.
+        @return: The C{dict} state of the run that was saved.
+        """
+        try:
+            with open(self.filename, "rb") as fp:
+                return pickle.load(fp)
+        except FileNotFoundError:
+            raise ValueError(
+                "Checkpoint file %r does not exist, so the run cannot be "
+                "resumed." % self.filename
+            )
+
+    def remove(self):
+        """
+        Remove the checkpoint file (when a run has completed).
+        """
+        try:
+            os.unlink(self.filename)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def truncate(offsets):
+        """
+        Truncate output files to the sizes they had at a checkpoint.
+
+        @param offsets: A C{dict} mapping C{str} filenames to C{int} sizes.
+        @raise ValueError: If an output file is missing or is shorter than
+            its size at the checkpoint.
+        """
+        for filename, offset in offsets.items():
+            try:
+                size = os.path.getsize(filename)
+            except FileNotFoundError:
+                size = -1
+            if size < offset:
+                raise ValueError(
+                    "Output file %r is missing or is shorter than it was at "
+                    "the checkpoint (%d bytes), so the run cannot be resumed."
+                    % (filename, offset)
+                )
+            os.truncate(filename, offset)
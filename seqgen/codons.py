@@ -0,0 +1,171 @@
+from itertools import product
+
+from seqgen.alias import AliasTable
+
+# The 64 codons, numbered so that the codon xyz (with A=0, C=1, G=2, T=3)
+# has index 16x + 4y + z.
+CODONS = tuple("".join(codon) for codon in product("ACGT", repeat=3))
+
+# The standard genetic code, with '*' for stop codons, in the order of
+# CODONS.
+AMINO_ACIDS = "KNKNTTTTRSRSIIMIQHQHPPPPRRRRLLLLEDEDAAAAGGGGVVVV*Y*YSSSS*CWCLFLF"
+
+GENETIC_CODE = dict(zip(CODONS, AMINO_ACIDS))
+
+START_CODON = "ATG"
+STOP_CODONS = tuple(codon for codon in CODONS if GENETIC_CODE[codon] == "*")
+SENSE_CODONS = tuple(codon for codon in CODONS if GENETIC_CODE[codon] != "*")
+
+
+def translate(sequence):
+    """
+    Translate a nucleotide sequence using the standard genetic code.
+
+    @param sequence: A C{str} nucleotide sequence. Any incomplete codon at its
+        end is ignored.
+    @return: The C{str} amino acid sequence, with '*' for stop codons and 'X'
+        for codons that contain letters other than A, C, G and T.
+    """
+    sequence = sequence.upper()
+    get = GENETIC_CODE.get
+    return "".join(
+        [get(sequence[i : i + 3], "X") for i in range(0, len(sequence) - 2, 3)]
+    )
+
+
+class CodonModel:
+    """
+    Generate open reading frames with a given codon usage, and choose
+    synonymous and non-synonymous changes to codons.
+
+    All the tables are made once, when the model is created: an alias table
+    (see L{seqgen.alias.AliasTable}) for choosing sense codons and one for
+    stop codons, and, for each codon, alias tables for choosing a codon that
+    codes for the same amino acid (a synonymous change) or for a different
+    one (a non-synonymous change, which never gives a stop codon).
+    Replacement codons are chosen in proportion to their usage.
+
+    @param usage: A C{dict} mapping C{str} codons to their (non-negative)
+        weights, or C{None} to give all codons the same weight. Codons that
+        are not given have weight zero.
+    @raise ValueError: If a key is not a codon, a weight is negative, or no
+        sense codon has a positive weight.
+    """
+
+    def __init__(self, usage=None):
+        if usage is None:
+            weights = dict.fromkeys(CODONS, 1.0)
+        else:
+            weights = dict.fromkeys(CODONS, 0.0)
+            for codon, weight in usage.items():
+                if codon.upper() not in weights:
+                    raise ValueError("Codon usage key %r is not a codon." % codon)
+                if weight < 0:
+                    raise ValueError(
+                        "Codon usage weight for %r (%r) is negative." % (codon, weight)
+                    )
+                weights[codon.upper()] += weight
+
+        if not any(weights[codon] for codon in SENSE_CODONS):
+            raise ValueError("Codon usage must give a sense codon a positive weight.")
+
+        self.weights = weights
+        self._sense = AliasTable(weights[codon] for codon in SENSE_CODONS)
+        self._stop = self._table(STOP_CODONS)[1]
+        self._index = {codon: index for index, codon in enumerate(CODONS)}
+        self._synonymous = []
+        self._nonSynonymous = []
+        for codon in CODONS:
+            aa = GENETIC_CODE[codon]
+            self._synonymous.append(
+                self._table(
+                    [
+                        other
+                        for other in CODONS
+                        if other != codon and GENETIC_CODE[other] == aa
+                    ]
+                )
+            )
+            self._nonSynonymous.append(
+                self._table(
+                    [
+                        other
+                        for other in SENSE_CODONS
+                        if GENETIC_CODE[other] not in (aa, "*")
+                    ]
+                )
+            )
+
+    def _table(self, codons):
+        """
+        Make an alias table for choosing among some codons, in proportion to
+        their weights (or uniformly, if their weights are all zero).
+
+        @param codons: A C{list} of C{str} codons.
+        @return: A 2-C{tuple} of the codons and a L{seqgen.alias.AliasTable},
+            or C{None} if there are no codons.
+        """
+        if not codons:
+            return None
+        weights = [self.weights[codon] for codon in codons]
+        if not any(weights):
+            weights = [1.0] * len(codons)
+        return tuple(codons), AliasTable(weights)
+
+    def orf(self, random, length):
+        """
+        Generate an open reading frame: a start codon, sense codons, and a
+        stop codon.
+
+        @param random: A random number generator (e.g., the C{random} module
+            or a C{random.Random} instance).
+        @param length: The C{int} length of the sequence, a multiple of three
+            that is at least six.
+        @return: A C{str} nucleotide sequence.
+        """
+        stop = STOP_CODONS[self._stop.draw(random.random())]
+        sense = self._sense.sample(random, length // 3 - 2)
+        return START_CODON + "".join(map(SENSE_CODONS.__getitem__, sense)) + stop
+
+    def mutations(self, random, sequence, synonymousRate, nonSynonymousRate):
+        """
+        Choose synonymous and non-synonymous changes to the codons of a
+        sequence, which is read in the frame starting at its first base. The
+        first codon (the start codon, in an open reading frame), stop codons,
+        and codons with letters other than A, C, G and T are not changed.
+
+        @param random: A random number generator (e.g., the C{random} module
+            or a C{random.Random} instance).
+        @param sequence: A C{str} nucleotide sequence.
+        @param synonymousRate: The C{float} probability that a codon is
+            changed to another codon for the same amino acid.
+        @param nonSynonymousRate: The C{float} probability that a codon is
+            changed to a (sense) codon for a different amino acid.
+        @return: A 2-C{tuple} with a C{list} of the C{int} (0-based) sites
+            to change, in increasing order, and a C{str} of their new bases.
+        """
+        rand = random.random
+        get = self._index.get
+        synonymous, nonSynonymous = self._synonymous, self._nonSynonymous
+        total = synonymousRate + nonSynonymousRate
+        upper = sequence.upper()
+        starts = range(3, len(sequence) - 2, 3)
+        positions = []
+        bases = []
+        for start, u in zip(starts, [rand() for _ in starts]):
+            if u >= total:
+                continue
+            index = get(upper[start : start + 3])
+            if index is None:
+                continue
+            table = (synonymous if u < synonymousRate else nonSynonymous)[index]
+            if table is None or AMINO_ACIDS[index] == "*":
+                continue
+            codons, aliasTable = table
+            new = codons[aliasTable.draw(rand())]
+            for offset in range(3):
+                if new[offset] != upper[start + offset]:
+                    positions.append(start + offset)
+                    bases.append(new[offset])
+
+        return positions, "".join(bases)
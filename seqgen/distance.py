@@ -0,0 +1,121 @@
+from operator import ne
+
+
+class DistanceIndex:
+    """
+    Index sequences so that those within a given (Hamming) distance of a new
+    sequence can be found without comparing it to all of them.
+
+    Each sequence is cut into C{minDistance} blocks, and the sequences are
+    indexed by the contents of each block. Two sequences of the same length
+    that differ at fewer than C{minDistance} sites cannot differ in every
+    block (by the pigeonhole principle), so any sequence that is too close
+    to a new one shares a block with it. Only the sequences that share a
+    block (the candidates) are compared to the new one, site by site, so no
+    close sequence is missed. The longer the blocks, the fewer candidates
+    there are.
+
+    If the blocks would be shorter than C{MIN_BLOCK_LENGTH} (because
+    C{minDistance} is large relative to the length of the sequences), so
+    many sequences would share each block that finding the candidates would
+    cost more than comparing the new sequence to every sequence of its
+    length, which is done instead.
+
+    Sequences of different lengths are not compared. Sequences shorter than
+    C{minDistance} (which cannot differ at enough sites) are too close to
+    any other sequence of their length.
+
+    @param minDistance: The C{int} number of sites at which each pair of
+        sequences must differ.
+    @raise ValueError: If C{minDistance} is not a positive integer.
+    """
+
+    MIN_BLOCK_LENGTH = 4
+
+    def __init__(self, minDistance):
+        if not isinstance(minDistance, int) or minDistance < 1:
+            raise ValueError(
+                "The minimum distance (%r) must be a positive integer." % (minDistance,)
+            )
+        self.minDistance = minDistance
+        # For each sequence length, the block boundaries and the index of
+        # each block (mapping block contents to sequence numbers).
+        self._indices = {}
+        self._sequences = []
+        self.count = 0
+        self.rejected = 0
+        self.comparisons = 0
+
+    def __len__(self):
+        return self.count
+
+    def _index(self, length):
+        """
+        Get the block boundaries and block indices for sequences of a given
+        length.
+
+        @param length: The C{int} sequence length.
+        @return: A 2-C{tuple} with a C{list} of (C{int} start, C{int} end)
+            block boundaries and a C{list} of C{dict}s, one per block, or
+            C{None} and a C{list} of sequence numbers if the blocks would be
+            shorter than C{MIN_BLOCK_LENGTH} (including if the length is less
+            than the minimum distance).
+        """
+        try:
+            return self._indices[length]
+        except KeyError:
+            d = self.minDistance
+            if length < d * self.MIN_BLOCK_LENGTH:
+                index = (None, [])
+            else:
+                starts = [length * block // d for block in range(d + 1)]
+                index = (list(zip(starts, starts[1:])), [{} for _ in range(d)])
+            self._indices[length] = index
+            return index
+
+    def far(self, sequence):
+        """
+        Check whether a sequence is at least the minimum distance from all
+        the sequences in the index. The sequence is not added (see C{add}).
+
+        @param sequence: A C{str} sequence.
+        @return: C{True} if the sequence is far enough from all the sequences
+            in the index, else C{False} (and the rejection is counted).
+        """
+        blocks, tables = self._index(len(sequence))
+        if blocks is None:
+            # Compare the sequence to all those of its length.
+            candidates = tables
+        else:
+            candidates = set()
+            for (start, end), table in zip(blocks, tables):
+                candidates.update(table.get(sequence[start:end], ()))
+        d = self.minDistance
+        sequences = self._sequences
+        far = True
+        for number in candidates:
+            self.comparisons += 1
+            if sum(map(ne, sequence, sequences[number])) < d:
+                far = False
+                break
+
+        if not far:
+            self.rejected += 1
+        return far
+
+    def add(self, sequence):
+        """
+        Add a sequence to the index (whether or not it is far enough from the
+        sequences already in it).
+
+        @param sequence: A C{str} sequence.
+        """
+        number = len(self._sequences)
+        self._sequences.append(sequence)
+        self.count += 1
+        blocks, tables = self._index(len(sequence))
+        if blocks is None:
+            tables.append(number)
+        else:
+            for (start, end), table in zip(blocks, tables):
+                table.setdefault(sequence[start:end], []).append(number)
@@ -0,0 +1,304 @@
+import sys
+from contextlib import contextmanager
+from json import dump
+from time import perf_counter
+
+PROFILERS = ("cprofile", "tracemalloc")
+
+
+def peakRSS():
+    """
+    Get the peak resident set size of this process, over its whole life
+    so far.
+
+    @return: The C{int} peak RSS in bytes, or C{None} if it cannot be found.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class SpecStats:
+    """
+    Hold timing and throughput statistics for one sequence specification.
+
+    The operating system only gives the peak resident set size (RSS) of the
+    whole process, so C{processPeakRSS} is the peak of the process up to the
+    end of the specification (which may have been reached by an earlier
+    specification), and C{peakRSSIncrease} is how much the specification
+    raised it (which is zero if it used less memory than an earlier one).
+
+    @param number: The C{int} (1-based) number of the specification (after
+        any repeat specifications have been expanded).
+    @param spec: The C{dict} sequence specification.
+    """
+
+    __slots__ = (
+        "number",
+        "name",
+        "filename",
+        "building",
+        "mutation",
+        "formatting",
+        "writing",
+        "reads",
+        "bases",
+        "processPeakRSS",
+        "peakRSSIncrease",
+        "peakTraced",
+    )
+
+    def __init__(self, number, spec):
+        self.number = number
+        self.name = spec.get("id", spec.get("id prefix"))
+        self.filename = spec.get("filename")
+        # The time spent building reads (which includes mutating them).
+        self.building = 0.0
+        self.mutation = 0.0
+        self.formatting = 0.0
+        self.writing = 0.0
+        self.reads = 0
+        self.bases = 0
+        self.processPeakRSS = None
+        self.peakRSSIncrease = None
+        self.peakTraced = None
+
+    def toDict(self):
+        """
+        Get the statistics as a C{dict}.
+
+        @return: A C{dict} of statistics, with times in seconds.
+        """
+        total = self.building + self.formatting + self.writing
+        return {
+            "spec": self.number,
+            "name": self.name,
+            "filename": self.filename,
+            "generation seconds": self.building - self.mutation,
+            "mutation seconds": self.mutation,
+            "formatting seconds": self.formatting,
+            "writing seconds": self.writing,
+            "total seconds": total,
+            "reads": self.reads,
+            "bases": self.bases,
+            "bases/s": self.bases / total if total else None,
+            "reads/s": self.reads / total if total else None,
+            "process peak RSS bytes": self.processPeakRSS,
+            "peak RSS increase bytes": self.peakRSSIncrease,
+            "peak traced bytes": self.peakTraced,
+        }
+
+
+class RunStats:
+    """
+    Collect per-specification timing, throughput and memory statistics for a
+    run, and optionally profile it and report progress.
+
+    Pass an instance to C{Sequences} (via its C{stats} argument) to have it
+    recorded.
+
+    @param progressInterval: If not C{None}, the C{float} number of seconds
+        between progress lines written to C{progressFp}.
+    @param progressFp: An open file pointer for progress lines.
+    @param profile: If not C{None}, either 'cprofile' or 'tracemalloc'.
+    @param profileFile: The C{str} file to save the cProfile statistics to
+        (in the C{pstats} format). If C{None}, a summary of the profile is
+        written to C{progressFp}.
+    @param callback: If not C{None}, a function to call with each
+        L{SpecStats} instance once its specification has been completed.
+    @raise ValueError: If C{profile} is not a known profiler.
+    """
+
+    def __init__(
+        self,
+        progressInterval=None,
+        progressFp=sys.stderr,
+        profile=None,
+        profileFile=None,
+        callback=None,
+    ):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(
+                "Unknown profiler %r. Use one of: %s." % (profile, ", ".join(PROFILERS))
+            )
+        self.progressInterval = progressInterval
+        self.progressFp = progressFp
+        self.profile = profile
+        self.profileFile = profileFile
+        self.callback = callback
+        self.specs = []
+        self.current = None
+        self._start = self._lastProgress = perf_counter()
+        self._reads = self._bases = 0
+        self._startRSS = None
+
+    def startSpec(self, spec):
+        """
+        Start recording statistics for a new specification.
+
+        @param spec: The C{dict} sequence specification.
+        """
+        self.endSpec()
+        self.current = SpecStats(len(self.specs) + 1, spec)
+        self.specs.append(self.current)
+        self._startRSS = peakRSS()
+        if self.profile == "tracemalloc":
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+
+    def endSpec(self):
+        """
+        Finish recording statistics for the current specification (if any).
+        """
+        current = self.current
+        if current is not None:
+            current.processPeakRSS = peakRSS()
+            if current.processPeakRSS is not None:
+                current.peakRSSIncrease = current.processPeakRSS - self._startRSS
+            if self.profile == "tracemalloc":
+                import tracemalloc
+
+                current.peakTraced = tracemalloc.get_traced_memory()[1]
+            if self.callback:
+                self.callback(current)
+            self.current = None
+
+    def built(self, seconds):
+        """
+        Record the time taken to build a read.
+
+        @param seconds: The C{float} number of seconds taken.
+        """
+        self.current.building += seconds
+
+    def mutated(self, seconds):
+        """
+        Record the time taken to mutate a sequence.
+
+        @param seconds: The C{float} number of seconds taken.
+        """
+        self.current.mutation += seconds
+
+    def produced(self, read):
+        """
+        Record that a read has been produced (i.e., not skipped).
+
+        @param read: The C{seqgen.read.Read} that was produced.
+        """
+        current = self.current
+        current.reads += 1
+        current.bases += len(read)
+        self._reads += 1
+        self._bases += len(read)
+
+        if self.progressInterval is not None:
+            now = perf_counter()
+            if now - self._lastProgress >= self.progressInterval:
+                self._lastProgress = now
+                elapsed = now - self._start
+                print(
+                    "Progress: spec %d, %d reads, %d bases in %.1fs "
+                    "(%.0f reads/s, %.0f bases/s)."
+                    % (
+                        current.number,
+                        self._reads,
+                        self._bases,
+                        elapsed,
+                        self._reads / elapsed,
+                        self._bases / elapsed,
+                    ),
+                    file=self.progressFp,
+                    flush=True,
+                )
+
+    def written(self, formatting, writing):
+        """
+        Record the time taken to format and write a read.
+
+        @param formatting: The C{float} number of seconds taken to format.
+        @param writing: The C{float} number of seconds taken to write.
+        """
+        self.current.formatting += formatting
+        self.current.writing += writing
+
+    @contextmanager
+    def profiling(self):
+        """
+        A context manager to profile a run (if profiling was requested) and
+        to finish recording when the run is over.
+        """
+        if self.profile == "cprofile":
+            from cProfile import Profile
+
+            profiler = Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self.endSpec()
+                if self.profileFile:
+                    profiler.dump_stats(self.profileFile)
+                else:
+                    from pstats import Stats
+
+                    Stats(profiler, stream=self.progressFp).sort_stats(
+                        "cumulative"
+                    ).print_stats(20)
+        elif self.profile == "tracemalloc":
+            import tracemalloc
+
+            tracemalloc.start()
+            try:
+                yield
+            finally:
+                self.endSpec()
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                print("Top memory allocations:", file=self.progressFp)
+                for stat in snapshot.statistics("lineno")[:20]:
+                    print("  %s" % stat, file=self.progressFp)
+        else:
+            try:
+                yield
+            finally:
+                self.endSpec()
+
+    def toDict(self):
+        """
+        Get all statistics as a C{dict}.
+
+        @return: A C{dict} with per-specification and total statistics.
+        """
+        specs = [spec.toDict() for spec in self.specs]
+        totals = {}
+        for key in (
+            "generation seconds",
+            "mutation seconds",
+            "formatting seconds",
+            "writing seconds",
+            "total seconds",
+            "reads",
+            "bases",
+        ):
+            totals[key] = sum(spec[key] for spec in specs)
+        totals["wall seconds"] = perf_counter() - self._start
+        totals["process peak RSS bytes"] = peakRSS()
+
+        return {"specs": specs, "total": totals}
+
+    def save(self, filename):
+        """
+        Save all statistics as JSON.
+
+        @param filename: The C{str} file to write to.
+        """
+        with open(filename, "w") as fp:
+            dump(self.toDict(), fp, indent=2)
+            print(file=fp)
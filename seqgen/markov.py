@@ -0,0 +1,213 @@
+from collections import Counter
+from hashlib import sha256
+from json import dump, dumps, load
+
+from seqgen.alias import AliasTable
+
+
+class MarkovModel:
+    """
+    An order-k Markov model of sequences, in which the probability of each
+    letter depends on the k letters before it.
+
+    The model is held as the number of times each (k+1)-mer was seen. For
+    sampling, each context (k-mer) gets an L{AliasTable} of the letters that
+    follow it, so each letter is drawn in constant time. Contexts that were
+    never seen use the overall letter frequencies. The first k letters of a
+    sequence are drawn from the frequencies of the contexts.
+
+    @param order: The C{int} order (k) of the model.
+    @param alphabet: A C{str} of the letters of the model.
+    @param counts: A C{dict} mapping each C{str} (k+1)-mer (of letters in
+        C{alphabet}) to the C{int} number of times it was seen.
+    @raise ValueError: If the order is negative, the model has too many
+        contexts, there are no counts, or a count is for a string that is not
+        a (k+1)-mer of the alphabet.
+    """
+
+    DEFAULT_ORDER = 3
+    # The maximum number of contexts (the alphabet size to the power of the
+    # order), to keep the alias tables to a sensible size.
+    MAX_CONTEXTS = 4**10
+    # The number of uniform random numbers drawn at once when sampling.
+    CHUNK_SIZE = 4096
+
+    def __init__(self, order, alphabet, counts):
+        if not isinstance(order, int) or order < 0:
+            raise ValueError(
+                "The order of a Markov model (%r) must be a non-negative integer."
+                % (order,)
+            )
+        alphabet = "".join(dict.fromkeys(alphabet))
+        n = len(alphabet)
+        contexts = n**order
+        if contexts > self.MAX_CONTEXTS:
+            raise ValueError(
+                "A Markov model of order %d with an alphabet of %d letters has "
+                "%d contexts, which is more than the maximum (%d)."
+                % (order, n, contexts, self.MAX_CONTEXTS)
+            )
+
+        index = {letter: i for i, letter in enumerate(alphabet)}
+        contextCounts = [[0] * n for _ in range(contexts)]
+        letterCounts = [0] * n
+        for kmer, count in counts.items():
+            if len(kmer) != order + 1 or any(letter not in index for letter in kmer):
+                raise ValueError(
+                    "Markov model count for %r is not for a string of %d letters "
+                    "from its alphabet (%r)." % (kmer, order + 1, alphabet)
+                )
+            letter = index[kmer[-1]]
+            contextCounts[self._encode(kmer[:-1], index, n)][letter] += count
+            letterCounts[letter] += count
+
+        if not sum(letterCounts):
+            raise ValueError("A Markov model needs at least one (k+1)-mer count.")
+
+        self.order = order
+        self.alphabet = alphabet
+        self.counts = dict(counts)
+        # The alias tables of the contexts, one after another (each has one
+        # column per letter), so that sampling can index them directly.
+        background = AliasTable(letterCounts)
+        self._probabilities = []
+        self._aliases = []
+        for row in contextCounts:
+            table = AliasTable(row) if sum(row) else background
+            self._probabilities.extend(table.probabilities)
+            self._aliases.extend(table.aliases)
+        self._start = AliasTable(sum(row) for row in contextCounts)
+
+    @staticmethod
+    def _encode(kmer, index, n):
+        """
+        Turn a k-mer into a context number.
+
+        @param kmer: A C{str} k-mer.
+        @param index: A C{dict} mapping each letter to its C{int} index in the
+            alphabet.
+        @param n: The C{int} size of the alphabet.
+        @return: The C{int} context number.
+        """
+        result = 0
+        for letter in kmer:
+            result = result * n + index[letter]
+        return result
+
+    @classmethod
+    def train(cls, sequences, order=None, alphabet="ACGT"):
+        """
+        Make a model from the (k+1)-mers of some sequences. Letters are
+        converted to upper case, and (k+1)-mers containing letters that are
+        not in the alphabet (e.g., 'N') are ignored.
+
+        @param sequences: An iterable of C{str} sequences.
+        @param order: The C{int} order of the model, or C{None} to use
+            C{DEFAULT_ORDER}.
+        @param alphabet: A C{str} of the letters of the model.
+        @raise ValueError: If the sequences have no (k+1)-mers of letters in
+            the alphabet.
+        @return: A L{MarkovModel} instance.
+        """
+        order = cls.DEFAULT_ORDER if order is None else order
+        width = order + 1
+        counts = Counter()
+        for sequence in sequences:
+            sequence = sequence.upper()
+            counts.update(sequence[i : i + width] for i in range(len(sequence) - order))
+        letters = set(alphabet)
+        counts = {
+            kmer: count for kmer, count in counts.items() if letters.issuperset(kmer)
+        }
+        if not counts:
+            raise ValueError(
+                "There are no %d-mers of the letters %r to train a Markov model "
+                "from." % (width, alphabet)
+            )
+        return cls(order, alphabet, counts)
+
+    @classmethod
+    def load(cls, fp):
+        """
+        Load a model saved by C{save}.
+
+        @param fp: An open file pointer to read the JSON model from.
+        @raise ValueError: If the model is not valid.
+        @return: A L{MarkovModel} instance.
+        """
+        model = load(fp)
+        try:
+            return cls(model["order"], model["alphabet"], model["counts"])
+        except (KeyError, TypeError):
+            raise ValueError(
+                "A Markov model must be a JSON object with 'order', 'alphabet' "
+                "and 'counts' keys."
+            )
+
+    def save(self, fp):
+        """
+        Save the model, as JSON.
+
+        @param fp: An open file pointer to write the model to.
+        """
+        dump(
+            {"order": self.order, "alphabet": self.alphabet, "counts": self.counts},
+            fp,
+            indent=2,
+            sort_keys=True,
+        )
+        print(file=fp)
+
+    def digest(self):
+        """
+        Get a digest of the model, which changes if the model changes.
+
+        @return: A C{str} hex digest.
+        """
+        return sha256(
+            dumps([self.order, self.alphabet, self.counts], sort_keys=True).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+
+    def sequence(self, random, length):
+        """
+        Generate a sequence.
+
+        @param random: A random number generator (e.g., the C{random} module
+            or a C{random.Random} instance).
+        @param length: The C{int} length of the sequence.
+        @return: A C{str} sequence.
+        """
+        alphabet, order = self.alphabet, self.order
+        n = len(alphabet)
+        contexts = n**order
+
+        # Draw the first k letters (the first context).
+        context = self._start.draw(random.random())
+        letters = []
+        value = context
+        for _ in range(order):
+            value, letter = divmod(value, n)
+            letters.append(alphabet[letter])
+        letters.reverse()
+        if length <= order:
+            return "".join(letters[:length])
+
+        probabilities, aliases = self._probabilities, self._aliases
+        rand = random.random
+        append = letters.append
+        remaining = length - order
+        while remaining:
+            chunk = min(remaining, self.CHUNK_SIZE)
+            remaining -= chunk
+            for u in [rand() for _ in range(chunk)]:
+                x = u * n
+                column = int(x)
+                # The index of the column in the table of the context.
+                index = context * n + column
+                letter = column if x - column < probabilities[index] else aliases[index]
+                append(alphabet[letter])
+                context = (context * n + letter) % contexts
+
+        return "".join(letters)
@@ -0,0 +1,340 @@
+import os
+from io import TextIOBase
+from json import dump, load
+from math import ceil
+from shutil import copyfileobj
+
+from seqgen.sequences import Sequences, loadSpecification
+from seqgen.writers import NpyWriter
+
+
+class Plan:
+    """
+    Split a run into units of work that can be executed separately (e.g.,
+    by a batch scheduler, on different machines that share storage), and
+    merge their outputs.
+
+    A plan is made (see C{make}) in a directory, which holds a plan file
+    with the specification, the options, and the units, and the parts of
+    the output files written by each unit. Each unit has one or more ranges
+    of the reads of (expanded) specifications. Large specifications are
+    split into ranges that start at a multiple of
+    C{Sequences.SEED_BLOCK_SIZE}, and ratchet specifications are never
+    split. A unit generates the reads of the specifications its ranges
+    depend on (via 'from id') as well as its own, so units can be executed
+    in any order (or at the same time). A seed must be given, so that the
+    reads of each range are the same as in a single run. Merging
+    concatenates the parts of each output file, giving output that is
+    identical to that of a single run.
+
+    @param directory: The C{str} directory holding the plan.
+    @raise ValueError: If there is no plan in C{directory}.
+    """
+
+    FILENAME = "plan.json"
+    DEFAULT_READS_PER_UNIT = 1000000
+
+    def __init__(self, directory):
+        self.directory = directory
+        filename = os.path.join(directory, self.FILENAME)
+        try:
+            with open(filename) as fp:
+                plan = load(fp)
+        except FileNotFoundError:
+            raise ValueError("Plan file %r does not exist." % filename)
+        self.spec = plan["specification"]
+        self.options = plan["options"]
+        self.units = plan["units"]
+        self.files = plan["files"]
+
+    @classmethod
+    def make(cls, spec, directory, units=None, readsPerUnit=None, **kwargs):
+        """
+        Make a plan and save it in a directory.
+
+        @param spec: A C{str} filename or an open file pointer to read the
+            specification from, or an already loaded specification (a
+            C{dict} or a C{list}).
+        @param directory: The C{str} directory to save the plan in. It is
+            created if it does not exist.
+        @param units: The C{int} number of units to aim for, or C{None}.
+            There may be more units (if ratchet specifications are long) or
+            fewer (if there are few reads).
+        @param readsPerUnit: The C{int} number of reads to put in each unit
+            (rounded up to a multiple of C{Sequences.SEED_BLOCK_SIZE}), or
+            C{None}. Only one of C{units} and C{readsPerUnit} may be given.
+            If neither is given, C{DEFAULT_READS_PER_UNIT} is used.
+        @param kwargs: Keyword arguments for L{Sequences}. A C{seed} must be
+            given.
+        @raise ValueError: If both C{units} and C{readsPerUnit} are given, no
+            seed is given, an output is in a format whose parts cannot be
+            concatenated, or a specification has 'unique' or 'min distance'.
+        @return: A L{Plan} instance.
+        """
+        if units is not None and readsPerUnit is not None:
+            raise ValueError("Only one of units and readsPerUnit may be given.")
+        if kwargs.get("seed") is None:
+            raise ValueError("A seed must be given to plan a run.")
+
+        _vars, sequenceSpecs = loadSpecification(spec)
+        specification = {"variables": _vars, "sequences": sequenceSpecs}
+        sequences = Sequences(specification, **kwargs)
+        destinations = sequences._destinations()
+        for filename, (writerClass, _, format_, _) in destinations.items():
+            if not writerClass.resumable:
+                raise ValueError(
+                    "%s has format %s, which cannot be used when partitioning "
+                    "a run."
+                    % (
+                        (
+                            "Standard output"
+                            if filename is None
+                            else "Output file %r" % filename
+                        ),
+                        format_,
+                    )
+                )
+
+        for index, spec in enumerate(sequences._iterSpecs(), start=1):
+            for name in "unique", "min distance":
+                if spec.get(name):
+                    # The reads of a unit would only be checked against those
+                    # of the same unit.
+                    raise ValueError(
+                        "Sequence specification %d has %r, which cannot be "
+                        "used when partitioning a run." % (index, name)
+                    )
+
+        specs = [
+            (index, spec)
+            for index, spec in enumerate(sequences._iterSpecs())
+            if not spec.get("skip")
+        ]
+        if readsPerUnit is None:
+            if units is None:
+                readsPerUnit = cls.DEFAULT_READS_PER_UNIT
+            else:
+                total = sum(spec.get("count", 1) for _, spec in specs)
+                readsPerUnit = ceil(total / max(units, 1))
+        blockSize = Sequences.SEED_BLOCK_SIZE
+        readsPerUnit = max(1, ceil(readsPerUnit / blockSize)) * blockSize
+
+        # Divide the reads of the specifications into ranges, and the ranges
+        # into units.
+        unitRanges = [[]]
+        size = 0
+        for index, spec in specs:
+            count = spec.get("count", 1)
+            if spec.get("ratchet"):
+                if size and size + count > readsPerUnit:
+                    unitRanges.append([])
+                    size = 0
+                unitRanges[-1].append((index, 0, count))
+                size += count
+                continue
+            first = 0
+            while first < count:
+                end = min(count, first + readsPerUnit - size)
+                if end < count:
+                    # Split at the start of a seed block.
+                    end -= end % blockSize
+                if end > first:
+                    unitRanges[-1].append((index, first, end))
+                    size += end - first
+                    first = end
+                if first < count:
+                    unitRanges.append([])
+                    size = 0
+        if not unitRanges[-1]:
+            unitRanges.pop()
+
+        # Find the output (and the number of reads already written to it by
+        # earlier units) of each range.
+        specFiles = {index: sequences._specFiles(spec) for index, spec in specs}
+        written = dict.fromkeys(destinations, 0)
+        files = {filename: [] for filename in destinations}
+        planUnits = []
+        for unit, ranges in enumerate(unitRanges):
+            outputs = {}
+            for index, first, end in ranges:
+                start = 0
+                for filename, count in specFiles[index]:
+                    reads = min(end, start + count) - max(first, start)
+                    if reads > 0:
+                        outputs[filename] = outputs.get(filename, 0) + reads
+                    start += count
+            planOutputs = []
+            for filename, reads in outputs.items():
+                part = "unit-%d-%d" % (unit, len(planOutputs))
+                planOutputs.append(
+                    {
+                        "filename": filename,
+                        "part": part,
+                        "offset": written[filename],
+                        "reads": reads,
+                    }
+                )
+                written[filename] += reads
+                files[filename].append(part)
+            planUnits.append(
+                {
+                    "ranges": [list(range_) for range_ in ranges],
+                    "reads": sum(end - first for _, first, end in ranges),
+                    "outputs": planOutputs,
+                }
+            )
+
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, cls.FILENAME), "w") as fp:
+            dump(
+                {
+                    "specification": specification,
+                    "options": kwargs,
+                    "units": planUnits,
+                    "files": [
+                        {
+                            "filename": filename,
+                            "format": destinations[filename][2],
+                            "parts": parts,
+                        }
+                        for filename, parts in files.items()
+                    ],
+                },
+                fp,
+                indent=2,
+            )
+            print(file=fp)
+
+        return cls(directory)
+
+    def _path(self, name):
+        """
+        Get the path of a file in the plan directory.
+
+        @param name: The C{str} name of the file.
+        @return: The C{str} path.
+        """
+        return os.path.join(self.directory, name)
+
+    def _doneFile(self, unit):
+        """
+        Get the path of the file that marks a unit as executed.
+
+        @param unit: The C{int} unit number.
+        @return: The C{str} path.
+        """
+        return self._path("unit-%d.done" % unit)
+
+    def execute(self, unit):
+        """
+        Execute a unit, writing its parts of the output files to the plan
+        directory. A unit may be executed again (e.g., if it was
+        interrupted).
+
+        @param unit: The C{int} unit number (starting from 0).
+        @raise ValueError: If C{unit} is not in the plan.
+        """
+        if not 0 <= unit < len(self.units):
+            raise ValueError(
+                "Unit %d does not exist (the plan has %d units, numbered from 0)."
+                % (unit, len(self.units))
+            )
+        doneFile = self._doneFile(unit)
+        try:
+            os.unlink(doneFile)
+        except FileNotFoundError:
+            pass
+
+        sequences = Sequences(self.spec, **self.options)
+        destinations = sequences._destinations()
+        outputs = {output["filename"]: output for output in self.units[unit]["outputs"]}
+        writers = {}
+        fps = {}
+        try:
+            for read, filename in sequences._unitReads(self.units[unit]["ranges"]):
+                try:
+                    writer = writers[filename]
+                except KeyError:
+                    output = outputs[filename]
+                    writerClass, count = destinations[filename][:2]
+                    part = self._path(output["part"])
+                    writer = writers[filename] = writerClass(
+                        count, None if filename is None else part
+                    )
+                    # Earlier units have written the start of the output.
+                    writer.written = output["offset"]
+                    fps[filename] = open(part, "wb" if writer.binary else "w")
+                fps[filename].write(writer.format(read))
+
+            # Resumable writers do not hold output back, so finishing one
+            # that has not been given all its reads only closes any files it
+            # has open.
+            for filename, writer in writers.items():
+                writer.finish(fps[filename])
+        finally:
+            for fp in fps.values():
+                fp.close()
+
+        with open(doneFile, "w"):
+            pass
+
+    def merge(self, fp=None):
+        """
+        Merge the parts written by the units into the output files.
+
+        @param fp: An open file pointer to write output that has no filename
+            in the specification to. If C{None}, nothing is written for such
+            output.
+        @raise ValueError: If any unit has not been executed.
+        """
+        missing = [
+            unit
+            for unit in range(len(self.units))
+            if not os.path.exists(self._doneFile(unit))
+        ]
+        if missing:
+            raise ValueError(
+                "The plan cannot be merged because %d of its %d units (%s) "
+                "have not been executed."
+                % (
+                    len(missing),
+                    len(self.units),
+                    ", ".join(map(str, missing)),
+                )
+            )
+
+        for file_ in self.files:
+            filename = file_["filename"]
+            parts = [self._path(part) for part in file_["parts"]]
+            if filename is None:
+                if fp is not None:
+                    self._concatenate(parts, fp)
+            else:
+                with open(filename, "wb") as outFp:
+                    self._concatenate(parts, outFp)
+                if file_["format"] == NpyWriter.FORMAT_NAME:
+                    with open(filename + ".ids", "wb") as outFp:
+                        self._concatenate([part + ".ids" for part in parts], outFp)
+
+    @staticmethod
+    def _concatenate(parts, fp):
+        """
+        Write the contents of some files to a file pointer.
+
+        @param parts: A C{list} of C{str} filenames.
+        @param fp: An open file pointer. The contents of the files are
+            written to the underlying buffer of a text file pointer that has
+            one (such as C{sys.stdout}).
+        """
+        if isinstance(fp, TextIOBase):
+            if hasattr(fp, "buffer"):
+                fp.flush()
+                fp = fp.buffer
+            else:
+                for part in parts:
+                    with open(part) as partFp:
+                        copyfileobj(partFp, fp)
+                return
+        for part in parts:
+            with open(part, "rb") as partFp:
+                copyfileobj(partFp, fp)
@@ -0,0 +1,220 @@
+from array import array
+
+COMPLEMENT = {
+    "A": "T",
+    "C": "G",
+    "G": "C",
+    "T": "A",
+    "M": "K",
+    "R": "Y",
+    "W": "W",
+    "S": "S",
+    "Y": "R",
+    "K": "M",
+    "V": "B",
+    "H": "D",
+    "D": "H",
+    "B": "V",
+    "X": "X",
+    "N": "N",
+}
+
+# A str.translate table for complementing (upper or lower case, possibly
+# ambiguous) nucleotides. This is the same complementing as is done by
+# dark.reads.DNARead.reverseComplement.
+COMPLEMENT_TABLE = str.maketrans(
+    "".join(COMPLEMENT) + "".join(COMPLEMENT).lower(),
+    "".join(COMPLEMENT.values()) + "".join(COMPLEMENT.values()).lower(),
+)
+
+
+class Read:
+    """
+    A lightweight read, used internally while generating sequences.
+
+    Generating sequences can involve creating a very large number of short
+    reads, so this class uses __slots__ and has no dependencies. Instances are
+    converted to C{dark.reads.DNARead} instances (via C{toDNARead}) only when
+    they are handed to callers.
+
+    A read may instead be a mutant (see L{mutant}) that holds a reference to
+    a parent read and the (sparse) changes made to it. The sequence of a
+    mutant is only built, each time it is needed, from the parent sequence.
+
+    @param id: A C{str} read id (or C{None}).
+    @param sequence: A C{str} sequence.
+    @param quality: A C{str} quality string (or C{None}).
+    @param alphabet: The alphabet the sequence was drawn from (or C{None}).
+    """
+
+    __slots__ = (
+        "id",
+        "_sequence",
+        "quality",
+        "alphabet",
+        "parent",
+        "positions",
+        "bases",
+    )
+
+    # If a mutant of a mutant would differ from the original parent at more
+    # than this fraction of sites, its sequence is stored in full instead.
+    # (Each change takes 5 bytes.)
+    MAX_CHANGE_FRACTION = 0.125
+
+    def __init__(self, id, sequence, quality=None, alphabet=None):
+        self.id = id
+        self._sequence = sequence
+        self.quality = quality
+        self.alphabet = alphabet
+        self.parent = self.positions = self.bases = None
+
+    @classmethod
+    def mutant(cls, parent, positions, bases):
+        """
+        Make a read that is a mutant of another.
+
+        If C{parent} is itself a mutant, the changes are combined with its
+        changes, so that the new read refers to the original parent (unless
+        there are too many changes, in which case the new read has its
+        sequence stored in full).
+
+        @param parent: The parent C{Read}.
+        @param positions: An iterable of C{int} (0-based, increasing) sites
+            that are changed.
+        @param bases: A C{str} of the new bases at those sites.
+        @return: A new C{Read} (with no id).
+        """
+        if parent.parent is not None:
+            changes = dict(zip(parent.positions, parent.bases))
+            changes.update(zip(positions, bases))
+            parent = parent.parent
+            original = parent._sequence
+            # Remove any sites that have been changed back.
+            positions = sorted(
+                position
+                for position, base in changes.items()
+                if original[position] != base
+            )
+            if len(positions) > len(original) * cls.MAX_CHANGE_FRACTION:
+                return cls(
+                    None,
+                    cls._applyChanges(
+                        original,
+                        positions,
+                        [changes[position] for position in positions],
+                    ),
+                )
+            bases = "".join(changes[position] for position in positions)
+
+        read = cls(None, None)
+        read.parent = parent
+        read.positions = array("I", positions)
+        read.bases = bases
+        return read
+
+    @staticmethod
+    def _applyChanges(sequence, positions, bases):
+        """
+        Apply changes to a sequence.
+
+        @param sequence: A C{str} sequence.
+        @param positions: An iterable of C{int} (0-based) sites.
+        @param bases: An iterable of C{str} new bases for those sites.
+        @return: The changed C{str} sequence.
+        """
+        if sequence.isascii():
+            result = bytearray(sequence, "ascii")
+            for position, base in zip(positions, bases):
+                result[position] = ord(base)
+            return result.decode("ascii")
+        else:
+            result = list(sequence)
+            for position, base in zip(positions, bases):
+                result[position] = base
+            return "".join(result)
+
+    @property
+    def sequence(self):
+        """
+        Get the sequence (building it, for a mutant).
+
+        @return: The C{str} sequence.
+        """
+        if self.parent is None:
+            return self._sequence
+        else:
+            return self._applyChanges(self.parent._sequence, self.positions, self.bases)
+
+    @sequence.setter
+    def sequence(self, sequence):
+        """
+        Set the sequence (which makes a mutant an ordinary read).
+
+        @param sequence: The C{str} sequence.
+        """
+        self._sequence = sequence
+        self.parent = self.positions = self.bases = None
+
+    def __len__(self):
+        if self.parent is None:
+            return len(self._sequence)
+        else:
+            return len(self.parent._sequence)
+
+    def __eq__(self, other):
+        return (
+            self.id == other.id
+            and self.sequence == other.sequence
+            and self.quality == other.quality
+        )
+
+    def reverseComplement(self):
+        """
+        Reverse complement a nucleotide sequence.
+
+        @return: A new C{Read} with the reverse complemented sequence.
+        """
+        quality = None if self.quality is None else self.quality[::-1]
+        return Read(
+            self.id,
+            self.sequence.translate(COMPLEMENT_TABLE)[::-1],
+            quality,
+            self.alphabet,
+        )
+
+    def toString(self, format_="fasta"):
+        """
+        Convert the read to a string format.
+
+        @param format_: Either 'fasta' or 'fastq'.
+        @raise ValueError: if C{format_} is 'fastq' and the read has no quality
+            information, or if an unknown format is requested.
+        @return: A C{str} representing the read in the requested format.
+        """
+        if format_ == "fasta":
+            return ">%s\n%s\n" % (self.id, self.sequence)
+        elif format_ == "fastq":
+            if self.quality is None:
+                raise ValueError("Read %r has no quality information." % self.id)
+            return "@%s\n%s\n+%s\n%s\n" % (
+                self.id,
+                self.sequence,
+                self.id,
+                self.quality,
+            )
+        else:
+            raise ValueError("Format must be either 'fasta' or 'fastq'.")
+
+    def toDNARead(self):
+        """
+        Convert to a C{dark.reads.DNARead}.
+
+        @return: A C{dark.reads.DNARead} instance, with an C{alphabet}
+            attribute.
+        """
+        from dark.reads import DNARead
+
+        read = DNARead(self.id, self.sequence, self.quality)
+        read.alphabet = self.alphabet
+        return read
@@ -1,10 +1,438 @@
+import os
 import sys
-from json import load
-from random import choice, uniform
+from collections import deque, namedtuple
+from hashlib import sha256
+from itertools import chain, islice, repeat
+from json import dump, dumps, load
+from json.decoder import JSONDecodeError
+from math import ceil, floor, log
+import random
+import re
+from time import perf_counter
 
-from dark.aaVars import AA_LETTERS
-from dark.fasta import FastaReads
-from dark.reads import DNARead
+from seqgen.alias import AliasTable
+from seqgen.backends import getBackend
+from seqgen.cache import ReadCache
+from seqgen.checkpoint import Checkpointer
+from seqgen.codons import CodonModel, translate
+from seqgen.distance import DistanceIndex
+from seqgen.markov import MarkovModel
+from seqgen.read import Read
+from seqgen.store import ReadStore
+from seqgen.unique import UniqueSet
+from seqgen.writers import FORMATS, WRITERS, ThreadedWriter
+
+# The amino acid letters. These are the same as dark.aaVars.AA_LETTERS, but
+# are given here to avoid importing dark (which is slow) at startup.
+AA_LETTERS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+# A %-format conversion (e.g., '%(i)d' or '%%'), as found in templates.
+_CONVERSION = re.compile(r"(%(?:\([^)]*\))?[-#0 +]*\d*(?:\.\d+)?[a-zA-Z%])")
+
+
+class _RepeatIds:
+    """
+    Hold the strings (e.g., ids) made by substituting each value of a repeat
+    variable into a template, without making them all, so that a repeat
+    specification with a large number of values can be checked cheaply.
+
+    @param template: The C{str} template (e.g., 'x-%(i)d').
+    @param variable: The C{str} name of the repeat variable.
+    @param values: A C{list} or C{range} of values of the variable.
+    @param _vars: A C{dict} of the other variables.
+    """
+
+    def __init__(self, template, variable, values, _vars):
+        self.template = template
+        self.variable = variable
+        self.values = values
+        self._vars = _vars
+        self._strings = None
+        self._affixes = None
+        # If the template only substitutes an integer range variable (once),
+        # a string can be checked by looking at the number in it.
+        if isinstance(values, range):
+            parts = _CONVERSION.split(template)
+            placeholders = set(("%%(%s)d" % variable, "%%(%s)s" % variable))
+            positions = [
+                index
+                for index, part in enumerate(parts)
+                if index % 2 and part in placeholders
+            ]
+            if len(positions) == 1:
+                position = positions[0]
+                self._affixes = tuple(
+                    "".join(
+                        part if index % 2 == 0 else part % _vars
+                        for index, part in enumerate(side, start=start)
+                    )
+                    for start, side in (
+                        (0, parts[:position]),
+                        (position + 1, parts[position + 1 :]),
+                    )
+                )
+
+    def covers(self, other):
+        """
+        Find out whether all the strings of another instance are certainly
+        among the strings of this one (without making them).
+
+        @param other: A C{_RepeatIds} instance.
+        @return: C{True} if C{other} has the same template, variables, and
+            values as this instance, else C{False}.
+        """
+        return (
+            self.template == other.template
+            and self.variable == other.variable
+            and self.values == other.values
+            and self._vars == other._vars
+        )
+
+    def __iter__(self):
+        loopVars = dict(self._vars)
+        for value in self.values:
+            loopVars[self.variable] = value
+            yield self.template % loopVars
+
+    def __contains__(self, string):
+        if self._affixes is None:
+            if self._strings is None:
+                self._strings = set(self)
+            return string in self._strings
+
+        prefix, suffix = self._affixes
+        if (
+            len(string) <= len(prefix) + len(suffix)
+            or not string.startswith(prefix)
+            or not string.endswith(suffix)
+        ):
+            return False
+        number = string[len(prefix) : len(string) - len(suffix)]
+        try:
+            value = int(number)
+        except ValueError:
+            return False
+        return str(value) == number and value in self.values
+
+
+class _KnownIds:
+    """
+    Hold the ids that the sequence specifications checked so far will
+    produce, each with a value (e.g., the length of the sequence, if known),
+    so that 'from id' references can be checked (or resolved) before any
+    sequences are generated.
+
+    Ids made from an id prefix are held as ranges of numbers, and ids made by
+    a repeat specification as L{_RepeatIds}, so a specification with a large
+    count (or a large number of repetitions) does not need a large amount of
+    memory.
+
+    @param readSequenceFile: A function that takes a C{str} FASTA filename
+        and returns the C{str} id and sequence of its first read, to be used
+        to find the ids and lengths of sequences given by a 'sequence file'.
+    @param lazy: If C{True}, sequence files are only read when an id cannot
+        otherwise be found, and the lengths of their sequences are not known.
+    """
+
+    def __init__(self, readSequenceFile, lazy=False):
+        self.readSequenceFile = readSequenceFile
+        self.lazy = lazy
+        self.values = {}
+        self.ranges = {}
+        self.prefixCounts = {}
+        self.repeats = []
+        # The (filename, description, value) of sequence files not read yet.
+        self.files = []
+        # The ids given in 'from id' (or 'parents') references.
+        self.references = set()
+        # The id prefixes given in 'parent prefix' references.
+        self.referencedPrefixes = set()
+        # The ids given in 'from id' (or 'parents') references by repeat
+        # specifications, as L{_RepeatIds}.
+        self.referencedRepeats = []
+
+    def addId(self, id_, value):
+        """
+        Add an id.
+
+        @param id_: The C{str} id.
+        @param value: The value for the id (e.g., the C{int} length of the
+            sequence, or C{None} if it is not known).
+        """
+        self.values[id_] = value
+
+    def addFile(self, filename, description, value):
+        """
+        Add the id of the (first) sequence in a sequence file.
+
+        @param filename: The C{str} FASTA filename.
+        @param description: The C{str} description appended to the id, or
+            C{None}.
+        @param value: The value for the id.
+        @raise ValueError: If the file is read (when not lazy) and cannot be
+            read or is empty.
+        """
+        if self.lazy:
+            self.files.append((filename, description, value))
+        else:
+            id_ = self.readSequenceFile(filename)[0]
+            self.addId(id_ if description is None else id_ + " " + description, value)
+
+    def fileLength(self, filename):
+        """
+        Get the length of the (first) sequence in a sequence file.
+
+        @param filename: The C{str} FASTA filename.
+        @raise ValueError: If the file cannot be read or is empty.
+        @return: The C{int} length, or C{None} if sequence files are read
+            lazily.
+        """
+        return None if self.lazy else len(self.readSequenceFile(filename)[1])
+
+    def addPrefix(self, prefix, description, count, value):
+        """
+        Add the ids made from an id prefix.
+
+        @param prefix: The C{str} id prefix.
+        @param description: The C{str} description appended to the ids, or
+            C{None}.
+        @param count: The C{int} number of ids.
+        @param value: The value for the ids.
+        """
+        first = self.prefixCounts.get(prefix, 0) + 1
+        self.prefixCounts[prefix] = first + count - 1
+        self.ranges.setdefault(prefix, []).append(
+            (description, first, first + count - 1, value)
+        )
+
+    def addRepeat(self, ids, value):
+        """
+        Add the ids made by a repeat specification.
+
+        @param ids: A L{_RepeatIds} instance.
+        @param value: The value for the ids.
+        """
+        self.repeats.append((ids, value))
+
+    def value(self, id_):
+        """
+        Get the value for an id.
+
+        @param id_: The C{str} id.
+        @raise KeyError: If the id is not known.
+        @raise ValueError: If a sequence file that has not been read yet
+            cannot be read or is empty.
+        @return: The value given when the id was added.
+        """
+        try:
+            return self.values[id_]
+        except KeyError:
+            pass
+
+        for prefix, ranges in self.ranges.items():
+            if id_.startswith(prefix):
+                rest = id_[len(prefix) :]
+                for description, first, last, value in ranges:
+                    if description is None:
+                        number = rest
+                    else:
+                        suffix = " " + description
+                        if not rest.endswith(suffix):
+                            continue
+                        number = rest[: -len(suffix)]
+                    if number.isdigit() and str(int(number)) == number:
+                        if first <= int(number) <= last:
+                            return value
+
+        for ids, value in self.repeats:
+            if id_ in ids:
+                return value
+
+        if self.files:
+            files, self.files = self.files, []
+            for filename, description, value in files:
+                fileId = self.readSequenceFile(filename)[0]
+                self.addId(
+                    fileId if description is None else fileId + " " + description,
+                    value,
+                )
+            return self.value(id_)
+
+        raise KeyError(id_)
+
+    def prefixValues(self, prefix):
+        """
+        Get the values for the ids made from an id prefix.
+
+        @param prefix: The C{str} id prefix.
+        @return: A 2-C{tuple} with the C{int} number of ids made from the
+            prefix and a C{list} of their values (one for each group of ids
+            added by C{addPrefix}).
+        """
+        ranges = self.ranges.get(prefix, [])
+        return (
+            sum(last - first + 1 for _, first, last, _ in ranges),
+            [value for _, _, _, value in ranges],
+        )
+
+
+def _digitCount(first, last):
+    """
+    Count the digits in the decimal representations of a range of integers.
+
+    @param first: The first C{int} in the range (at least 1).
+    @param last: The last C{int} in the range.
+    @return: The C{int} total number of digits.
+    """
+    total = 0
+    digits, low = 1, 1
+    while low <= last:
+        high = low * 10 - 1
+        if high >= first:
+            total += digits * (min(high, last) - max(low, first) + 1)
+        digits, low = digits + 1, low * 10
+    return total
+
+
+def _ratchetChanges(count, length, rate, firstIsMutant):
+    """
+    Estimate the number of reads of a ratchet that are stored as mutants (see
+    C{seqgen.read.Read.mutant}), and the number of changes they hold.
+
+    Each mutant holds the changes between it and the last read that was
+    stored in full. After s steps, a fraction 1 - (1 - rate)^s of the sites
+    are expected to have changed, and once that exceeds
+    C{Read.MAX_CHANGE_FRACTION} the read is stored in full (and the next
+    mutant starts again from it).
+
+    @param count: The C{int} number of reads.
+    @param length: The C{int} length of the reads.
+    @param rate: The C{float} mutation rate.
+    @param firstIsMutant: If C{True}, the first read is a mutant of another
+        (full length) read. Otherwise it is stored in full.
+    @return: A 2-C{tuple} with the C{int} number of mutants and the C{float}
+        expected number of changes they hold.
+    """
+    offset = 1 if firstIsMutant else 0
+    if rate <= 0.0:
+        return count - 1 + offset, 0.0
+
+    keep = 1.0 - rate
+    # The number of steps for which a mutant is not stored in full.
+    steps = 0 if rate >= 1.0 else floor(log(1.0 - Read.MAX_CHANGE_FRACTION) / log(keep))
+    period = steps + 1
+
+    def changes(m):
+        # The expected changes in the mutants at steps 1 to m.
+        return length * (m - keep * (1.0 - keep**m) / rate) if m > 0 else 0.0
+
+    def totals(n):
+        # The mutants and changes in the first n reads, counting steps from 0.
+        cycles, remainder = divmod(n, period)
+        return (
+            cycles * steps + max(0, remainder - 1),
+            cycles * changes(steps) + changes(remainder - 1),
+        )
+
+    mutants, total = totals(offset + count)
+    skippedMutants, skippedTotal = totals(offset)
+    return mutants - skippedMutants, total - skippedTotal
+
+
+# A batch of reads (see Sequences.batches). If offsets is None, codes is a
+# 2-D uint8 array with one row per read. Otherwise, codes is a 1-D uint8
+# array holding the concatenated reads and offsets is an int64 array with
+# the start of each read in codes (plus a final element giving its length),
+# so read i is codes[offsets[i]:offsets[i + 1]].
+Batch = namedtuple("Batch", ("ids", "codes", "offsets", "alphabet"))
+
+
+def loadSpecification(spec):
+    """
+    Load a specification.
+
+    @param spec: A C{str} filename or an open file pointer to read the
+        specification from, or a C{dict} or C{list} specification.
+    @raise ValueError: if the specification JSON is an object and does not
+        have a 'sequences' key.
+    @return: A 2-C{tuple} with a C{dict} of variables and a C{list} of
+        sequence specifications.
+    """
+    if isinstance(spec, str):
+        with open(spec) as fp:
+            j = load(fp)
+    elif isinstance(spec, (dict, list)):
+        j = spec
+    else:
+        # Open file pointer.
+        j = load(spec)
+
+    if isinstance(j, list):
+        # No vars were given. We just have a list of sequence specifications.
+        _vars = {}
+        sequenceSpecs = j
+    else:
+        _vars = j.get("variables", {})
+        assert isinstance(j, dict)
+        try:
+            sequenceSpecs = j["sequences"]
+        except KeyError:
+            raise ValueError("The specification must have a 'sequences' key.")
+
+    return _vars, sequenceSpecs
+
+
+def variableValues(name, value):
+    """
+    Get the values a sweep variable should take.
+
+    @param name: The C{str} variable name.
+    @param value: Either a C{list} of values or a C{dict} with 'start',
+        'stop', and (optionally) 'step' keys giving a range. As with the
+        Python C{range} function, the 'stop' value is not included. The
+        'start', 'stop', and 'step' values may be floats.
+    @raise ValueError: If C{value} is a C{dict} that is not a valid range
+        or it results in no values.
+    @return: A C{list} of values, or a C{range} for integer ranges.
+    """
+    if isinstance(value, list):
+        values = value
+    else:
+        unexpected = set(value) - {"start", "stop", "step"}
+        if unexpected:
+            raise ValueError(
+                "Range for variable %r contains unknown key%s: %s."
+                % (
+                    name,
+                    "" if len(unexpected) == 1 else "s",
+                    ", ".join(sorted(unexpected)),
+                )
+            )
+        try:
+            start, stop = value["start"], value["stop"]
+        except KeyError:
+            raise ValueError(
+                "Range for variable %r must have 'start' and 'stop' keys." % name
+            )
+        step = value.get("step", 1)
+        if step <= 0:
+            raise ValueError("Range for variable %r has a non-positive step." % name)
+
+        if all(isinstance(x, int) for x in (start, stop, step)):
+            values = range(start, stop, step)
+        else:
+            # Allow a little slack when computing the number of values, and
+            # round the values, so that floating point inaccuracy does not
+            # result in an extra value or in values (that may be used in
+            # filenames) such as 0.30000000000000004.
+            n = max(0, ceil((stop - start) / step - 1e-9))
+            values = [round(start + i * step, 12) for i in range(n)]
+
+    if not values:
+        raise ValueError("Variable %r has no values." % name)
+
+    return values
 
 
 class Sequences:
@@ -12,11 +440,53 @@ class Sequences:
     Create genetic sequences from a JSON specification.
 
     @param spec: A C{str} filename or an open file pointer to read the
-        specification from.
+        specification from, or an already loaded specification (a C{dict} or
+        a C{list}).
+    @param sequenceFileCache: A C{dict} in which to cache the contents of
+        sequence files (given via 'sequence file' in the specification). This
+        can be shared among C{Sequences} instances so that each file is only
+        read once. If C{None}, a new cache will be made.
+    @param stats: A C{seqgen.instrumentation.RunStats} instance to record
+        timing, throughput, and memory statistics in, or C{None}.
+    @param defaultShards: The C{int} number of shards to split the reads of
+        a specification into, for specifications whose filename contains a
+        C{{shard}} field but that do not give 'shards' or 'max reads per
+        file'.
+    @param defaultMaxReadsPerFile: The C{int} maximum number of reads per
+        shard, for specifications whose filename contains a C{{shard}} field
+        but that do not give 'shards' or 'max reads per file'. Only one of
+        C{defaultShards} and C{defaultMaxReadsPerFile} may be given.
+    @param seed: A seed (e.g., an C{int} or C{str}) for random number
+        generation, or C{None}. If a seed is given, each specification gets
+        a key (a hash of the specification, the seed, the keys of the
+        specifications it refers to, the sequence files it reads, and the
+        options that affect its reads) that is used to seed random number
+        generation for it, so that its reads do not depend on unrelated
+        specifications. Otherwise, the global C{random} generator is used.
+    @param cache: A C{str} directory in which to keep the reads of each
+        specification (see L{seqgen.cache.ReadCache}), keyed by its key, so
+        that later runs can reuse them instead of generating them again. A
+        C{seed} must also be given.
+    @param cacheSize: The C{int} maximum number of bytes to keep in the
+        C{cache} directory, or C{None} for the default.
+    @param summary: A C{seqgen.summary.Summary} instance to add summary
+        statistics of the reads of each specification to, or C{None}.
+    @param backend: The C{str} name of the backend (see
+        L{seqgen.backends.BACKENDS}) used to generate and change sequences,
+        or C{None} (or 'auto') to use the fastest one that is installed. All
+        backends give the same sequences.
+    @param store: A C{str} directory in which to make a file to keep the
+        reads that other specifications refer to (see
+        L{seqgen.store.ReadStore}), instead of keeping them in memory, or
+        C{None}. With a store, reads that are not referred to are not kept.
+    @param storeMemory: The C{int} maximum number of bytes of the sequences
+        (and qualities) of stored reads to keep in memory, or C{None} for the
+        default.
     @raise json.decoder.JSONDecodeError: If the specification JSON cannot
         be read.
     @raise ValueError: If the specification JSON is an object but does not
-        have a 'sequences' key.
+        have a 'sequences' key, if C{cache} is given without C{seed}, or if
+        the backend is unknown or cannot be used.
     """
 
     NT = list("ACGT")
@@ -24,8 +494,43 @@ class Sequences:
     DEFAULT_LENGTH = 100
     DEFAULT_ID_PREFIX = "seq-id-"
     DEFAULT_QUALITY = 30
+    DEFAULT_BATCH_SIZE = 10000
+    # Change this when a change to the code changes the reads generated for
+    # a specification, so that cached reads are not reused.
+    CACHE_VERSION = 4
+    # When a seed is given, each block of this many reads of a specification
+    # is generated from its own seed (made from the key of the specification
+    # and the block number), so that a run can be split into parts that are
+    # generated separately (see seqgen.partition).
+    SEED_BLOCK_SIZE = 1000
+    # The number of times a read of a specification with 'unique' or 'min
+    # distance' is drawn before giving up because each one is too close to
+    # (or duplicates) an earlier read.
+    MAX_UNIQUE_ATTEMPTS = 1000
+    # Keys that only affect where and how (and not which) reads are written,
+    # and so are not used in the key of a specification.
+    OUTPUT_SPEC_KEYS = {"filename", "format", "max reads per file", "shards", "skip"}
+    # Throughput constants used by estimate, in seconds per read, per base
+    # chosen at random, per base considered for mutation, per mutation, and
+    # per byte of output (measured with CPython 3.12 on an x86-64 server).
+    ESTIMATE_READ_SECONDS = 1.0e-5
+    ESTIMATE_RANDOM_BASE_SECONDS = 2.0e-7
+    ESTIMATE_MUTATION_SITE_SECONDS = 1.0e-7
+    ESTIMATE_MUTATION_SECONDS = 1.6e-6
+    ESTIMATE_OUTPUT_BYTE_SECONDS = 5.0e-10
+    # The bytes of memory used to keep a read (not counting its id, sequence
+    # and quality characters) or a mutant (not counting its id, quality and
+    # changes), and per change in a mutant.
+    ESTIMATE_READ_BYTES = 165
+    ESTIMATE_MUTANT_BYTES = 245
+    ESTIMATE_CHANGE_BYTES = 5
     LEGAL_SPEC_KEYS = {
         "alphabet",
+        "breakpoint rate",
+        "breakpoints",
+        "codon usage",
+        "coding",
+        "composition",
         "count",
         "description",
         "id",
@@ -33,8 +538,17 @@ class Sequences:
         "filename",
         "format",
         "from id",
+        "gc content",
         "length",
+        "markov model",
+        "markov order",
+        "markov sequence file",
+        "max reads per file",
+        "min distance",
         "mutation rate",
+        "non-synonymous rate",
+        "parent prefix",
+        "parents",
         "rc",
         "reverse complement",
         "random aa",
@@ -43,14 +557,26 @@ class Sequences:
         "sections",
         "sequence",
         "sequence file",
+        "shards",
         "skip",
         "start",
+        "synonymous rate",
+        "translate",
+        "unique",
     }
     LEGAL_SPEC_SECTION_KEYS = {
         "alphabet",
+        "codon usage",
+        "coding",
+        "composition",
         "from id",
+        "gc content",
         "length",
+        "markov model",
+        "markov order",
+        "markov sequence file",
         "mutation rate",
+        "non-synonymous rate",
         "random aa",
         "random nt",
         "rc",
@@ -58,8 +584,36 @@ class Sequences:
         "start",
         "sequence",
         "sequence file",
+        "synonymous rate",
+        "translate",
+    }
+
+    # The keys that may be given in a specification of recombinants.
+    LEGAL_RECOMBINANT_SPEC_KEYS = {
+        "breakpoint rate",
+        "breakpoints",
+        "count",
+        "description",
+        "filename",
+        "format",
+        "id",
+        "id prefix",
+        "max reads per file",
+        "min distance",
+        "parent prefix",
+        "parents",
+        "shards",
+        "skip",
+        "unique",
     }
 
+    LEGAL_SPEC_REPEAT_KEYS = {
+        "repeat",
+        "sequences",
+        "variable",
+    }
+    DEFAULT_REPEAT_VARIABLE = "i"
+
     def __init__(
         self,
         spec,
@@ -67,13 +621,50 @@ class Sequences:
         defaultIdPrefix=None,
         defaultQuality=None,
         _format="fasta",
+        sequenceFileCache=None,
+        stats=None,
+        defaultShards=None,
+        defaultMaxReadsPerFile=None,
+        seed=None,
+        cache=None,
+        cacheSize=None,
+        summary=None,
+        backend=None,
+        store=None,
+        storeMemory=None,
     ):
+        if defaultShards is not None and defaultMaxReadsPerFile is not None:
+            raise ValueError(
+                "Only one of defaultShards and defaultMaxReadsPerFile may be given."
+            )
+        if cache is not None and seed is None:
+            raise ValueError("A seed must be given to use a cache.")
+        self._seed = seed
+        self._random = random if seed is None else random.Random()
+        self._backend = getBackend(backend)
+        self._cache = None if cache is None else ReadCache(cache, cacheSize)
+        self._store = store
+        self._storeMemory = storeMemory
+        self._sequences = None
+        self._uniqueSets = {}
+        self._defaultShards = defaultShards
+        self._defaultMaxReadsPerFile = defaultMaxReadsPerFile
         self._defaultLength = defaultLength or self.DEFAULT_LENGTH
         self._defaultIdPrefix = defaultIdPrefix or self.DEFAULT_ID_PREFIX
-        self._readSpecification(spec)
-        self._idPrefixCount = {}
-        self._sequences = {}
+        self._sequenceFileCache = {} if sequenceFileCache is None else sequenceFileCache
+        self._compositionTables = {}
+        self._codonModels = {}
+        self._stats = stats
+        self._summary = summary
+        if _format.lower() not in WRITERS:
+            raise ValueError(
+                "Unknown output format %r. Use one of: %s."
+                % (_format, ", ".join(FORMATS))
+            )
+        # The format is needed to check the specification (see _checkVcf).
         self._format = _format
+        self._readSpecification(spec)
+        self.reset()
 
         defaultQuality = (
             self.DEFAULT_QUALITY if defaultQuality is None else int(defaultQuality)
@@ -82,44 +673,52 @@ class Sequences:
         assert 0 <= defaultQuality <= 94  # This is 126 - 32 (tilde - space).
         self._defaultQuality = chr(ord("!") + defaultQuality)
 
+    def reset(self):
+        """
+        Forget all previously generated sequences, so that the next iteration
+        (or call to C{write}) starts afresh, exactly as though this instance
+        had just been created.
+        """
+        self._idPrefixCount = {}
+        self._sequences = self._newSequences()
+        for uniqueSet in self._uniqueSets.values():
+            uniqueSet.close()
+        self._uniqueSets = {}
+        self._distanceIndex = None
+        self._recombinantDraws = deque()
+
     def _readSpecification(self, spec):
         """
         Read the specification in C{spec}.
 
         @param spec: A C{str} filename or an open file pointer to read the
-            specification from.
-        @raise KeyError: if the specification JSON is an object and does not
-            have a 'sequences' key.
-        """
-        if isinstance(spec, str):
-            with open(spec) as fp:
-                j = load(fp)
-        elif isinstance(spec, dict):
-            j = spec
-        else:
-            # Open file pointer.
-            j = load(spec)
-
-        if isinstance(j, list):
-            # No vars were given. We just have a list of sequence specifications.
-            _vars = {}
-            sequenceSpecs = j
-        else:
-            _vars = j.get("variables", {})
-            assert isinstance(j, dict)
-            try:
-                sequenceSpecs = j["sequences"]
-            except KeyError:
-                raise ValueError("The specification must have a 'sequences' key.")
+            specification from, or a C{dict} or C{list} specification.
+        @raise ValueError: if the specification JSON is an object and does not
+            have a 'sequences' key, or if a variable has a list or range value.
+        """
+        _vars, sequenceSpecs = loadSpecification(spec)
 
-        canonicalKeys = self._canonicalKeys()
+        for name, value in _vars.items():
+            if isinstance(value, (list, dict)):
+                raise ValueError(
+                    "Variable %r has a list or range value. Use seqgen.sweep.Sweep "
+                    "to generate sequences for a sweep of variable values." % name
+                )
+
+        self._vars = _vars
+        self._canonicalKeys = self._makeCanonicalKeys()
         self._sequenceSpecs = [
-            self._canonicalizeSpec(spec, _vars, canonicalKeys) for spec in sequenceSpecs
+            (
+                self._canonicalizeRepeat(spec)
+                if "repeat" in spec
+                else self._canonicalizeSpec(spec, _vars, self._canonicalKeys)
+            )
+            for spec in sequenceSpecs
         ]
         self._checkKeys()
         self._checkValid()
 
-    def _canonicalKeys(self) -> dict[str, str]:
+    def _makeCanonicalKeys(self) -> dict[str, str]:
         """
         Make a canonicalization dict for specification keys by allowing '-' or '_'
         everywhere there's a space in a specification key.
@@ -137,8 +736,10 @@ class Sequences:
         """
         Canonicalize a string value.
 
-        @param key: A specification key.
-        @return: A C{str} canonicalized key.
+        @param value: A C{str} specification value.
+        @param _vars: A C{dict} of variables to substitute into C{value}.
+        @return: The C{str} value with variables substituted, converted to an
+            C{int} or C{float} if possible.
         """
         assert isinstance(value, str)
 
@@ -154,7 +755,7 @@ class Sequences:
                 except ValueError:
                     pass
 
-        return value
+        return newValue
 
     def _canonicalizeSpec(self, sequenceSpec, _vars, canonicalKeys):
         """
@@ -169,7 +770,13 @@ class Sequences:
             assert isinstance(key, str)
             newKey = canonicalKeys.get(key, key)
 
-            if isinstance(value, list):
+            if isinstance(value, list) and newKey == "parents":
+                # Parent ids are kept as strings, even if they look like
+                # numbers once variables are substituted.
+                newValue = [
+                    item % _vars if isinstance(item, str) else item for item in value
+                ]
+            elif isinstance(value, list):
                 assert key == "sections"
                 assert all(isinstance(section, dict) for section in value)
                 newValue = [
@@ -180,6 +787,17 @@ class Sequences:
                 newValue = self._canonicalizeStrValue(value, _vars)
             elif isinstance(value, (int, float)):
                 newValue = value
+            elif isinstance(value, dict):
+                # A mapping (e.g., the weights of a composition), whose keys
+                # are kept as they are.
+                newValue = {
+                    name: (
+                        self._canonicalizeStrValue(item, _vars)
+                        if isinstance(item, str)
+                        else item
+                    )
+                    for name, item in value.items()
+                }
             else:
                 raise ValueError(
                     f"Found unexpected value {value!r} of type {type(value)} "
@@ -191,235 +809,2188 @@ class Sequences:
 
         return new
 
-    def _checkValid(self):
-        """
-        Check that all specification dicts contain sensible values.
-
-        @param sequenceSpec: A C{dict} with information about the sequences
-            to be produced.
-        @raise ValueError: If any problem is found.
+    def _canonicalizeRepeat(self, repeatSpec):
         """
-        ids = set()
-        for specCount, spec in enumerate(self._sequenceSpecs, start=1):
-            if spec.get("ratchet"):
-                nSequences = spec.get("count", 1)
-                if nSequences == 1:
-                    raise ValueError(
-                        "Sequence specification %d is specified as ratchet "
-                        "but its count is only 1." % specCount
-                    )
-
-                if "mutation rate" not in spec:
-                    raise ValueError(
-                        "Sequence specification %d is specified as ratchet "
-                        "but does not give a mutation rate." % specCount
-                    )
+        Canonicalize the keys of a repeat specification and its templates.
 
-            nSequences = spec.get("count", 1)
+        The values in the templates are not canonicalized, since they may
+        refer to the repeat variable. That happens as the templates are
+        expanded (in C{_iterSpecs}).
 
-            try:
-                id_ = spec["id"]
-            except KeyError:
-                pass
-            else:
-                # If an id is given, the number of sequences requested must be
-                # one.
-                if nSequences != 1:
-                    raise ValueError(
-                        "Sequence specification %d with id '%s' has a count "
-                        "of %d. If you want to specify a sequence with an "
-                        "id, the count must be 1. To specify multiple "
-                        "sequences with an id prefix, use 'id prefix'."
-                        % (specCount, id_, nSequences)
-                    )
+        @param repeatSpec: A C{dict} with a 'repeat' key.
+        @return: A C{dict} with canonicalized keys.
+        """
 
-                if id_ in ids:
-                    raise ValueError(
-                        "Sequence specification %d has an id (%s) that has "
-                        "already been used." % (specCount, id_)
-                    )
+        def canonicalize(spec):
+            new = {}
+            for key, value in spec.items():
+                if key in ("sections", "sequences"):
+                    value = [canonicalize(section) for section in value]
+                new[self._canonicalKeys.get(key, key)] = value
+            return new
 
-                ids.add(id_)
+        return canonicalize(repeatSpec)
 
-    def _checkKeys(self):
+    def _repeatValues(self, repeatSpec, _vars, label):
         """
-        Check that all specification dicts only contain legal keys.
+        Get the values of the variable of a repeat specification.
 
-        @param sequenceSpec: A C{dict} with information about the sequences
-            to be produced.
-        @raise ValueError: If an unknown key is found.
+        @param repeatSpec: A C{dict} with a 'repeat' key, whose value is an
+            C{int} number of repetitions (in which case the variable takes the
+            values 1 to that number), or a list or range of values (see
+            L{variableValues}).
+        @param _vars: A C{dict} of variables to substitute into the value.
+        @param label: A C{str} label for the specification, for error messages.
+        @raise ValueError: If the value is not valid.
+        @return: A C{list} or C{range} of values.
         """
-        for specCount, spec in enumerate(self._sequenceSpecs, start=1):
-            unexpected = set(spec) - self.LEGAL_SPEC_KEYS
-            if unexpected:
-                raise ValueError(
-                    "Sequence specification %d contains %sunknown key%s: %s."
-                    % (
-                        specCount,
-                        "an " if len(unexpected) == 1 else "",
-                        "" if len(unexpected) == 1 else "s",
-                        ", ".join(sorted(unexpected)),
-                    )
-                )
-            try:
-                sections = spec["sections"]
-            except KeyError:
-                pass
+
+        def canonicalize(value):
+            if isinstance(value, str):
+                return self._canonicalizeStrValue(value, _vars)
+            elif isinstance(value, list):
+                return [canonicalize(item) for item in value]
+            elif isinstance(value, dict):
+                return {key: canonicalize(item) for key, item in value.items()}
             else:
-                for sectionCount, section in enumerate(sections, start=1):
-                    unexpected = set(section) - self.LEGAL_SPEC_SECTION_KEYS
-                    if unexpected:
-                        raise ValueError(
-                            "Section %d of sequence specification %d contains "
-                            "%sunknown key%s: %s."
-                            % (
-                                sectionCount,
-                                specCount,
-                                "an " if len(unexpected) == 1 else "",
-                                "" if len(unexpected) == 1 else "s",
-                                ", ".join(sorted(unexpected)),
-                            )
-                        )
+                return value
 
-    def _specToDNARead(self, spec, previousRead=None):
-        """
-        Get a sequence from a specification.
+        value = canonicalize(repeatSpec["repeat"])
 
-        @param spec: A C{dict} with keys/values specifying a sequence.
-        @param previousRead: If not C{None}, a {dark.Read} instance containing
-            the last read this method returned. This is only used when
-            'ratchet' is given for a specification, in which case we generate
-            a mutant based on the previous read.
-        @raise ValueError: If the section spec refers to a non-existent other
-            sequence, or to part of another sequence but the requested part
-            exceeds the bounds of the other sequence. Or if the C{spec} does
-            not have a 'length' key when no other sequence is being referred
-            to.
-        @return: A C{dark.Read} instance.
-        """
-        alphabet = self.NT
-        length = spec.get("length", self._defaultLength)
+        if isinstance(value, int):
+            return range(1, value + 1)
+        elif isinstance(value, (list, dict)):
+            return variableValues(
+                repeatSpec.get("variable", self.DEFAULT_REPEAT_VARIABLE), value
+            )
+        else:
+            raise ValueError(
+                "Sequence specification %s has a repeat value (%r) that is not "
+                "an integer, a list, or a range." % (label, value)
+            )
 
-        if spec.get("ratchet") and previousRead:
-            read = DNARead(None, previousRead.sequence)
-            alphabet = previousRead.alphabet
+    def _expandRepeat(self, repeatSpec, _vars, label):
+        """
+        Lazily expand a repeat specification.
 
-        elif "from id" in spec:
-            fromId = spec["from id"]
-            try:
-                fromRead = self._sequences[fromId]
-            except KeyError:
-                raise ValueError(
-                    "Sequence section refers to the id '%s' of "
-                    "non-existent other sequence." % fromId
+        @param repeatSpec: A C{dict} with a 'repeat' key.
+        @param _vars: A C{dict} of variables to substitute into the templates.
+        @param label: A C{str} label for the specification, for error messages.
+        @return: A generator of 2-C{tuple}s, each with a C{str} label and a
+            canonicalized sequence specification C{dict}.
+        """
+        variable = repeatSpec.get("variable", self.DEFAULT_REPEAT_VARIABLE)
+        templates = repeatSpec.get("sequences", [])
+        for value in self._repeatValues(repeatSpec, _vars, label):
+            loopVars = dict(_vars)
+            loopVars[variable] = value
+            for templateCount, template in enumerate(templates, start=1):
+                templateLabel = "%s (%s=%s, template %d)" % (
+                    label,
+                    variable,
+                    value,
+                    templateCount,
                 )
-            else:
-                # The start offset in the spec is 1-based. Convert to 0-based.
-                index = int(spec.get("start", 1)) - 1
-                # Use the given length (if any) else the length of the
-                # named read.
-                length = spec.get("length", len(fromRead))
-                sequence = fromRead.sequence[index : index + length]
-                alphabet = fromRead.alphabet
-
-                if len(sequence) != length:
-                    raise ValueError(
-                        "Sequence specification refers to sequence id '%s', "
-                        "starting at index %d with length %d, but sequence "
-                        "'%s' is not long enough to support that."
-                        % (fromId, index + 1, length, fromId)
+                if "repeat" in template:
+                    yield from self._expandRepeat(template, loopVars, templateLabel)
+                else:
+                    yield templateLabel, self._canonicalizeSpec(
+                        template, loopVars, self._canonicalKeys
                     )
 
-                read = DNARead(None, sequence)
+    def _newSequences(self):
+        """
+        Make somewhere to keep the reads that later specifications may refer
+        to, closing (and so removing) the store used before, if any.
 
-        elif "sequence" in spec:
-            read = DNARead(None, spec["sequence"])
+        @return: A C{dict}, or a L{seqgen.store.ReadStore} if a store
+            directory was given.
+        """
+        if isinstance(self._sequences, ReadStore):
+            self._sequences.close()
+        if self._store is None:
+            return {}
+        else:
+            return ReadStore(self._store, self._storeMemory)
 
-        elif "sequence file" in spec:
-            reads = iter(FastaReads(spec["sequence file"]))
-            try:
-                read = next(reads)
-            except StopIteration:
-                raise ValueError("Sequence file '%s' is empty." % spec["sequence file"])
-            except FileNotFoundError:
-                raise ValueError(
-                    "Sequence file '%s' could not be read." % spec["sequence file"]
-                )
-            if spec.get("id"):
-                # There is an id in the spec, which means we are supposed to
-                # replace the one that was in the file. Set the id to None
-                # and let our caller take care of putting the wanted id in.
-                read.id = None
+    def _keep(self, id_, read):
+        """
+        Keep a read, so that later specifications can refer to it. With a
+        store, only the reads that are referred to (via 'from id', 'parents'
+        or 'parent prefix') are kept.
 
-        elif spec.get("alphabet"):
-            alphabet = spec["alphabet"]
-            read = DNARead(None, "".join(choice(alphabet) for _ in range(length)))
+        @param id_: The C{str} id to keep the read under.
+        @param read: A C{Read} instance.
+        """
+        if (
+            self._store is None
+            or id_ in self._referencedIds
+            or id_.startswith(tuple(self._referencedPrefixes))
+            or any(id_ in ids for ids in self._referencedRepeats)
+        ):
+            self._sequences[id_] = read
 
-        elif spec.get("random aa"):
-            alphabet = self.AA
-            read = DNARead(None, "".join(choice(alphabet) for _ in range(length)))
+    def _iterSpecs(self):
+        """
+        Yield all sequence specifications, expanding repeat specifications
+        (lazily) and checking the specifications they produce (which are not
+        all checked by C{_checkValid}).
 
-        else:
-            read = DNARead(None, "".join(choice(alphabet) for _ in range(length)))
+        @raise ValueError: If an expanded specification is not valid.
+        @return: A generator of canonicalized sequence specification C{dict}s.
+        """
+        for specCount, spec in enumerate(self._sequenceSpecs, start=1):
+            if "repeat" in spec:
+                for label, expanded in self._expandRepeat(spec, self._vars, specCount):
+                    # Duplicate ids are found as the reads are made.
+                    self._checkSpec(label, expanded, set())
+                    yield expanded
+            else:
+                yield spec
 
-        if "rc" in spec or "reverse complement" in spec:
-            read = read.reverseComplement()
+    def _specKeys(self):
+        """
+        Yield a key for each (expanded) specification, in the order given by
+        C{_iterSpecs}.
 
-        try:
-            rate = spec["mutation rate"]
-        except KeyError:
-            pass
-        else:
-            read.sequence = self._mutate(read.sequence, rate, alphabet)
+        The key is a hash of everything that affects the reads of the
+        specification: the seed, the specification (without the keys that
+        only affect where and how its reads are written), the number of the
+        first id made from its id prefix, the keys of the specifications it
+        refers to (via 'from id'), the ids and sequences it reads from
+        sequence files, and the options that affect reads. So the key of a
+        specification changes if (and only if) it or one of the
+        specifications it depends on changes. The key seeds the generation
+        of the reads, so the output format and quality do not change them
+        (see C{_cacheKey}).
 
-        read.alphabet = alphabet
+        @return: A generator of C{str} keys, or of C{None} (forever) if no
+            seed was given.
+        """
+        if self._seed is None:
+            yield from repeat(None)
+            return
 
-        return read
+        known = _KnownIds(self._readSequenceFile)
+        seen = set()
+        # The keys of the specifications in each 'unique' group so far.
+        groupKeys = {}
+        for spec in self._iterSpecs():
+            sections = spec.get("sections", [spec])
+            dependencies = []
+            sequenceFiles = []
+            for section in sections:
+                if "from id" in section:
+                    try:
+                        dependencies.append(known.value(section["from id"]))
+                    except KeyError:
+                        dependencies.append(None)
+                if "sequence file" in section:
+                    id_, sequence = self._readSequenceFile(section["sequence file"])
+                    sequenceFiles.append(
+                        sha256((id_ + "\n" + sequence).encode("utf-8")).hexdigest()
+                    )
+                if "markov model" in section or "markov sequence file" in section:
+                    sequenceFiles.append(self._markovModel(section).digest())
+            if "parents" in spec or "parent prefix" in spec:
+                dependencies.extend(self._parentValues(spec, known))
+            group = spec.get("unique")
+            if isinstance(group, str):
+                # The reads depend on those of the earlier specifications in
+                # the group, which they must not duplicate.
+                dependencies.extend(groupKeys.get(group, []))
+            prefix = spec.get("id prefix", self._defaultIdPrefix)
+            key = sha256(
+                dumps(
+                    [
+                        self.CACHE_VERSION,
+                        self._seed,
+                        {
+                            name: value
+                            for name, value in spec.items()
+                            if name not in self.OUTPUT_SPEC_KEYS
+                        },
+                        known.prefixCounts.get(prefix, 0),
+                        dependencies,
+                        sequenceFiles,
+                        self._defaultLength,
+                        self._defaultIdPrefix,
+                    ],
+                    sort_keys=True,
+                    default=repr,
+                ).encode("utf-8")
+            ).hexdigest()
+            # Identical specifications (that give the same ids, e.g., from
+            # the same sequence file) must not get the same key.
+            while key in seen:
+                key = sha256(key.encode("ascii")).hexdigest()
+            seen.add(key)
+            if isinstance(group, str):
+                groupKeys.setdefault(group, []).append(key)
+            self._addIds(spec, known, key)
+            yield key
 
-    def _mutate(self, sequence, rate, alphabet):
+    def _specDependencies(self):
         """
-        Mutate a sequence at a certain rate.
+        Find the specifications that each (expanded) specification refers
+        to, and the number of ids made from its id prefix before it.
 
-        @param sequence: A C{str} nucleotide or amino acid sequence.
-        @param rate: A C{float} mutation rate.
-        @param alphabet: A C{list} of alphabet letters.
-        @return: The mutatated C{str} sequence.
+        @return: A C{list} with a 2-C{tuple} for each specification, in the
+            order given by C{_iterSpecs}, holding a C{set} of the C{int}
+            indices of the specifications it refers to (via 'from id') and
+            the C{int} number of ids made from its id prefix by earlier
+            specifications.
         """
+        known = _KnownIds(self._readSequenceFile)
         result = []
-        possibles = set(alphabet)
-        for current in sequence:
-            if uniform(0.0, 1.0) < rate:
-                result.append(choice(list(possibles - {current})))
-            else:
-                result.append(current)
-
-        return "".join(result)
+        for index, spec in enumerate(self._iterSpecs()):
+            dependencies = set(
+                known.value(section["from id"])
+                for section in spec.get("sections", [spec])
+                if "from id" in section
+            )
+            if "parents" in spec or "parent prefix" in spec:
+                dependencies.update(self._parentValues(spec, known))
+            prefix = spec.get("id prefix", self._defaultIdPrefix)
+            result.append((dependencies, known.prefixCounts.get(prefix, 0)))
+            self._addIds(spec, known, index)
+        return result
 
-    def _readsForSpec(self, spec):
+    def _referencedSequences(self):
         """
-        Yield reads for a given specification.
+        Get the reads that other specifications refer to (via 'from id'),
+        along with the reads that any mutants among them were made from.
+
+        @return: A C{dict} of C{Read} instances, keyed by C{str} id.
+        """
+        result = {}
+        ids = set(self._referencedIds)
+        prefixes = tuple(self._referencedPrefixes)
+        if prefixes or self._referencedRepeats:
+            ids.update(
+                id_
+                for id_ in self._sequences
+                if id_.startswith(prefixes)
+                or any(id_ in repeatIds for repeatIds in self._referencedRepeats)
+            )
+        for id_ in ids:
+            try:
+                read = self._sequences[id_]
+            except KeyError:
+                continue
+            result[id_] = read
+            if read.parent is not None:
+                result[read.parent.id] = read.parent
+        return result
+
+    def filenames(self):
+        """
+        Get the names of the files that output will be written to.
+
+        @return: A C{set} of C{str} filenames.
+        """
+        return set(
+            filename
+            for spec in self._iterSpecs()
+            for filename, _ in self._specFiles(spec)
+            if filename is not None
+        )
+
+    def estimate(self):
+        """
+        Estimate the cost of generating and writing the sequences, without
+        generating any.
+
+        The numbers of reads and bases, and the sizes of the output files,
+        are worked out from the specification. The memory needed to keep the
+        reads (which are all kept, so that later specifications can refer to
+        them) is estimated from the size of a read and the expected number of
+        changes in mutants (see C{seqgen.read.Read.mutant}), and the run time
+        from the C{ESTIMATE_*_SECONDS} throughput constants. Sequence files
+        are read, to find their ids and lengths.
+
+        @raise ValueError: If an output destination is given formats that
+            cannot be mixed.
+        @return: A C{dict} with a 'specs' key holding a C{list} with a C{dict}
+            for each (expanded) specification, giving its label, number of
+            reads and bases, the files it is written to, the bytes of memory
+            needed to keep its reads, and its estimated run time in seconds.
+            A 'files' key holds a C{list} with a C{dict} for each output
+            destination, giving its filename (C{None} for standard output),
+            format, number of reads and bases, and estimated size in bytes.
+            The 'reads', 'bases', 'bytes', 'memory', and 'seconds' keys give
+            totals.
+        """
+        destinations = self._destinations()
+        known = _KnownIds(self._readSequenceFile)
+        specs = []
+        # Output totals, keyed by (filename, quality) so that FASTQ and
+        # FASTA parts of a file are sized separately.
+        parts = {}
+        # The number of reads each specification writes to each file.
+        shares = []
+        for specCount, spec in enumerate(self._sequenceSpecs, start=1):
+            if "repeat" in spec:
+                labelled = self._expandRepeat(spec, self._vars, specCount)
+            else:
+                labelled = [(specCount, spec)]
+            for label, spec in labelled:
+                specs.append(self._estimateSpec(str(label), spec, known, parts, shares))
+
+        files = {}
+        for (filename, quality), (reads, idBytes, bases, changes) in parts.items():
+            writerClass, _, format_, _ = destinations[filename]
+            size = writerClass.estimateSize(
+                reads, round(idBytes), bases, quality, round(changes)
+            )
+            try:
+                file_ = files[filename]
+            except KeyError:
+                files[filename] = {
+                    "filename": filename,
+                    "format": format_,
+                    "reads": reads,
+                    "bases": bases,
+                    "bytes": size,
+                }
+            else:
+                file_["reads"] += reads
+                file_["bases"] += bases
+                file_["bytes"] += size
+
+        for spec, filename, reads in shares:
+            file_ = files[filename]
+            spec["seconds"] += (
+                file_["bytes"] * reads / file_["reads"]
+            ) * self.ESTIMATE_OUTPUT_BYTE_SECONDS
+
+        return {
+            "specs": specs,
+            "files": list(files.values()),
+            "reads": sum(spec["reads"] for spec in specs),
+            "bases": sum(spec["bases"] for spec in specs),
+            "bytes": sum(file_["bytes"] for file_ in files.values()),
+            "memory": sum(spec["memory"] for spec in specs),
+            "seconds": sum(spec["seconds"] for spec in specs),
+        }
+
+    def _estimateSpec(self, label, spec, known, parts, shares):
+        """
+        Estimate the cost of a specification.
+
+        @param label: The C{str} label of the specification.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param known: A C{_KnownIds} instance holding the ids (and lengths)
+            of the sequences of earlier specifications. The ids of C{spec}
+            are added.
+        @param parts: A C{dict} keyed by (C{str} filename, C{bool} quality)
+            C{tuple}s with [reads, id bytes, bases, changes] C{list} values,
+            to add the output of C{spec} to.
+        @param shares: A C{list} to add (estimate C{dict}, C{str} filename,
+            C{int} reads) C{tuple}s to, for each file C{spec} writes to.
+        @return: A C{dict} with the estimate for the specification. Its
+            'seconds' value does not include the time taken to write output.
+        """
+        count = spec.get("count", 1)
+        description = spec.get("description")
+        suffixLength = 0 if description is None else len(description) + 1
+        if "id" in spec:
+            idBytes = len(spec["id"]) + suffixLength
+        elif "sequence file" in spec and "sections" not in spec:
+            idBytes = count * (
+                len(self._readSequenceFile(spec["sequence file"])[0]) + suffixLength
+            )
+        else:
+            prefix = spec.get("id prefix", self._defaultIdPrefix)
+            first = known.prefixCounts.get(prefix, 0) + 1
+            idBytes = count * (len(prefix) + suffixLength) + _digitCount(
+                first, first + count - 1
+            )
+
+        # The lengths of the sections (or of the whole sequence) are worked
+        # out before the ids of the specification are added to those known.
+        if "parents" in spec or "parent prefix" in spec:
+            sectionLengths = [self._checkParents(label, spec, known, []) or 0]
+        else:
+            sectionLengths = [
+                self._checkReference(label, section, known, []) or 0
+                for section in spec.get("sections", [spec])
+            ]
+        self._checkReferences(label, spec, known, [])
+        length = sum(sectionLengths)
+        if ("parents" in spec or "parent prefix" in spec) and length:
+            idBytes += count * (1 + self._segmentsLength(spec, known, length))
+
+        # The bases chosen at random, considered for mutation, and changed.
+        randomBases = examinedBases = mutations = 0
+        for section, sectionLength in zip(spec.get("sections", [spec]), sectionLengths):
+            if not (
+                "from id" in section
+                or "sequence" in section
+                or "sequence file" in section
+                or "parents" in section
+                or "parent prefix" in section
+            ):
+                randomBases += sectionLength * (1 if section.get("ratchet") else count)
+            if "mutation rate" in section:
+                examinedBases += sectionLength * count
+                mutations += sectionLength * count * section["mutation rate"]
+
+        # Work out which reads are kept as mutants, and their changes.
+        mutants = changes = 0
+        if (
+            "mutation rate" in spec
+            and "sections" not in spec
+            and not ("rc" in spec or "reverse complement" in spec)
+        ):
+            rate = spec["mutation rate"]
+            try:
+                fromLength = known.value(spec["from id"])
+            except KeyError:
+                fromIsParent = False
+            else:
+                fromIsParent = fromLength is not None and length == fromLength
+            if spec.get("ratchet"):
+                mutants, changes = _ratchetChanges(count, length, rate, fromIsParent)
+            elif fromIsParent:
+                mutants, changes = count, count * length * rate
+
+        fastq = spec.get("format", self._format).lower() == "fastq"
+        memory = (
+            (count - mutants) * (self.ESTIMATE_READ_BYTES + length)
+            + mutants * self.ESTIMATE_MUTANT_BYTES
+            + changes * self.ESTIMATE_CHANGE_BYTES
+            + idBytes
+            + (count * length if fastq else 0)
+        )
+
+        result = {
+            "spec": label,
+            "reads": count,
+            "bases": count * length,
+            "files": [],
+            "memory": round(memory),
+            "seconds": (
+                count * self.ESTIMATE_READ_SECONDS
+                + randomBases * self.ESTIMATE_RANDOM_BASE_SECONDS
+                + examinedBases * self.ESTIMATE_MUTATION_SITE_SECONDS
+                + mutations * self.ESTIMATE_MUTATION_SECONDS
+            ),
+        }
+
+        if not spec.get("skip"):
+            for filename, fileCount in self._specFiles(spec):
+                result["files"].append(filename)
+                shares.append((result, filename, fileCount))
+                fraction = fileCount / count
+                part = parts.setdefault((filename, fastq), [0, 0, 0, 0])
+                part[0] += fileCount
+                part[1] += idBytes * fraction
+                part[2] += fileCount * length
+                part[3] += changes * fraction
+
+        return result
+
+    def _segmentsLength(self, spec, known, length):
+        """
+        Estimate the length of the description of the parts of a recombinant
+        (see C{_segments}).
+
+        The description of a recombinant with the expected number of evenly
+        spaced breakpoints is made (with empty parent ids), and the mean
+        length of the ids of the parents is added for each part.
+
+        @param spec: A C{dict} with information about the recombinants to
+            be produced.
+        @param known: A C{_KnownIds} instance holding the ids of the
+            sequences of earlier specifications.
+        @param length: The C{int} length of the recombinants.
+        @return: The C{float} estimated length.
+        """
+        if "breakpoint rate" in spec:
+            breakpoints = round(spec["breakpoint rate"] * (length - 1))
+        else:
+            breakpoints = spec.get("breakpoints", 1)
+
+        if "parents" in spec:
+            parentIds = spec["parents"]
+            idLength = sum(len(id_.split(" ", 1)[0]) for id_ in parentIds) / len(
+                parentIds
+            )
+        else:
+            prefix = spec["parent prefix"]
+            ranges = known.ranges[prefix]
+            idLength = len(prefix) + sum(
+                _digitCount(first, last) for _, first, last, _ in ranges
+            ) / sum(last - first + 1 for _, first, last, _ in ranges)
+
+        segments = self._segments(
+            [("", None), ("", None)],
+            length,
+            [
+                length * (number + 1) // (breakpoints + 1)
+                for number in range(breakpoints)
+            ],
+            [number % 2 for number in range(breakpoints + 1)],
+        )
+        return len(segments) + (breakpoints + 1) * idLength
+
+    def _shardSizes(self, spec):
+        """
+        Get the number of reads in each shard of a specification.
+
+        A specification is sharded if its filename contains a C{{shard}}
+        field (e.g., 'out-{shard:04d}.fastq'). Its reads are divided, in
+        order, among shard files numbered from 1. The number of shards is
+        given by 'shards' (which splits the reads as evenly as possible) or
+        'max reads per file' in the specification, or by the defaults given
+        to C{__init__}. If none of these is given, there is one shard.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @return: A C{list} of C{int} shard sizes, or C{None} if C{spec} is
+            not sharded.
+        """
+        filename = spec.get("filename")
+        if filename is None or "{shard" not in filename:
+            return None
+
+        count = spec.get("count", 1)
+        shards = spec.get("shards")
+        maxReads = spec.get("max reads per file")
+        if shards is None and maxReads is None:
+            shards, maxReads = self._defaultShards, self._defaultMaxReadsPerFile
+
+        if maxReads is not None:
+            full, remainder = divmod(count, maxReads)
+            return [maxReads] * full + ([remainder] if remainder else [])
+        else:
+            shards = shards or 1
+            quotient, remainder = divmod(count, shards)
+            return [quotient + 1] * remainder + [quotient] * (shards - remainder)
+
+    def _specFiles(self, spec):
+        """
+        Get the output files of a specification.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @return: A C{list} of (filename, count) C{tuple}s, giving each C{str}
+            filename (or C{None} for the default destination) and the C{int}
+            number of reads written to it, in order.
+        """
+        filename = spec.get("filename")
+        shardSizes = self._shardSizes(spec)
+        if shardSizes is None:
+            return [(filename, spec.get("count", 1))]
+        else:
+            return [
+                (filename.format(shard=shard), size)
+                for shard, size in enumerate(shardSizes, start=1)
+            ]
+
+    def _checkValid(self):
+        """
+        Check the whole specification before any sequences are generated.
+
+        All specification dicts are checked for sensible values. The ids that
+        each will produce are worked out, so that every 'from id' reference
+        can be checked, along with the bounds of the part of the referenced
+        sequence that is used (where the lengths of sequences are known
+        without generating them). The templates of repeat specifications are
+        checked without expanding them in full (see C{_checkRepeat}).
+
+        @raise ValueError: If any problem is found. The message describes
+            all the problems found, one per line.
+        """
+        errors = []
+        ids = set()
+        # The ids made by repeat templates, as _RepeatIds.
+        repeatIds = []
+        known = _KnownIds(self._readSequenceFile, lazy=True)
+        for specCount, spec in enumerate(self._sequenceSpecs, start=1):
+            if "repeat" in spec:
+                try:
+                    self._checkRepeat(
+                        specCount, spec, self._vars, ids, repeatIds, known, errors
+                    )
+                except ValueError as e:
+                    # A (possibly nested) repeat specification is invalid.
+                    errors.append(str(e))
+            else:
+                try:
+                    self._checkSpec(specCount, spec, ids)
+                except ValueError as e:
+                    errors.append(str(e))
+                else:
+                    if "id" in spec and any(spec["id"] in made for made in repeatIds):
+                        errors.append(
+                            "Sequence specification %s has an id (%s) that has "
+                            "already been used." % (specCount, spec["id"])
+                        )
+                self._checkReferences(specCount, spec, known, errors)
+
+        if errors:
+            raise ValueError("\n".join(errors))
+
+        # The ids (and id prefixes) of sequences that other sequences are
+        # made from.
+        self._referencedIds = known.references
+        self._referencedPrefixes = known.referencedPrefixes
+        self._referencedRepeats = known.referencedRepeats
+
+    @staticmethod
+    def _usesVariable(value, variable):
+        """
+        Find out whether a (template) value substitutes a variable.
+
+        @param value: A specification value.
+        @param variable: The C{str} variable name.
+        @return: C{True} if the variable is substituted into the value (or
+            into anything in it, if it is a C{list} or C{dict}).
+        """
+        if isinstance(value, str):
+            return "%(" + variable + ")" in value
+        elif isinstance(value, list):
+            return any(Sequences._usesVariable(item, variable) for item in value)
+        elif isinstance(value, dict):
+            return any(
+                Sequences._usesVariable(item, variable) for item in value.values()
+            )
+        else:
+            return False
+
+    def _checkRepeat(self, label, repeatSpec, _vars, ids, repeatIds, known, errors):
+        """
+        Check a repeat specification without expanding it in full.
+
+        Each template is checked (as in C{_checkValid}) for the first value
+        of the repeat variable. For the other values, the ids the template
+        makes are added to C{known} without making them (as a range of
+        numbers for an id prefix, or as a L{_RepeatIds} for an id that uses
+        the variable) and only the references that change with the variable
+        are looked up. So checking takes time (and memory) in proportion to
+        the size of the templates, not to the number of repetitions (unless
+        the references, or the id prefix, count, or sequence file of a
+        template change with the variable). The expanded specifications are
+        checked in full as they are made (in C{_iterSpecs}).
+
+        @param label: A label to identify the specification in error
+            messages.
+        @param repeatSpec: A C{dict} with a 'repeat' key.
+        @param _vars: A C{dict} of variables to substitute into the templates.
+        @param ids: A C{set} of C{str} ids already used.
+        @param repeatIds: A C{list} of the L{_RepeatIds} made by the repeat
+            templates already checked, to add to.
+        @param known: A C{_KnownIds} instance.
+        @param errors: A C{list} of C{str} error messages, to add to.
+        @raise ValueError: If the repeat value is not valid.
+        """
+        values = self._repeatValues(repeatSpec, _vars, label)
+        if not values:
+            return
+
+        variable = repeatSpec.get("variable", self.DEFAULT_REPEAT_VARIABLE)
+        rest = values[1:]
+
+        def loopVars(value):
+            result = dict(_vars)
+            result[variable] = value
+            return result
+
+        def templateLabel(value, templateCount):
+            return "%s (%s=%s, template %d)" % (label, variable, value, templateCount)
+
+        for templateCount, template in enumerate(
+            repeatSpec.get("sequences", []), start=1
+        ):
+            if "repeat" in template:
+                # Nested repeats are checked for each value of the outer
+                # variable (but are not expanded in full).
+                for value in values:
+                    self._checkRepeat(
+                        templateLabel(value, templateCount),
+                        template,
+                        loopVars(value),
+                        ids,
+                        repeatIds,
+                        known,
+                        errors,
+                    )
+                continue
+
+            firstLabel = templateLabel(values[0], templateCount)
+            spec = self._canonicalizeSpec(
+                template, loopVars(values[0]), self._canonicalKeys
+            )
+            try:
+                self._checkSpec(firstLabel, spec, ids)
+            except ValueError as e:
+                errors.append(str(e))
+            length = self._checkReferences(firstLabel, spec, known, errors)
+
+            if not rest:
+                continue
+
+            varying = set(
+                key
+                for key, value in template.items()
+                if self._usesVariable(value, variable)
+            )
+            if varying & {
+                "length",
+                "sequence",
+                "sequence file",
+                "sections",
+                "from id",
+                "start",
+                "parents",
+                "parent prefix",
+            }:
+                length = None
+
+            # Look up the references that change with the variable.
+            references = [
+                section["from id"]
+                for section in template.get("sections", [template])
+                if "from id" in section
+            ] + list(template.get("parents", []))
+            for reference in references:
+                if self._usesVariable(reference, variable):
+                    referenced = _RepeatIds(reference, variable, rest, _vars)
+                    known.referencedRepeats.append(referenced)
+                    if any(made.covers(referenced) for made in repeatIds):
+                        # The ids are made by an earlier template.
+                        continue
+                    for value, id_ in zip(rest, referenced):
+                        try:
+                            known.value(id_)
+                        except KeyError:
+                            errors.append(
+                                "Sequence specification %s refers to the id "
+                                "'%s', which is not the id of an earlier "
+                                "sequence." % (templateLabel(value, templateCount), id_)
+                            )
+                        except ValueError as e:
+                            errors.append(str(e))
+            if "parent prefix" in varying:
+                for value in rest:
+                    prefix = template["parent prefix"] % loopVars(value)
+                    known.referencedPrefixes.add(prefix)
+                    if known.prefixValues(prefix)[0] < 2:
+                        errors.append(
+                            "Sequence specification %s has a parent prefix (%r) "
+                            "that fewer than two earlier sequence ids were made "
+                            "from." % (templateLabel(value, templateCount), prefix)
+                        )
+
+            # Add the ids made for the other values.
+            if "id" in template:
+                if "id" not in varying and "description" not in varying:
+                    errors.append(
+                        "Sequence specification %s has an id (%s) that has "
+                        "already been used."
+                        % (templateLabel(rest[0], templateCount), spec["id"])
+                    )
+                    continue
+                made = _RepeatIds(
+                    (
+                        template["id"]
+                        if "description" not in template
+                        else template["id"] + " " + template["description"]
+                    ),
+                    variable,
+                    rest,
+                    _vars,
+                )
+                for id_ in sorted(id_ for id_ in ids if id_ in made):
+                    value = next(
+                        value for value, madeId in zip(rest, made) if madeId == id_
+                    )
+                    errors.append(
+                        "Sequence specification %s has an id (%s) that has "
+                        "already been used."
+                        % (templateLabel(value, templateCount), id_)
+                    )
+                repeatIds.append(made)
+                known.addRepeat(made, length)
+            elif "sequence file" in template and "sections" not in template:
+                for value in rest:
+                    expanded = self._canonicalizeSpec(
+                        template, loopVars(value), self._canonicalKeys
+                    )
+                    known.addFile(
+                        expanded["sequence file"], expanded.get("description"), length
+                    )
+            elif varying & {"id prefix", "count", "description"}:
+                for value in rest:
+                    expanded = self._canonicalizeSpec(
+                        template, loopVars(value), self._canonicalKeys
+                    )
+                    self._addIds(expanded, known, length)
+            else:
+                # If another template also makes ids from this prefix, the
+                # ids of the two are interleaved, so the value of an id in
+                # this range is not known.
+                prefix = spec.get("id prefix", self._defaultIdPrefix)
+                shared = any(
+                    other is not template
+                    and "id" not in other
+                    and other.get("id prefix", self._defaultIdPrefix) == prefix
+                    for other in repeatSpec.get("sequences", [])
+                )
+                known.addPrefix(
+                    prefix,
+                    spec.get("description"),
+                    spec.get("count", 1) * len(rest),
+                    None if shared else length,
+                )
+
+    def _checkReferences(self, label, spec, known, errors):
+        """
+        Check the 'from id' references of a specification and add the ids it
+        will produce to those that are known.
+
+        @param label: A label (e.g., the C{int} specification number) to
+            identify the specification in error messages.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param known: A C{_KnownIds} instance.
+        @param errors: A C{list} of C{str} error messages, to add to.
+        @return: The C{int} length of the sequences of the specification, or
+            C{None} if it is not known.
+        """
+        if "sections" in spec:
+            length = 0
+            for sectionCount, section in enumerate(spec["sections"], start=1):
+                sectionLength = self._checkReference(
+                    "%s (section %d)" % (label, sectionCount), section, known, errors
+                )
+                length = (
+                    None
+                    if length is None or sectionLength is None
+                    else length + sectionLength
+                )
+        elif "parents" in spec or "parent prefix" in spec:
+            length = self._checkParents(label, spec, known, errors)
+        else:
+            length = self._checkReference(label, spec, known, errors)
+
+        self._addIds(spec, known, length)
+        return length
+
+    def _parentValues(self, spec, known):
+        """
+        Get the values of the parents of a specification of recombinants.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param known: A C{_KnownIds} instance.
+        @raise KeyError: If a parent id is not known.
+        @return: A C{list} of values, one for each parent id (or for each
+            group of ids made from the parent prefix).
+        """
+        if "parents" in spec:
+            return [known.value(id_) for id_ in spec["parents"]]
+        else:
+            return known.prefixValues(spec["parent prefix"])[1]
+
+    def _checkParents(self, label, spec, known, errors):
+        """
+        Check the parents of a specification of recombinants and get the
+        length of the recombinants.
+
+        @param label: A label to identify the specification in error
+            messages.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param known: A C{_KnownIds} instance.
+        @param errors: A C{list} of C{str} error messages, to add to.
+        @return: The C{int} length of the recombinants, or C{None} if it is
+            not known (e.g., a parent comes from a sequence file or there is
+            an error).
+        """
+        if "parents" in spec:
+            known.references.update(spec["parents"])
+            try:
+                lengths = self._parentValues(spec, known)
+            except KeyError as e:
+                errors.append(
+                    "Sequence specification %s refers to the id '%s', which "
+                    "is not the id of an earlier sequence." % (label, e.args[0])
+                )
+                return None
+            except ValueError as e:
+                # A sequence file could not be read.
+                errors.append(str(e))
+                return None
+        else:
+            prefix = spec["parent prefix"]
+            known.referencedPrefixes.add(prefix)
+            count, lengths = known.prefixValues(prefix)
+            if count < 2:
+                errors.append(
+                    "Sequence specification %s has a parent prefix (%r) that "
+                    "fewer than two earlier sequence ids were made from."
+                    % (label, prefix)
+                )
+                return None
+
+        if None in lengths:
+            return None
+        if len(set(lengths)) > 1:
+            errors.append(
+                "Sequence specification %s has parents of different lengths "
+                "(%s)." % (label, ", ".join(map(str, sorted(set(lengths)))))
+            )
+            return None
+
+        length = lengths[0]
+        if spec.get("breakpoints", 1) >= length:
+            errors.append(
+                "Sequence specification %s has more breakpoints (%d) than there "
+                "are sites between the bases of its parents (of length %d)."
+                % (label, spec.get("breakpoints", 1), length)
+            )
+            return None
+        return length
+
+    def _addIds(self, spec, known, value):
+        """
+        Add the ids a specification will produce to those that are known.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param known: A C{_KnownIds} instance.
+        @param value: The value to give the ids.
+        """
+        description = spec.get("description")
+        if "id" in spec:
+            id_ = spec["id"]
+            known.addId(id_ if description is None else id_ + " " + description, value)
+        elif "sequence file" in spec and "sections" not in spec:
+            # The id will come from the file.
+            known.addFile(spec["sequence file"], description, value)
+        else:
+            known.addPrefix(
+                spec.get("id prefix", self._defaultIdPrefix),
+                description,
+                spec.get("count", 1),
+                value,
+            )
+
+    def _checkReference(self, label, spec, known, errors):
+        """
+        Check the 'from id' reference (if any) of a specification or section
+        and get the length of the sequence it gives.
+
+        @param label: A label to identify the specification (or section) in
+            error messages.
+        @param spec: A C{dict} with information about a sequence.
+        @param known: A C{_KnownIds} instance.
+        @param errors: A C{list} of C{str} error messages, to add to.
+        @return: The C{int} length of the sequence, or C{None} if it is not
+            known (e.g., it comes from a sequence file or there is an error).
+        """
+        if "from id" in spec:
+            fromId = spec["from id"]
+            known.references.add(fromId)
+            try:
+                fromLength = known.value(fromId)
+            except KeyError:
+                errors.append(
+                    "Sequence specification %s refers to the id '%s', which "
+                    "is not the id of an earlier sequence." % (label, fromId)
+                )
+                return None
+            except ValueError as e:
+                # A sequence file could not be read.
+                errors.append(str(e))
+                return None
+
+            start = int(spec.get("start", 1))
+            length = spec.get("length", fromLength)
+            if start < 1:
+                errors.append(
+                    "Sequence specification %s has a start (%d) that is less "
+                    "than 1." % (label, start)
+                )
+                return None
+            if fromLength is not None and start - 1 + length > fromLength:
+                errors.append(
+                    "Sequence specification %s refers to sequence id '%s', "
+                    "starting at index %d with length %d, but sequence '%s' "
+                    "(of length %d) is not long enough to support that."
+                    % (label, fromId, start, length, fromId, fromLength)
+                )
+                return None
+            return length
+        elif "sequence" in spec:
+            return len(spec["sequence"])
+        elif "sequence file" in spec:
+            return known.fileLength(spec["sequence file"])
+        else:
+            return spec.get("length", self._defaultLength)
+
+    def _checkSpec(self, label, spec, ids):
+        """
+        Check that a specification dict contains sensible values.
+
+        @param label: A label (e.g., the C{int} specification number) to
+            identify the specification in error messages.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param ids: A C{set} of C{str} ids already used. The id of C{spec},
+            if any, is added.
+        @raise ValueError: If any problem is found.
+        """
+        if spec.get("ratchet"):
+            nSequences = spec.get("count", 1)
+            if nSequences == 1:
+                raise ValueError(
+                    "Sequence specification %s is specified as ratchet "
+                    "but its count is only 1." % label
+                )
+
+            if not (
+                "mutation rate" in spec
+                or "synonymous rate" in spec
+                or "non-synonymous rate" in spec
+            ):
+                raise ValueError(
+                    "Sequence specification %s is specified as ratchet "
+                    "but does not give a mutation rate." % label
+                )
+
+        nSequences = spec.get("count", 1)
+
+        unique = spec.get("unique", False)
+        if not (isinstance(unique, bool) or (isinstance(unique, str) and unique)):
+            raise ValueError(
+                "Sequence specification %s has a 'unique' value (%r) that is not "
+                "true, false, or the name of a group of specifications."
+                % (label, unique)
+            )
+
+        if "min distance" in spec:
+            minDistance = spec["min distance"]
+            if (
+                isinstance(minDistance, bool)
+                or not isinstance(minDistance, int)
+                or minDistance < 1
+            ):
+                raise ValueError(
+                    "Sequence specification %s has a 'min distance' value (%r) "
+                    "that is not a positive integer." % (label, minDistance)
+                )
+
+        self._checkMarkov(label, spec)
+        self._checkComposition(label, spec)
+        self._checkCoding(label, spec)
+        self._checkRecombinants(label, spec)
+        for sectionCount, section in enumerate(spec.get("sections", []), start=1):
+            sectionLabel = "%s (section %d)" % (label, sectionCount)
+            self._checkMarkov(sectionLabel, section)
+            self._checkComposition(sectionLabel, section)
+            self._checkCoding(sectionLabel, section)
+
+        filename = spec.get("filename")
+        if "shards" in spec or "max reads per file" in spec:
+            if "shards" in spec and "max reads per file" in spec:
+                raise ValueError(
+                    "Sequence specification %s gives both 'shards' and 'max "
+                    "reads per file'." % label
+                )
+            key = "shards" if "shards" in spec else "max reads per file"
+            value = spec[key]
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(
+                    "Sequence specification %s has a %r value (%r) that is not a "
+                    "positive integer." % (label, key, value)
+                )
+            if filename is None or "{shard" not in filename:
+                raise ValueError(
+                    "Sequence specification %s gives %r but does not have a "
+                    "filename containing a {shard} field (e.g., "
+                    "'out-{shard:04d}.fasta')." % (label, key)
+                )
+            if key == "shards" and value > nSequences:
+                raise ValueError(
+                    "Sequence specification %s has more shards (%d) than "
+                    "sequences (%d)." % (label, value, nSequences)
+                )
+
+        if filename is not None and "{shard" in filename:
+            try:
+                filename.format(shard=1)
+            except (IndexError, KeyError, ValueError) as e:
+                raise ValueError(
+                    "Sequence specification %s has a filename (%r) that is not a "
+                    "valid shard filename template (%s)." % (label, filename, e)
+                )
+
+        format_ = spec.get("format")
+        if format_ is not None and format_.lower() not in WRITERS:
+            raise ValueError(
+                "Sequence specification %s has an unknown format (%r). Use one "
+                "of: %s." % (label, format_, ", ".join(FORMATS))
+            )
+        self._checkVcf(label, spec)
+
+        try:
+            id_ = spec["id"]
+        except KeyError:
+            pass
+        else:
+            # If an id is given, the number of sequences requested must be
+            # one.
+            if nSequences != 1:
+                raise ValueError(
+                    "Sequence specification %s with id '%s' has a count "
+                    "of %d. If you want to specify a sequence with an "
+                    "id, the count must be 1. To specify multiple "
+                    "sequences with an id prefix, use 'id prefix'."
+                    % (label, id_, nSequences)
+                )
+
+            if id_ in ids:
+                raise ValueError(
+                    "Sequence specification %s has an id (%s) that has "
+                    "already been used." % (label, id_)
+                )
+
+            ids.add(id_)
+
+    def _checkMarkov(self, label, spec):
+        """
+        Check the Markov model keys of a specification or section.
+
+        @param label: A label to identify the specification (or section) in
+            error messages.
+        @param spec: A C{dict} with information about a sequence.
+        @raise ValueError: If the Markov model keys are not sensible.
+        """
+        if "markov model" in spec and "markov sequence file" in spec:
+            raise ValueError(
+                "Sequence specification %s gives both 'markov model' and "
+                "'markov sequence file'." % label
+            )
+        if "markov order" in spec:
+            if "markov sequence file" not in spec:
+                raise ValueError(
+                    "Sequence specification %s gives 'markov order' but not "
+                    "'markov sequence file'." % label
+                )
+            order = spec["markov order"]
+            if not isinstance(order, int) or order < 0:
+                raise ValueError(
+                    "Sequence specification %s has a 'markov order' value (%r) "
+                    "that is not a non-negative integer." % (label, order)
+                )
+        if "markov model" in spec or "markov sequence file" in spec:
+            for key in "from id", "sequence", "sequence file":
+                if key in spec:
+                    raise ValueError(
+                        "Sequence specification %s gives a Markov model and %r, "
+                        "which cannot be used together." % (label, key)
+                    )
+
+    def _checkComposition(self, label, spec):
+        """
+        Check the 'composition' and 'gc content' keys of a specification or
+        section.
+
+        @param label: A label to identify the specification (or section) in
+            error messages.
+        @param spec: A C{dict} with information about a sequence.
+        @raise ValueError: If the keys are not sensible.
+        """
+        if "composition" in spec and "gc content" in spec:
+            raise ValueError(
+                "Sequence specification %s gives both 'composition' and 'gc "
+                "content'." % label
+            )
+        if "gc content" in spec:
+            key = "gc content"
+            gc = spec[key]
+            if (
+                isinstance(gc, bool)
+                or not isinstance(gc, (int, float))
+                or not 0.0 <= gc <= 1.0
+            ):
+                raise ValueError(
+                    "Sequence specification %s has a 'gc content' value (%r) "
+                    "that is not a number from 0 to 1." % (label, gc)
+                )
+        elif "composition" in spec:
+            key = "composition"
+            composition = spec[key]
+            if (
+                not isinstance(composition, dict)
+                or not all(
+                    isinstance(letter, str)
+                    and len(letter) == 1
+                    and not isinstance(weight, bool)
+                    and isinstance(weight, (int, float))
+                    and weight >= 0
+                    for letter, weight in composition.items()
+                )
+                or not sum(composition.values())
+            ):
+                raise ValueError(
+                    "Sequence specification %s has a 'composition' value (%r) "
+                    "that is not an object mapping letters to non-negative "
+                    "weights (that are not all zero)." % (label, composition)
+                )
+        else:
+            return
+
+        for other in "alphabet", "random aa", "markov model", "markov sequence file":
+            if spec.get(other):
+                raise ValueError(
+                    "Sequence specification %s gives %r and %r, which cannot be "
+                    "used together." % (label, key, other)
+                )
+
+    def _checkCoding(self, label, spec):
+        """
+        Check the coding keys of a specification or section.
+
+        @param label: A label to identify the specification (or section) in
+            error messages.
+        @param spec: A C{dict} with information about a sequence.
+        @raise ValueError: If the coding keys are not sensible.
+        """
+        if not spec.get("coding"):
+            for key in "codon usage", "synonymous rate", "non-synonymous rate":
+                if key in spec:
+                    raise ValueError(
+                        "Sequence specification %s gives %r but is not coding "
+                        "(via 'coding')." % (label, key)
+                    )
+            return
+
+        for key in (
+            "alphabet",
+            "random aa",
+            "composition",
+            "gc content",
+            "markov model",
+            "markov sequence file",
+        ):
+            if spec.get(key):
+                raise ValueError(
+                    "Sequence specification %s gives 'coding' and %r, which "
+                    "cannot be used together." % (label, key)
+                )
+
+        rates = [spec.get("synonymous rate", 0.0), spec.get("non-synonymous rate", 0.0)]
+        if "synonymous rate" in spec or "non-synonymous rate" in spec:
+            if "mutation rate" in spec:
+                raise ValueError(
+                    "Sequence specification %s gives a 'mutation rate' and a "
+                    "synonymous or non-synonymous rate, which cannot be used "
+                    "together." % label
+                )
+            if not (
+                all(
+                    isinstance(rate, (int, float)) and 0.0 <= rate <= 1.0
+                    for rate in rates
+                )
+                and sum(rates) <= 1.0
+            ):
+                raise ValueError(
+                    "Sequence specification %s has synonymous and "
+                    "non-synonymous rates (%r and %r) that are not probabilities "
+                    "whose sum is at most 1." % (label, rates[0], rates[1])
+                )
+
+        if "codon usage" in spec:
+            usage = spec["codon usage"]
+            try:
+                if not isinstance(usage, dict):
+                    raise ValueError("It must be an object.")
+                self._codonModel(spec)
+            except (TypeError, ValueError) as e:
+                raise ValueError(
+                    "Sequence specification %s has an invalid 'codon usage' "
+                    "(%s)" % (label, e)
+                )
+
+        if not ("from id" in spec or "sequence" in spec or "sequence file" in spec):
+            length = spec.get("length", self._defaultLength)
+            if length % 3 or length < 6:
+                raise ValueError(
+                    "Sequence specification %s is coding, but its length (%d) is "
+                    "not a multiple of three that is at least six." % (label, length)
+                )
+
+    def _checkRecombinants(self, label, spec):
+        """
+        Check the recombination keys of a specification.
+
+        @param label: A label to identify the specification in error
+            messages.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @raise ValueError: If the recombination keys are not sensible.
+        """
+        if not ("parents" in spec or "parent prefix" in spec):
+            for key in "breakpoints", "breakpoint rate":
+                if key in spec:
+                    raise ValueError(
+                        "Sequence specification %s gives %r but does not give "
+                        "'parents' or a 'parent prefix'." % (label, key)
+                    )
+            return
+
+        unexpected = set(spec) - self.LEGAL_RECOMBINANT_SPEC_KEYS
+        if unexpected:
+            raise ValueError(
+                "Sequence specification %s makes recombinants, so it cannot "
+                "give %s." % (label, ", ".join(map(repr, sorted(unexpected))))
+            )
+
+        if "parents" in spec:
+            if "parent prefix" in spec:
+                raise ValueError(
+                    "Sequence specification %s gives both 'parents' and a "
+                    "'parent prefix'." % label
+                )
+            parents = spec["parents"]
+            if (
+                not isinstance(parents, list)
+                or len(set(parents)) < 2
+                or not all(isinstance(id_, str) for id_ in parents)
+            ):
+                raise ValueError(
+                    "Sequence specification %s has 'parents' that are not a list "
+                    "of at least two different ids." % label
+                )
+
+        if "breakpoints" in spec:
+            if "breakpoint rate" in spec:
+                raise ValueError(
+                    "Sequence specification %s gives both 'breakpoints' and a "
+                    "'breakpoint rate'." % label
+                )
+            breakpoints = spec["breakpoints"]
+            if not isinstance(breakpoints, int) or breakpoints < 1:
+                raise ValueError(
+                    "Sequence specification %s has a 'breakpoints' value (%r) "
+                    "that is not a positive integer." % (label, breakpoints)
+                )
+        elif "breakpoint rate" in spec:
+            rate = spec["breakpoint rate"]
+            if not isinstance(rate, (int, float)) or not 0.0 < rate <= 1.0:
+                raise ValueError(
+                    "Sequence specification %s has a 'breakpoint rate' (%r) that "
+                    "is not greater than 0 and at most 1." % (label, rate)
+                )
+
+    def _checkVcf(self, label, spec):
+        """
+        Check that a specification whose reads are written in the VCF format
+        makes them as mutants (see C{Read.mutant}) of the whole of the
+        sequence given by its 'from id', so that nothing is written before a
+        read that cannot be written in that format is found.
+
+        @param label: A label to identify the specification in error
+            messages.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @raise ValueError: If the reads of C{spec} are written in the VCF
+            format but are not made as mutants.
+        """
+        if spec.get("skip") or spec.get("format", self._format).lower() != "vcf":
+            return
+
+        if not (
+            "from id" in spec
+            and (
+                "mutation rate" in spec
+                or "synonymous rate" in spec
+                or "non-synonymous rate" in spec
+            )
+        ) or any(
+            key in spec
+            for key in (
+                "start",
+                "length",
+                "sections",
+                "rc",
+                "reverse complement",
+                "translate",
+            )
+        ):
+            raise ValueError(
+                "Sequence specification %s is written in the VCF format, so it "
+                "must make mutants of the whole of another sequence (give a "
+                "'from id' and a mutation rate, and no 'start', 'length', "
+                "'sections', 'rc', or 'translate')." % label
+            )
+
+    def _checkKeys(self):
+        """
+        Check that all specification dicts (including the templates of repeat
+        specifications) only contain legal keys.
+
+        @raise ValueError: If an unknown key is found.
+        """
+        for specCount, spec in enumerate(self._sequenceSpecs, start=1):
+            self._checkSpecKeys(specCount, spec)
+
+    def _checkSpecKeys(self, label, spec):
+        """
+        Check that a specification dict only contains legal keys.
+
+        @param label: A label (e.g., the C{int} specification number) to
+            identify the specification in error messages.
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @raise ValueError: If an unknown key is found.
+        """
+        if "repeat" in spec:
+            legal = self.LEGAL_SPEC_REPEAT_KEYS
+        else:
+            legal = self.LEGAL_SPEC_KEYS
+
+        unexpected = set(spec) - legal
+        if unexpected:
+            raise ValueError(
+                "Sequence specification %s contains %sunknown key%s: %s."
+                % (
+                    label,
+                    "an " if len(unexpected) == 1 else "",
+                    "" if len(unexpected) == 1 else "s",
+                    ", ".join(sorted(unexpected)),
+                )
+            )
+
+        if "repeat" in spec:
+            for templateCount, template in enumerate(
+                spec.get("sequences", []), start=1
+            ):
+                self._checkSpecKeys(
+                    "%s (template %d)" % (label, templateCount), template
+                )
+            return
+
+        try:
+            sections = spec["sections"]
+        except KeyError:
+            pass
+        else:
+            for sectionCount, section in enumerate(sections, start=1):
+                unexpected = set(section) - self.LEGAL_SPEC_SECTION_KEYS
+                if unexpected:
+                    raise ValueError(
+                        "Section %d of sequence specification %s contains "
+                        "%sunknown key%s: %s."
+                        % (
+                            sectionCount,
+                            label,
+                            "an " if len(unexpected) == 1 else "",
+                            "" if len(unexpected) == 1 else "s",
+                            ", ".join(sorted(unexpected)),
+                        )
+                    )
+
+    def _specToDNARead(self, spec, previousRead=None):
+        """
+        Get a sequence from a specification.
+
+        @param spec: A C{dict} with keys/values specifying a sequence.
+        @param previousRead: If not C{None}, a C{Read} instance containing
+            the last read this method returned. This is only used when
+            'ratchet' is given for a specification, in which case we generate
+            a mutant based on the previous read.
+        @raise ValueError: If the section spec refers to a non-existent other
+            sequence, or to part of another sequence but the requested part
+            exceeds the bounds of the other sequence. Or if the C{spec} does
+            not have a 'length' key when no other sequence is being referred
+            to.
+        @return: A C{seqgen.read.Read} instance.
+        """
+        alphabet = self.NT
+        backend = self._backend
+        length = spec.get("length", self._defaultLength)
+        composition = self._composition(spec)
+        # A read that the new read is an (unchanged) copy of, if any. If the
+        # new read is mutated, it is made as a mutant of this read (see
+        # Read.mutant) instead of holding a full copy of its sequence.
+        parentRead = None
+
+        if spec.get("ratchet") and previousRead:
+            read = Read(None, previousRead.sequence)
+            alphabet = previousRead.alphabet
+            parentRead = previousRead
+
+        elif "from id" in spec:
+            fromId = spec["from id"]
+            try:
+                fromRead = self._sequences[fromId]
+            except KeyError:
+                raise ValueError(
+                    "Sequence section refers to the id '%s' of "
+                    "non-existent other sequence." % fromId
+                )
+            else:
+                # The start offset in the spec is 1-based. Convert to 0-based.
+                index = int(spec.get("start", 1)) - 1
+                # Use the given length (if any) else the length of the
+                # named read.
+                length = spec.get("length", len(fromRead))
+                sequence = backend.slice(fromRead.sequence, index, length)
+                alphabet = fromRead.alphabet
+
+                if len(sequence) != length:
+                    raise ValueError(
+                        "Sequence specification refers to sequence id '%s', "
+                        "starting at index %d with length %d, but sequence "
+                        "'%s' is not long enough to support that."
+                        % (fromId, index + 1, length, fromId)
+                    )
+
+                read = Read(None, sequence)
+                if length == len(fromRead):
+                    parentRead = fromRead
+
+        elif "sequence" in spec:
+            read = Read(None, spec["sequence"])
+
+        elif "sequence file" in spec:
+            id_, sequence = self._readSequenceFile(spec["sequence file"])
+            # If there is an id in the spec, we are supposed to replace the
+            # one that was in the file. Set the id to None and let our
+            # caller take care of putting the wanted id in.
+            read = Read(None if spec.get("id") else id_, sequence)
+
+        elif "markov model" in spec or "markov sequence file" in spec:
+            model = self._markovModel(spec)
+            alphabet = list(model.alphabet)
+            read = Read(None, model.sequence(self._random, length))
+
+        elif spec.get("coding"):
+            read = Read(None, self._codonModel(spec).orf(self._random, length))
+
+        elif "composition" in spec or "gc content" in spec:
+            letters, weights = composition
+            alphabet = list(letters)
+            table = self._compositionTable(composition)[0]
+            read = Read(
+                None,
+                "".join(map(letters.__getitem__, table.sample(self._random, length))),
+            )
+
+        elif spec.get("alphabet"):
+            alphabet = spec["alphabet"]
+            read = Read(None, backend.randomSequence(self._random, alphabet, length))
+
+        elif spec.get("random aa"):
+            alphabet = self.AA
+            read = Read(None, backend.randomSequence(self._random, alphabet, length))
+
+        else:
+            read = Read(None, backend.randomSequence(self._random, alphabet, length))
+
+        if "rc" in spec or "reverse complement" in spec:
+            read = Read(read.id, backend.reverseComplement(read.sequence))
+            parentRead = None
+
+        mutations = None
+        if self._stats:
+            start = perf_counter()
+        if "mutation rate" in spec:
+            mutations = self._mutations(
+                read.sequence, spec["mutation rate"], alphabet, composition
+            )
+        elif "synonymous rate" in spec or "non-synonymous rate" in spec:
+            mutations = self._codonModel(spec).mutations(
+                self._random,
+                read.sequence,
+                spec.get("synonymous rate", 0.0),
+                spec.get("non-synonymous rate", 0.0),
+            )
+
+        if mutations is not None:
+            if parentRead is None:
+                read.sequence = Read._applyChanges(read.sequence, *mutations)
+            else:
+                read = Read.mutant(parentRead, *mutations)
+            if self._stats:
+                self._stats.mutated(perf_counter() - start)
+            if self._summary:
+                self._summary.mutated(len(mutations[0]), len(read))
+
+        if spec.get("translate"):
+            read = Read(read.id, translate(read.sequence))
+            alphabet = self.AA
+
+        read.alphabet = alphabet
+
+        return read
+
+    def _readSequenceFile(self, filename):
+        """
+        Read the first sequence from a FASTA file, using a cache.
+
+        @param filename: The C{str} name of a FASTA file.
+        @raise ValueError: If the file cannot be read or is empty.
+        @return: A C{tuple} with the C{str} id and sequence of the first read
+            in the file.
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            # Let FastaReads (below) deal with the error.
+            key = None
+        else:
+            key = (stat.st_mtime_ns, stat.st_size)
+
+        try:
+            cachedKey, result = self._sequenceFileCache[filename]
+        except KeyError:
+            pass
+        else:
+            if key is not None and cachedKey == key:
+                return result
+
+        from dark.fasta import FastaReads
+
+        reads = iter(FastaReads(filename))
+        try:
+            read = next(reads)
+        except StopIteration:
+            raise ValueError("Sequence file '%s' is empty." % filename)
+        except FileNotFoundError:
+            raise ValueError("Sequence file '%s' could not be read." % filename)
+
+        result = read.id, read.sequence
+        if key is not None:
+            self._sequenceFileCache[filename] = key, result
+
+        return result
+
+    def _markovModel(self, spec):
+        """
+        Get the Markov model of a specification (or section), using a cache so
+        that a model is loaded (or trained) only once.
+
+        @param spec: A C{dict} with information about a sequence, with a
+            'markov model' or a 'markov sequence file' key.
+        @raise ValueError: If the file cannot be read or the model cannot be
+            made.
+        @return: A C{seqgen.markov.MarkovModel} instance.
+        """
+        if "markov model" in spec:
+            filename = spec["markov model"]
+            cacheKey = ("markov model", filename)
+        else:
+            filename = spec["markov sequence file"]
+            order = spec.get("markov order", MarkovModel.DEFAULT_ORDER)
+            if spec.get("random aa"):
+                alphabet = "".join(self.AA)
+            else:
+                alphabet = spec.get("alphabet") or "".join(self.NT)
+            cacheKey = ("markov sequence file", filename, order, alphabet)
+
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            raise ValueError("Markov model file '%s' could not be read." % filename)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        try:
+            cachedKey, model = self._sequenceFileCache[cacheKey]
+        except KeyError:
+            pass
+        else:
+            if cachedKey == key:
+                return model
+
+        if "markov model" in spec:
+            with open(filename) as fp:
+                try:
+                    model = MarkovModel.load(fp)
+                except JSONDecodeError:
+                    raise ValueError(
+                        "Markov model file '%s' is not valid JSON." % filename
+                    )
+        else:
+            from dark.fasta import FastaReads
+
+            model = MarkovModel.train(
+                (read.sequence for read in FastaReads(filename)), order, alphabet
+            )
+
+        self._sequenceFileCache[cacheKey] = key, model
+        return model
+
+    def _composition(self, spec):
+        """
+        Get the letter weights of a specification (or section).
+
+        @param spec: A C{dict} with information about a sequence.
+        @return: A 2-C{tuple} with a C{str} of letters and a C{tuple} of their
+            C{float} weights, or C{None} if C{spec} gives neither
+            'composition' nor 'gc content'.
+        """
+        if "gc content" in spec:
+            gc = spec["gc content"]
+            return "ACGT", ((1.0 - gc) / 2, gc / 2, gc / 2, (1.0 - gc) / 2)
+        try:
+            composition = spec["composition"]
+        except KeyError:
+            return None
+        letters = "".join(composition)
+        return letters, tuple(composition[letter] for letter in letters)
+
+    def _compositionTable(self, composition):
+        """
+        Get the alias tables for a composition, making them the first time
+        they are needed.
+
+        @param composition: A 2-C{tuple} of letters and weights, as returned
+            by C{_composition}.
+        @return: A 2-C{tuple} with a C{seqgen.alias.AliasTable} for choosing
+            a letter, and a C{dict} keyed by C{str} letter, whose values are
+            (C{str} letters, C{AliasTable}) C{tuple}s for choosing the
+            letter that a letter is changed to in a mutation.
+        """
+        try:
+            return self._compositionTables[composition]
+        except KeyError:
+            pass
+
+        letters, weights = composition
+        table = AliasTable(weights)
+        replacements = {}
+        for letter in letters:
+            others = [
+                (other, weight)
+                for other, weight in zip(letters, weights)
+                if other != letter
+            ]
+            if sum(weight for _, weight in others) > 0:
+                replacements[letter] = (
+                    "".join(other for other, _ in others),
+                    AliasTable(weight for _, weight in others),
+                )
+            else:
+                # There is nothing else the letter can change to.
+                replacements[letter] = letters, table
+
+        result = self._compositionTables[composition] = table, replacements
+        return result
+
+    def _parents(self, spec):
+        """
+        Get the parents of a specification of recombinants.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @raise ValueError: If a parent does not exist or the parents have
+            different lengths.
+        @return: A C{list} of (C{str} id, C{str} key) C{tuple}s, with the id
+            of each parent (without its description) and the id its read is
+            kept under (see C{_keep}). Only the ids are returned, so that a
+            large panel of parents (e.g., in a store) is not held in memory.
+            The reads are looked up when they are needed.
+        """
+        sequences = self._sequences
+        if "parents" in spec:
+            keys = []
+            for id_ in spec["parents"]:
+                if id_ not in sequences:
+                    raise ValueError(
+                        "Sequence specification refers to the id '%s' of "
+                        "non-existent other sequence." % id_
+                    )
+                keys.append(id_)
+        else:
+            # The reads made from the prefix, in the order of their numbers.
+            # A recombinant is held under two ids (see _newReadsForSpec), so
+            # the numbers are used to keep just one copy.
+            prefix = spec["parent prefix"]
+            numbered = {}
+            for id_ in sequences:
+                if id_.startswith(prefix):
+                    number = id_[len(prefix) :].split(" ", 1)[0]
+                    if number.isdigit():
+                        numbered[int(number)] = id_
+            keys = [numbered[number] for number in sorted(numbered)]
+
+        parents = []
+        lengths = set()
+        for key in keys:
+            read = sequences[key]
+            parents.append((read.id.split(" ", 1)[0], key))
+            lengths.add(len(read))
+        if len(lengths) != 1:
+            raise ValueError("Sequence specification has parents of different lengths.")
+        return parents
+
+    def _recombinant(self, parents, length, breakpoints, choices):
+        """
+        Make a recombinant, from its breakpoints and the parent that gives
+        the bases between each pair of breakpoints (drawn, for a batch of
+        recombinants at once, by the C{recombinants} method of the backend).
+
+        @param parents: A C{list} of parents, as returned by C{_parents}.
+        @param length: The C{int} length of the parents.
+        @param breakpoints: A C{list} of the C{int} (0-based) starts of all
+            but the first part, in increasing order.
+        @param choices: A C{list} of the C{int} index (in C{parents}) of the
+            parent of each part.
+        @return: A 2-C{tuple} with a C{Read} and a C{str} giving the parent id
+            and (1-based, inclusive) sites of each part, e.g.,
+            'segments=a:1-120,b:121-300'.
+        """
+        sequences = self._sequences
+        starts = [0] + breakpoints
+        ends = breakpoints + [length]
+        backend = self._backend
+        read = Read(
+            None,
+            backend.concatenate(
+                backend.slice(
+                    sequences[parents[choice][1]].sequence, start, end - start
+                )
+                for choice, start, end in zip(choices, starts, ends)
+            ),
+        )
+        read.alphabet = sequences[parents[choices[0]][1]].alphabet
+        return read, self._segments(parents, length, breakpoints, choices)
+
+    @staticmethod
+    def _segments(parents, length, breakpoints, choices):
+        """
+        Describe the parts of a recombinant.
+
+        @param parents: A C{list} of parents, as returned by C{_parents}.
+        @param length: The C{int} length of the recombinant.
+        @param breakpoints: A C{list} of the C{int} (0-based) starts of all
+            but the first part, in increasing order.
+        @param choices: A C{list} of the C{int} index (in C{parents}) of the
+            parent of each part.
+        @return: A C{str} giving the parent id and (1-based, inclusive) sites
+            of each part, e.g., 'segments=a:1-120,b:121-300'.
+        """
+        starts = [0] + breakpoints
+        ends = breakpoints + [length]
+        return "segments=" + ",".join(
+            "%s:%d-%d" % (parents[choice][0], start + 1, end)
+            for choice, start, end in zip(choices, starts, ends)
+        )
+
+    def _codonModel(self, spec):
+        """
+        Get the codon model of a specification (or section), making it the
+        first time its codon usage is needed.
+
+        @param spec: A C{dict} with information about a sequence.
+        @return: A C{seqgen.codons.CodonModel} instance.
+        """
+        usage = spec.get("codon usage")
+        key = None if usage is None else tuple(sorted(usage.items()))
+        try:
+            return self._codonModels[key]
+        except KeyError:
+            model = self._codonModels[key] = CodonModel(usage)
+            return model
+
+    def _mutations(self, sequence, rate, alphabet, composition=None):
+        """
+        Choose mutations for a sequence at a certain rate.
+
+        @param sequence: A C{str} nucleotide or amino acid sequence.
+        @param rate: A C{float} mutation rate.
+        @param alphabet: A C{list} of alphabet letters.
+        @param composition: The letter weights to choose new letters with, as
+            returned by C{_composition}, or C{None} to choose them uniformly
+            from C{alphabet}.
+        @return: A 2-C{tuple} with a C{list} of the C{int} (0-based) sites
+            to change, in increasing order, and a C{str} of their new bases.
+        """
+        if composition is None:
+            return self._backend.mutations(self._random, sequence, rate, alphabet)
+
+        rand = self._random.random
+        table, replacements = self._compositionTable(composition)
+        default = composition[0], table
+        positions = self._backend.sites(self._random, len(sequence), rate)
+        bases = []
+        for position in positions:
+            letters, replacement = replacements.get(sequence[position], default)
+            bases.append(letters[replacement.draw(rand())])
+
+        return positions, "".join(bases)
+
+    def _readsForSpec(self, spec, first=0, previousRead=None, key=None):
+        """
+        Yield reads for a given specification, from the cache if possible.
+
+        @param sequenceSpec: A C{dict} with information about the sequences
+            to be produced.
+        @param first: The C{int} index of the first read to produce (when
+            resuming from a checkpoint).
+        @param previousRead: The C{Read} before the first to produce (when
+            resuming from a checkpoint), or C{None}.
+        @param key: The C{str} key of the specification (see C{_specKeys}),
+            or C{None} if no seed was given.
+        @return: A generator of (C{Read}, C{str} filename) C{tuple}s.
+        """
+        cacheWriter = None
+        if key is not None and first == 0:
+            if self._cache:
+                cacheKey = self._cacheKey(spec, key)
+                reads = self._cache.load(cacheKey, self._sequences)
+                if reads is None:
+                    cacheWriter = self._cache.writer(cacheKey)
+                else:
+                    yield from self._cachedReadsForSpec(spec, reads)
+                    return
+
+        if cacheWriter is None:
+            yield from self._newReadsForSpec(spec, first, previousRead, key=key)
+        else:
+            try:
+                yield from self._newReadsForSpec(
+                    spec, first, previousRead, cacheWriter, key
+                )
+            except BaseException:
+                cacheWriter.abort()
+                raise
+            cacheWriter.commit()
+
+    def _cacheKey(self, spec, key):
+        """
+        Get the key of the cache entry for the reads of a specification.
+
+        Reads written as FASTQ are given quality strings, which are cached
+        with them, so their key (see C{_specKeys}) is combined with the
+        quality.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param key: The C{str} key of the specification.
+        @return: The C{str} cache key.
+        """
+        if spec.get("format", self._format).lower() == "fastq":
+            return sha256(
+                ("%s:%s" % (key, self._defaultQuality)).encode("utf-8")
+            ).hexdigest()
+        else:
+            return key
+
+    def _idPrefix(self, spec):
+        """
+        Get the prefix of the ids of the reads of a specification.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @return: The C{str} id prefix, or C{None} if the ids of the reads are
+            not made from a prefix (because an id is given or taken from a
+            sequence file).
+        """
+        if "id" in spec or ("sequence file" in spec and "sections" not in spec):
+            return None
+        else:
+            return spec.get("id prefix", self._defaultIdPrefix)
+
+    def _specName(self, spec):
+        """
+        Describe a specification by its id or id prefix, for error messages
+        made while generating reads (when its number is not known).
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @return: A C{str} description.
+        """
+        if "id" in spec:
+            return "id %r" % spec["id"]
+        else:
+            return "id prefix %r" % spec.get("id prefix", self._defaultIdPrefix)
+
+    def _uniqueSet(self, spec, first=0):
+        """
+        Get the set of sequences that the reads of a specification must not
+        duplicate.
+
+        A specification with 'unique' true has its own set, made when its
+        first read is generated. One with a 'unique' group name shares the
+        set of the group with the other specifications in the group.
+
+        @param spec: A C{dict} with information about the sequences
+            to be produced.
+        @param first: The C{int} index of the first read to produce (when
+            resuming from a checkpoint, the set is the one that was saved).
+        @return: A L{seqgen.unique.UniqueSet} instance, or C{None} if the
+            reads of the specification need not be unique.
+        """
+        unique = spec.get("unique")
+        if not unique:
+            return None
+        name = None if unique is True else unique
+        if (name is None and first == 0) or name not in self._uniqueSets:
+            if name in self._uniqueSets:
+                # The set of the previous specification with 'unique' true.
+                self._uniqueSets[name].close()
+            self._uniqueSets[name] = UniqueSet(spec.get("count", 1), self._store)
+        return self._uniqueSets[name]
+
+    def _cachedReadsForSpec(self, spec, reads):
+        """
+        Yield cached reads for a given specification.
+
+        @param sequenceSpec: A C{dict} with information about the sequences
+            to be produced.
+        @param reads: An iterable of C{Read} instances.
+        @return: A generator of (C{Read}, C{str} filename) C{tuple}s.
+        """
+        stats, summary = self._stats, self._summary
+        filenames = chain.from_iterable(
+            repeat(filename, count) for filename, count in self._specFiles(spec)
+        )
+        prefix = self._idPrefix(spec)
+        skip = spec.get("skip")
+        recombinant = "parents" in spec or "parent prefix" in spec
+        uniqueSet = self._uniqueSet(spec)
+
+        for read, filename in zip(reads, filenames):
+            self._keep(read.id, read)
+            if uniqueSet is not None:
+                # Later specifications in the same group must not repeat
+                # the cached reads.
+                uniqueSet.add(read.sequence)
+                if summary:
+                    summary.rejected(0)
+            if recombinant:
+                self._keep(read.id.rsplit(" ", 1)[0], read)
+            if prefix is not None:
+                self._idPrefixCount[prefix] = self._idPrefixCount.get(prefix, 0) + 1
+            if not skip:
+                if stats:
+                    stats.produced(read)
+                if summary:
+                    summary.produced(read)
+                yield (read, filename)
+
+    def _newReadsForSpec(
+        self, spec, first=0, previousRead=None, cacheWriter=None, key=None
+    ):
+        """
+        Generate and yield reads for a given specification.
+
+        If a key is given, random number generation is seeded from it (and
+        the block number) at the start of each block of C{SEED_BLOCK_SIZE}
+        reads, so the reads of a block do not depend on those of earlier
+        blocks (except in a ratchet).
+
+        The breakpoints and parents of recombinants are drawn for the rest
+        of the block at once, and kept in C{self._recombinantDraws} until
+        they are used (so they are saved in checkpoints).
 
         @param sequenceSpec: A C{dict} with information about the sequences
             to be produced.
+        @param first: The C{int} index of the first read to produce (when
+            resuming from a checkpoint).
+        @param previousRead: The C{Read} before the first to produce (when
+            resuming from a checkpoint), or C{None}.
+        @param cacheWriter: A C{seqgen.cache.CacheEntryWriter} to add each
+            read to, or C{None}.
+        @param key: The C{str} key of the specification (see C{_specKeys}),
+            or C{None} if no seed was given.
+        @return: A generator of (C{Read}, C{str} filename) C{tuple}s.
         """
         alphabet = None
-        previousRead = None
+        blockSize = self.SEED_BLOCK_SIZE
         nSequences = spec.get("count", 1)
+        stats, summary = self._stats, self._summary
+        filenames = chain.from_iterable(
+            repeat(filename, count) for filename, count in self._specFiles(spec)
+        )
+        if "parents" in spec or "parent prefix" in spec:
+            parents = self._parents(spec)
+            length = len(self._sequences[parents[0][1]])
+            draws = self._recombinantDraws
+            if first == 0:
+                draws.clear()
+        else:
+            parents = None
+        segments = None
+        uniqueSet = self._uniqueSet(spec, first)
+        if "min distance" in spec:
+            if first == 0:
+                self._distanceIndex = DistanceIndex(spec["min distance"])
+            distanceIndex = self._distanceIndex
+        else:
+            distanceIndex = None
 
-        for count in range(nSequences):
-            id_ = None
-            if "sections" in spec:
-                sequence = ""
-                for section in spec["sections"]:
-                    read = self._specToDNARead(section, previousRead)
-                    sequence += read.sequence
-                    if alphabet is None:
-                        alphabet = read.alphabet
-            else:
-                read = self._specToDNARead(spec, previousRead)
+        for count, filename in zip(
+            range(first, nSequences), islice(filenames, first, None)
+        ):
+            if key is not None and count % blockSize == 0:
+                self._random.seed("%s:%d" % (key, count // blockSize))
+                if parents is not None:
+                    draws.clear()
+            if stats:
+                start = perf_counter()
+            for attempt in range(self.MAX_UNIQUE_ATTEMPTS):
+                id_ = None
+                if parents is not None:
+                    if not draws:
+                        draws.extend(
+                            self._backend.recombinants(
+                                self._random,
+                                min(blockSize - count % blockSize, nSequences - count),
+                                length,
+                                len(parents),
+                                spec.get("breakpoints", 1),
+                                spec.get("breakpoint rate"),
+                            )
+                        )
+                    read, segments = self._recombinant(
+                        parents, length, *draws.popleft()
+                    )
+                    alphabet = read.alphabet
+                elif "sections" in spec:
+                    sequences = []
+                    for section in spec["sections"]:
+                        read = self._specToDNARead(section, previousRead)
+                        sequences.append(read.sequence)
+                        if alphabet is None:
+                            alphabet = read.alphabet
+                    read = Read(None, self._backend.concatenate(sequences))
+                else:
+                    # Note that the read may be a mutant (see Read.mutant),
+                    # so its sequence is not accessed here (unless it must
+                    # be unique).
+                    read = self._specToDNARead(spec, previousRead)
+                    id_ = read.id
+                    alphabet = read.alphabet
+
+                if uniqueSet is None and distanceIndex is None:
+                    break
                 sequence = read.sequence
-                id_ = read.id
-                alphabet = read.alphabet
+                if (distanceIndex is None or distanceIndex.far(sequence)) and (
+                    uniqueSet is None or uniqueSet.add(sequence)
+                ):
+                    if distanceIndex is not None:
+                        distanceIndex.add(sequence)
+                    break
+            else:
+                raise ValueError(
+                    "Could not make a read that is different enough from the "
+                    "earlier reads (for %s) in %d attempts. The specification "
+                    "may not allow enough different sequences."
+                    % (self._specName(spec), self.MAX_UNIQUE_ATTEMPTS)
+                )
+
+            if summary and (uniqueSet is not None or distanceIndex is not None):
+                summary.rejected(attempt)
 
             if id_ is None:
                 try:
@@ -436,63 +3007,481 @@ class Sequences:
                 pass
 
             if spec.get("format", self._format).lower() == "fastq":
-                quality = self._defaultQuality * len(sequence)
-            else:
-                quality = None
+                read.quality = self._defaultQuality * len(read)
 
-            read = DNARead(id_, sequence, quality)
+            read.id = id_
             read.alphabet = alphabet
 
             if id_ in self._sequenceSpecs:
                 raise ValueError("Sequence id '%s' has already been used." % id_)
-            else:
-                self._sequences[id_] = read
+
+            if segments is not None:
+                # The parts of a recombinant are given after its id (and
+                # description), but it can still be referred to without them.
+                read.id = id_ + " " + segments
+                self._keep(read.id, read)
+            self._keep(id_, read)
+
+            if cacheWriter:
+                cacheWriter.add(read)
+
+            if stats:
+                stats.built(perf_counter() - start)
 
             if not spec.get("skip"):
-                yield (read, spec.get("filename"))
+                if stats:
+                    stats.produced(read)
+                if summary:
+                    summary.produced(read)
+                yield (read, filename)
                 previousRead = read
 
+    def _unitReads(self, ranges):
+        """
+        Yield some ranges of the reads of a run, generating only the reads in
+        the ranges and those of the specifications they depend on.
+
+        Each block of C{SEED_BLOCK_SIZE} reads of a specification is seeded
+        separately (see C{_newReadsForSpec}), so a range that starts at a
+        multiple of C{SEED_BLOCK_SIZE} has the same reads as in a full run.
+        Ratchet specifications must not be split, because each of their reads
+        is made from the one before.
+
+        @param ranges: A C{list} of (specification index, first read index,
+            end read index) C{tuple}s of C{int}s, in order. Specification
+            indices are in the order given by C{_iterSpecs}, and the end read
+            index is one more than the index of the last read in the range.
+        @raise ValueError: If no seed was given.
+        @return: A generator of (C{Read}, C{str} filename) C{tuple}s.
+        """
+        if self._seed is None:
+            raise ValueError("A seed must be given to generate part of a run.")
+
+        dependencies = self._specDependencies()
+        wanted = {}
+        for index, first, end in ranges:
+            wanted.setdefault(index, []).append((first, end))
+
+        # Find the specifications whose reads are needed to make the reads in
+        # the ranges.
+        needed = set()
+        unchecked = list(wanted)
+        while unchecked:
+            for index in dependencies[unchecked.pop()][0]:
+                if index not in needed:
+                    needed.add(index)
+                    unchecked.append(index)
+
+        lastIndex = max(chain(wanted, needed))
+        for index, (spec, key) in enumerate(zip(self._iterSpecs(), self._specKeys())):
+            if index > lastIndex:
+                break
+            prefix = self._idPrefix(spec)
+            prefixCount = dependencies[index][1]
+            if index in needed:
+                if prefix is not None:
+                    self._idPrefixCount[prefix] = prefixCount
+                for _ in self._readsForSpec(spec, key=key):
+                    pass
+            for first, end in wanted.get(index, ()):
+                if prefix is not None:
+                    self._idPrefixCount[prefix] = prefixCount + first
+                reads = self._readsForSpec(spec, first, key=key)
+                yield from islice(reads, end - first)
+                reads.close()
+
     def __iter__(self):
         """
         Yield the reads, ignoring output files.
+
+        @return: A generator of C{dark.reads.DNARead} instances, each with an
+            C{alphabet} attribute.
+        """
+        stats, summary = self._stats, self._summary
+        for sequenceSpec, key in zip(self._iterSpecs(), self._specKeys()):
+            if stats:
+                stats.startSpec(sequenceSpec)
+            if summary:
+                summary.startSpec(sequenceSpec)
+            for read, filename in self._readsForSpec(sequenceSpec, key=key):
+                yield read.toDNARead()
+
+        if stats:
+            stats.endSpec()
+        if summary:
+            summary.endSpec()
+
+    def batches(self, size=None):
+        """
+        Yield the reads in batches of (ASCII) character codes, ignoring output
+        files.
+
+        The reads are still made one at a time (as L{seqgen.read.Read}
+        instances), as when iterating, but no C{dark} reads are made from
+        them, and the characters of the reads in a batch are encoded
+        together. Reads from different specifications are never put in the
+        same batch, so all reads in a batch have the same alphabet.
+
+        @param size: The C{int} maximum number of reads in a batch, or
+            C{None} to use C{DEFAULT_BATCH_SIZE}.
+        @raise ValueError: If C{size} is not positive.
+        @return: A generator of L{Batch} instances. If all the reads in a
+            batch have the same length, its C{codes} are a 2-D C{uint8}
+            C{numpy} array (with one row per read) and its C{offsets} are
+            C{None}. Otherwise C{codes} is a 1-D (ragged) C{uint8} array and
+            C{offsets} is an C{int64} array of read start offsets (with a
+            final element giving the length of C{codes}).
+        """
+        import numpy as np
+
+        size = self.DEFAULT_BATCH_SIZE if size is None else size
+        if size < 1:
+            raise ValueError("The batch size must be positive (got %d)." % size)
+
+        def makeBatch(ids, sequences, alphabet):
+            codes = np.frombuffer("".join(sequences).encode("ascii"), dtype=np.uint8)
+            lengths = set(map(len, sequences))
+            if len(lengths) == 1:
+                codes = codes.reshape(len(sequences), lengths.pop())
+                return Batch(ids, codes, None, alphabet)
+            else:
+                offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+                np.cumsum([len(sequence) for sequence in sequences], out=offsets[1:])
+                return Batch(ids, codes, offsets, alphabet)
+
+        stats, summary = self._stats, self._summary
+        for sequenceSpec, key in zip(self._iterSpecs(), self._specKeys()):
+            if stats:
+                stats.startSpec(sequenceSpec)
+            if summary:
+                summary.startSpec(sequenceSpec)
+            ids, sequences, alphabet = [], [], None
+            for read, _ in self._readsForSpec(sequenceSpec, key=key):
+                ids.append(read.id)
+                sequences.append(read.sequence)
+                alphabet = read.alphabet
+                if len(ids) == size:
+                    yield makeBatch(ids, sequences, "".join(alphabet))
+                    ids, sequences = [], []
+            if ids:
+                yield makeBatch(ids, sequences, "".join(alphabet))
+
+        if stats:
+            stats.endSpec()
+        if summary:
+            summary.endSpec()
+
+    def write(
+        self,
+        fp=None,
+        manifest=None,
+        checkpoint=None,
+        checkpointInterval=None,
+        resume=False,
+    ):
+        """
+        Write out all reads, respecting filenames given in the specification.
+
+        @param fp: An open file pointer to write reads that have no filename
+            in the specification to. If C{None}, standard output is used.
+        @param manifest: A C{str} filename to write a JSON manifest of shard
+            files to (giving the filename, number of reads, and first and last
+            read ids of each shard), or C{None}.
+        @param checkpoint: A C{str} filename to periodically save the
+            progress of the run to (see L{seqgen.checkpoint.Checkpointer}), or
+            C{None}. The file is removed when the run completes. All reads
+            must be written to files given in the specification, in formats
+            that can be resumed.
+        @param checkpointInterval: The C{float} minimum number of seconds
+            between checkpoints, or C{None} for the default.
+        @param resume: If C{True}, resume an interrupted run from the
+            C{checkpoint} file. Output files are truncated to their sizes at
+            the checkpoint and the run continues from there, so the final
+            output is identical to that of an uninterrupted run.
+        @raise ValueError: If C{resume} is given without C{checkpoint}, or a
+            run cannot be checkpointed or resumed.
+        """
+        fp = sys.stdout if fp is None else fp
+        if resume and checkpoint is None:
+            raise ValueError("A checkpoint file must be given to resume a run.")
+        checkpointer = (
+            None if checkpoint is None else Checkpointer(checkpoint, checkpointInterval)
+        )
+        if self._stats:
+            with self._stats.profiling():
+                self._write(fp, manifest, checkpointer, resume)
+        else:
+            self._write(fp, manifest, checkpointer, resume)
+        if checkpointer:
+            checkpointer.remove()
+
+    def _fingerprint(self):
+        """
+        Make a fingerprint of the specification and the options that affect
+        output, to check that a run is resumed with the same specification.
+
+        @return: A C{str} hex digest.
+        """
+        return sha256(
+            dumps(
+                [
+                    self._vars,
+                    self._sequenceSpecs,
+                    self._format,
+                    self._defaultLength,
+                    self._defaultIdPrefix,
+                    self._defaultQuality,
+                    self._defaultShards,
+                    self._defaultMaxReadsPerFile,
+                    self._seed,
+                ],
+                sort_keys=True,
+                default=repr,
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def _checkCheckpointable(self, destinations):
+        """
+        Check that a run can be checkpointed.
+
+        @param destinations: A C{dict} of destinations, as returned by
+            C{_destinations}.
+        @raise ValueError: If any reads are not written to a file, or are
+            written in a format that cannot be resumed.
+        """
+        if None in destinations:
+            raise ValueError(
+                "To checkpoint a run, all sequences must be written to files "
+                "given (via 'filename') in the specification."
+            )
+        for filename, (writerClass, _, format_, _) in destinations.items():
+            if not writerClass.resumable:
+                raise ValueError(
+                    "Output file %r has format %s, which cannot be used when "
+                    "checkpointing a run." % (filename, format_)
+                )
+
+    def _destinations(self):
+        """
+        Find the writer class and number of reads for each output destination.
+
+        @raise ValueError: If a destination is given formats that cannot be
+            mixed.
+        @return: A C{dict} keyed by C{str} filename (or C{None} for the default
+            destination), with values that are [writer class, C{int} count,
+            C{str} name of the first format given, C{bool} sharded] lists.
         """
-        for sequenceSpec in self._sequenceSpecs:
-            for read, filename in self._readsForSpec(sequenceSpec):
-                yield read
+        destinations = {}
+        for spec in self._iterSpecs():
+            if spec.get("skip"):
+                continue
+            format_ = spec.get("format", self._format).lower()
+            writerClass = WRITERS[format_]
+            sharded = self._shardSizes(spec) is not None
+            for filename, count in self._specFiles(spec):
+                try:
+                    destination = destinations[filename]
+                except KeyError:
+                    destinations[filename] = [writerClass, count, format_, sharded]
+                else:
+                    if destination[0] is not writerClass:
+                        raise ValueError(
+                            "%s is given incompatible formats (%s and %s)."
+                            % (
+                                (
+                                    "Standard output"
+                                    if filename is None
+                                    else "Output file %r" % filename
+                                ),
+                                destination[2],
+                                format_,
+                            )
+                        )
+                    destination[1] += count
+                    destination[3] = destination[3] or sharded
 
-    def write(self):
+        return destinations
+
+    def _write(self, fp, manifest, checkpointer=None, resume=False):
         """
         Write out all reads, respecting filenames given in the specification.
+
+        @param fp: An open file pointer to write reads that have no filename
+            in the specification to.
+        @param manifest: A C{str} filename to write a JSON manifest of shard
+            files to, or C{None}.
+        @param checkpointer: A C{seqgen.checkpoint.Checkpointer} instance, or
+            C{None}.
+        @param resume: If C{True}, resume from the last checkpoint.
         """
-        filesSeen = set()
+        stats, summary = self._stats, self._summary
+        destinations = self._destinations()
+        writers = {}
+        # Shard files are each written by their own thread, in parallel with
+        # generation (and with one another), unless checkpointing.
+        threadedWriters = {}
+        shards = {}
+        startSpec = startRead = 0
+        previousRead = None
+
+        if checkpointer:
+            self._checkCheckpointable(destinations)
+            if resume:
+                state = checkpointer.load()
+                if state["fingerprint"] != self._fingerprint():
+                    raise ValueError(
+                        "The checkpoint in %r was made for a different "
+                        "specification (or different options), so the run "
+                        "cannot be resumed." % checkpointer.filename
+                    )
+                Checkpointer.truncate(state["offsets"])
+                self._random.setstate(state["random"])
+                self._idPrefixCount = state["idPrefixCount"]
+                self._sequences = self._newSequences()
+                for id_, read in state["sequences"].items():
+                    self._sequences[id_] = read
+                self._uniqueSets = state["unique"]
+                self._distanceIndex = state["distance"]
+                self._recombinantDraws = state["recombinants"]
+                writers = state["writers"]
+                for writer in writers.values():
+                    writer.resume()
+                shards = state["shards"]
+                startSpec, startRead = state["spec"], state["read"]
+                previousRead = state["previousRead"]
+
         currentFile = currentFp = None
-        for sequenceSpec in self._sequenceSpecs:
-            for read, thisFile in self._readsForSpec(sequenceSpec):
-                if thisFile is None:
-                    # Write to standard output.
-                    if currentFile:
-                        # We already had an open non-stdout file.
-                        assert currentFp
-                        currentFp.close()
-                        currentFp = None
-                    currentFile = None
-                    currentFp = sys.stdout
+        try:
+            for specIndex, (sequenceSpec, key) in enumerate(
+                zip(self._iterSpecs(), self._specKeys())
+            ):
+                if specIndex < startSpec:
+                    continue
+                if stats:
+                    stats.startSpec(sequenceSpec)
+                if summary:
+                    summary.startSpec(sequenceSpec)
+                if specIndex == startSpec:
+                    reads = self._readsForSpec(
+                        sequenceSpec, startRead, previousRead, key
+                    )
                 else:
-                    # Write to a file.
-                    if thisFile == currentFile:
-                        assert currentFp
+                    startRead = 0
+                    reads = self._readsForSpec(sequenceSpec, key=key)
+                for readIndex, (read, thisFile) in enumerate(reads, start=startRead):
+                    try:
+                        writer = writers[thisFile]
+                    except KeyError:
+                        writerClass, count, _, sharded = destinations[thisFile]
+                        writer = writers[thisFile] = writerClass(count, thisFile)
+                        if sharded:
+                            shards[thisFile] = {
+                                "filename": thisFile,
+                                "reads": 0,
+                                "first id": read.id,
+                            }
+                            if checkpointer is None:
+                                threadedWriters[thisFile] = ThreadedWriter(
+                                    thisFile, writer
+                                )
+                                threadedWriters[thisFile].start()
+                        new = True
                     else:
+                        new = False
+
+                    if thisFile in shards:
+                        shard = shards[thisFile]
+                        shard["reads"] += 1
+                        shard["last id"] = read.id
+
+                    if thisFile in threadedWriters:
+                        outFp = threadedWriters[thisFile]
+                    elif thisFile is None:
+                        # Write to fp (standard output by default).
                         if currentFile:
+                            # We already had an open non-stdout file.
                             assert currentFp
                             currentFp.close()
-                        currentFp = open(
-                            thisFile, "a" if thisFile in filesSeen else "w"
+                            currentFp = None
+                        currentFile = None
+                        if writer.binary and hasattr(fp, "buffer"):
+                            # Write binary formats to the underlying buffer of
+                            # a text file pointer (such as sys.stdout).
+                            fp.flush()
+                            currentFp = outFp = fp.buffer
+                        else:
+                            currentFp = outFp = fp
+                    else:
+                        # Write to a file.
+                        if thisFile == currentFile:
+                            assert currentFp
+                        else:
+                            if currentFile:
+                                assert currentFp
+                                currentFp.close()
+                            currentFp = open(
+                                thisFile,
+                                ("w" if new else "a") + ("b" if writer.binary else ""),
+                            )
+                            currentFile = thisFile
+                        outFp = currentFp
+
+                    if stats:
+                        start = perf_counter()
+                        data = writer.format(read)
+                        formatted = perf_counter()
+                        outFp.write(data)
+                        if writer.written == writer.count:
+                            if thisFile in threadedWriters:
+                                outFp.close()
+                            else:
+                                writer.finish(outFp)
+                        stats.written(formatted - start, perf_counter() - formatted)
+                    else:
+                        outFp.write(writer.format(read))
+                        if writer.written == writer.count:
+                            if thisFile in threadedWriters:
+                                outFp.close()
+                            else:
+                                writer.finish(outFp)
+
+                    if checkpointer and checkpointer.due():
+                        currentFp.flush()
+                        checkpointer.save(
+                            {
+                                "fingerprint": self._fingerprint(),
+                                "spec": specIndex,
+                                "read": readIndex + 1,
+                                "previousRead": read,
+                                "random": self._random.getstate(),
+                                "idPrefixCount": self._idPrefixCount,
+                                "sequences": self._referencedSequences(),
+                                "unique": self._uniqueSets,
+                                "distance": self._distanceIndex,
+                                "recombinants": self._recombinantDraws,
+                                "writers": writers,
+                                "shards": shards,
+                                "offsets": {
+                                    filename: os.path.getsize(filename)
+                                    for filename in writers
+                                },
+                            }
                         )
-                        currentFile = thisFile
-                        filesSeen.add(thisFile)
+        finally:
+            if currentFile:
+                currentFp.close()
+            for threadedWriter in threadedWriters.values():
+                threadedWriter.close()
+                threadedWriter.join()
 
-                print(
-                    read.toString(format_="fasta" if read.quality is None else "fastq"),
-                    end="",
-                    file=currentFp,
-                )
+        for threadedWriter in threadedWriters.values():
+            if threadedWriter.error:
+                raise threadedWriter.error
+
+        if summary:
+            summary.endSpec()
+
+        if manifest:
+            with open(manifest, "w") as manifestFp:
+                dump({"shards": list(shards.values())}, manifestFp, indent=2)
+                print(file=manifestFp)
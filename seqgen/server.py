@@ -0,0 +1,137 @@
+import os
+import socket
+import socketserver
+from collections import OrderedDict
+from io import TextIOWrapper
+from json import JSONDecodeError, loads
+
+from seqgen.sequences import Sequences
+
+# Errors are sent to the client on a line that starts with a NUL byte,
+# which cannot occur in FASTA or FASTQ output.
+ERROR_PREFIX = "\0"
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle one client connection.
+
+    The client sends either a single JSON specification or a number of
+    specifications in JSON Lines format (one per line) and then shuts down
+    its side of the connection. The reads for each specification are sent
+    back in turn. If a specification cannot be processed, a line starting
+    with L{ERROR_PREFIX} and giving the error is sent and the connection is
+    closed.
+    """
+
+    def handle(self):
+        data = self.rfile.read().decode("utf-8")
+        try:
+            specs = [data.strip()]
+            loads(specs[0])
+        except JSONDecodeError:
+            specs = [line for line in map(str.strip, data.splitlines()) if line]
+
+        out = TextIOWrapper(self.wfile, encoding="utf-8")
+        try:
+            for spec in specs:
+                try:
+                    sequences = self.server.sequences(spec)
+                    sequences.write(out)
+                except Exception as e:
+                    print(
+                        "%s%s: %s" % (ERROR_PREFIX, e.__class__.__name__, e),
+                        file=out,
+                    )
+                    break
+            out.flush()
+        finally:
+            out.detach()
+
+
+class SequencesServer(socketserver.UnixStreamServer):
+    """
+    Generate sequences for clients connecting on a Unix socket.
+
+    Parsed specifications (and the contents of any sequence files they
+    use) are cached between requests, so a client sending the same
+    specification many times only pays for generating the sequences.
+    Requests are handled one at a time.
+
+    @param path: The C{str} path of the Unix socket to listen on.
+    @param maxPlans: The C{int} maximum number of parsed specifications to
+        keep in the cache.
+    @param kwargs: Keyword arguments to pass to C{Sequences} (e.g.,
+        C{defaultLength}).
+    """
+
+    DEFAULT_MAX_PLANS = 1000
+
+    def __init__(self, path, maxPlans=None, **kwargs):
+        self.path = path
+        self.maxPlans = self.DEFAULT_MAX_PLANS if maxPlans is None else maxPlans
+        self.plans = OrderedDict()
+        self.sequenceFileCache = {}
+        self._kwargs = kwargs
+        super().__init__(path, _RequestHandler)
+
+    def sequences(self, spec):
+        """
+        Get a C{Sequences} instance for a specification.
+
+        @param spec: A C{str} JSON specification.
+        @return: A C{Sequences} instance, ready to generate sequences.
+        """
+        try:
+            sequences = self.plans[spec]
+        except KeyError:
+            sequences = Sequences(
+                loads(spec), sequenceFileCache=self.sequenceFileCache, **self._kwargs
+            )
+            self.plans[spec] = sequences
+            if len(self.plans) > self.maxPlans:
+                self.plans.popitem(last=False)
+        else:
+            self.plans.move_to_end(spec)
+            sequences.reset()
+
+        return sequences
+
+    def server_close(self):
+        """
+        Close the server and remove its socket.
+        """
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def request(path, spec):
+    """
+    Send a specification to a server and get the resulting sequences.
+
+    @param path: The C{str} path of the server's Unix socket.
+    @param spec: A C{str} JSON specification, or several specifications in
+        JSON Lines format.
+    @raise ValueError: If the server reports an error.
+    @return: A C{str} with the FASTA or FASTQ for the specification(s).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(spec.encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    result = b"".join(chunks).decode("utf-8")
+    index = result.find(ERROR_PREFIX)
+    if index != -1:
+        raise ValueError(result[index + len(ERROR_PREFIX) :].rstrip("\n"))
+
+    return result
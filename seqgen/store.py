@@ -0,0 +1,167 @@
+import mmap
+import pickle
+from collections import OrderedDict
+from struct import Struct
+from tempfile import TemporaryFile
+
+from seqgen.read import Read
+
+# The length of each record, before its (pickled) contents.
+_LENGTH = Struct("<I")
+
+
+class ReadStore:
+    """
+    Keep reads (by id) in an append-only file on disk, instead of in memory,
+    so that runs that keep a very large number of reads (e.g., a big panel of
+    reads that recombinants are made from) do not run out of memory.
+
+    Only the offset of each read in the file is kept in memory, along with a
+    least recently used (LRU) cache of the reads most recently added or
+    looked up, whose sequences (and qualities) take at most C{maxBytes}
+    bytes. Other reads are read from the file (via C{mmap}) when they are
+    needed. Mutants (see L{seqgen.read.Read.mutant}) are saved with their
+    full sequence, and so are read back as ordinary reads. The file is a
+    temporary file, which is removed when the store is closed (or garbage
+    collected).
+
+    A read that is added with an id that is already in the store replaces
+    it (its record is not removed from the file).
+
+    @param directory: The C{str} directory to make the file in, or C{None}
+        to use the default temporary directory.
+    @param maxBytes: The C{int} maximum number of bytes of sequence and
+        quality to keep in memory, or C{None} to use C{DEFAULT_MAX_BYTES}.
+    """
+
+    DEFAULT_MAX_BYTES = 2**28
+
+    def __init__(self, directory=None, maxBytes=None):
+        self.maxBytes = self.DEFAULT_MAX_BYTES if maxBytes is None else maxBytes
+        self._fp = TemporaryFile(dir=directory, prefix="seqgen-store-")
+        self._size = 0
+        self._map = None
+        self._offsets = {}
+        self._lru = OrderedDict()
+        self._lruBytes = 0
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, id_):
+        return id_ in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def keys(self):
+        """
+        Get the ids of the reads in the store.
+
+        @return: An iterable of C{str} ids.
+        """
+        return self._offsets.keys()
+
+    def items(self):
+        """
+        Get the ids and reads in the store, in the order they were added.
+
+        @return: A generator of (C{str} id, C{seqgen.read.Read}) C{tuple}s.
+        """
+        for id_ in list(self._offsets):
+            yield id_, self[id_]
+
+    def get(self, id_, default=None):
+        """
+        Get a read, if it is in the store.
+
+        @param id_: The C{str} id of the read.
+        @param default: The value to return if there is no read with that id.
+        @return: A C{seqgen.read.Read} instance, or C{default}.
+        """
+        try:
+            return self[id_]
+        except KeyError:
+            return default
+
+    def __setitem__(self, id_, read):
+        record = pickle.dumps(
+            (read.id, read.sequence, read.quality, read.alphabet),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        self._fp.seek(self._size)
+        self._fp.write(_LENGTH.pack(len(record)))
+        self._fp.write(record)
+        self._offsets[id_] = self._size
+        self._size += _LENGTH.size + len(record)
+        self._remember(id_, read)
+
+    def __getitem__(self, id_):
+        try:
+            read = self._lru[id_]
+        except KeyError:
+            pass
+        else:
+            self._lru.move_to_end(id_)
+            self.hits += 1
+            return read
+
+        offset = self._offsets[id_]
+        self.misses += 1
+        if self._map is None or len(self._map) < self._size:
+            # The file has grown since it was mapped.
+            self._fp.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(
+                self._fp.fileno(), self._size, access=mmap.ACCESS_READ
+            )
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        readId, sequence, quality, alphabet = pickle.loads(
+            self._map[start : start + length]
+        )
+        read = Read(readId, sequence, quality, alphabet)
+        self._remember(id_, read)
+        return read
+
+    def _remember(self, id_, read):
+        """
+        Add a read to the LRU cache, removing the least recently used reads
+        if the cache is then too big.
+
+        @param id_: The C{str} id the read was stored under.
+        @param read: A C{seqgen.read.Read} instance.
+        """
+        lru = self._lru
+        old = lru.pop(id_, None)
+        if old is not None:
+            self._lruBytes -= self._bytes(old)
+        lru[id_] = read
+        self._lruBytes += self._bytes(read)
+        while self._lruBytes > self.maxBytes and lru:
+            _, old = lru.popitem(last=False)
+            self._lruBytes -= self._bytes(old)
+
+    @staticmethod
+    def _bytes(read):
+        """
+        Get the number of bytes of the sequence and quality of a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: The C{int} number of bytes.
+        """
+        return len(read) * (1 if read.quality is None else 2)
+
+    def close(self):
+        """
+        Close (and so remove) the file.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._fp.close()
+        self._offsets = {}
+        self._lru.clear()
+        self._lruBytes = 0
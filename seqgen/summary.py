@@ -0,0 +1,270 @@
+import random
+from collections import Counter
+from json import dump
+from operator import ne
+
+
+class SpecSummary:
+    """
+    Hold summary statistics of the reads of one sequence specification.
+
+    @param number: The C{int} (1-based) number of the specification (after
+        any repeat specifications have been expanded).
+    @param spec: The C{dict} sequence specification.
+    """
+
+    __slots__ = (
+        "number",
+        "name",
+        "reads",
+        "bases",
+        "lengths",
+        "composition",
+        "mutatedReads",
+        "substitutions",
+        "sites",
+        "acceptedReads",
+        "rejected",
+        "sample",
+        "letters",
+    )
+
+    def __init__(self, number, spec):
+        self.number = number
+        self.name = spec.get("id", spec.get("id prefix"))
+        self.reads = 0
+        self.bases = 0
+        self.lengths = Counter()
+        self.composition = Counter()
+        self.mutatedReads = 0
+        self.substitutions = 0
+        self.sites = 0
+        self.acceptedReads = 0
+        self.rejected = 0
+        # A uniform sample of the sequences, for pairwise distances.
+        self.sample = []
+        # The distinct letters of the alphabet of the reads, once known.
+        self.letters = None
+
+    def toDict(self, random, maxPairs):
+        """
+        Get the summary as a C{dict}.
+
+        @param random: A C{random.Random} instance, used to choose the pairs
+            of sampled sequences to compare.
+        @param maxPairs: The C{int} maximum number of pairs to compare.
+        @return: A C{dict} of summary statistics.
+        """
+        bases = self.bases
+        lengths = self.lengths
+        return {
+            "spec": self.number,
+            "name": self.name,
+            "reads": self.reads,
+            "bases": bases,
+            "lengths": {
+                "min": min(lengths) if lengths else None,
+                "max": max(lengths) if lengths else None,
+                "mean": bases / self.reads if self.reads else None,
+                "counts": {
+                    str(length): count for length, count in sorted(lengths.items())
+                },
+            },
+            "composition": {
+                letter: count / bases
+                for letter, count in sorted(self.composition.items())
+            },
+            "gc content": (
+                (
+                    sum(self.composition[letter] for letter in "CGcg")
+                    / sum(self.composition[letter] for letter in "ACGTacgt")
+                )
+                if any(self.composition[letter] for letter in "ACGTacgt")
+                else None
+            ),
+            "substitutions": {
+                "mutated reads": self.mutatedReads,
+                "substitutions": self.substitutions,
+                "sites": self.sites,
+                "rate": self.substitutions / self.sites if self.sites else None,
+            },
+            "rejections": {
+                "accepted reads": self.acceptedReads,
+                "rejected": self.rejected,
+                "rejection rate": (
+                    self.rejected / (self.acceptedReads + self.rejected)
+                    if self.acceptedReads
+                    else None
+                ),
+            },
+            "pairwise distance": self._pairwise(random, maxPairs),
+        }
+
+    def _pairwise(self, random, maxPairs):
+        """
+        Find the mean (Hamming) distance between pairs of sampled sequences
+        of the same length.
+
+        @param random: A C{random.Random} instance, used to choose the pairs
+            to compare if there are more than C{maxPairs}.
+        @param maxPairs: The C{int} maximum number of pairs to compare.
+        @return: A C{dict} giving the number of sampled sequences and of
+            pairs compared, and the mean number and fraction of differing
+            sites (or C{None} if no pairs were compared).
+        """
+        sample = self.sample
+        pairs = [
+            (i, j)
+            for i in range(len(sample))
+            for j in range(i + 1, len(sample))
+            if len(sample[i]) == len(sample[j])
+        ]
+        if len(pairs) > maxPairs:
+            pairs = random.sample(pairs, maxPairs)
+        differences = sites = 0
+        for i, j in pairs:
+            differences += sum(map(ne, sample[i], sample[j]))
+            sites += len(sample[i])
+        return {
+            "sampled reads": len(sample),
+            "pairs": len(pairs),
+            "mean": differences / len(pairs) if pairs else None,
+            "mean per site": differences / sites if sites else None,
+        }
+
+
+class Summary:
+    """
+    Collect summary statistics of the reads of each specification as they
+    are generated, so the output does not have to be read again to check
+    it: the composition, the distribution of read lengths, the
+    substitutions made by mutation (compared to the read each mutant was
+    made from, e.g., via 'from id'), and the mean distance between pairs of
+    reads from a uniform (reservoir) sample. For specifications whose reads
+    must be unique or a minimum distance apart, the number of reads that
+    were rejected (and drawn again) is also given; the substitutions of
+    rejected reads are counted.
+
+    Pass an instance to C{Sequences} (via its C{summary} argument) to have it
+    updated. Reads taken from a cache (see L{seqgen.cache.ReadCache}) are
+    not mutated, so their substitutions are not counted, and a resumed run
+    (see L{seqgen.checkpoint.Checkpointer}) is only summarized from the
+    point at which it was resumed.
+
+    @param sampleSize: The C{int} number of reads of each specification to
+        keep, to find pairwise distances.
+    @param maxPairs: The C{int} maximum number of pairs of sampled reads to
+        compare.
+    @param seed: A seed for the random number generator used to sample reads
+        (which is separate from the one used to generate them).
+    """
+
+    SAMPLE_SIZE = 100
+    MAX_PAIRS = 1000
+
+    def __init__(self, sampleSize=None, maxPairs=None, seed=0):
+        self.sampleSize = self.SAMPLE_SIZE if sampleSize is None else sampleSize
+        self.maxPairs = self.MAX_PAIRS if maxPairs is None else maxPairs
+        self._random = random.Random(seed)
+        self.specs = []
+        self.current = None
+
+    def startSpec(self, spec):
+        """
+        Start summarizing a new specification.
+
+        @param spec: The C{dict} sequence specification.
+        """
+        self.current = SpecSummary(len(self.specs) + 1, spec)
+        self.specs.append(self.current)
+
+    def endSpec(self):
+        """
+        Finish summarizing the current specification (if any).
+        """
+        self.current = None
+
+    def mutated(self, substitutions, sites):
+        """
+        Record the substitutions made when mutating a sequence.
+
+        @param substitutions: The C{int} number of sites changed.
+        @param sites: The C{int} number of sites that could have changed.
+        """
+        current = self.current
+        if current is not None:
+            current.mutatedReads += 1
+            current.substitutions += substitutions
+            current.sites += sites
+
+    def rejected(self, count):
+        """
+        Record the number of reads rejected before a read (of a
+        specification whose reads must be unique or a minimum distance
+        apart) was accepted.
+
+        @param count: The C{int} number of rejected reads.
+        """
+        current = self.current
+        if current is not None:
+            current.acceptedReads += 1
+            current.rejected += count
+
+    def produced(self, read):
+        """
+        Add a read that has been produced (i.e., not skipped).
+
+        @param read: The C{seqgen.read.Read} that was produced.
+        """
+        current = self.current
+        if current is None:
+            return
+        sequence = read.sequence
+        length = len(sequence)
+        current.reads += 1
+        current.bases += length
+        current.lengths[length] += 1
+
+        # Count the letters of the alphabet with str.count, which is much
+        # faster than counting each character, and only count characters
+        # one by one if there are others (e.g., from a sequence file).
+        if current.letters is None:
+            current.letters = list(dict.fromkeys(read.alphabet or ""))
+        composition = current.composition
+        counted = 0
+        for letter in current.letters:
+            count = sequence.count(letter)
+            composition[letter] += count
+            counted += count
+        if counted != length:
+            letters = set(current.letters)
+            composition.update(letter for letter in sequence if letter not in letters)
+
+        # Reservoir sampling.
+        if current.reads <= self.sampleSize:
+            current.sample.append(sequence)
+        else:
+            index = self._random.randrange(current.reads)
+            if index < self.sampleSize:
+                current.sample[index] = sequence
+
+    def toDict(self):
+        """
+        Get the summaries of all specifications as a C{dict}.
+
+        @return: A C{dict} with a 'specs' key holding a C{list} with a C{dict}
+            for each specification.
+        """
+        return {
+            "specs": [spec.toDict(self._random, self.maxPairs) for spec in self.specs]
+        }
+
+    def save(self, filename):
+        """
+        Save the summaries as JSON.
+
+        @param filename: The C{str} file to write to.
+        """
+        with open(filename, "w") as fp:
+            dump(self.toDict(), fp, indent=2)
+            print(file=fp)
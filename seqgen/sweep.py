@@ -0,0 +1,211 @@
+import os
+import sys
+from itertools import product
+from shutil import copyfileobj
+from tempfile import NamedTemporaryFile
+
+from seqgen.sequences import Sequences, loadSpecification, variableValues
+
+
+def isSweep(spec):
+    """
+    Does a (loaded) specification have variables with multiple values?
+
+    @param spec: A C{dict} or C{list} specification.
+    @return: C{True} if C{spec} is a sweep specification.
+    """
+    return isinstance(spec, dict) and any(
+        isinstance(value, (list, dict)) for value in spec.get("variables", {}).values()
+    )
+
+
+class Sweep:
+    """
+    Create sets of genetic sequences for all combinations of the values of
+    the variables in a JSON specification.
+
+    Variables in the specification can be given a list of values (or a range,
+    see L{variableValues}). A separate dataset is generated for each
+    combination of variable values. The combinations are produced lazily
+    and the datasets can be generated in parallel.
+
+    @param spec: A C{str} filename or an open file pointer to read the
+        specification from, or a C{dict} specification.
+    @param kwargs: Keyword arguments to pass to C{Sequences} (e.g.,
+        C{defaultLength}).
+    @raise ValueError: If a variable value is invalid.
+    """
+
+    def __init__(self, spec, **kwargs):
+        variables, self._sequenceSpecs = loadSpecification(spec)
+        self._kwargs = kwargs
+        self._names = []
+        self._values = []
+        self._fixed = {}
+        for name, value in variables.items():
+            if isinstance(value, (list, dict)):
+                self._names.append(name)
+                self._values.append(variableValues(name, value))
+            else:
+                self._fixed[name] = value
+
+    def __len__(self):
+        """
+        How many datasets are in the sweep?
+
+        @return: The C{int} number of combinations of variable values.
+        """
+        result = 1
+        for values in self._values:
+            result *= len(values)
+        return result
+
+    def variables(self):
+        """
+        Yield the variables for each dataset in the sweep.
+
+        @return: A generator of C{dict}s mapping variable names to values.
+        """
+        for combination in product(*self._values):
+            variables = dict(self._fixed)
+            variables.update(zip(self._names, combination))
+            yield variables
+
+    def datasets(self, sequenceFileCache=None):
+        """
+        Yield the datasets in the sweep.
+
+        @param sequenceFileCache: A C{dict} in which to cache the contents of
+            sequence files, or C{None} to use a new cache.
+        @return: A generator of 2-C{tuple}s, each with a C{dict} of variables
+            and a C{Sequences} instance.
+        """
+        sequenceFileCache = {} if sequenceFileCache is None else sequenceFileCache
+        for variables in self.variables():
+            yield variables, Sequences(
+                {"variables": variables, "sequences": self._sequenceSpecs},
+                sequenceFileCache=sequenceFileCache,
+                **self._kwargs,
+            )
+
+    def check(self):
+        """
+        Check that every dataset has a valid specification and that no two
+        datasets write to the same file.
+
+        The datasets are made (and checked) one at a time and are not kept,
+        so the sweep is still expanded lazily. They share a sequence file
+        cache, so each sequence file is only read once.
+
+        @raise ValueError: If a dataset specification is invalid or two
+            datasets write to the same file.
+        @return: The C{dict} sequence file cache filled by the datasets (see
+            C{datasets}), so the files need not be read again to write them.
+        """
+        owners = {}
+        sequenceFileCache = {}
+        for index, (variables, sequences) in enumerate(
+            self.datasets(sequenceFileCache), start=1
+        ):
+            for filename in sequences.filenames():
+                if filename in owners:
+                    raise ValueError(
+                        "Sweep datasets %d and %d both write to the file %r. "
+                        "Use the sweep variables in the filename to give each "
+                        "dataset its own output file."
+                        % (owners[filename], index, filename)
+                    )
+                owners[filename] = index
+        return sequenceFileCache
+
+    def write(self, fp=None, processes=None):
+        """
+        Write out all datasets, respecting filenames given in the
+        specification.
+
+        All datasets are checked (see C{check}) before any is written. With
+        more than one process, each worker process is given the sequence file
+        cache made by C{check} when it starts, and writes the output of each
+        of its datasets that has no filename to a temporary file, which is
+        then copied to C{fp} (so the output is not held in memory).
+
+        @param fp: An open file pointer to write reads that have no filename
+            in the specification to. If C{None}, standard output is used.
+            Reads from different datasets are written in dataset order.
+        @param processes: The C{int} number of processes to use, or C{None}
+            to use one per CPU.
+        """
+        fp = sys.stdout if fp is None else fp
+        sequenceFileCache = self.check()
+
+        if processes == 1:
+            for _, sequences in self.datasets(sequenceFileCache):
+                sequences.write(fp)
+        else:
+            from multiprocessing import Pool
+
+            with Pool(
+                processes,
+                initializer=_initializeWorker,
+                initargs=(self._sequenceSpecs, self._kwargs, sequenceFileCache),
+            ) as pool:
+                for filename in pool.imap(_writeDataset, self.variables()):
+                    try:
+                        _copy(filename, fp)
+                    finally:
+                        os.unlink(filename)
+
+
+# Per-process state for writing datasets, set by _initializeWorker.
+_worker = {}
+
+
+def _initializeWorker(sequenceSpecs, kwargs, sequenceFileCache):
+    """
+    Set up a process to write sweep datasets.
+
+    @param sequenceSpecs: The C{list} of (unexpanded) sequence specifications.
+    @param kwargs: Keyword arguments to pass to C{Sequences}.
+    @param sequenceFileCache: A C{dict} sequence file cache, shared by the
+        datasets written by the process.
+    """
+    _worker["sequenceSpecs"] = sequenceSpecs
+    _worker["kwargs"] = kwargs
+    _worker["sequenceFileCache"] = sequenceFileCache
+
+
+def _writeDataset(variables):
+    """
+    Write a sweep dataset.
+
+    @param variables: A C{dict} of variable values for the dataset.
+    @return: The C{str} name of a temporary file holding the output of the
+        dataset that was not written to a file in the specification.
+    """
+    sequences = Sequences(
+        {"variables": variables, "sequences": _worker["sequenceSpecs"]},
+        sequenceFileCache=_worker["sequenceFileCache"],
+        **_worker["kwargs"],
+    )
+    with NamedTemporaryFile("w", prefix="seqgen-sweep-", delete=False) as fp:
+        sequences.write(fp)
+    return fp.name
+
+
+def _copy(filename, fp):
+    """
+    Copy the output of a dataset to a file pointer.
+
+    @param filename: The C{str} name of the file holding the output.
+    @param fp: An open file pointer to copy the output to. If it has an
+        underlying binary buffer (as standard output does), the output is
+        copied to that (as it may hold a binary format).
+    """
+    if hasattr(fp, "buffer"):
+        fp.flush()
+        with open(filename, "rb") as infp:
+            copyfileobj(infp, fp.buffer)
+        fp.buffer.flush()
+    else:
+        with open(filename) as infp:
+            copyfileobj(infp, fp)
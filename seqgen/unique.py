@@ -0,0 +1,198 @@
+import os
+from array import array
+from hashlib import blake2b
+from struct import Struct
+from tempfile import TemporaryFile
+
+# The length of each sequence in the file, before its bytes.
+_LENGTH = Struct("<I")
+
+
+class UniqueSet:
+    """
+    A compact set of sequences, used to reject duplicates.
+
+    A 64-bit fingerprint (part of a BLAKE2 digest) of each sequence is kept,
+    in an open-addressing hash table held in an C{array}, along with the
+    offset of the sequence in an append-only temporary file. So each
+    sequence takes between 16 / C{MAX_LOAD} and 32 / C{MAX_LOAD} bytes of
+    memory (about 2.1 to 4.3 GB for 10^8 sequences), instead of the hundred
+    or so bytes (plus the sequence itself) of a Python C{set} entry.
+
+    Sequences with different fingerprints are certainly different. When a
+    sequence has the same fingerprint as one in the set, the stored sequence
+    is read from the file and compared to it, so a sequence is only rejected
+    if it really is a duplicate. Different sequences with the same
+    fingerprint (which are very rare) are counted in C{collisions}.
+
+    @param capacity: The C{int} number of sequences expected, used to size
+        the table (which grows if more are added).
+    @param directory: The C{str} directory to make the file in, or C{None}
+        to use the default temporary directory.
+    """
+
+    # The largest fraction of the slots of the table that may be used
+    # before it is made bigger.
+    MAX_LOAD = 0.75
+    MIN_SLOTS = 16
+
+    def __init__(self, capacity=0, directory=None):
+        slots = self.MIN_SLOTS
+        while slots * self.MAX_LOAD < capacity:
+            slots *= 2
+        self._table = array("Q", bytes(8 * slots))
+        self._offsets = array("Q", bytes(8 * slots))
+        self._limit = int(slots * self.MAX_LOAD)
+        self._directory = directory
+        self._fp = TemporaryFile(dir=directory, prefix="seqgen-unique-")
+        self._size = 0
+        self._flushed = True
+        self.count = 0
+        self.rejected = 0
+        self.collisions = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, sequence):
+        encoded = sequence.encode("utf-8")
+        return self._find(self.fingerprint(sequence), encoded)[1]
+
+    def __getstate__(self):
+        """
+        Get the state of the set, including the sequences in its file, so it
+        can be pickled (e.g., in a checkpoint).
+
+        @return: A C{dict}.
+        """
+        state = dict(self.__dict__)
+        self._fp.flush()
+        self._fp.seek(0)
+        state["_fp"] = self._fp.read(self._size)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled set, writing its sequences to a new file.
+
+        @param state: A C{dict}, as returned by C{__getstate__}.
+        """
+        self.__dict__.update(state)
+        contents = self._fp
+        self._fp = TemporaryFile(dir=self._directory, prefix="seqgen-unique-")
+        self._fp.write(contents)
+        self._flushed = False
+
+    @staticmethod
+    def fingerprint(sequence):
+        """
+        Get the fingerprint of a sequence.
+
+        @param sequence: A C{str} sequence.
+        @return: A non-zero C{int} less than 2^64 (zero marks an empty slot).
+        """
+        return (
+            int.from_bytes(
+                blake2b(sequence.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            or 1
+        )
+
+    def _find(self, fingerprint, encoded):
+        """
+        Find the slot of a sequence in the table.
+
+        @param fingerprint: The C{int} fingerprint of the sequence.
+        @param encoded: The sequence, as C{bytes}.
+        @return: A 2-C{tuple} with the C{int} index of the slot and C{True}
+            if the sequence is in the set, else the C{int} index of the empty
+            slot it would go in and C{False}.
+        """
+        table = self._table
+        mask = len(table) - 1
+        index = fingerprint & mask
+        while True:
+            value = table[index]
+            if value == 0:
+                return index, False
+            if value == fingerprint:
+                if self._stored(self._offsets[index], encoded):
+                    return index, True
+                self.collisions += 1
+            index = (index + 1) & mask
+
+    def _stored(self, offset, encoded):
+        """
+        Check whether the sequence at an offset in the file is a given one.
+
+        @param offset: The C{int} offset of a sequence in the file.
+        @param encoded: A sequence, as C{bytes}.
+        @return: C{True} if the sequences are the same, else C{False}.
+        """
+        if not self._flushed:
+            self._fp.flush()
+            self._flushed = True
+        record = os.pread(self._fp.fileno(), _LENGTH.size + len(encoded), offset)
+        return (
+            _LENGTH.unpack_from(record)[0] == len(encoded)
+            and record[_LENGTH.size :] == encoded
+        )
+
+    def add(self, sequence):
+        """
+        Add a sequence, unless it is already present, in which case the
+        rejection is counted.
+
+        @param sequence: A C{str} sequence.
+        @return: C{True} if the sequence was added, else C{False}.
+        """
+        encoded = sequence.encode("utf-8")
+        fingerprint = self.fingerprint(sequence)
+        index, found = self._find(fingerprint, encoded)
+        if found:
+            self.rejected += 1
+            return False
+
+        self._fp.seek(self._size)
+        self._fp.write(_LENGTH.pack(len(encoded)) + encoded)
+        self._flushed = False
+        self._table[index] = fingerprint
+        self._offsets[index] = self._size
+        self._size += _LENGTH.size + len(encoded)
+        self.count += 1
+        if self.count > self._limit:
+            self._grow()
+        return True
+
+    def _grow(self):
+        """
+        Double the size of the table.
+        """
+        oldTable, oldOffsets = self._table, self._offsets
+        table = self._table = array("Q", bytes(16 * len(oldTable)))
+        offsets = self._offsets = array("Q", bytes(16 * len(oldTable)))
+        mask = len(table) - 1
+        for fingerprint, offset in zip(oldTable, oldOffsets):
+            if fingerprint:
+                index = fingerprint & mask
+                while table[index]:
+                    index = (index + 1) & mask
+                table[index] = fingerprint
+                offsets[index] = offset
+        self._limit = int(len(table) * self.MAX_LOAD)
+
+    def rejectionRate(self):
+        """
+        Get the fraction of the sequences offered to C{add} that were
+        rejected.
+
+        @return: A C{float}, or C{None} if no sequences have been offered.
+        """
+        offered = self.count + self.rejected
+        return self.rejected / offered if offered else None
+
+    def close(self):
+        """
+        Close (and so remove) the file of sequences.
+        """
+        self._fp.close()
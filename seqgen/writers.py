@@ -0,0 +1,1012 @@
+import os
+import re
+import struct
+from functools import lru_cache
+from itertools import product
+from math import ceil
+from queue import Queue
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from threading import Thread
+
+from seqgen.read import COMPLEMENT
+
+# Characters that may appear in a nucleotide sequence in a NEXUS file
+# with datatype=dna.
+_DNA = set("".join(COMPLEMENT) + "".join(COMPLEMENT).lower() + "-?")
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    Import NumPy, which is optional.
+
+    @return: The C{numpy} module, or C{None} if it is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class Writer:
+    """
+    Format reads for an output destination (a file or standard output).
+
+    A writer is made for each destination before anything is written to it
+    and is given the number of reads that will be written, so that formats
+    with a header giving the number of sequences can be streamed. The
+    destination may be closed and re-opened (for appending) between reads.
+
+    Writers whose C{binary} attribute is C{True} return C{bytes} from
+    C{format} and are given a destination opened in binary mode.
+
+    Writers are pickled when a run is checkpointed. Those whose C{resumable}
+    attribute is C{False} hold output back until C{finish} is called, so
+    they cannot be used in a run that is checkpointed.
+
+    @param count: The C{int} number of reads that will be written.
+    @param filename: The C{str} name of the destination file, or C{None} for
+        standard output.
+    """
+
+    binary = False
+    resumable = True
+
+    def __init__(self, count, filename=None):
+        self.count = count
+        self.filename = filename
+        self.written = 0
+
+    def resume(self):
+        """
+        Prepare to continue writing after this writer has been restored from
+        a checkpoint.
+        """
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings.
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (see C{seqgen.read.Read.mutant}).
+        @return: The estimated C{int} number of bytes.
+        """
+        raise NotImplementedError()
+
+    def format(self, read):
+        """
+        Format a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: A C{str} (or C{bytes}, for a binary writer) to write to the
+            destination.
+        """
+        raise NotImplementedError()
+
+    def finish(self, fp):
+        """
+        Finish writing, once all reads have been formatted.
+
+        @param fp: An open file pointer for the destination.
+        """
+
+
+class FastxWriter(Writer):
+    """
+    Format reads as FASTA or (for reads with a quality string) FASTQ.
+    """
+
+    def format(self, read):
+        """
+        Format a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: A C{str} to write to the destination.
+        """
+        self.written += 1
+        return read.toString("fasta" if read.quality is None else "fastq")
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings.
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (not used).
+        @return: The estimated C{int} number of bytes.
+        """
+        if quality:
+            return 6 * reads + 2 * idBytes + 2 * bases
+        else:
+            return 3 * reads + idBytes + bases
+
+
+class AlignmentWriter(Writer):
+    """
+    Base class for writers of formats that require all sequences to have the
+    same length. The length is taken from the first read.
+    """
+
+    FORMAT_NAME = None
+
+    def __init__(self, count, filename=None):
+        super().__init__(count, filename)
+        self.length = None
+
+    def checkLength(self, read):
+        """
+        Check that a read has the same length as the first read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @raise ValueError: If the read length differs from that of the first
+            read.
+        """
+        if self.length is None:
+            self.length = len(read)
+        elif len(read) != self.length:
+            raise ValueError(
+                "Sequence %r has length %d, but the %s format requires all "
+                "sequences to have the same length (the first had length %d)."
+                % (read.id, len(read), self.FORMAT_NAME, self.length)
+            )
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings (not
+            used).
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (not used).
+        @return: The estimated C{int} number of bytes.
+        """
+        if reads == 0:
+            return 0
+        return (
+            cls.estimateHeaderSize(reads, bases // reads) + idBytes + bases + 2 * reads
+        )
+
+    @classmethod
+    def estimateHeaderSize(cls, count, length):
+        """
+        Estimate the number of bytes written before and after the lines of
+        the alignment (each of which has a name, a space, a sequence, and a
+        newline).
+
+        @param count: The C{int} number of sequences.
+        @param length: The C{int} length of the sequences.
+        @return: The C{int} number of bytes.
+        """
+        return 0
+
+    @staticmethod
+    def taxonName(read):
+        """
+        Get a taxon name for a read, with whitespace replaced by underscores.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: A C{str} name.
+        """
+        return re.sub(r"\s+", "_", read.id)
+
+
+class PhylipWriter(AlignmentWriter):
+    """
+    Format reads as a (relaxed) sequential PHYLIP alignment.
+    """
+
+    FORMAT_NAME = "PHYLIP"
+
+    def format(self, read):
+        """
+        Format a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: A C{str} to write to the destination.
+        """
+        self.checkLength(read)
+        self.written += 1
+        line = "%s %s\n" % (self.taxonName(read), read.sequence)
+        if self.written == 1:
+            return "%d %d\n%s" % (self.count, self.length, line)
+        else:
+            return line
+
+    @classmethod
+    def estimateHeaderSize(cls, count, length):
+        """
+        Estimate the number of bytes written before and after the lines of
+        the alignment.
+
+        @param count: The C{int} number of sequences.
+        @param length: The C{int} length of the sequences.
+        @return: The C{int} number of bytes.
+        """
+        return len("%d %d\n" % (count, length))
+
+
+class InterleavedPhylipWriter(AlignmentWriter):
+    """
+    Format reads as a (relaxed) interleaved PHYLIP alignment.
+
+    The first block of the alignment needs the start of the last sequence, so
+    sequences are spooled to a temporary file (not held in memory) and the
+    alignment is written when the last one has been given.
+
+    @param count: The C{int} number of reads that will be written.
+    @param filename: The C{str} name of the destination file, or C{None} for
+        standard output.
+    @param width: The C{int} number of sequence characters per line.
+    """
+
+    FORMAT_NAME = "PHYLIP"
+    WIDTH = 60
+    resumable = False
+
+    def __init__(self, count, filename=None, width=None):
+        super().__init__(count, filename)
+        self.width = width or self.WIDTH
+        self.names = []
+        self.spool = TemporaryFile()
+
+    def format(self, read):
+        """
+        Spool a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: The empty C{str}, since nothing is written until all reads
+            have been given.
+        """
+        self.checkLength(read)
+        self.written += 1
+        self.names.append(self.taxonName(read))
+        self.spool.write(read.sequence.encode("ascii"))
+        return ""
+
+    def finish(self, fp):
+        """
+        Write the alignment.
+
+        @param fp: An open file pointer for the destination.
+        """
+        spool, length, width = self.spool, self.length, self.width
+        nameWidth = max(map(len, self.names), default=0)
+        print("%d %d" % (self.count, length or 0), file=fp)
+        for start in range(0, length or 0, width):
+            if start:
+                print(file=fp)
+            for index, name in enumerate(self.names):
+                spool.seek(index * length + start)
+                chunk = spool.read(min(width, length - start)).decode("ascii")
+                if start:
+                    print(chunk, file=fp)
+                else:
+                    print("%-*s %s" % (nameWidth, name, chunk), file=fp)
+        spool.close()
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        Names are padded to the width of the longest, which is taken to be
+        the average id length (rounded up).
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings (not
+            used).
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (not used).
+        @return: The estimated C{int} number of bytes.
+        """
+        if reads == 0:
+            return 0
+        length = bases // reads
+        blocks = ceil(length / cls.WIDTH)
+        return (
+            len("%d %d\n" % (reads, length))
+            + reads * (ceil(idBytes / reads) + 1)
+            + bases
+            + reads * blocks
+            + max(0, blocks - 1)
+        )
+
+
+class NexusWriter(AlignmentWriter):
+    """
+    Format reads as a NEXUS alignment (data block).
+
+    The datatype is given in the header, which is written with the first
+    read, so it is taken from the first read. A later read that does not fit
+    it (i.e., a protein sequence in a nucleotide alignment) raises an error.
+    """
+
+    FORMAT_NAME = "NEXUS"
+
+    def __init__(self, count, filename=None):
+        super().__init__(count, filename)
+        self.dna = None
+
+    @staticmethod
+    def taxonName(read):
+        """
+        Get a taxon name for a read, quoted if necessary.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: A C{str} name.
+        """
+        if re.fullmatch(r"[A-Za-z0-9_.|\-]+", read.id):
+            return read.id
+        else:
+            return "'%s'" % read.id.replace("'", "''")
+
+    @staticmethod
+    def datatype(sequence):
+        """
+        Get the NEXUS datatype for a sequence.
+
+        @param sequence: A C{str} sequence.
+        @return: A C{str} NEXUS format command argument.
+        """
+        if set(sequence) <= _DNA:
+            return "datatype=dna missing=? gap=-"
+        else:
+            return "datatype=protein missing=? gap=-"
+
+    def format(self, read):
+        """
+        Format a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @raise ValueError: If the read has a different length than the first
+            read, or is a protein sequence but the first read was not.
+        @return: A C{str} to write to the destination.
+        """
+        self.checkLength(read)
+        sequence = read.sequence
+        if self.dna is None:
+            self.dna = set(sequence) <= _DNA
+        elif self.dna and not set(sequence) <= _DNA:
+            raise ValueError(
+                "Sequence %r is not a nucleotide sequence, but the %s "
+                "alignment has the dna datatype (taken from its first "
+                "sequence)." % (read.id, self.FORMAT_NAME)
+            )
+        self.written += 1
+        result = "%s %s\n" % (self.taxonName(read), sequence)
+        if self.written == 1:
+            result = (
+                "#NEXUS\n\nbegin data;\n\tdimensions ntax=%d nchar=%d;\n"
+                "\tformat %s;\n\tmatrix\n%s"
+                % (self.count, self.length, self.datatype(sequence), result)
+            )
+        if self.written == self.count:
+            result += "\t;\nend;\n"
+        return result
+
+    @classmethod
+    def estimateHeaderSize(cls, count, length):
+        """
+        Estimate the number of bytes written before and after the lines of
+        the alignment.
+
+        @param count: The C{int} number of sequences.
+        @param length: The C{int} length of the sequences.
+        @return: The C{int} number of bytes (for nucleotide sequences).
+        """
+        return len(
+            "#NEXUS\n\nbegin data;\n\tdimensions ntax=%d nchar=%d;\n"
+            "\tformat %s;\n\tmatrix\n\t;\nend;\n" % (count, length, cls.datatype(""))
+        )
+
+
+class NpyWriter(AlignmentWriter):
+    """
+    Write an alignment as a NumPy C{.npy} file holding a C{uint8} matrix with
+    one row per sequence and one (ASCII) character code per column.
+
+    The matrix shape is known from the specification and the first read, so
+    the header is written first and each row is written as soon as its read
+    is given. The file can be memory-mapped by consumers (e.g., with
+    C{numpy.load(filename, mmap_mode='r')}). If the destination is a file,
+    the read ids are written, one per line, to a file with the same name
+    plus a C{.ids} suffix.
+    """
+
+    FORMAT_NAME = "npy"
+    binary = True
+
+    def __init__(self, count, filename=None):
+        super().__init__(count, filename)
+        self.idsFp = None if filename is None else open(filename + ".ids", "w")
+
+    def header(self):
+        """
+        Make a version 1.0 C{.npy} header.
+
+        @return: The C{bytes} header.
+        """
+        header = "{'descr': '|u1', 'fortran_order': False, 'shape': (%d, %d), }" % (
+            self.count,
+            self.length,
+        )
+        # The magic string, version, length and header must together have a
+        # length that is a multiple of 64, with the header ending in a newline.
+        header += " " * (63 - (10 + len(header)) % 64) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode()
+
+    def format(self, read):
+        """
+        Format a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: The C{bytes} to write to the destination.
+        """
+        self.checkLength(read)
+        self.written += 1
+        if self.idsFp:
+            print(read.id, file=self.idsFp)
+        row = read.sequence.encode("ascii")
+        if self.written == 1:
+            return self.header() + row
+        else:
+            return row
+
+    def finish(self, fp):
+        """
+        Finish writing, once all reads have been formatted.
+
+        @param fp: An open file pointer for the destination.
+        """
+        if self.idsFp:
+            self.idsFp.close()
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads (not
+        counting the C{.ids} file).
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings (not
+            used).
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (not used).
+        @return: The estimated C{int} number of bytes.
+        """
+        if reads == 0:
+            return 0
+        writer = cls(reads)
+        writer.length = bases // reads
+        return len(writer.header()) + bases
+
+    def __getstate__(self):
+        """
+        Get the state of the writer for pickling, with the size of the ids
+        file in place of its (open) file pointer.
+
+        @return: A C{dict} of attributes.
+        """
+        state = self.__dict__.copy()
+        idsFp = state.pop("idsFp")
+        if idsFp is None or idsFp.closed:
+            state["idsSize"] = None
+        else:
+            idsFp.flush()
+            state["idsSize"] = os.path.getsize(idsFp.name)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the state of an unpickled writer.
+
+        @param state: A C{dict} of attributes, as returned by C{__getstate__}.
+        """
+        self.__dict__.update(state)
+        self.idsFp = None
+
+    def resume(self):
+        """
+        Truncate the ids file to its size at the checkpoint and re-open it
+        for appending.
+        """
+        if self.idsSize is not None:
+            os.truncate(self.filename + ".ids", self.idsSize)
+            self.idsFp = open(self.filename + ".ids", "a")
+
+
+class TwoBitWriter(Writer):
+    """
+    Write nucleotide sequences in the UCSC C{.2bit} format.
+
+    The header and index (which hold the offset of each sequence) precede
+    the sequence records, so packed records are spooled to a temporary file
+    and copied to the destination when the last read has been given. Only
+    names and record sizes are kept in memory. Lower-case bases are recorded
+    as masked and ambiguous nucleotide codes are stored as N.
+    """
+
+    binary = True
+    resumable = False
+    SIGNATURE = 0x1A412743
+    # 2bit packs T, C, A, G as 0, 1, 2, 3. N is packed as T (and recorded in
+    # the N blocks of the record).
+    PACK_TABLE = bytes.maketrans(
+        bytes(range(256)), bytes(max(0, b"TCAGtcag".find(c)) % 4 for c in range(256))
+    )
+    # The byte for each group of four 2-bit codes (used if NumPy is not
+    # installed).
+    PACK_GROUPS = {
+        bytes(codes): (codes[0] << 6) | (codes[1] << 4) | (codes[2] << 2) | codes[3]
+        for codes in product(range(4), repeat=4)
+    }
+    N_BLOCKS = re.compile(r"[^ACGTacgt]+")
+    MASK_BLOCKS = re.compile(r"[a-z]+")
+
+    def __init__(self, count, filename=None):
+        super().__init__(count, filename)
+        self.names = []
+        self.offsets = []
+        self.spool = TemporaryFile()
+
+    def pack(self, sequence):
+        """
+        Pack a sequence, four bases per byte (with NumPy, if it is installed).
+
+        @param sequence: The C{str} sequence.
+        @return: The packed C{bytes}.
+        """
+        codes = sequence.encode("ascii").translate(self.PACK_TABLE)
+        np = _numpy()
+        if np is None:
+            return self.packGroups(codes)
+        codes = np.frombuffer(codes, dtype=np.uint8)
+        padding = -len(codes) % 4
+        if padding:
+            codes = np.concatenate((codes, np.zeros(padding, dtype=np.uint8)))
+        return (
+            (codes[0::4] << 6) | (codes[1::4] << 4) | (codes[2::4] << 2) | codes[3::4]
+        ).tobytes()
+
+    @classmethod
+    def packGroups(cls, codes):
+        """
+        Pack 2-bit codes, four per byte, without NumPy.
+
+        @param codes: The C{bytes} codes (each 0 to 3) of the bases.
+        @return: The packed C{bytes}.
+        """
+        codes += bytes(-len(codes) % 4)
+        groups = cls.PACK_GROUPS
+        return bytes([groups[codes[i : i + 4]] for i in range(0, len(codes), 4)])
+
+    @staticmethod
+    def blocks(regex, sequence):
+        """
+        Find blocks of a sequence matching a regular expression.
+
+        @param regex: A compiled regular expression.
+        @param sequence: The C{str} sequence.
+        @return: The C{bytes} block count, starts, and sizes for a record.
+        """
+        spans = [match.span() for match in regex.finditer(sequence)]
+        return struct.pack(
+            "<%dI" % (2 * len(spans) + 1),
+            len(spans),
+            *(start for start, _ in spans),
+            *(end - start for start, end in spans),
+        )
+
+    def format(self, read):
+        """
+        Spool a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @raise ValueError: If the read id is too long or the read is not a
+            nucleotide sequence.
+        @return: The empty C{bytes}, since nothing is written until all reads
+            have been given.
+        """
+        name = read.id.encode("utf-8")
+        if len(name) > 255:
+            raise ValueError(
+                "Sequence id %r is too long for the 2bit format (the maximum "
+                "length is 255 bytes)." % read.id
+            )
+        sequence = read.sequence
+        if not set(sequence) <= _DNA:
+            raise ValueError(
+                "Sequence %r cannot be written in the 2bit format because it "
+                "is not a nucleotide sequence." % read.id
+            )
+
+        self.written += 1
+        self.names.append(name)
+        spool = self.spool
+        self.offsets.append(spool.tell())
+        spool.write(struct.pack("<I", len(sequence)))
+        spool.write(self.blocks(self.N_BLOCKS, sequence))
+        spool.write(self.blocks(self.MASK_BLOCKS, sequence))
+        spool.write(struct.pack("<I", 0))
+        spool.write(self.pack(sequence))
+        return b""
+
+    def finish(self, fp):
+        """
+        Write the header and index, and copy the spooled records.
+
+        @param fp: An open (binary) file pointer for the destination.
+        """
+        names, offsets, spool = self.names, self.offsets, self.spool
+        indexSize = sum(len(name) + 5 for name in names)
+        if 16 + indexSize + spool.tell() < 2**32:
+            version, offsetFormat, start = 0, "<I", 16 + indexSize
+        else:
+            # Version 1 files have 64-bit offsets.
+            version, offsetFormat, start = 1, "<Q", 16 + indexSize + 4 * len(names)
+
+        fp.write(struct.pack("<4I", self.SIGNATURE, version, len(names), 0))
+        for name, offset in zip(names, offsets):
+            fp.write(struct.pack("B", len(name)) + name)
+            fp.write(struct.pack(offsetFormat, start + offset))
+
+        spool.seek(0)
+        copyfileobj(spool, fp)
+        spool.close()
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        The reads are assumed to have no ambiguous or lower-case bases (which
+        add N and mask blocks to their records).
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings (not
+            used).
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (not used).
+        @return: The estimated C{int} number of bytes.
+        """
+        if reads == 0:
+            return 0
+        size = 16 + 5 * reads + idBytes + 16 * reads + reads * ceil(bases / reads / 4)
+        # Version 1 files have 64-bit offsets.
+        return size if size < 2**32 else size + 4 * reads
+
+
+class _Chunks:
+    """
+    A minimal writable file object that collects what is written to it, so
+    Arrow IPC data can be returned in pieces (see L{ArrowWriter}).
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        """
+        Collect data.
+
+        @param data: A C{bytes}-like object.
+        @return: The C{int} number of bytes written.
+        """
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        """
+        Get the position in the stream.
+
+        @return: The C{int} number of bytes written.
+        """
+        return self.position
+
+    def flush(self):
+        """
+        Do nothing (there is nothing to flush).
+        """
+
+    def close(self):
+        """
+        Mark the file as closed.
+        """
+        self.closed = True
+
+    def take(self):
+        """
+        Get (and forget) everything written so far.
+
+        @return: The C{bytes} written since the last call.
+        """
+        result = b"".join(self.chunks)
+        self.chunks = []
+        return result
+
+
+class ArrowWriter(Writer):
+    """
+    Write reads as an Arrow IPC stream of record batches with C{id} and
+    C{sequence} columns.
+
+    Reads are collected into batches of at most C{BATCH_SIZE} reads (or
+    about C{BATCH_BYTES} bytes of sequence), each of which is written as soon
+    as it is full. The C{pyarrow} package must be installed.
+
+    @param count: The C{int} number of reads that will be written.
+    @param filename: The C{str} name of the destination file, or C{None} for
+        standard output.
+    @raise ValueError: If C{pyarrow} is not installed.
+    """
+
+    binary = True
+    resumable = False
+    BATCH_SIZE = 65536
+    BATCH_BYTES = 2**26
+
+    def __init__(self, count, filename=None):
+        super().__init__(count, filename)
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError(
+                "The pyarrow package must be installed to write the arrow format "
+                "(try 'pip install pyarrow')."
+            )
+        self.pa = pa
+        self.schema = pa.schema([("id", pa.string()), ("sequence", pa.large_string())])
+        self.sink = _Chunks()
+        self.ipcWriter = None
+        self.ids = []
+        self.sequences = []
+        self.batchBytes = 0
+
+    def flushBatch(self):
+        """
+        Write the current batch (if any).
+
+        @return: The C{bytes} of the IPC stream produced since the last call.
+        """
+        pa = self.pa
+        if self.ipcWriter is None:
+            self.ipcWriter = pa.ipc.new_stream(
+                pa.PythonFile(self.sink, mode="w"), self.schema
+            )
+        if self.ids:
+            self.ipcWriter.write_batch(
+                pa.record_batch(
+                    [
+                        pa.array(self.ids, pa.string()),
+                        pa.array(self.sequences, pa.large_string()),
+                    ],
+                    schema=self.schema,
+                )
+            )
+            self.ids = []
+            self.sequences = []
+            self.batchBytes = 0
+        return self.sink.take()
+
+    def format(self, read):
+        """
+        Add a read to the current batch.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @return: The C{bytes} to write to the destination (empty unless a
+            batch has been completed).
+        """
+        self.written += 1
+        self.ids.append(read.id)
+        self.sequences.append(read.sequence)
+        self.batchBytes += len(read)
+        if len(self.ids) >= self.BATCH_SIZE or self.batchBytes >= self.BATCH_BYTES:
+            return self.flushBatch()
+        else:
+            return b""
+
+    def finish(self, fp):
+        """
+        Write the last batch and the end of the stream.
+
+        @param fp: An open (binary) file pointer for the destination.
+        """
+        fp.write(self.flushBatch())
+        self.ipcWriter.close()
+        fp.write(self.sink.take())
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings (not
+            used).
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants (not used).
+        @return: The estimated C{int} number of bytes.
+        """
+        if reads == 0:
+            return 0
+        batches = max(ceil(reads / cls.BATCH_SIZE), ceil(bases / cls.BATCH_BYTES))
+        # The schema and end of stream marker take about 175 bytes, and the
+        # metadata of each batch about 245. Each read has a 4-byte id offset
+        # and an 8-byte sequence offset.
+        return 175 + 245 * batches + 12 * reads + idBytes + bases
+
+
+class VcfWriter(Writer):
+    """
+    Write the changes in mutant reads (see C{seqgen.read.Read.mutant}) as a
+    sites-only VCF file.
+
+    Each changed site of a mutant is written as a record whose CHROM is the
+    id of the sequence the mutant was made from (up to any whitespace), and
+    whose ID is the id of the mutant. Only the changes are written, so the
+    output is much smaller than a full copy of each mutant. Records are
+    written in the order the mutants are generated, so the output for more
+    than one mutant is not sorted by position.
+    """
+
+    HEADER = (
+        "##fileformat=VCFv4.2\n"
+        "##source=seqgen\n"
+        "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+    )
+
+    def format(self, read):
+        """
+        Format the changes in a read.
+
+        @param read: A C{seqgen.read.Read} instance.
+        @raise ValueError: If the read is not a mutant.
+        @return: A C{str} to write to the destination.
+        """
+        if read.parent is None:
+            raise ValueError(
+                "Sequence %r cannot be written in the VCF format because it is "
+                "not stored as a set of changes to another sequence (only "
+                "sequences given by 'from id' or 'ratchet' with a 'mutation "
+                "rate' are)." % read.id
+            )
+        self.written += 1
+        chrom = read.parent.id.split()[0]
+        id_ = read.id.split()[0]
+        reference = read.parent.sequence
+        result = "".join(
+            "%s\t%d\t%s\t%s\t%s\t.\t.\t.\n"
+            % (chrom, position + 1, id_, reference[position], base)
+            for position, base in zip(read.positions, read.bases)
+        )
+        if self.written == 1:
+            return self.HEADER + result
+        else:
+            return result
+
+    @classmethod
+    def estimateSize(cls, reads, idBytes, bases, quality=False, changes=0):
+        """
+        Estimate the number of bytes that will be written for some reads.
+
+        The ids of the reads and of the sequences they were made from are
+        taken to have the average id length, and positions to have as many
+        digits as the middle position of a read.
+
+        @param reads: The C{int} number of reads.
+        @param idBytes: The C{int} total length of the read ids.
+        @param bases: The C{int} total length of the reads.
+        @param quality: If C{True}, the reads have quality strings (not
+            used).
+        @param changes: The expected C{int} total number of changes held by
+            the reads that are mutants.
+        @return: The estimated C{int} number of bytes.
+        """
+        if reads == 0:
+            return 0
+        # Each record has two ids, a position, two bases, seven tabs, three
+        # dots, and a newline.
+        record = 2 * idBytes / reads + len(str(bases // reads // 2 + 1)) + 13
+        return len(cls.HEADER) + round(changes * record)
+
+
+class ThreadedWriter(Thread):
+    """
+    Write the output of a writer to a file in a separate thread.
+
+    Data passed to C{write} is queued and written by the thread. Calling
+    C{close} tells the thread that there is no more data. When
+    everything has been written, the thread calls the C{finish} method of
+    the writer and closes the file. Any exception raised in the thread is
+    stored in the C{error} attribute.
+
+    @param filename: The C{str} name of the file to write.
+    @param writer: A L{Writer} instance.
+    """
+
+    QUEUE_SIZE = 1024
+
+    def __init__(self, filename, writer):
+        super().__init__(daemon=True)
+        self.filename = filename
+        self.writer = writer
+        self.queue = Queue(self.QUEUE_SIZE)
+        self.closed = False
+        self.error = None
+
+    def run(self):
+        queue = self.queue
+        done = False
+        try:
+            with open(self.filename, "wb" if self.writer.binary else "w") as fp:
+                for data in iter(queue.get, None):
+                    fp.write(data)
+                done = True
+                self.writer.finish(fp)
+        except Exception as e:
+            self.error = e
+            if not done:
+                # Consume the rest of the queue so the producer is not blocked.
+                for _ in iter(queue.get, None):
+                    pass
+
+    def write(self, data):
+        """
+        Queue data to be written.
+
+        @param data: The C{str} (or C{bytes}, for a binary writer) to write.
+        """
+        if data:
+            self.queue.put(data)
+
+    def close(self):
+        """
+        Indicate that all data has been given. This may be called more than
+        once.
+        """
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+
+
+WRITERS = {
+    "2bit": TwoBitWriter,
+    "arrow": ArrowWriter,
+    "fasta": FastxWriter,
+    "fastq": FastxWriter,
+    "nexus": NexusWriter,
+    "npy": NpyWriter,
+    "phylip": PhylipWriter,
+    "phylip-interleaved": InterleavedPhylipWriter,
+    "vcf": VcfWriter,
+}
+
+FORMATS = sorted(WRITERS)
@@ -44,6 +44,15 @@ setup(
     ),
     long_description=("Please see https://github.com/acorg/seqgen for details."),
     license="MIT",
-    scripts=["bin/seq-gen.py", "bin/seq-gen-version.py"],
+    scripts=[
+        "bin/seq-gen.py",
+        "bin/seq-gen-partition.py",
+        "bin/seq-gen-version.py",
+    ],
     install_requires=["dark-matter>=1.1.28"],
+    extras_require={
+        "arrow": ["pyarrow"],
+        "numpy": ["numpy"],
+        "numba": ["numba", "numpy"],
+    },
 )
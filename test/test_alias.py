@@ -0,0 +1,71 @@
+import random
+from collections import Counter
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.alias import AliasTable
+
+
+class TestAliasTable(TestCase):
+    """
+    Test the AliasTable class.
+    """
+
+    def testNoWeights(self):
+        """
+        An alias table with no weights must raise a ValueError.
+        """
+        error = "^An alias table needs at least one weight\\.$"
+        assertRaisesRegex(self, ValueError, error, AliasTable, [])
+
+    def testNegativeWeight(self):
+        """
+        An alias table with a negative weight must raise a ValueError.
+        """
+        error = "^Alias table weights must not be negative\\.$"
+        assertRaisesRegex(self, ValueError, error, AliasTable, [1, -1])
+
+    def testZeroWeights(self):
+        """
+        An alias table whose weights are all zero must raise a ValueError.
+        """
+        error = "^Alias table weights must not all be zero\\.$"
+        assertRaisesRegex(self, ValueError, error, AliasTable, [0, 0])
+
+    def testOneWeight(self):
+        """
+        An alias table with one weight must always give that outcome.
+        """
+        self.assertEqual([0] * 10, AliasTable([3]).sample(random, 10))
+
+    def testZeroWeightNeverDrawn(self):
+        """
+        An outcome with a zero weight must never be drawn.
+        """
+        table = AliasTable([1, 0, 2])
+        self.assertNotIn(1, table.sample(random.Random(1), 10000))
+        self.assertNotEqual(1, table.draw(0.0))
+        self.assertNotEqual(1, table.draw(0.9999999))
+
+    def testProbabilities(self):
+        """
+        The columns of the table must give each outcome a probability in
+        proportion to its weight.
+        """
+        weights = [1, 2, 3, 4]
+        table = AliasTable(weights)
+        totals = [0.0] * len(weights)
+        for column in range(table.size):
+            probability = table.probabilities[column]
+            totals[column] += probability / table.size
+            totals[table.aliases[column]] += (1.0 - probability) / table.size
+        for total, weight in zip(totals, weights):
+            self.assertAlmostEqual(weight / sum(weights), total)
+
+    def testSample(self):
+        """
+        Sampled outcomes must have frequencies close to their probabilities.
+        """
+        counts = Counter(AliasTable([1, 3]).sample(random.Random(2), 40000))
+        self.assertAlmostEqual(0.25, counts[0] / 40000, places=2)
+        self.assertAlmostEqual(0.75, counts[1] / 40000, places=2)
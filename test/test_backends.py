@@ -0,0 +1,257 @@
+import random
+from unittest import TestCase, skipUnless
+from six import assertRaisesRegex
+
+from seqgen.backends import (
+    BACKENDS,
+    AutoBackend,
+    NumbaBackend,
+    NumpyBackend,
+    PythonBackend,
+    getBackend,
+)
+from seqgen.sequences import Sequences
+
+
+def available():
+    """
+    Get the backends whose dependencies are installed.
+
+    @return: A C{list} of backend instances.
+    """
+    result = []
+    for backendClass in BACKENDS.values():
+        try:
+            result.append(backendClass())
+        except ValueError:
+            pass
+    return result
+
+
+def installed(backendClass):
+    """
+    Find out if the dependencies of a backend are installed.
+
+    @param backendClass: A backend class.
+    @return: C{True} if the backend can be used.
+    """
+    try:
+        backendClass()
+    except ValueError:
+        return False
+    return True
+
+
+class TestGetBackend(TestCase):
+    """
+    Test the getBackend function.
+    """
+
+    def testUnknown(self):
+        """
+        An unknown backend name must raise a ValueError.
+        """
+        error = "^Unknown backend 'xxx'\\. Use one of: auto, numba, numpy, python\\.$"
+        assertRaisesRegex(self, ValueError, error, getBackend, "xxx")
+
+    def testPython(self):
+        """
+        The python backend must be available.
+        """
+        self.assertIsInstance(getBackend("python"), PythonBackend)
+
+    def testAuto(self):
+        """
+        The automatic choice must use the first backend that is installed.
+        """
+        self.assertIsInstance(getBackend(), AutoBackend)
+        self.assertIsInstance(getBackend("auto"), AutoBackend)
+        self.assertEqual(available()[0].name, getBackend().fast.name)
+
+    def testAutoIsLazy(self):
+        """
+        The automatic choice must not choose a backend (and so import its
+        dependencies) until it is given a long sequence.
+        """
+        backend = getBackend()
+        rng = random.Random(1)
+        sequence = backend.randomSequence(rng, "ACGT", 10)
+        backend.mutations(rng, sequence, 0.5, "ACGT")
+        backend.sites(rng, 10, 0.5)
+        backend.recombinants(rng, AutoBackend.MIN_BATCH - 1, 10, 2, rate=0.5)
+        self.assertIsNone(backend._fast)
+        backend.randomSequence(rng, "ACGT", AutoBackend.MIN_LENGTH)
+        self.assertIsNotNone(backend._fast)
+
+    def testSequencesUnknown(self):
+        """
+        Passing an unknown backend name to Sequences must raise a ValueError.
+        """
+        error = "^Unknown backend 'xxx'\\."
+        assertRaisesRegex(self, ValueError, error, Sequences, [{}], backend="xxx")
+
+
+class TestPythonBackend(TestCase):
+    """
+    Test the PythonBackend class.
+    """
+
+    def testRandomSequence(self):
+        """
+        A random sequence must have the wanted length and letters.
+        """
+        sequence = PythonBackend().randomSequence(random.Random(1), "AC", 100)
+        self.assertEqual(100, len(sequence))
+        self.assertEqual({"A", "C"}, set(sequence))
+
+    def testMutations(self):
+        """
+        Mutations must change each site they give to another letter.
+        """
+        sequence = "ACGT" * 50
+        positions, bases = PythonBackend().mutations(
+            random.Random(2), sequence, 0.5, "ACGT"
+        )
+        self.assertEqual(sorted(positions), positions)
+        self.assertEqual(len(positions), len(bases))
+        for position, base in zip(positions, bases):
+            self.assertNotEqual(sequence[position], base)
+
+    def testMutationsOtherLetter(self):
+        """
+        A site whose letter is not in the alphabet must be changed to a
+        letter of the alphabet.
+        """
+        positions, bases = PythonBackend().mutations(random.Random(3), "N", 1.0, "A")
+        self.assertEqual(([0], "A"), (positions, bases))
+
+    def testRecombinants(self):
+        """
+        Recombinants must have the wanted number of different breakpoints,
+        in order, and a parent for each part that differs from the parent of
+        the part before it.
+        """
+        result = PythonBackend().recombinants(random.Random(4), 20, 10, 3, 4)
+        self.assertEqual(20, len(result))
+        for breakpoints, choices in result:
+            self.assertEqual(4, len(set(breakpoints)))
+            self.assertEqual(sorted(breakpoints), breakpoints)
+            self.assertTrue(all(1 <= site <= 9 for site in breakpoints))
+            self.assertEqual(5, len(choices))
+            self.assertTrue(all(0 <= choice < 3 for choice in choices))
+            self.assertTrue(all(a != b for a, b in zip(choices, choices[1:])))
+
+    def testRecombinantsRate(self):
+        """
+        The mean number of breakpoints of recombinants made with a breakpoint
+        rate must be close to the rate times the number of sites.
+        """
+        result = PythonBackend().recombinants(random.Random(5), 1000, 201, 2, rate=0.1)
+        mean = sum(len(breakpoints) for breakpoints, _ in result) / 1000
+        self.assertAlmostEqual(20.0, mean, delta=0.5)
+
+    def testRecombinantsAllSites(self):
+        """
+        Recombinants made with a breakpoint rate of 1.0 must have a
+        breakpoint at every site.
+        """
+        result = PythonBackend().recombinants(random.Random(6), 2, 5, 2, rate=1.0)
+        self.assertEqual([[1, 2, 3, 4]] * 2, [breakpoints for breakpoints, _ in result])
+
+    def testReverseComplement(self):
+        """
+        A sequence must be reverse complemented.
+        """
+        self.assertEqual("NACGTt", PythonBackend().reverseComplement("aACGTN"))
+
+    def testSliceAndConcatenate(self):
+        """
+        Parts of sequences must be sliced and joined.
+        """
+        backend = PythonBackend()
+        self.assertEqual("CG", backend.slice("ACGT", 1, 2))
+        self.assertEqual("AC", backend.slice("AC", 0, 5))
+        self.assertEqual("ACGT", backend.concatenate(["A", "", "CGT"]))
+
+
+class TestAgainstPython(TestCase):
+    """
+    Check the other backends against the pure Python backend.
+    """
+
+    def check(self, backend):
+        """
+        Check that a backend gives the same results as the Python backend,
+        for short and long sequences, and leaves the random number generator
+        in the same state.
+
+        @param backend: A backend instance.
+        """
+        python = PythonBackend()
+        for length in 10, 5000:
+            for letters in "ACGT", "ACDEFGHIKLMNPQRSTVWY", ["A", "C"]:
+                results = []
+                for each in python, backend:
+                    rng = random.Random(length)
+                    sequence = each.randomSequence(rng, letters, length)
+                    results.append(
+                        (
+                            sequence,
+                            each.mutations(rng, sequence, 0.1, letters),
+                            each.mutations(rng, sequence + "N", 1.0, letters),
+                            each.sites(rng, length, 0.3),
+                            each.recombinants(rng, 150, length, 3, 2),
+                            each.recombinants(rng, 150, length, 4, rate=0.2),
+                            each.recombinants(rng, 3, length, 2, rate=1.0),
+                            each.reverseComplement(sequence),
+                            rng.random(),
+                        )
+                    )
+                self.assertEqual(results[0], results[1])
+
+    @skipUnless(installed(NumpyBackend), "NumPy is not installed")
+    def testNumpy(self):
+        """
+        The NumPy backend must give the same results as the Python backend.
+        """
+        self.check(NumpyBackend())
+
+    def testAuto(self):
+        """
+        The automatic backend must give the same results as the Python
+        backend.
+        """
+        self.check(AutoBackend())
+
+    @skipUnless(installed(NumbaBackend), "Numba is not installed")
+    def testNumba(self):
+        """
+        The Numba backend must give the same results as the Python backend.
+        """
+        self.check(NumbaBackend())
+
+    def testSequences(self):
+        """
+        All installed backends must give the same sequences for a seeded
+        specification.
+        """
+        spec = [
+            {"id": "a", "length": 3000},
+            {"from id": "a", "count": 3, "mutation rate": 0.05, "rc": True},
+            {"count": 2, "length": 2000, "random aa": True, "mutation rate": 0.1},
+            {
+                "sections": [
+                    {"from id": "a", "start": 10, "length": 1500},
+                    {"length": 1200, "gc content": 0.7, "mutation rate": 0.2},
+                ]
+            },
+        ]
+        results = [
+            [
+                (read.id, read.sequence)
+                for read in Sequences(spec, seed=4, backend=backend.name)
+            ]
+            for backend in available()
+        ]
+        for result in results[1:]:
+            self.assertEqual(results[0], result)
@@ -0,0 +1,292 @@
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.cache import ReadCache
+from seqgen.read import Read
+from seqgen.sequences import Sequences
+from seqgen.writers import FORMATS
+
+
+class CountingSequences(Sequences):
+    """
+    A L{Sequences} subclass that records the specifications whose reads are
+    generated (and not taken from the cache).
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.generated = []
+        super().__init__(*args, **kwargs)
+
+    def _newReadsForSpec(self, spec, *args, **kwargs):
+        self.generated.append(spec.get("id", spec.get("id prefix")))
+        return super()._newReadsForSpec(spec, *args, **kwargs)
+
+
+def output(sequences):
+    """
+    Get the output of a L{Sequences} instance.
+
+    @param sequences: A L{Sequences} instance.
+    @return: The C{str} output.
+    """
+    fp = StringIO()
+    sequences.write(fp)
+    return fp.getvalue()
+
+
+class TestReadCache(TestCase):
+    """
+    Test the ReadCache class.
+    """
+
+    def testMissing(self):
+        """
+        Loading an entry that does not exist must return C{None}.
+        """
+        with TemporaryDirectory() as tempdir:
+            self.assertIsNone(ReadCache(tempdir).load("key", {}))
+
+    def testSaveAndLoad(self):
+        """
+        Reads added to an entry (including mutants) must be loaded.
+        """
+        parent = Read("p", "ACGTACGT", alphabet="ACGT")
+        mutant = Read.mutant(parent, [1, 5], "TA")
+        mutant.id, mutant.quality = "m", "!!!!!!!!"
+        with TemporaryDirectory() as tempdir:
+            cache = ReadCache(tempdir)
+            writer = cache.writer("key")
+            writer.add(parent)
+            writer.add(mutant)
+            writer.commit()
+            reads = list(cache.load("key", {"p": parent}))
+            self.assertEqual(
+                [("p", "ACGTACGT", None), ("m", "ATGTAAGT", "!!!!!!!!")],
+                [(read.id, read.sequence, read.quality) for read in reads],
+            )
+            self.assertIs(parent, reads[1].parent)
+
+    def testAbort(self):
+        """
+        An aborted entry must not be saved.
+        """
+        with TemporaryDirectory() as tempdir:
+            cache = ReadCache(tempdir)
+            writer = cache.writer("key")
+            writer.add(Read("a", "A"))
+            writer.abort()
+            self.assertIsNone(cache.load("key", {}))
+            self.assertEqual([], os.listdir(tempdir))
+
+    def testEvict(self):
+        """
+        When the cache is too big, the least recently used entries must be
+        removed.
+        """
+        with TemporaryDirectory() as tempdir:
+            cache = ReadCache(tempdir, maxBytes=10**6)
+            for key in "abc":
+                writer = cache.writer(key)
+                writer.add(Read(key, "A" * 1000))
+                writer.commit()
+                os.utime(cache.filename(key), ns=(0, "abc".index(key) * 10**9))
+            # Use a (making it the most recently used), then shrink the cache.
+            list(cache.load("a", {}))
+            cache.maxBytes = 2 * os.path.getsize(cache.filename("a"))
+            cache.evict()
+            self.assertIsNone(cache.load("b", {}))
+            self.assertIsNotNone(cache.load("a", {}))
+            self.assertIsNotNone(cache.load("c", {}))
+
+
+class TestSeed(TestCase):
+    """
+    Test giving a seed to Sequences.
+    """
+
+    SPEC = [
+        {"id": "a", "length": 50},
+        {"id": "b", "length": 50},
+        {"id prefix": "c-", "from id": "a", "count": 3, "mutation rate": 0.1},
+    ]
+
+    def testSameSeed(self):
+        """
+        The same seed must give the same reads.
+        """
+        self.assertEqual(
+            output(Sequences(self.SPEC, seed=3)), output(Sequences(self.SPEC, seed=3))
+        )
+
+    def testDifferentSeed(self):
+        """
+        Different seeds must give different reads.
+        """
+        self.assertNotEqual(
+            output(Sequences(self.SPEC, seed=3)), output(Sequences(self.SPEC, seed=4))
+        )
+
+    def testUnrelatedSpecificationChanged(self):
+        """
+        Changing a specification must not change the reads of specifications
+        that do not depend on it.
+        """
+        changed = [dict(spec) for spec in self.SPEC]
+        changed[1]["length"] = 60
+        original = {read.id: read.sequence for read in Sequences(self.SPEC, seed=3)}
+        new = {read.id: read.sequence for read in Sequences(changed, seed=3)}
+        self.assertEqual(original["a"], new["a"])
+        self.assertNotEqual(original["b"], new["b"])
+        for id_ in "c-1", "c-2", "c-3":
+            self.assertEqual(original[id_], new[id_])
+
+    def testSameSeedAllFormats(self):
+        """
+        The same seed must give the same reads whatever the output format
+        and quality.
+        """
+        expected = [(read.id, read.sequence) for read in Sequences(self.SPEC, seed=3)]
+        for format_ in FORMATS:
+            if format_ == "vcf":
+                # Only the mutants can be written in the VCF format.
+                specs = [self.SPEC[:2] + [dict(self.SPEC[2], format=format_)]]
+                _format = "fasta"
+            else:
+                specs = [
+                    self.SPEC,
+                    [dict(spec, format=format_) for spec in self.SPEC],
+                ]
+                _format = format_
+            for spec in specs:
+                reads = Sequences(spec, seed=3, _format=_format, defaultQuality=10)
+                self.assertEqual(
+                    expected, [(read.id, read.sequence) for read in reads], format_
+                )
+
+    def testOutputSpecificationChanged(self):
+        """
+        Changing where a specification's reads are written must not change
+        its reads.
+        """
+        with TemporaryDirectory() as tempdir:
+            changed = [dict(spec) for spec in self.SPEC]
+            changed[0]["filename"] = os.path.join(tempdir, "a.fasta")
+            original = [read.sequence for read in Sequences(self.SPEC, seed=3)]
+            new = [read.sequence for read in Sequences(changed, seed=3)]
+            self.assertEqual(original, new)
+
+
+class TestSequencesCache(TestCase):
+    """
+    Test using a cache with Sequences.
+    """
+
+    SPEC = [
+        {"id": "a", "length": 50},
+        {"id": "b", "length": 50},
+        {"id prefix": "c-", "from id": "a", "count": 3, "mutation rate": 0.1},
+        {"id prefix": "d-", "count": 3, "mutation rate": 0.1, "ratchet": True},
+    ]
+
+    def testNoSeed(self):
+        """
+        A cache without a seed must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = "^A seed must be given to use a cache\\.$"
+            assertRaisesRegex(self, ValueError, error, Sequences, [{}], cache=tempdir)
+
+    def testReuse(self):
+        """
+        Cached reads must be reused, giving the same output as generating
+        them.
+        """
+        with TemporaryDirectory() as tempdir:
+            expected = output(Sequences(self.SPEC, seed=1))
+            first = CountingSequences(self.SPEC, seed=1, cache=tempdir)
+            self.assertEqual(expected, output(first))
+            self.assertEqual(["a", "b", "c-", "d-"], first.generated)
+            second = CountingSequences(self.SPEC, seed=1, cache=tempdir)
+            self.assertEqual(expected, output(second))
+            self.assertEqual([], second.generated)
+
+    def testQuality(self):
+        """
+        Reads cached for one format must not be reused with the qualities of
+        another.
+        """
+        with TemporaryDirectory() as tempdir:
+            expected = output(Sequences(self.SPEC, seed=1, _format="fastq"))
+            output(Sequences(self.SPEC, seed=1, cache=tempdir))
+            output(
+                Sequences(
+                    self.SPEC, seed=1, cache=tempdir, defaultQuality=10, _format="fastq"
+                )
+            )
+            self.assertEqual(
+                expected,
+                output(Sequences(self.SPEC, seed=1, cache=tempdir, _format="fastq")),
+            )
+
+    def testChangeRegeneratesDependents(self):
+        """
+        When a specification changes, it and the specifications that depend on
+        it must be generated again, and the others taken from the cache.
+        """
+        with TemporaryDirectory() as tempdir:
+            output(Sequences(self.SPEC, seed=1, cache=tempdir))
+            changed = [dict(spec) for spec in self.SPEC]
+            changed[0]["length"] = 40
+            s = CountingSequences(changed, seed=1, cache=tempdir)
+            self.assertEqual(output(Sequences(changed, seed=1)), output(s))
+            self.assertEqual(["a", "c-"], s.generated)
+
+    def testPrefixNumbersChange(self):
+        """
+        When the numbers of the ids made from an id prefix change, the reads
+        must be generated again.
+        """
+        with TemporaryDirectory() as tempdir:
+            spec = [{"count": 2, "length": 5}, {"count": 2, "length": 5}]
+            output(Sequences(spec, seed=1, cache=tempdir))
+            changed = [{"count": 3, "length": 5}, {"count": 2, "length": 5}]
+            s = CountingSequences(changed, seed=1, cache=tempdir)
+            self.assertEqual(output(Sequences(changed, seed=1)), output(s))
+            self.assertEqual(2, len(s.generated))
+
+    def testInterruptedNotCached(self):
+        """
+        If the reads of a specification are not all generated, they must not
+        be cached.
+        """
+        with TemporaryDirectory() as tempdir:
+            reads = iter(Sequences([{"count": 3}], seed=1, cache=tempdir))
+            next(reads)
+            reads.close()
+            self.assertEqual([], os.listdir(tempdir))
+
+    def testUniqueGroup(self):
+        """
+        Reads of a 'unique' group that are generated must not duplicate those
+        of the group that are taken from the cache, and a change to one
+        specification in a group must regenerate the later ones.
+        """
+        with TemporaryDirectory() as tempdir:
+            spec = [
+                {"id prefix": "a-", "count": 10, "length": 2, "unique": "g"},
+                {"id prefix": "b-", "count": 6, "length": 2, "unique": "g"},
+            ]
+            output(Sequences(spec, seed=1, cache=tempdir))
+            changed = [dict(spec[0]), dict(spec[1], count=5)]
+            s = CountingSequences(changed, seed=1, cache=tempdir)
+            reads = list(s)
+            self.assertEqual(["b-"], s.generated)
+            self.assertEqual(15, len(set(read.sequence for read in reads)))
+
+            changed = [dict(spec[0], count=9), dict(spec[1])]
+            s = CountingSequences(changed, seed=1, cache=tempdir)
+            list(s)
+            self.assertEqual(["a-", "b-"], s.generated)
@@ -0,0 +1,384 @@
+import os
+import random
+from tempfile import TemporaryDirectory, gettempdir
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.checkpoint import Checkpointer
+from seqgen.sequences import Sequences
+
+
+class Interrupted(Exception):
+    """
+    Raised to simulate a run being killed.
+    """
+
+
+class InterruptedSequences(Sequences):
+    """
+    A L{Sequences} subclass that stops writing after a given number of reads.
+
+    @param stopAfter: The C{int} number of reads after which to stop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.stopAfter = kwargs.pop("stopAfter")
+        super().__init__(*args, **kwargs)
+
+    def _readsForSpec(self, *args, **kwargs):
+        for result in super()._readsForSpec(*args, **kwargs):
+            if self.stopAfter == 0:
+                raise Interrupted()
+            self.stopAfter -= 1
+            yield result
+
+
+class TestCheckpointer(TestCase):
+    """
+    Test the Checkpointer class.
+    """
+
+    def testSaveAndLoad(self):
+        """
+        A saved state must be returned by load.
+        """
+        with TemporaryDirectory() as tempdir:
+            checkpointer = Checkpointer(os.path.join(tempdir, "checkpoint"))
+            checkpointer.save({"read": 3})
+            self.assertEqual({"read": 3}, checkpointer.load())
+
+    def testLoadMissing(self):
+        """
+        Loading a checkpoint that does not exist must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            checkpointer = Checkpointer(os.path.join(tempdir, "checkpoint"))
+            error = "^Checkpoint file .* does not exist, so the run cannot be resumed"
+            assertRaisesRegex(self, ValueError, error, checkpointer.load)
+
+    def testDue(self):
+        """
+        A checkpoint must be due immediately if the interval is zero, and not
+        if the interval is long.
+        """
+        self.assertTrue(Checkpointer("x", 0).due())
+        self.assertFalse(Checkpointer("x", 3600).due())
+
+    def testTruncate(self):
+        """
+        Output files must be truncated to their sizes at the checkpoint.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "out")
+            with open(filename, "w") as fp:
+                fp.write("0123456789")
+            Checkpointer.truncate({filename: 4})
+            with open(filename) as fp:
+                self.assertEqual("0123", fp.read())
+
+    def testTruncateShortFile(self):
+        """
+        Truncating a file that is shorter than its size at the checkpoint
+        must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "out")
+            with open(filename, "w") as fp:
+                fp.write("01")
+            error = "^Output file .* is missing or is shorter than it was"
+            assertRaisesRegex(
+                self, ValueError, error, Checkpointer.truncate, {filename: 4}
+            )
+
+
+class TestResume(TestCase):
+    """
+    Test checkpointing and resuming a run.
+    """
+
+    def outputs(self, tempdir):
+        """
+        Get the contents of the output files in a directory.
+
+        @param tempdir: The C{str} directory name.
+        @return: A C{dict} mapping C{str} filenames to C{bytes} contents.
+        """
+        result = {}
+        for filename in os.listdir(tempdir):
+            if filename != "checkpoint":
+                with open(os.path.join(tempdir, filename), "rb") as fp:
+                    result[filename] = fp.read()
+        return result
+
+    def check(self, spec, stopAfter, **kwargs):
+        """
+        Check that a run that is interrupted and then resumed produces the
+        same output as an uninterrupted run.
+
+        @param spec: A function that, given a C{str} directory, returns a
+            C{list} specification that writes files there.
+        @param stopAfter: The C{int} number of reads after which to interrupt
+            the run.
+        @param kwargs: Keyword arguments for L{Sequences}.
+        """
+        with TemporaryDirectory() as tempdir:
+            random.seed(1)
+            Sequences(spec(tempdir), **kwargs).write()
+            expected = self.outputs(tempdir)
+
+        with TemporaryDirectory() as tempdir:
+            checkpoint = os.path.join(tempdir, "checkpoint")
+            random.seed(1)
+            s = InterruptedSequences(spec(tempdir), stopAfter=stopAfter, **kwargs)
+            self.assertRaises(
+                Interrupted, s.write, checkpoint=checkpoint, checkpointInterval=0
+            )
+            # Add some output written after the checkpoint was saved.
+            for filename in os.listdir(tempdir):
+                if filename != "checkpoint":
+                    with open(os.path.join(tempdir, filename), "ab") as fp:
+                        fp.write(b"partial")
+            # Generate some other random numbers, which must be ignored.
+            random.seed(2)
+            Sequences(spec(tempdir), **kwargs).write(checkpoint=checkpoint, resume=True)
+            self.assertEqual(expected, self.outputs(tempdir))
+            self.assertFalse(os.path.exists(checkpoint))
+
+    def testFasta(self):
+        """
+        Resuming a run that writes FASTA must give the same output as an
+        uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {
+                    "count": 10,
+                    "length": 20,
+                    "filename": os.path.join(tempdir, "out.fasta"),
+                }
+            ],
+            4,
+        )
+
+    def testRatchetAndFromId(self):
+        """
+        Resuming a run with a ratchet and reads made from an earlier read
+        (whose spec was finished before the checkpoint) must give the same
+        output as an uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {
+                    "id": "a",
+                    "length": 50,
+                    "filename": os.path.join(tempdir, "a.fasta"),
+                },
+                {
+                    "from id": "a",
+                    "count": 6,
+                    "mutation rate": 0.1,
+                    "ratchet": True,
+                    "filename": os.path.join(tempdir, "b.fasta"),
+                },
+            ],
+            3,
+        )
+
+    def testUnique(self):
+        """
+        Resuming a run whose reads must be unique must give the same output as
+        an uninterrupted run, with no read duplicating one written before the
+        checkpoint.
+        """
+        self.check(
+            lambda tempdir: [
+                {
+                    "count": 16,
+                    "length": 2,
+                    "unique": True,
+                    "filename": os.path.join(tempdir, "out.fasta"),
+                }
+            ],
+            8,
+        )
+
+    def testMinDistance(self):
+        """
+        Resuming a run whose reads must be a minimum distance apart must give
+        the same output as an uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {
+                    "count": 20,
+                    "length": 8,
+                    "min distance": 3,
+                    "filename": os.path.join(tempdir, "out.fasta"),
+                }
+            ],
+            10,
+        )
+
+    def testStore(self):
+        """
+        Resuming a run that keeps referenced reads in a store must give the
+        same output as an uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {"id prefix": "p-", "count": 10, "length": 20, "skip": True},
+                {
+                    "parent prefix": "p-",
+                    "count": 10,
+                    "filename": os.path.join(tempdir, "out.fasta"),
+                },
+            ],
+            4,
+            seed=1,
+            store=gettempdir(),
+            storeMemory=0,
+        )
+
+    def testRecombinants(self):
+        """
+        Resuming a run whose checkpoint was saved part way through a batch of
+        recombinant breakpoints and parents must give the same output as an
+        uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {"id prefix": "p-", "count": 5, "length": 40, "skip": True},
+                {
+                    "parent prefix": "p-",
+                    "count": 12,
+                    "breakpoint rate": 0.1,
+                    "filename": os.path.join(tempdir, "out.fasta"),
+                },
+            ],
+            5,
+        )
+
+    def testMultipleFilesAndFormats(self):
+        """
+        Resuming a run that writes several files, in several formats, must
+        give the same output as an uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {
+                    "count": 3,
+                    "length": 10,
+                    "filename": os.path.join(tempdir, "a.phy"),
+                    "format": "phylip",
+                },
+                {
+                    "count": 4,
+                    "length": 10,
+                    "filename": os.path.join(tempdir, "b.npy"),
+                    "format": "npy",
+                },
+                {
+                    "count": 3,
+                    "length": 10,
+                    "filename": os.path.join(tempdir, "a.phy"),
+                    "format": "phylip",
+                },
+            ],
+            5,
+        )
+
+    def testShards(self):
+        """
+        Resuming a run that writes shards must give the same output as an
+        uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {
+                    "count": 7,
+                    "length": 10,
+                    "filename": os.path.join(tempdir, "out-{shard}.fasta"),
+                    "shards": 3,
+                }
+            ],
+            4,
+        )
+
+    def testResumeWithoutCheckpoint(self):
+        """
+        Resuming without a checkpoint filename must raise a ValueError.
+        """
+        error = "^A checkpoint file must be given to resume a run\\.$"
+        assertRaisesRegex(self, ValueError, error, Sequences([{}]).write, resume=True)
+
+    def testStandardOutput(self):
+        """
+        Checkpointing a run that writes to standard output must raise a
+        ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = "^To checkpoint a run, all sequences must be written to files"
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Sequences([{}]).write,
+                checkpoint=os.path.join(tempdir, "checkpoint"),
+            )
+
+    def testUnresumableFormat(self):
+        """
+        Checkpointing a run that writes a format that cannot be resumed must
+        raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "out.2bit")
+            error = "^Output file .* has format 2bit, which cannot be used when "
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Sequences([{"filename": filename, "format": "2bit"}]).write,
+                checkpoint=os.path.join(tempdir, "checkpoint"),
+            )
+
+    def testDifferentSpecification(self):
+        """
+        Resuming with a different specification must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            checkpoint = os.path.join(tempdir, "checkpoint")
+            filename = os.path.join(tempdir, "out.fasta")
+            s = InterruptedSequences([{"count": 5, "filename": filename}], stopAfter=2)
+            self.assertRaises(
+                Interrupted, s.write, checkpoint=checkpoint, checkpointInterval=0
+            )
+            error = "^The checkpoint in .* was made for a different specification"
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Sequences([{"count": 6, "filename": filename}]).write,
+                checkpoint=checkpoint,
+                resume=True,
+            )
+
+    def testSeed(self):
+        """
+        Resuming a run that was given a seed must give the same output as an
+        uninterrupted run.
+        """
+        self.check(
+            lambda tempdir: [
+                {"count": 4, "length": 20, "filename": os.path.join(tempdir, "a")},
+                {
+                    "count": 5,
+                    "length": 20,
+                    "mutation rate": 0.1,
+                    "ratchet": True,
+                    "filename": os.path.join(tempdir, "b"),
+                },
+            ],
+            6,
+            seed=9,
+        )
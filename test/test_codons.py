@@ -0,0 +1,384 @@
+import random
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.codons import (
+    CODONS,
+    GENETIC_CODE,
+    SENSE_CODONS,
+    STOP_CODONS,
+    CodonModel,
+    translate,
+)
+from seqgen.sequences import Sequences
+
+
+class TestTranslate(TestCase):
+    """
+    Test the translate function.
+    """
+
+    def testGeneticCode(self):
+        """
+        The genetic code must have 64 codons, three of them stops.
+        """
+        self.assertEqual(64, len(GENETIC_CODE))
+        self.assertEqual(("TAA", "TAG", "TGA"), STOP_CODONS)
+        self.assertEqual(61, len(SENSE_CODONS))
+        self.assertEqual("M", GENETIC_CODE["ATG"])
+        self.assertEqual("W", GENETIC_CODE["TGG"])
+
+    def testTranslate(self):
+        """
+        A sequence must be translated, ignoring an incomplete final codon.
+        """
+        self.assertEqual("MKW*", translate("ATGAAATGGTAAGC"))
+
+    def testLowerCase(self):
+        """
+        Lower case codons must be translated.
+        """
+        self.assertEqual("MF", translate("atgttt"))
+
+    def testAmbiguous(self):
+        """
+        A codon with a letter other than A, C, G or T must be translated as X.
+        """
+        self.assertEqual("MXF", translate("ATGANATTT"))
+
+
+class TestCodonModel(TestCase):
+    """
+    Test the CodonModel class.
+    """
+
+    def testNotACodon(self):
+        """
+        A usage key that is not a codon must raise a ValueError.
+        """
+        error = "^Codon usage key 'AT' is not a codon\\.$"
+        assertRaisesRegex(self, ValueError, error, CodonModel, {"AT": 1})
+
+    def testNegativeWeight(self):
+        """
+        A negative usage weight must raise a ValueError.
+        """
+        error = "^Codon usage weight for 'ATG' \\(-1\\) is negative\\.$"
+        assertRaisesRegex(self, ValueError, error, CodonModel, {"ATG": -1})
+
+    def testOnlyStops(self):
+        """
+        Usage that gives no sense codon a positive weight must raise a
+        ValueError.
+        """
+        error = "^Codon usage must give a sense codon a positive weight\\.$"
+        assertRaisesRegex(self, ValueError, error, CodonModel, {"TAA": 1})
+
+    def testORF(self):
+        """
+        An open reading frame must start with ATG, end with a stop codon, and
+        have no stop codons in between.
+        """
+        orf = CodonModel().orf(random.Random(1), 300)
+        self.assertEqual(300, len(orf))
+        protein = translate(orf)
+        self.assertTrue(orf.startswith("ATG"))
+        self.assertEqual("*", protein[-1])
+        self.assertNotIn("*", protein[:-1])
+
+    def testUsage(self):
+        """
+        Only codons with a positive weight must be used.
+        """
+        orf = CodonModel({"GCC": 1, "TGA": 1}).orf(random.Random(1), 30)
+        self.assertEqual("ATG" + "GCC" * 8 + "TGA", orf)
+
+    def testNoMutations(self):
+        """
+        Rates of zero must not change anything.
+        """
+        model = CodonModel()
+        orf = model.orf(random.Random(1), 90)
+        self.assertEqual(([], ""), model.mutations(random.Random(2), orf, 0.0, 0.0))
+
+    def testSynonymous(self):
+        """
+        Synonymous changes must not change the protein or the start and stop
+        codons.
+        """
+        model = CodonModel()
+        orf = model.orf(random.Random(1), 600)
+        positions, bases = model.mutations(random.Random(2), orf, 1.0, 0.0)
+        self.assertTrue(positions)
+        sequence = list(orf)
+        for position, base in zip(positions, bases):
+            sequence[position] = base
+        mutant = "".join(sequence)
+        self.assertNotEqual(orf, mutant)
+        self.assertEqual(translate(orf), translate(mutant))
+        self.assertEqual(orf[:3], mutant[:3])
+        self.assertEqual(orf[-3:], mutant[-3:])
+
+    def testNonSynonymous(self):
+        """
+        Non-synonymous changes must change every amino acid (except the first
+        and the stop) and must not make stop codons.
+        """
+        model = CodonModel()
+        orf = model.orf(random.Random(1), 300)
+        positions, bases = model.mutations(random.Random(2), orf, 0.0, 1.0)
+        sequence = list(orf)
+        for position, base in zip(positions, bases):
+            sequence[position] = base
+        before, after = translate(orf), translate("".join(sequence))
+        self.assertEqual(before[0], after[0])
+        self.assertEqual("*", after[-1])
+        self.assertNotIn("*", after[:-1])
+        for original, changed in zip(before[1:-1], after[1:-1]):
+            self.assertNotEqual(original, changed)
+
+    def testSiteOrder(self):
+        """
+        The changed sites must be in increasing order.
+        """
+        model = CodonModel()
+        orf = model.orf(random.Random(1), 300)
+        positions, _ = model.mutations(random.Random(2), orf, 0.3, 0.3)
+        self.assertEqual(sorted(positions), positions)
+
+    def testAllCodonsHaveNonSynonymousTable(self):
+        """
+        Every sense codon must have a table of non-synonymous changes.
+        """
+        model = CodonModel()
+        for codon in CODONS:
+            if codon in SENSE_CODONS:
+                self.assertIsNotNone(model._nonSynonymous[CODONS.index(codon)])
+
+
+class TestSequencesCoding(TestCase):
+    """
+    Test coding specifications in Sequences.
+    """
+
+    def testORF(self):
+        """
+        A coding specification must make an open reading frame.
+        """
+        (read,) = list(Sequences([{"coding": True, "length": 90}], seed=1))
+        self.assertEqual(90, len(read.sequence))
+        protein = translate(read.sequence)
+        self.assertEqual("M", protein[0])
+        self.assertEqual("*", protein[-1])
+        self.assertNotIn("*", protein[:-1])
+
+    def testCodonUsage(self):
+        """
+        A coding specification must use its codon usage.
+        """
+        (read,) = list(
+            Sequences(
+                [
+                    {
+                        "coding": True,
+                        "length": 12,
+                        "codon usage": {"CTG": 1, "TAG": 1},
+                    }
+                ]
+            )
+        )
+        self.assertEqual("ATGCTGCTGTAG", read.sequence)
+
+    def testSynonymousFromId(self):
+        """
+        Synonymous changes to reads made from another read must not change
+        the protein.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id": "orf", "coding": True, "length": 300},
+                    {
+                        "from id": "orf",
+                        "count": 5,
+                        "coding": True,
+                        "synonymous rate": 0.5,
+                    },
+                ],
+                seed=2,
+            )
+        )
+        protein = translate(reads[0].sequence)
+        for read in reads[1:]:
+            self.assertNotEqual(reads[0].sequence, read.sequence)
+            self.assertEqual(protein, translate(read.sequence))
+
+    def testTranslate(self):
+        """
+        A translated specification must give the protein of its read.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id": "orf", "coding": True, "length": 60},
+                    {"id": "protein", "from id": "orf", "translate": True},
+                ],
+                seed=3,
+            )
+        )
+        self.assertEqual("protein", reads[1].id)
+        self.assertEqual(translate(reads[0].sequence), reads[1].sequence)
+        self.assertEqual(20, len(reads[1].sequence))
+
+    def testSeeded(self):
+        """
+        Coding reads must be the same when the same seed is given.
+        """
+        spec = [{"coding": True, "length": 60, "non-synonymous rate": 0.2}]
+        self.assertEqual(
+            [read.sequence for read in Sequences(spec, seed=4)],
+            [read.sequence for read in Sequences(spec, seed=4)],
+        )
+
+    def testRatchet(self):
+        """
+        A ratchet may be given codon rates instead of a mutation rate.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {
+                        "coding": True,
+                        "length": 60,
+                        "count": 4,
+                        "ratchet": True,
+                        "synonymous rate": 0.5,
+                    }
+                ],
+                seed=5,
+            )
+        )
+        self.assertEqual(1, len(set(translate(read.sequence) for read in reads)))
+
+    def testBadLength(self):
+        """
+        A coding specification whose length is not a multiple of three must
+        raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 is coding, but its length \\(10\\) is "
+            "not a multiple of three that is at least six\\.$"
+        )
+        assertRaisesRegex(
+            self, ValueError, error, Sequences, [{"coding": True, "length": 10}]
+        )
+
+    def testRateWithoutCoding(self):
+        """
+        A codon rate in a specification that is not coding must raise a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 1 gives 'synonymous rate' but is not "
+            "coding \\(via 'coding'\\)\\.$"
+        )
+        assertRaisesRegex(
+            self, ValueError, error, Sequences, [{"synonymous rate": 0.1}]
+        )
+
+    def testMutationRateAndCodonRate(self):
+        """
+        A mutation rate and a codon rate must raise a ValueError.
+        """
+        error = "^Sequence specification 1 gives a 'mutation rate' and a synonymous "
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {
+                    "coding": True,
+                    "length": 30,
+                    "mutation rate": 0.1,
+                    "non-synonymous rate": 0.1,
+                }
+            ],
+        )
+
+    def testBadRates(self):
+        """
+        Codon rates that sum to more than one must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has synonymous and non-synonymous rates "
+            "\\(0\\.6 and 0\\.6\\) that are not probabilities whose sum is at "
+            "most 1\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {
+                    "coding": True,
+                    "length": 30,
+                    "synonymous rate": 0.6,
+                    "non-synonymous rate": 0.6,
+                }
+            ],
+        )
+
+    def testCodingAndAlphabet(self):
+        """
+        A coding specification that gives an alphabet must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 gives 'coding' and 'alphabet', which "
+            "cannot be used together\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"coding": True, "length": 30, "alphabet": "AC"}],
+        )
+
+    def testBadUsage(self):
+        """
+        A coding specification with invalid codon usage must raise a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has an invalid 'codon usage' \\(Codon "
+            "usage key 'XYZ' is not a codon\\.\\)$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"coding": True, "length": 30, "codon usage": {"XYZ": 1}}],
+        )
+
+    def testSection(self):
+        """
+        A coding section must make an open reading frame.
+        """
+        (read,) = list(
+            Sequences(
+                [
+                    {
+                        "sections": [
+                            {"length": 5, "sequence": "CCCCC"},
+                            {"length": 30, "coding": True},
+                        ]
+                    }
+                ],
+                seed=6,
+            )
+        )
+        self.assertEqual("CCCCC", read.sequence[:5])
+        self.assertEqual("M", translate(read.sequence[5:])[0])
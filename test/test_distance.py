@@ -0,0 +1,134 @@
+from itertools import product
+from operator import ne
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.distance import DistanceIndex
+
+
+class TestDistanceIndex(TestCase):
+    """
+    Test the DistanceIndex class.
+    """
+
+    def testBadMinDistance(self):
+        """
+        A minimum distance that is not a positive integer must raise a
+        ValueError.
+        """
+        error = "^The minimum distance \\(0\\) must be a positive integer\\.$"
+        assertRaisesRegex(self, ValueError, error, DistanceIndex, 0)
+
+    def testEmpty(self):
+        """
+        Any sequence must be far from the sequences of an empty index.
+        """
+        index = DistanceIndex(3)
+        self.assertEqual(0, len(index))
+        self.assertTrue(index.far("ACGTACGT"))
+
+    def testClose(self):
+        """
+        A sequence that differs from one in the index at fewer than the
+        minimum number of sites must not be far.
+        """
+        index = DistanceIndex(3)
+        index.add("AAAAAAAAA")
+        self.assertFalse(index.far("AAAAAAAAA"))
+        self.assertFalse(index.far("CAAAAAAAA"))
+        self.assertFalse(index.far("CAAACAAAA"))
+        self.assertEqual(3, index.rejected)
+
+    def testFar(self):
+        """
+        A sequence that differs from one in the index at the minimum number
+        of sites must be far.
+        """
+        index = DistanceIndex(3)
+        index.add("AAAAAAAAA")
+        self.assertTrue(index.far("CAAACAAAC"))
+        self.assertTrue(index.far("CCCAAAAAA"))
+        self.assertEqual(0, index.rejected)
+
+    def testFarIsNotAdded(self):
+        """
+        Checking a sequence must not add it.
+        """
+        index = DistanceIndex(3)
+        index.far("AAAAAAAAA")
+        self.assertEqual(0, len(index))
+        self.assertTrue(index.far("AAAAAAAAA"))
+
+    def testDifferentLengths(self):
+        """
+        Sequences of different lengths must not be compared.
+        """
+        index = DistanceIndex(3)
+        index.add("AAAAAAAAA")
+        self.assertTrue(index.far("AAAAAAAAAA"))
+
+    def testShort(self):
+        """
+        Sequences shorter than the minimum distance must be too close to any
+        other sequence of their length.
+        """
+        index = DistanceIndex(5)
+        self.assertTrue(index.far("AAAA"))
+        index.add("AAAA")
+        self.assertFalse(index.far("CCCC"))
+        self.assertTrue(index.far("CCC"))
+
+    def testCandidates(self):
+        """
+        Only the sequences that share a block with a new sequence must be
+        compared to it.
+        """
+        index = DistanceIndex(2)
+        index.add("AAAACCCC")
+        index.add("GGGGTTTT")
+        index.add("AAAATTTT")
+        self.assertTrue(index.far("AAAAGGGG"))
+        self.assertEqual(2, index.comparisons)
+        self.assertTrue(index.far("CCCCGGGG"))
+        self.assertEqual(2, index.comparisons)
+
+    def testShortBlocks(self):
+        """
+        If the blocks would be shorter than the minimum block length, a new
+        sequence must be compared to every sequence of its length (and to no
+        others).
+        """
+        index = DistanceIndex(3)
+        self.assertEqual(
+            (None, []), index._index(DistanceIndex.MIN_BLOCK_LENGTH * 3 - 1)
+        )
+        for sequence in "AAAAAAAAAAA", "CCCCCCCCCCC", "GGGGGGGGGGG", "AAAA":
+            index.add(sequence)
+        self.assertTrue(index.far("TTTTTTTTTTT"))
+        self.assertEqual(3, index.comparisons)
+        self.assertFalse(index.far("AAAAAAAAATT"))
+
+    def testLongBlocks(self):
+        """
+        If the blocks are at least the minimum block length, the sequences
+        must be indexed by their blocks.
+        """
+        index = DistanceIndex(3)
+        blocks, tables = index._index(DistanceIndex.MIN_BLOCK_LENGTH * 3)
+        self.assertEqual(3, len(blocks))
+        self.assertEqual(3, len(tables))
+
+    def testExhaustive(self):
+        """
+        The index must agree with comparing all pairs of sequences.
+        """
+        index = DistanceIndex(2)
+        accepted = []
+        for letters in product("AC", repeat=5):
+            sequence = "".join(letters)
+            expected = all(sum(map(ne, sequence, other)) >= 2 for other in accepted)
+            self.assertEqual(expected, index.far(sequence))
+            if expected:
+                index.add(sequence)
+                accepted.append(sequence)
+        self.assertEqual(16, len(accepted))
@@ -0,0 +1,146 @@
+import os
+from io import StringIO
+from json import load
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from seqgen.instrumentation import RunStats
+from seqgen.sequences import Sequences
+
+
+class TestRunStats(TestCase):
+    """
+    Test the RunStats class.
+    """
+
+    def testUnknownProfiler(self):
+        """
+        An unknown profiler must cause a ValueError.
+        """
+        error = "^Unknown profiler 'xxx'\\. Use one of: cprofile, tracemalloc\\.$"
+        self.assertRaisesRegex(ValueError, error, RunStats, profile="xxx")
+
+    def testNoSpecs(self):
+        """
+        If there are no specifications, there must be no statistics.
+        """
+        stats = RunStats()
+        Sequences([], stats=stats).write(StringIO())
+        result = stats.toDict()
+        self.assertEqual([], result["specs"])
+        self.assertEqual(0, result["total"]["reads"])
+
+    def testWrite(self):
+        """
+        Writing must record per-specification statistics.
+        """
+        stats = RunStats()
+        Sequences(
+            [
+                {"id": "a", "length": 10, "skip": True},
+                {"from id": "a", "id prefix": "m-", "count": 3, "mutation rate": 0.5},
+            ],
+            stats=stats,
+        ).write(StringIO())
+        first, second = stats.toDict()["specs"]
+
+        self.assertEqual(1, first["spec"])
+        self.assertEqual("a", first["name"])
+        self.assertEqual(0, first["reads"])
+        self.assertEqual(0, first["bases"])
+        self.assertEqual(0.0, first["mutation seconds"])
+        self.assertEqual(0.0, first["writing seconds"])
+
+        self.assertEqual(2, second["spec"])
+        self.assertEqual("m-", second["name"])
+        self.assertEqual(3, second["reads"])
+        self.assertEqual(30, second["bases"])
+        self.assertGreater(second["mutation seconds"], 0.0)
+        self.assertGreater(second["formatting seconds"], 0.0)
+        self.assertGreater(second["writing seconds"], 0.0)
+        self.assertIsNotNone(second["process peak RSS bytes"])
+        self.assertGreaterEqual(second["peak RSS increase bytes"], 0)
+        self.assertGreaterEqual(
+            second["process peak RSS bytes"], first["process peak RSS bytes"]
+        )
+        self.assertIsNone(second["peak traced bytes"])
+
+    def testIterate(self):
+        """
+        Iterating must record per-specification statistics.
+        """
+        stats = RunStats()
+        list(Sequences([{"count": 2, "length": 5}, {"length": 7}], stats=stats))
+        self.assertEqual(
+            [(2, 10), (1, 7)],
+            [(spec["reads"], spec["bases"]) for spec in stats.toDict()["specs"]],
+        )
+
+    def testTotals(self):
+        """
+        The totals must be the sums over all specifications.
+        """
+        stats = RunStats()
+        Sequences([{"count": 2, "length": 5}, {"length": 7}], stats=stats).write(
+            StringIO()
+        )
+        total = stats.toDict()["total"]
+        self.assertEqual(3, total["reads"])
+        self.assertEqual(17, total["bases"])
+
+    def testCallback(self):
+        """
+        The callback must be called once for each specification.
+        """
+        seen = []
+        stats = RunStats(callback=lambda spec: seen.append((spec.number, spec.reads)))
+        Sequences([{"count": 2}, {"count": 3}], stats=stats).write(StringIO())
+        self.assertEqual([(1, 2), (2, 3)], seen)
+
+    def testProgress(self):
+        """
+        Progress lines must be written.
+        """
+        fp = StringIO()
+        stats = RunStats(progressInterval=0.0, progressFp=fp)
+        Sequences([{"count": 3, "length": 4}], stats=stats).write(StringIO())
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[2].startswith("Progress: spec 1, 3 reads, 12 bases in"))
+
+    def testSave(self):
+        """
+        The statistics must be saved as JSON.
+        """
+        stats = RunStats()
+        Sequences([{"count": 2}], stats=stats).write(StringIO())
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "stats.json")
+            stats.save(filename)
+            with open(filename) as fp:
+                result = load(fp)
+        self.assertEqual(2, result["specs"][0]["reads"])
+
+    def testCProfileFile(self):
+        """
+        A cProfile profile must be saved to the requested file.
+        """
+        from pstats import Stats
+
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "profile")
+            stats = RunStats(profile="cprofile", profileFile=filename)
+            Sequences([{"count": 2}], stats=stats).write(StringIO())
+            functions = [function for (_, _, function) in Stats(filename).stats]
+        self.assertIn("_readsForSpec", functions)
+
+    def testTracemalloc(self):
+        """
+        With tracemalloc profiling, the peak traced memory must be recorded
+        and the top allocations reported.
+        """
+        fp = StringIO()
+        stats = RunStats(profile="tracemalloc", progressFp=fp)
+        Sequences([{"count": 2}], stats=stats).write(StringIO())
+        self.assertGreater(stats.toDict()["specs"][0]["peak traced bytes"], 0)
+        self.assertTrue(fp.getvalue().startswith("Top memory allocations:\n"))
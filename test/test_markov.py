@@ -0,0 +1,216 @@
+import os
+import random
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.markov import MarkovModel
+from seqgen.sequences import Sequences
+
+
+class TestMarkovModel(TestCase):
+    """
+    Test the MarkovModel class.
+    """
+
+    def testNegativeOrder(self):
+        """
+        A negative order must raise a ValueError.
+        """
+        error = "^The order of a Markov model \\(-1\\) must be a non-negative integer"
+        assertRaisesRegex(self, ValueError, error, MarkovModel, -1, "AC", {"A": 1})
+
+    def testTooManyContexts(self):
+        """
+        A model with too many contexts must raise a ValueError.
+        """
+        error = "^A Markov model of order 11 with an alphabet of 4 letters has "
+        assertRaisesRegex(
+            self, ValueError, error, MarkovModel, 11, "ACGT", {"A" * 12: 1}
+        )
+
+    def testBadCount(self):
+        """
+        A count for a string that is not a (k+1)-mer of the alphabet must
+        raise a ValueError.
+        """
+        error = "^Markov model count for 'AN' is not for a string of 2 letters "
+        assertRaisesRegex(self, ValueError, error, MarkovModel, 1, "AC", {"AN": 1})
+
+    def testTrainIgnoresOtherLetters(self):
+        """
+        Training must count (k+1)-mers in upper case, ignoring those with
+        letters that are not in the alphabet.
+        """
+        model = MarkovModel.train(["acNgt"], 1)
+        self.assertEqual({"AC": 1, "GT": 1}, model.counts)
+
+    def testTrainNothing(self):
+        """
+        Training on sequences with no (k+1)-mers must raise a ValueError.
+        """
+        error = "^There are no 3-mers of the letters 'ACGT' to train a Markov "
+        assertRaisesRegex(self, ValueError, error, MarkovModel.train, ["AC"], 2)
+
+    def testDeterministicModel(self):
+        """
+        A model in which each context has only one next letter must generate
+        sequences that follow the training sequence.
+        """
+        model = MarkovModel.train(["ACGTACGTACGT"], 2)
+        sequence = model.sequence(random.Random(1), 40)
+        self.assertEqual(40, len(sequence))
+        self.assertIn(sequence, "ACGT" * 12)
+
+    def testUnseenContext(self):
+        """
+        A context that was never seen must be followed by letters drawn with
+        the overall letter frequencies.
+        """
+        # The context 'A' is never followed by anything.
+        model = MarkovModel(1, "AC", {"CA": 1})
+        self.assertEqual("CA", model.sequence(random.Random(1), 2))
+        self.assertEqual("CAA", model.sequence(random.Random(1), 3))
+
+    def testShortSequence(self):
+        """
+        A sequence shorter than the order must be returned.
+        """
+        model = MarkovModel.train(["ACGTACGT"], 3)
+        self.assertEqual(2, len(model.sequence(random.Random(1), 2)))
+
+    def testSaveAndLoad(self):
+        """
+        A saved model must be loaded with the same counts and digest.
+        """
+        model = MarkovModel.train(["ACGTTGCAAC"], 2)
+        fp = StringIO()
+        model.save(fp)
+        fp.seek(0)
+        loaded = MarkovModel.load(fp)
+        self.assertEqual(model.counts, loaded.counts)
+        self.assertEqual(model.digest(), loaded.digest())
+
+    def testLoadInvalid(self):
+        """
+        Loading JSON that is not a model must raise a ValueError.
+        """
+        error = "^A Markov model must be a JSON object with 'order', 'alphabet' "
+        assertRaisesRegex(
+            self, ValueError, error, MarkovModel.load, StringIO('{"order": 1}')
+        )
+
+
+class TestSequencesMarkov(TestCase):
+    """
+    Test specifications that use a Markov model.
+    """
+
+    def testTrained(self):
+        """
+        Sequences made from a model trained on a sequence file must have the
+        k-mers of the file, and the model must be trained only once.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "genome.fasta")
+            with open(filename, "w") as fp:
+                fp.write(">id1\nACGTACGTACGTACGT\n>id2\nacgtacgt\n")
+            cache = {}
+            spec = [
+                {"id prefix": "m-", "count": 3, "length": 30},
+                {"sections": [{"length": 10}, {"length": 8}]},
+            ]
+            for section in spec[0], spec[1]["sections"][0]:
+                section["markov sequence file"] = filename
+                section["markov order"] = 2
+            s = Sequences(spec, sequenceFileCache=cache, seed=1)
+            reads = list(s)
+            self.assertEqual(1, len(cache))
+            for read in reads:
+                self.assertIn(read.sequence[:10], "ACGT" * 10)
+            self.assertEqual(["A", "C", "G", "T"], s._sequences["m-1"].alphabet)
+
+    def testPrecomputed(self):
+        """
+        Sequences must be made from a precomputed model.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "model.json")
+            with open(filename, "w") as fp:
+                MarkovModel(1, "AC", {"AC": 1, "CA": 1}).save(fp)
+            (read,) = Sequences([{"length": 20, "markov model": filename}])
+            self.assertIn(read.sequence, "AC" * 11)
+
+    def testModelChangesKey(self):
+        """
+        Changing a precomputed model must change the sequences of a seeded
+        run (and so the key of its specification).
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "model.json")
+            spec = [{"length": 20, "markov model": filename}]
+            with open(filename, "w") as fp:
+                MarkovModel(1, "AC", {"AC": 1, "CA": 1, "AA": 1}).save(fp)
+            key1 = next(Sequences(spec, seed=1)._specKeys())
+            with open(filename, "w") as fp:
+                MarkovModel(1, "AC", {"AC": 1, "CA": 1, "CC": 1}).save(fp)
+            key2 = next(Sequences(spec, seed=1)._specKeys())
+            self.assertNotEqual(key1, key2)
+
+    def testMissingFile(self):
+        """
+        A Markov model file that does not exist must raise a ValueError.
+        """
+        error = "^Markov model file 'xxx.json' could not be read\\.$"
+        s = Sequences([{"markov model": "xxx.json"}])
+        assertRaisesRegex(self, ValueError, error, list, s)
+
+    def testBothKeys(self):
+        """
+        Giving both 'markov model' and 'markov sequence file' must raise a
+        ValueError.
+        """
+        error = "gives both 'markov model' and 'markov sequence file'\\.$"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"markov model": "a", "markov sequence file": "b"}],
+        )
+
+    def testOrderWithoutSequenceFile(self):
+        """
+        Giving 'markov order' without 'markov sequence file' must raise a
+        ValueError.
+        """
+        error = "gives 'markov order' but not 'markov sequence file'\\.$"
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"markov order": 2}])
+
+    def testBadOrder(self):
+        """
+        A 'markov order' that is not a non-negative integer must raise a
+        ValueError.
+        """
+        error = "has a 'markov order' value \\(-2\\) that is not a non-negative "
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"markov order": -2, "markov sequence file": "a"}],
+        )
+
+    def testWithFromId(self):
+        """
+        Giving a Markov model and 'from id' must raise a ValueError.
+        """
+        error = "gives a Markov model and 'from id', which cannot be used together"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id": "a"}, {"markov model": "m", "from id": "a"}],
+        )
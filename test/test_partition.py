@@ -0,0 +1,327 @@
+import os
+import subprocess
+import sys
+from io import StringIO
+from json import dump
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from six import assertRaisesRegex
+
+from seqgen.partition import Plan
+from seqgen.sequences import Sequences
+
+TOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(TOP, "bin", "seq-gen-partition.py")
+# Run the script with this package (not an installed one, if any).
+ENV = dict(os.environ, PYTHONPATH=TOP + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+
+def outputs(directory):
+    """
+    Get the contents of the files in a directory.
+
+    @param directory: The C{str} directory name.
+    @return: A C{dict} mapping C{str} filenames to C{bytes} contents.
+    """
+    result = {}
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            with open(path, "rb") as fp:
+                result[filename] = fp.read()
+    return result
+
+
+def makeSpec(directory):
+    """
+    Make a specification that writes files (in several formats) to a
+    directory, with reads made from other reads, a ratchet, and shards.
+
+    @param directory: The C{str} directory name.
+    @return: A C{list} specification.
+    """
+    return [
+        {"id": "a", "length": 50},
+        {"skip": True, "id prefix": "b-", "count": 2, "length": 40},
+        {
+            "id prefix": "m-",
+            "from id": "a",
+            "count": 2500,
+            "mutation rate": 0.05,
+            "filename": os.path.join(directory, "m.fastq"),
+            "format": "fastq",
+        },
+        {
+            "count": 1200,
+            "length": 10,
+            "filename": os.path.join(directory, "s-{shard}.phy"),
+            "format": "phylip",
+            "shards": 2,
+        },
+        {"from id": "b-2", "count": 1100, "length": 20},
+        {
+            "count": 30,
+            "length": 8,
+            "mutation rate": 0.1,
+            "ratchet": True,
+            "filename": os.path.join(directory, "r.npy"),
+            "format": "npy",
+        },
+        {"count": 5, "length": 8, "filename": os.path.join(directory, "m.fastq")},
+    ]
+
+
+class TestPlan(TestCase):
+    """
+    Test the Plan class.
+    """
+
+    def testNoSeed(self):
+        """
+        Making a plan without a seed must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = "^A seed must be given to plan a run\\.$"
+            assertRaisesRegex(self, ValueError, error, Plan.make, [{}], tempdir)
+
+    def testUnique(self):
+        """
+        Making a plan for a specification with 'unique' must raise a
+        ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = (
+                "^Sequence specification 2 has 'unique', which cannot be used "
+                "when partitioning a run\\.$"
+            )
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Plan.make,
+                [{}, {"unique": True}],
+                tempdir,
+                seed=1,
+            )
+
+    def testMinDistance(self):
+        """
+        Making a plan for a specification with a minimum distance must raise
+        a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = (
+                "^Sequence specification 1 has 'min distance', which cannot be "
+                "used when partitioning a run\\.$"
+            )
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Plan.make,
+                [{"count": 2, "min distance": 3}],
+                tempdir,
+                seed=1,
+            )
+
+    def testUnitsAndReadsPerUnit(self):
+        """
+        Giving both units and readsPerUnit must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = "^Only one of units and readsPerUnit may be given\\.$"
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Plan.make,
+                [{}],
+                tempdir,
+                units=2,
+                readsPerUnit=10,
+                seed=1,
+            )
+
+    def testUnpartitionableFormat(self):
+        """
+        Making a plan for output in a format that holds output back must raise
+        a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = "^Standard output has format 2bit, which cannot be used when "
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Plan.make,
+                [{}],
+                tempdir,
+                seed=1,
+                _format="2bit",
+            )
+
+    def testMissingPlan(self):
+        """
+        Loading a plan from a directory without one must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            error = "^Plan file .* does not exist\\.$"
+            assertRaisesRegex(self, ValueError, error, Plan, tempdir)
+
+    def testUnits(self):
+        """
+        Specifications must be split at seed blocks, ratchets must not be
+        split, and small specifications must be put together.
+        """
+        with TemporaryDirectory() as tempdir:
+            plan = Plan.make(
+                [
+                    {"count": 2500},
+                    {"count": 1500, "mutation rate": 0.1, "ratchet": True},
+                    {"count": 10},
+                    {"count": 20},
+                ],
+                tempdir,
+                readsPerUnit=2000,
+                seed=1,
+            )
+            self.assertEqual(
+                [
+                    [[0, 0, 2000]],
+                    [[0, 2000, 2500], [1, 0, 1500]],
+                    [[2, 0, 10], [3, 0, 20]],
+                ],
+                [unit["ranges"] for unit in plan.units],
+            )
+
+    def testUnitNotExecuted(self):
+        """
+        Merging before all units have been executed must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            plan = Plan.make([{"count": 2500}], tempdir, readsPerUnit=1000, seed=1)
+            plan.execute(1)
+            error = "^The plan cannot be merged because 2 of its 3 units \\(0, 2\\) "
+            assertRaisesRegex(self, ValueError, error, plan.merge)
+
+    def testNoSuchUnit(self):
+        """
+        Executing a unit that is not in the plan must raise a ValueError.
+        """
+        with TemporaryDirectory() as tempdir:
+            plan = Plan.make([{}], tempdir, seed=1)
+            error = "^Unit 1 does not exist \\(the plan has 1 units, numbered from 0\\)"
+            assertRaisesRegex(self, ValueError, error, plan.execute, 1)
+
+    def testMerge(self):
+        """
+        Merging the output of units executed (in any order) in this process
+        must give the same output as a single run.
+        """
+        with TemporaryDirectory() as tempdir:
+            expectedFp = StringIO()
+            Sequences(makeSpec(tempdir), seed=3).write(expectedFp)
+            expected = outputs(tempdir)
+
+        with TemporaryDirectory() as tempdir:
+            plan = Plan.make(
+                makeSpec(tempdir), os.path.join(tempdir, "plan"), units=4, seed=3
+            )
+            self.assertEqual(4, len(plan.units))
+            for unit in reversed(range(len(plan.units))):
+                plan.execute(unit)
+            fp = StringIO()
+            plan.merge(fp)
+            self.assertEqual(expectedFp.getvalue(), fp.getvalue())
+            self.assertEqual(expected, outputs(tempdir))
+
+    def testRecombinants(self):
+        """
+        Recombinants made from a parent prefix whose ids are made in other
+        units must be the same as in a single run.
+        """
+        spec = [
+            {"id prefix": "p-", "count": 1500, "length": 30, "skip": True},
+            {"parent prefix": "p-", "count": 2500, "breakpoint rate": 0.05},
+        ]
+        expectedFp = StringIO()
+        Sequences(spec, seed=2).write(expectedFp)
+
+        with TemporaryDirectory() as tempdir:
+            plan = Plan.make(spec, tempdir, readsPerUnit=1000, seed=2)
+            for unit in range(len(plan.units)):
+                plan.execute(unit)
+            fp = StringIO()
+            plan.merge(fp)
+            self.assertEqual(expectedFp.getvalue(), fp.getvalue())
+
+
+class TestScript(TestCase):
+    """
+    Test running the units of a plan as separate processes.
+    """
+
+    def script(self, *args):
+        """
+        Run bin/seq-gen-partition.py.
+
+        @param args: The C{str} command-line arguments.
+        @return: The C{str} standard output.
+        """
+        return subprocess.run(
+            (sys.executable, SCRIPT) + args,
+            env=ENV,
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+
+    def testPlanExecuteMerge(self):
+        """
+        Units run as separate processes (at the same time) must give the same
+        output as a single run.
+        """
+        with TemporaryDirectory() as tempdir:
+            expectedFp = StringIO()
+            Sequences(makeSpec(tempdir), seed="7").write(expectedFp)
+            expected = outputs(tempdir)
+
+        with TemporaryDirectory() as tempdir:
+            specFile = os.path.join(tempdir, "spec.json")
+            with open(specFile, "w") as fp:
+                dump(makeSpec(tempdir), fp)
+            planDir = os.path.join(tempdir, "plan")
+            units = int(
+                self.script(
+                    "plan",
+                    "--specification",
+                    specFile,
+                    "--directory",
+                    planDir,
+                    "--seed",
+                    "7",
+                    "--readsPerUnit",
+                    "1000",
+                )
+            )
+            self.assertEqual(8, units)
+            processes = [
+                subprocess.Popen(
+                    (
+                        sys.executable,
+                        SCRIPT,
+                        "execute",
+                        "--directory",
+                        planDir,
+                        "--unit",
+                        str(unit),
+                    ),
+                    env=ENV,
+                )
+                for unit in range(units)
+            ]
+            self.assertEqual([0] * units, [process.wait() for process in processes])
+            stdout = self.script("merge", "--directory", planDir)
+            os.unlink(specFile)
+            self.assertEqual(expectedFp.getvalue(), stdout)
+            self.assertEqual(expected, outputs(tempdir))
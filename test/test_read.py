@@ -0,0 +1,133 @@
+from unittest import TestCase
+
+from dark.aaVars import AA_LETTERS as DARK_AA_LETTERS
+from dark.reads import DNARead
+
+from seqgen.read import Read
+from seqgen.sequences import AA_LETTERS
+
+
+class TestRead(TestCase):
+    """
+    Test the Read class.
+    """
+
+    def testAALetters(self):
+        """
+        The amino acid letters must be the same as those in dark.aaVars.
+        """
+        self.assertEqual(list(DARK_AA_LETTERS), list(AA_LETTERS))
+
+    def testLength(self):
+        """
+        The length of a read must be the length of its sequence.
+        """
+        self.assertEqual(4, len(Read("id", "ACGT")))
+
+    def testReverseComplement(self):
+        """
+        Reverse complementing must give the same result as dark does.
+        """
+        sequence = "ACGTMRWSYKVHDBXNacgtn-"
+        self.assertEqual(
+            DNARead("id", sequence).reverseComplement().sequence,
+            Read("id", sequence).reverseComplement().sequence,
+        )
+
+    def testReverseComplementQuality(self):
+        """
+        Reverse complementing must reverse the quality string.
+        """
+        read = Read("id", "AACG", "!#%&").reverseComplement()
+        self.assertEqual("CGTT", read.sequence)
+        self.assertEqual("&%#!", read.quality)
+
+    def testFasta(self):
+        """
+        Conversion to FASTA must work.
+        """
+        self.assertEqual(">id\nACGT\n", Read("id", "ACGT").toString("fasta"))
+
+    def testFastq(self):
+        """
+        Conversion to FASTQ must work.
+        """
+        self.assertEqual(
+            "@id\nACGT\n+id\n!!!!\n", Read("id", "ACGT", "!!!!").toString("fastq")
+        )
+
+    def testFastqWithoutQuality(self):
+        """
+        Conversion to FASTQ must raise a ValueError if there is no quality.
+        """
+        error = "^Read 'id' has no quality information\\.$"
+        self.assertRaisesRegex(ValueError, error, Read("id", "ACGT").toString, "fastq")
+
+    def testUnknownFormat(self):
+        """
+        Conversion to an unknown format must raise a ValueError.
+        """
+        error = "^Format must be either 'fasta' or 'fastq'\\.$"
+        self.assertRaisesRegex(ValueError, error, Read("id", "ACGT").toString, "xxx")
+
+    def testToDNARead(self):
+        """
+        Conversion to a DNARead must keep the id, sequence, quality, and
+        alphabet.
+        """
+        read = Read("id", "ACGT", "!!!!", "ACGT").toDNARead()
+        self.assertIsInstance(read, DNARead)
+        self.assertEqual(DNARead("id", "ACGT", "!!!!"), read)
+        self.assertEqual("ACGT", read.alphabet)
+
+
+class TestMutant(TestCase):
+    """
+    Test mutant reads (made with Read.mutant).
+    """
+
+    def testSequence(self):
+        """
+        A mutant must have the expected sequence and length, and refer to its
+        parent.
+        """
+        parent = Read("p", "ACGTACGT")
+        read = Read.mutant(parent, [0, 5], "TA")
+        self.assertEqual("TCGTAAGT", read.sequence)
+        self.assertEqual(8, len(read))
+        self.assertIs(parent, read.parent)
+        self.assertEqual([0, 5], list(read.positions))
+        self.assertEqual("TA", read.bases)
+
+    def testMutantOfMutant(self):
+        """
+        A mutant of a mutant must refer to the original parent and combine
+        the changes, dropping sites that have been changed back.
+        """
+        parent = Read("p", "ACGTACGTACGTACGTACGT")
+        first = Read.mutant(parent, [0, 5], "TA")
+        second = Read.mutant(first, [5, 7], "CA")
+        self.assertIs(parent, second.parent)
+        self.assertEqual("TCGTACGAACGTACGTACGT", second.sequence)
+        self.assertEqual([0, 7], list(second.positions))
+
+    def testTooManyChanges(self):
+        """
+        A mutant of a mutant with too many changes must have its sequence
+        stored in full.
+        """
+        parent = Read("p", "ACGTACGT")
+        first = Read.mutant(parent, [0], "T")
+        second = Read.mutant(first, [1, 2], "AA")
+        self.assertIsNone(second.parent)
+        self.assertEqual("TAATACGT", second.sequence)
+
+    def testSetSequence(self):
+        """
+        Setting the sequence of a mutant must make it an ordinary read.
+        """
+        read = Read.mutant(Read("p", "ACGT"), [0], "T")
+        read.sequence = "GG"
+        self.assertIsNone(read.parent)
+        self.assertEqual("GG", read.sequence)
+        self.assertEqual(2, len(read))
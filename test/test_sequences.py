@@ -1,7 +1,12 @@
+import os
+from itertools import islice
+from json import load
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 from six.moves import builtins
 from six import assertRaisesRegex, PY3, StringIO
-from seqgen.sequences import Sequences
+from seqgen.read import Read
+from seqgen.sequences import Sequences, _digitCount, _ratchetChanges
 from dark.aaVars import AA_LETTERS
 
 try:
@@ -751,60 +756,38 @@ class TestSequences(TestCase):
     def testSectionWithUnknownIdReference(self):
         """
         If a sequence is built up from sections and a referred to sequence
-        id does not exist, a ValueError must be raised.
+        id does not exist, a ValueError must be raised when the specification
+        is read.
         """
-        s = Sequences(
-            StringIO(
-                """{
-            "sequences": [
-                {
-                    "sections": [
-                        {
-                            "from id": "xxx"
-                        }
-                    ]
-                }
-            ]
-        }"""
-            )
-        )
         error = (
-            "^Sequence section refers to the id 'xxx' of "
-            "non-existent other sequence\\.$"
+            "^Sequence specification 1 \\(section 1\\) refers to the id 'xxx', "
+            "which is not the id of an earlier sequence\\.$"
+        )
+        assertRaisesRegex(
+            self, ValueError, error, Sequences, [{"sections": [{"from id": "xxx"}]}]
         )
-        assertRaisesRegex(self, ValueError, error, list, s)
 
     def testSectionWithIdReferenceTooShort(self):
         """
         If a sequence is built up from sections and a referred-to sequence
-        is too short for the desired length, a ValueError must be raised.
+        is too short for the desired length, a ValueError must be raised when
+        the specification is read.
         """
-        s = Sequences(
-            StringIO(
-                """{
-            "sequences": [
-                {
-                    "id": "xxx",
-                    "sequence": "ACCGT"
-                },
-                {
-                    "sections": [
-                        {
-                            "from id": "xxx",
-                            "length": 10
-                        }
-                    ]
-                }
-            ]
-        }"""
-            )
-        )
         error = (
-            "^Sequence specification refers to sequence id 'xxx', "
-            "starting at index 1 with length 10, but sequence 'xxx' is "
-            "not long enough to support that\\.$"
+            "^Sequence specification 2 \\(section 1\\) refers to sequence id "
+            "'xxx', starting at index 1 with length 10, but sequence 'xxx' "
+            "\\(of length 5\\) is not long enough to support that\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {"id": "xxx", "sequence": "ACCGT"},
+                {"sections": [{"from id": "xxx", "length": 10}]},
+            ],
         )
-        assertRaisesRegex(self, ValueError, error, list, s)
 
     def testNamedRecombinant(self):
         """
@@ -1044,3 +1027,1604 @@ class TestSequences(TestCase):
             + orig.sequence[80:],
             rc.sequence,
         )
+
+    def testSpecificationAsList(self):
+        """
+        It must be possible to pass an already loaded list specification.
+        """
+        s = Sequences([{"id": "a", "sequence": "ACGT"}])
+        (read,) = list(s)
+        self.assertEqual("ACGT", read.sequence)
+
+    def testWriteToFileObject(self):
+        """
+        Reads with no filename must be written to the given file object.
+        """
+        fp = StringIO()
+        Sequences([{"id": "a", "sequence": "ACGT"}]).write(fp)
+        self.assertEqual(">a\nACGT\n", fp.getvalue())
+
+    def testReset(self):
+        """
+        After a reset, generated ids must start again from the beginning.
+        """
+        s = Sequences([{"length": 3}])
+        (read,) = list(s)
+        self.assertEqual("seq-id-1", read.id)
+        s.reset()
+        (read,) = list(s)
+        self.assertEqual("seq-id-1", read.id)
+
+    def testSequenceFileCache(self):
+        """
+        A sequence file must be read only once if it does not change, and
+        must be read again if it does change.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "file.fasta")
+            with open(filename, "w") as fp:
+                fp.write(">id1\nACCT\n")
+            cache = {}
+            spec = [{"sequence file": filename}]
+            (read,) = list(Sequences(spec, sequenceFileCache=cache))
+            self.assertEqual("ACCT", read.sequence)
+            self.assertEqual(("id1", "ACCT"), cache[filename][1])
+
+            # Alter the cache so we can tell if it is used.
+            cache[filename] = cache[filename][0], ("id2", "GGGG")
+            (read,) = list(Sequences(spec, sequenceFileCache=cache))
+            self.assertEqual("GGGG", read.sequence)
+
+            with open(filename, "w") as fp:
+                fp.write(">id3\nTTTTT\n")
+            (read,) = list(Sequences(spec, sequenceFileCache=cache))
+            self.assertEqual("TTTTT", read.sequence)
+
+    def testStringVariable(self):
+        """
+        A variable must be substituted into a string value that cannot be
+        converted to a number.
+        """
+        s = Sequences(
+            {
+                "variables": {"name": "xxx"},
+                "sequences": [{"id": "%(name)s-1", "sequence": "AC"}],
+            }
+        )
+        (read,) = list(s)
+        self.assertEqual("xxx-1", read.id)
+
+    def testRepeat(self):
+        """
+        A repeat specification must expand its templates once for each value
+        of its variable, which must be usable in 'id' and 'from id'.
+        """
+        s = Sequences(
+            [
+                {
+                    "repeat": 3,
+                    "variable": "clade",
+                    "sequences": [
+                        {"id": "clade-%(clade)d", "length": 10},
+                        {
+                            "from id": "clade-%(clade)d",
+                            "id prefix": "clade-%(clade)d-mutant-",
+                            "count": 2,
+                        },
+                    ],
+                }
+            ]
+        )
+        reads = list(s)
+        self.assertEqual(
+            [
+                "clade-1",
+                "clade-1-mutant-1",
+                "clade-1-mutant-2",
+                "clade-2",
+                "clade-2-mutant-1",
+                "clade-2-mutant-2",
+                "clade-3",
+                "clade-3-mutant-1",
+                "clade-3-mutant-2",
+            ],
+            [read.id for read in reads],
+        )
+        for index in range(0, 9, 3):
+            self.assertEqual(reads[index].sequence, reads[index + 1].sequence)
+            self.assertEqual(reads[index].sequence, reads[index + 2].sequence)
+
+    def testRepeatIsNotExpandedInAdvance(self):
+        """
+        A repeat specification must be stored as a single template.
+        """
+        s = Sequences([{"repeat": 1000000, "sequences": [{"id": "x-%(i)d"}]}])
+        self.assertEqual(1, len(s._sequenceSpecs))
+        self.assertEqual("x-1", next(iter(s)).id)
+
+    def testRepeatListAndRange(self):
+        """
+        A repeat specification may give a list or a range of values, and may
+        use (non-repeat) variables.
+        """
+        s = Sequences(
+            {
+                "variables": {"n": 7},
+                "sequences": [
+                    {
+                        "repeat": ["a", "b"],
+                        "variable": "x",
+                        "sequences": [{"id": "%(x)s", "sequence": "A"}],
+                    },
+                    {
+                        "repeat": {"start": 5, "stop": "%(n)d", "step": 1},
+                        "sequences": [{"id": "n-%(i)d", "sequence": "A"}],
+                    },
+                ],
+            }
+        )
+        self.assertEqual(["a", "b", "n-5", "n-6"], [read.id for read in s])
+
+    def testNestedRepeat(self):
+        """
+        Repeat specifications may be nested and the inner repeat may use the
+        variable of the outer one.
+        """
+        s = Sequences(
+            [
+                {
+                    "repeat": 2,
+                    "variable": "a",
+                    "sequences": [
+                        {
+                            "repeat": "%(a)d",
+                            "variable": "b",
+                            "sequences": [{"id": "%(a)d-%(b)d", "sequence": "A"}],
+                        }
+                    ],
+                }
+            ]
+        )
+        self.assertEqual(["1-1", "2-1", "2-2"], [read.id for read in s])
+
+    def testRepeatFilename(self):
+        """
+        The repeat variable must be usable in a filename.
+        """
+        s = Sequences(
+            [{"repeat": 2, "sequences": [{"filename": "out-%(i)d.fasta"}, {}]}]
+        )
+        self.assertEqual({"out-1.fasta", "out-2.fasta"}, s.filenames())
+
+    def testRepeatUnknownKey(self):
+        """
+        An unknown key in a repeat specification must cause a ValueError.
+        """
+        error = "^Sequence specification 1 contains an unknown key: xxx\\.$"
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"repeat": 2, "xxx": 3}])
+
+    def testRepeatTemplateUnknownKey(self):
+        """
+        An unknown key in a repeat template must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 2 \\(template 1\\) contains an unknown "
+            "key: xxx\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{}, {"repeat": 2, "sequences": [{"xxx": 3}]}],
+        )
+
+    def testRepeatInvalidValue(self):
+        """
+        A repeat value that is not an integer, list, or range must cause a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has a repeat value \\('x'\\) that is not "
+            "an integer, a list, or a range\\.$"
+        )
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"repeat": "x"}])
+
+    def testRepeatDuplicateId(self):
+        """
+        If a repeat template produces an id that has already been used, a
+        ValueError must be raised when the specification is read.
+        """
+        error = (
+            "^Sequence specification 2 \\(i=2, template 1\\) has an id "
+            "\\(x-2\\) that has already been used\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id": "x-2"}, {"repeat": 2, "sequences": [{"id": "x-%(i)d"}]}],
+        )
+
+
+class TestBatches(TestCase):
+    """
+    Test the Sequences.batches method.
+    """
+
+    def testMatrix(self):
+        """
+        Reads of the same length must be returned as a 2-D matrix of codes.
+        """
+        s = Sequences([{"id prefix": "x-", "count": 3, "sequence": "ACG"}])
+        (batch,) = list(s.batches())
+        self.assertEqual(["x-1", "x-2", "x-3"], batch.ids)
+        self.assertEqual((3, 3), batch.codes.shape)
+        self.assertEqual(b"ACG", batch.codes[1].tobytes())
+        self.assertIsNone(batch.offsets)
+        self.assertEqual("ACGT", batch.alphabet)
+
+    def testRaggedBuffer(self):
+        """
+        A batch of reads of different lengths must have the expected codes
+        and offsets.
+        """
+        s = Sequences([{}])
+        s._readsForSpec = lambda spec, **kwargs: iter(
+            [
+                (Read("a", "AC", None, "ACGT"), None),
+                (Read("b", "GTA", None, "ACGT"), None),
+            ]
+        )
+        (batch,) = list(s.batches())
+        self.assertEqual(b"ACGTA", batch.codes.tobytes())
+        self.assertEqual([0, 2, 5], batch.offsets.tolist())
+
+    def testSize(self):
+        """
+        Batches must not have more than the given number of reads and must
+        not span specifications.
+        """
+        s = Sequences(
+            [
+                {"id prefix": "x-", "count": 5, "length": 4},
+                {"id prefix": "y-", "count": 2, "length": 4, "random aa": True},
+            ]
+        )
+        batches = list(s.batches(2))
+        self.assertEqual([2, 2, 1, 2], [len(batch.ids) for batch in batches])
+        self.assertEqual("ACGT", batches[2].alphabet)
+        self.assertEqual("".join(AA_LETTERS), batches[3].alphabet)
+
+    def testSkip(self):
+        """
+        Skipped reads must not be returned.
+        """
+        s = Sequences([{"id": "a", "skip": True}, {"from id": "a", "id": "b"}])
+        (batch,) = list(s.batches())
+        self.assertEqual(["b"], batch.ids)
+
+    def testInvalidSize(self):
+        """
+        A batch size that is not positive must cause a ValueError.
+        """
+        error = "^The batch size must be positive \\(got 0\\)\\.$"
+        assertRaisesRegex(self, ValueError, error, list, Sequences([{}]).batches(0))
+
+
+class TestShards(TestCase):
+    """
+    Test writing sharded output.
+    """
+
+    def readIds(self, filename):
+        """
+        Get the ids in a FASTA file.
+
+        @param filename: The C{str} name of a FASTA file.
+        @return: A C{list} of C{str} ids.
+        """
+        with open(filename) as fp:
+            return [line[1:-1] for line in fp if line.startswith(">")]
+
+    def testShards(self):
+        """
+        The reads of a specification must be split as evenly as possible, in
+        order, into the given number of shards.
+        """
+        with TemporaryDirectory() as tempdir:
+            template = os.path.join(tempdir, "out-{shard:02d}.fasta")
+            Sequences(
+                [{"id prefix": "x", "count": 5, "filename": template, "shards": 3}]
+            ).write()
+            self.assertEqual(["x1", "x2"], self.readIds(template.format(shard=1)))
+            self.assertEqual(["x3", "x4"], self.readIds(template.format(shard=2)))
+            self.assertEqual(["x5"], self.readIds(template.format(shard=3)))
+
+    def testMaxReadsPerFile(self):
+        """
+        No shard may have more than 'max reads per file' reads.
+        """
+        with TemporaryDirectory() as tempdir:
+            template = os.path.join(tempdir, "out-{shard}.fasta")
+            s = Sequences(
+                [
+                    {
+                        "id prefix": "x",
+                        "count": 5,
+                        "filename": template,
+                        "max reads per file": 2,
+                    }
+                ]
+            )
+            self.assertEqual(
+                {template.format(shard=shard) for shard in (1, 2, 3)},
+                s.filenames(),
+            )
+            s.write()
+            self.assertEqual(["x5"], self.readIds(template.format(shard=3)))
+
+    def testDefaults(self):
+        """
+        The default number of shards must be used for specifications whose
+        filename has a shard field but that do not give sharding keys, and a
+        template with no sharding must give one shard.
+        """
+        with TemporaryDirectory() as tempdir:
+            first = os.path.join(tempdir, "a-{shard}.fasta")
+            second = os.path.join(tempdir, "b-{shard}.fasta")
+            Sequences(
+                [
+                    {"id prefix": "a", "count": 4, "filename": first},
+                    {"id prefix": "b", "count": 4, "filename": second, "shards": 1},
+                ],
+                defaultShards=2,
+            ).write()
+            self.assertEqual(
+                ["a-1.fasta", "a-2.fasta", "b-1.fasta"], sorted(os.listdir(tempdir))
+            )
+            Sequences([{"count": 4, "filename": first}]).write()
+            self.assertEqual(4, len(self.readIds(first.format(shard=1))))
+
+    def testManifest(self):
+        """
+        The manifest must give the reads and the first and last ids of each
+        shard.
+        """
+        with TemporaryDirectory() as tempdir:
+            template = os.path.join(tempdir, "out-{shard}.fasta")
+            manifest = os.path.join(tempdir, "manifest.json")
+            Sequences(
+                [
+                    {"id": "a", "filename": os.path.join(tempdir, "a.fasta")},
+                    {"id prefix": "x", "count": 3, "filename": template, "shards": 2},
+                ]
+            ).write(manifest=manifest)
+            with open(manifest) as fp:
+                self.assertEqual(
+                    {
+                        "shards": [
+                            {
+                                "filename": template.format(shard=1),
+                                "reads": 2,
+                                "first id": "x1",
+                                "last id": "x2",
+                            },
+                            {
+                                "filename": template.format(shard=2),
+                                "reads": 1,
+                                "first id": "x3",
+                                "last id": "x3",
+                            },
+                        ]
+                    },
+                    load(fp),
+                )
+
+    def testAlignmentShards(self):
+        """
+        Each shard of an alignment format must have its own header.
+        """
+        with TemporaryDirectory() as tempdir:
+            template = os.path.join(tempdir, "out-{shard}.phy")
+            Sequences(
+                [
+                    {
+                        "id prefix": "x",
+                        "count": 3,
+                        "length": 4,
+                        "filename": template,
+                        "shards": 2,
+                        "format": "phylip",
+                    }
+                ]
+            ).write()
+            with open(template.format(shard=2)) as fp:
+                self.assertEqual("1 4\n", fp.readline())
+
+    def testWriteError(self):
+        """
+        An error writing a shard must be raised.
+        """
+        template = "/non-existent-directory/out-{shard}.fasta"
+        s = Sequences([{"count": 2, "filename": template, "shards": 2}])
+        assertRaisesRegex(self, FileNotFoundError, "non-existent", s.write)
+
+    def testTooManyShards(self):
+        """
+        More shards than sequences must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has more shards \\(3\\) than sequences "
+            "\\(2\\)\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"count": 2, "filename": "x-{shard}", "shards": 3}],
+        )
+
+    def testShardsWithoutTemplate(self):
+        """
+        Giving shards without a shard field in the filename must cause a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 1 gives 'shards' but does not have a "
+            "filename containing a {shard} field "
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"count": 2, "filename": "x.fasta", "shards": 2}],
+        )
+
+    def testBothShardKeys(self):
+        """
+        Giving both 'shards' and 'max reads per file' must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 gives both 'shards' and 'max reads per "
+            "file'\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {
+                    "count": 2,
+                    "filename": "x-{shard}",
+                    "shards": 2,
+                    "max reads per file": 1,
+                }
+            ],
+        )
+
+    def testInvalidShards(self):
+        """
+        A shards value that is not a positive integer must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has a 'shards' value \\(0\\) that is not a "
+            "positive integer\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"count": 2, "filename": "x-{shard}", "shards": 0}],
+        )
+
+    def testInvalidTemplate(self):
+        """
+        A filename template with an unknown field must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has a filename \\('x-{shard}-{other}'\\) "
+            "that is not a valid shard filename template \\('other'\\)\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"count": 2, "filename": "x-{shard}-{other}"}],
+        )
+
+
+class TestMutants(TestCase):
+    """
+    Test that mutants are stored as changes to their parent.
+    """
+
+    def testFromId(self):
+        """
+        A mutated copy of a whole sequence must be stored as a mutant of it.
+        """
+        s = Sequences(
+            [
+                {"id": "parent", "length": 1000},
+                {"id": "mutant", "from id": "parent", "mutation rate": 0.1},
+            ]
+        )
+        parent, mutant = list(s)
+        stored = s._sequences["mutant"]
+        self.assertIs(s._sequences["parent"], stored.parent)
+        self.assertEqual(mutant.sequence, stored.sequence)
+        differences = sum(a != b for a, b in zip(parent.sequence, mutant.sequence))
+        self.assertEqual(len(stored.positions), differences)
+
+    def testPartialCopy(self):
+        """
+        A mutated copy of part of a sequence must be stored in full.
+        """
+        s = Sequences(
+            [
+                {"id": "parent", "length": 100},
+                {
+                    "id": "mutant",
+                    "from id": "parent",
+                    "length": 50,
+                    "mutation rate": 0.1,
+                },
+            ]
+        )
+        list(s)
+        self.assertIsNone(s._sequences["mutant"].parent)
+
+    def testReverseComplement(self):
+        """
+        A mutated reverse complemented copy must be stored in full.
+        """
+        s = Sequences(
+            [
+                {"id": "parent", "length": 100},
+                {"id": "mutant", "from id": "parent", "rc": True, "mutation rate": 0.1},
+            ]
+        )
+        list(s)
+        self.assertIsNone(s._sequences["mutant"].parent)
+
+    def testRatchet(self):
+        """
+        Ratchet mutants must be stored as mutants of the first read.
+        """
+        s = Sequences(
+            [
+                {"id": "parent", "length": 1000},
+                {
+                    "id prefix": "r",
+                    "from id": "parent",
+                    "count": 3,
+                    "mutation rate": 0.01,
+                    "ratchet": True,
+                },
+            ]
+        )
+        reads = list(s)
+        self.assertIs(s._sequences["parent"], s._sequences["r3"].parent)
+        self.assertEqual(reads[3].sequence, s._sequences["r3"].sequence)
+
+
+class TestStaticChecks(TestCase):
+    """
+    Test the checks of 'from id' references made when a specification is
+    read.
+    """
+
+    def testPrefixIds(self):
+        """
+        References to ids made from an id prefix must be checked, with the
+        numbering of a prefix continuing across specifications.
+        """
+        Sequences(
+            [
+                {"id prefix": "x-", "count": 2},
+                {"id prefix": "x-", "count": 2},
+                {"from id": "x-4"},
+                {"from id": "seq-id-1"},
+            ]
+        )
+        error = (
+            "^Sequence specification 2 refers to the id 'x-3', which is not the "
+            "id of an earlier sequence\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id prefix": "x-", "count": 2}, {"from id": "x-3"}],
+        )
+
+    def testDescription(self):
+        """
+        References to ids with a description must include the description.
+        """
+        Sequences(
+            [
+                {"id prefix": "x-", "description": "d", "count": 2},
+                {"from id": "x-2 d"},
+            ]
+        )
+        error = "^Sequence specification 2 refers to the id 'x-2', which is not "
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id prefix": "x-", "description": "d", "count": 2}, {"from id": "x-2"}],
+        )
+
+    def testLaterId(self):
+        """
+        A reference to the id of a later sequence must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 refers to the id 'a', which is not the id "
+            "of an earlier sequence\\.$"
+        )
+        assertRaisesRegex(
+            self, ValueError, error, Sequences, [{"from id": "a"}, {"id": "a"}]
+        )
+
+    def testStartBeyondEnd(self):
+        """
+        A start and length beyond the end of the referenced sequence must
+        cause a ValueError, using the length of the referenced sequence when
+        no length is given.
+        """
+        error = (
+            "^Sequence specification 2 refers to sequence id 'a', starting at "
+            "index 3 with length 10, but sequence 'a' \\(of length 10\\) is not "
+            "long enough to support that\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id": "a", "length": 10}, {"from id": "a", "start": 3}],
+        )
+
+    def testStartTooSmall(self):
+        """
+        A start less than 1 must cause a ValueError.
+        """
+        error = "^Sequence specification 2 has a start \\(0\\) that is less than 1\\.$"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id": "a"}, {"from id": "a", "start": 0}],
+        )
+
+    def testLengthsOfDerivedSequences(self):
+        """
+        The lengths of sequences made from sections and from other sequences
+        must be known.
+        """
+        error = (
+            "^Sequence specification 3 refers to sequence id 'c', starting at "
+            "index 1 with length 8, but sequence 'c' \\(of length 7\\) is not "
+            "long enough"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {"id": "a", "sequence": "ACGTA"},
+                {
+                    "id": "c",
+                    "sections": [
+                        {"from id": "a", "start": 2, "length": 3},
+                        {"length": 4},
+                    ],
+                },
+                {"from id": "c", "length": 8},
+            ],
+        )
+
+    def testAllErrorsReported(self):
+        """
+        All errors (including those in repeat specifications) must be
+        reported together, one per line.
+        """
+        error = (
+            "^Sequence specification 1 refers to the id 'x', which is not the id "
+            "of an earlier sequence\\.\\n"
+            "Sequence specification 2 is specified as ratchet but its count is "
+            "only 1\\.\\n"
+            "Sequence specification 4 \\(i=y, template 1\\) refers to the id 'y', "
+            "which is not the id of an earlier sequence\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {"from id": "x"},
+                {"id": "a", "ratchet": True, "mutation rate": 0.1},
+                {"from id": "a"},
+                {
+                    "repeat": ["a", "y"],
+                    "sequences": [{"id": "%(i)s-1", "from id": "%(i)s"}],
+                },
+            ],
+        )
+
+    def testSequenceFileIds(self):
+        """
+        A reference to the id of the sequence in an earlier sequence file
+        must be found (by reading the file).
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "file.fasta")
+            with open(filename, "w") as fp:
+                fp.write(">id1\nACCT\n")
+            s = Sequences([{"sequence file": filename}, {"from id": "id1"}])
+            self.assertEqual(["ACCT", "ACCT"], [read.sequence for read in s])
+
+    def testSequenceFileUnknownId(self):
+        """
+        A reference to an unknown id must be reported even if an earlier
+        sequence file gives an id.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "file.fasta")
+            with open(filename, "w") as fp:
+                fp.write(">id1\nACCT\n")
+            error = (
+                "^Sequence specification 3 refers to the id 'id2', which is not "
+                "the id of an earlier sequence\\.$"
+            )
+            assertRaisesRegex(
+                self,
+                ValueError,
+                error,
+                Sequences,
+                [{"sequence file": filename}, {"id": "a"}, {"from id": "id2"}],
+            )
+
+    def testSequenceFileUnreadable(self):
+        """
+        If a sequence file must be read to find a referenced id but cannot be
+        read, a ValueError must be raised.
+        """
+        error = "^Sequence file 'xxx.fasta' could not be read\\.$"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"sequence file": "xxx.fasta"}, {"from id": "id1"}],
+        )
+
+    def testLargeRepeat(self):
+        """
+        A repeat specification with a very large number of values must be
+        checked (including references to the ids it makes) without expanding
+        it.
+        """
+        s = Sequences(
+            [
+                {
+                    "repeat": 10**9,
+                    "sequences": [{"id": "x-%(i)d"}, {"id prefix": "p-", "count": 2}],
+                },
+                {"from id": "x-1000000000"},
+                {"from id": "p-2000000000"},
+            ]
+        )
+        self.assertEqual(
+            ["x-1", "p-1", "p-2", "x-2"], [read.id for read in islice(s, 4)]
+        )
+
+    def testLargeRepeatUnknownIds(self):
+        """
+        References to ids beyond those made by a very large repeat
+        specification must be reported.
+        """
+        error = (
+            "^Sequence specification 2 refers to the id 'x-1000000001', which is "
+            "not the id of an earlier sequence\\.\\n"
+            "Sequence specification 3 refers to the id 'p-2000000001', which is "
+            "not the id of an earlier sequence\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {
+                    "repeat": 10**9,
+                    "sequences": [{"id": "x-%(i)d"}, {"id prefix": "p-", "count": 2}],
+                },
+                {"from id": "x-1000000001"},
+                {"from id": "p-2000000001"},
+            ],
+        )
+
+    def testRepeatExpandedSpecsChecked(self):
+        """
+        A repeat template whose values are only invalid for a later value of
+        the repeat variable must cause a ValueError when it is expanded.
+        """
+        s = Sequences([{"repeat": [1, 0], "sequences": [{"min distance": "%(i)d"}]}])
+        error = (
+            "^Sequence specification 1 \\(i=0, template 1\\) has a 'min "
+            "distance' value \\(0\\) that is not a positive integer\\.$"
+        )
+        assertRaisesRegex(self, ValueError, error, list, s)
+
+
+class TestEstimate(TestCase):
+    """
+    Test the Sequences.estimate method.
+    """
+
+    def testDigitCount(self):
+        """
+        The digits in a range of integers must be counted correctly.
+        """
+        self.assertEqual(9, _digitCount(1, 9))
+        self.assertEqual(11, _digitCount(1, 10))
+        self.assertEqual(2 * 90 + 3 * 5, _digitCount(10, 104))
+        self.assertEqual(0, _digitCount(1, 0))
+
+    def testRatchetChangesNoMutation(self):
+        """
+        With a zero mutation rate, all reads of a ratchet (except the first,
+        if it is not a mutant) must be mutants with no changes.
+        """
+        self.assertEqual((9, 0.0), _ratchetChanges(10, 100, 0.0, False))
+        self.assertEqual((10, 0.0), _ratchetChanges(10, 100, 0.0, True))
+
+    def testRatchetChanges(self):
+        """
+        The changes in the mutants of a ratchet must accumulate until a read
+        is stored in full.
+        """
+        # With a rate of 0.05, the fraction changed after s steps is 0.05,
+        # 0.0975 and 0.142625, so every third read is stored in full.
+        mutants, changes = _ratchetChanges(7, 1000, 0.05, False)
+        self.assertEqual(4, mutants)
+        self.assertAlmostEqual(2 * (50 + 97.5), changes)
+
+    def testCounts(self):
+        """
+        The numbers of reads and bases must be given for each specification
+        and in total.
+        """
+        estimate = Sequences(
+            [{"count": 3, "length": 10}, {"id": "a", "sequence": "ACGT"}]
+        ).estimate()
+        self.assertEqual(
+            [(3, 30), (1, 4)],
+            [(spec["reads"], spec["bases"]) for spec in estimate["specs"]],
+        )
+        self.assertEqual(4, estimate["reads"])
+        self.assertEqual(34, estimate["bases"])
+
+    def testFileSizes(self):
+        """
+        The sizes of output files must be estimated from the ids and lengths
+        of their reads.
+        """
+        with TemporaryDirectory() as tempdir:
+            fasta = os.path.join(tempdir, "out.fasta")
+            fastq = os.path.join(tempdir, "out.fastq")
+            template = os.path.join(tempdir, "out-{shard}.fasta")
+            s = Sequences(
+                [
+                    {"id": "a", "length": 30, "filename": fasta},
+                    {"from id": "a", "count": 12, "filename": fasta},
+                    {
+                        "count": 3,
+                        "length": 20,
+                        "filename": fastq,
+                        "format": "fastq",
+                        "description": "desc",
+                    },
+                    {"count": 5, "sections": [{"length": 3}], "filename": template},
+                ],
+                defaultShards=2,
+            )
+            estimate = s.estimate()
+            self.assertEqual([], os.listdir(tempdir))
+            s.write()
+            self.assertEqual(
+                sorted(os.listdir(tempdir)),
+                sorted(os.path.basename(f["filename"]) for f in estimate["files"]),
+            )
+            for f in estimate["files"]:
+                self.assertEqual(os.path.getsize(f["filename"]), f["bytes"])
+            self.assertEqual(
+                sum(os.path.getsize(f["filename"]) for f in estimate["files"]),
+                estimate["bytes"],
+            )
+
+    def testRecombinantFileSizes(self):
+        """
+        The sizes of files of recombinants must be estimated from the ids of
+        their parents and their expected breakpoints, which are given after
+        their ids.
+        """
+        for recombinant in (
+            {"parent prefix": "p-", "breakpoint rate": 0.01},
+            {"parents": ["p-1", "p-20", "p-3"], "breakpoints": 4, "description": "d"},
+        ):
+            with TemporaryDirectory() as tempdir:
+                filename = os.path.join(tempdir, "out.fasta")
+                recombinant = dict(recombinant, count=200, filename=filename)
+                s = Sequences(
+                    [
+                        {"id prefix": "p-", "count": 20, "length": 500, "skip": True},
+                        recombinant,
+                    ],
+                    seed=1,
+                )
+                estimate = s.estimate()
+                s.write()
+                self.assertAlmostEqual(
+                    os.path.getsize(filename),
+                    estimate["bytes"],
+                    delta=0.01 * estimate["bytes"],
+                )
+
+    def testSkip(self):
+        """
+        A skipped specification must not be written to any file, but its
+        reads must still be counted (and their memory use estimated).
+        """
+        estimate = Sequences([{"id": "a", "length": 50, "skip": True}]).estimate()
+        self.assertEqual([], estimate["files"])
+        self.assertEqual([], estimate["specs"][0]["files"])
+        self.assertEqual(1, estimate["reads"])
+        self.assertGreater(estimate["memory"], 50)
+
+    def testMutantsUseLessMemory(self):
+        """
+        Mutants (which only hold their changes) must be estimated to need
+        less memory than reads of the same length that are held in full.
+        """
+        mutants = Sequences(
+            [
+                {"id": "a", "length": 1000},
+                {"from id": "a", "count": 100, "mutation rate": 0.01},
+            ]
+        ).estimate()["specs"][1]
+        full = Sequences([{"count": 100, "length": 1000}]).estimate()["specs"][0]
+        self.assertLess(mutants["memory"], full["memory"] / 3)
+
+    def testSeconds(self):
+        """
+        The estimated run time must be positive, grow with the number of
+        bases, and be the sum of the times for each specification.
+        """
+        estimate = Sequences(
+            [{"count": 10, "length": 100}, {"count": 10, "length": 1000}]
+        ).estimate()
+        first, second = estimate["specs"]
+        self.assertGreater(first["seconds"], 0.0)
+        self.assertGreater(second["seconds"], first["seconds"])
+        self.assertAlmostEqual(
+            first["seconds"] + second["seconds"], estimate["seconds"]
+        )
+
+    def testRepeat(self):
+        """
+        Repeat specifications must be expanded, with their labels given.
+        """
+        estimate = Sequences(
+            {
+                "sequences": [
+                    {"repeat": 2, "sequences": [{"id": "x-%(i)s", "length": 5}]}
+                ]
+            }
+        ).estimate()
+        self.assertEqual(2, len(estimate["specs"]))
+        self.assertEqual(10, estimate["bases"])
+
+    def testNothingGenerated(self):
+        """
+        Estimating must not generate any sequences.
+        """
+        s = Sequences([{"id": "a", "length": 10}])
+        s.estimate()
+        self.assertEqual({}, s._sequences)
+
+
+class TestComposition(TestCase):
+    """
+    Test the 'composition' and 'gc content' specification keys.
+    """
+
+    def testGCContent(self):
+        """
+        Sequences must have (approximately) the given GC content.
+        """
+        (read,) = Sequences([{"length": 20000, "gc content": 0.8}], seed=1)
+        gc = (read.sequence.count("G") + read.sequence.count("C")) / 20000
+        self.assertAlmostEqual(0.8, gc, delta=0.02)
+        self.assertEqual(set("ACGT"), set(read.sequence))
+
+    def testZeroGCContent(self):
+        """
+        A GC content of zero must give sequences of only A and T.
+        """
+        (read,) = Sequences([{"length": 1000, "gc content": 0}], seed=1)
+        self.assertEqual(set("AT"), set(read.sequence))
+
+    def testComposition(self):
+        """
+        Sequences must only contain letters given in a composition, in
+        (approximately) the given proportions.
+        """
+        (read,) = Sequences([{"length": 20000, "composition": {"X": 1, "Y": 3}}])
+        self.assertEqual(set("XY"), set(read.sequence))
+        self.assertAlmostEqual(0.75, read.sequence.count("Y") / 20000, delta=0.02)
+        self.assertEqual(["X", "Y"], read.alphabet)
+
+    def testCompositionVariable(self):
+        """
+        Variables must be substituted into the weights of a composition.
+        """
+        (read,) = Sequences(
+            {
+                "variables": {"w": 0},
+                "sequences": [{"length": 100, "composition": {"A": "%(w)d", "C": 1}}],
+            }
+        )
+        self.assertEqual("C" * 100, read.sequence)
+
+    def testMutationReplacements(self):
+        """
+        The letters that mutated sites change to must be chosen with the
+        weights of the composition, and never be the letter that was there.
+        """
+        spec = [
+            {"id": "a", "length": 10000},
+            {
+                "from id": "a",
+                "mutation rate": 0.5,
+                "composition": {"A": 1, "C": 0, "G": 0, "T": 0},
+            },
+        ]
+        original, mutant = Sequences(spec, seed=2)
+        changed = [
+            (old, new)
+            for old, new in zip(original.sequence, mutant.sequence)
+            if old != new
+        ]
+        self.assertGreater(len(changed), 3000)
+        # Sites that were A can only change to another letter if all weights
+        # but that of A are zero, so they are not changed.
+        self.assertEqual(set("A"), set(new for _, new in changed))
+
+    def testBoth(self):
+        """
+        Giving both 'composition' and 'gc content' must raise a ValueError.
+        """
+        error = "gives both 'composition' and 'gc content'\\.$"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"composition": {"A": 1}, "gc content": 0.5}],
+        )
+
+    def testBadGCContent(self):
+        """
+        A GC content that is not from 0 to 1 must raise a ValueError.
+        """
+        error = "has a 'gc content' value \\(1.5\\) that is not a number from 0 to 1"
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"gc content": 1.5}])
+
+    def testBadComposition(self):
+        """
+        A composition with a negative weight must raise a ValueError.
+        """
+        error = "has a 'composition' value .* that is not an object mapping letters"
+        assertRaisesRegex(
+            self, ValueError, error, Sequences, [{"composition": {"A": -1, "C": 2}}]
+        )
+
+    def testZeroComposition(self):
+        """
+        A composition whose weights are all zero must raise a ValueError.
+        """
+        error = "has a 'composition' value .* that is not an object mapping letters"
+        assertRaisesRegex(
+            self, ValueError, error, Sequences, [{"composition": {"A": 0}}]
+        )
+
+    def testWithAlphabet(self):
+        """
+        Giving a composition and an alphabet must raise a ValueError.
+        """
+        error = "gives 'gc content' and 'random aa', which cannot be used together"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"sections": [{"gc content": 0.4, "random aa": True}]}],
+        )
+
+
+class TestRecombinants(TestCase):
+    """
+    Test specifications of recombinants.
+    """
+
+    def parts(self, read):
+        """
+        Get the parts of a recombinant from its id.
+
+        @param read: A C{Read} recombinant.
+        @return: A C{list} of (C{str} parent id, C{int} start, C{int} end)
+            C{tuple}s, with 1-based inclusive sites.
+        """
+        segments = read.id.split()[-1]
+        self.assertTrue(segments.startswith("segments="))
+        result = []
+        for part in segments[len("segments=") :].split(","):
+            parent, sites = part.split(":")
+            start, end = map(int, sites.split("-"))
+            result.append((parent, start, end))
+        return result
+
+    def testParents(self):
+        """
+        Each part of a recombinant must come from the parent given in its id,
+        and adjacent parts must have different parents.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id": "a", "length": 50},
+                    {"id": "b", "length": 50},
+                    {"id": "c", "length": 50},
+                    {
+                        "id prefix": "r-",
+                        "parents": ["a", "b", "c"],
+                        "breakpoints": 3,
+                        "count": 20,
+                    },
+                ],
+                seed=1,
+            )
+        )
+        parents = {read.id: read.sequence for read in reads[:3]}
+        for count, read in enumerate(reads[3:], start=1):
+            self.assertTrue(read.id.startswith("r-%d segments=" % count))
+            self.assertEqual(50, len(read.sequence))
+            parts = self.parts(read)
+            self.assertEqual(4, len(parts))
+            self.assertEqual(1, parts[0][1])
+            self.assertEqual(50, parts[-1][2])
+            previous = None
+            for parent, start, end in parts:
+                self.assertNotEqual(previous, parent)
+                self.assertEqual(
+                    parents[parent][start - 1 : end], read.sequence[start - 1 : end]
+                )
+                previous = parent
+
+    def testParentPrefix(self):
+        """
+        A parent prefix must use the ids made from it.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id prefix": "p-", "count": 2, "length": 20},
+                    {"id": "p-x", "length": 20},
+                    {"parent prefix": "p-", "breakpoint rate": 0.2, "count": 10},
+                ],
+                seed=2,
+            )
+        )
+        self.assertEqual(
+            {"p-1", "p-2"},
+            set(parent for read in reads[3:] for parent, _, _ in self.parts(read)),
+        )
+
+    def testBreakpointRate(self):
+        """
+        A breakpoint rate of 1 must put a breakpoint between every pair of
+        bases.
+        """
+        _, _, read = list(
+            Sequences(
+                [
+                    {"id": "a", "sequence": "AAAAA"},
+                    {"id": "b", "sequence": "CCCCC"},
+                    {"parents": ["a", "b"], "breakpoint rate": 1.0},
+                ],
+                seed=3,
+            )
+        )
+        self.assertIn(read.sequence, ("ACACA", "CACAC"))
+        self.assertEqual(5, len(self.parts(read)))
+
+    def testDescription(self):
+        """
+        The parts of a recombinant must follow its description, and it must
+        be possible to refer to it without them.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id": "a", "sequence": "AAAAAAAA"},
+                    {"id": "b", "sequence": "CCCCCCCC"},
+                    {"id": "r", "description": "rec", "parents": ["a", "b"]},
+                    {"from id": "r rec", "start": 3, "length": 4},
+                ],
+                seed=4,
+            )
+        )
+        self.assertTrue(reads[2].id.startswith("r rec segments="))
+        self.assertEqual(reads[2].sequence[2:6], reads[3].sequence)
+
+    def testSeeded(self):
+        """
+        Recombinants must be the same when the same seed is given.
+        """
+        spec = [
+            {"id prefix": "p-", "count": 4, "length": 100},
+            {"parent prefix": "p-", "breakpoint rate": 0.05, "count": 10},
+        ]
+        self.assertEqual(
+            [(read.id, read.sequence) for read in Sequences(spec, seed=5)],
+            [(read.id, read.sequence) for read in Sequences(spec, seed=5)],
+        )
+
+    def testUnknownParent(self):
+        """
+        A parent that is not an earlier id must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 2 refers to the id 'b', which is not the "
+            "id of an earlier sequence\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id": "a"}, {"parents": ["a", "b"]}],
+        )
+
+    def testDifferentLengths(self):
+        """
+        Parents of different lengths must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 3 has parents of different lengths "
+            "\\(5, 10\\)\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {"id": "a", "length": 10},
+                {"id": "b", "length": 5},
+                {"parents": ["a", "b"]},
+            ],
+        )
+
+    def testTooFewPrefixIds(self):
+        """
+        A parent prefix that fewer than two ids were made from must raise a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 2 has a parent prefix \\('p-'\\) that "
+            "fewer than two earlier sequence ids were made from\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id prefix": "p-"}, {"parent prefix": "p-"}],
+        )
+
+    def testTooManyBreakpoints(self):
+        """
+        More breakpoints than sites between bases must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 3 has more breakpoints \\(4\\) than there "
+            "are sites between the bases of its parents \\(of length 4\\)\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {"id": "a", "length": 4},
+                {"id": "b", "length": 4},
+                {"parents": ["a", "b"], "breakpoints": 4},
+            ],
+        )
+
+    def testOtherKeys(self):
+        """
+        A specification of recombinants that gives keys for making other
+        sequences must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 3 makes recombinants, so it cannot give "
+            "'length', 'mutation rate'\\.$"
+        )
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [
+                {"id": "a"},
+                {"id": "b"},
+                {"parents": ["a", "b"], "length": 4, "mutation rate": 0.1},
+            ],
+        )
+
+    def testBreakpointsWithoutParents(self):
+        """
+        Breakpoints without parents must raise a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 gives 'breakpoints' but does not give "
+            "'parents' or a 'parent prefix'\\.$"
+        )
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"breakpoints": 2}])
+
+    def testBadBreakpointRate(self):
+        """
+        A breakpoint rate that is not in (0, 1] must raise a ValueError.
+        """
+        error = "has a 'breakpoint rate' \\(0\\) that is not greater than 0"
+        assertRaisesRegex(
+            self,
+            ValueError,
+            error,
+            Sequences,
+            [{"id": "a"}, {"id": "b"}, {"parents": ["a", "b"], "breakpoint rate": 0}],
+        )
+
+
+class TestUnique(TestCase):
+    """
+    Test specifications whose reads must be unique.
+    """
+
+    def testUnique(self):
+        """
+        The reads of a specification with 'unique' must all be different, even
+        when there are few possible sequences.
+        """
+        reads = list(Sequences([{"count": 60, "length": 3, "unique": True}], seed=1))
+        self.assertEqual(60, len(set(read.sequence for read in reads)))
+
+    def testNotUnique(self):
+        """
+        Without 'unique', reads may be duplicates.
+        """
+        reads = list(Sequences([{"count": 60, "length": 3}], seed=1))
+        self.assertLess(len(set(read.sequence for read in reads)), 60)
+
+    def testSpecsNotGrouped(self):
+        """
+        Specifications with 'unique' true must each have their own reads
+        checked, so they may duplicate one another's.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id prefix": "a-", "count": 16, "length": 2, "unique": True},
+                    {"id prefix": "b-", "count": 16, "length": 2, "unique": True},
+                ],
+                seed=1,
+            )
+        )
+        self.assertEqual(16, len(set(read.sequence for read in reads)))
+
+    def testGroup(self):
+        """
+        The reads of specifications in the same 'unique' group must all be
+        different.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id prefix": "a-", "count": 10, "length": 2, "unique": "g"},
+                    {"id prefix": "b-", "count": 6, "length": 2, "unique": "g"},
+                ],
+                seed=1,
+            )
+        )
+        self.assertEqual(16, len(set(read.sequence for read in reads)))
+
+    def testMutants(self):
+        """
+        Mutants made from another read must be unique.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id": "a", "length": 10},
+                    {
+                        "id prefix": "m-",
+                        "from id": "a",
+                        "count": 20,
+                        "mutation rate": 0.1,
+                        "unique": True,
+                    },
+                ],
+                seed=1,
+            )
+        )
+        self.assertEqual(20, len(set(read.sequence for read in reads[1:])))
+
+    def testSeed(self):
+        """
+        Reads with 'unique' must be the same when the same seed is given.
+        """
+        spec = [{"count": 60, "length": 3, "unique": True}]
+        self.assertEqual(
+            [read.sequence for read in Sequences(spec, seed=1)],
+            [read.sequence for read in Sequences(spec, seed=1)],
+        )
+
+    def testTooFewSequences(self):
+        """
+        Asking for more unique reads than there are possible sequences must
+        raise a ValueError.
+        """
+        error = (
+            "^Could not make a read that is different enough from the earlier "
+            "reads \\(for id prefix 'x-'\\) in 1000 attempts\\. The "
+            "specification may not allow enough different sequences\\.$"
+        )
+        s = Sequences(
+            [{"id prefix": "x-", "count": 17, "length": 2, "unique": True}], seed=1
+        )
+        assertRaisesRegex(self, ValueError, error, list, s)
+
+    def testReset(self):
+        """
+        After a reset, the reads must be the same as the first time.
+        """
+        s = Sequences([{"count": 16, "length": 2, "unique": True}], seed=1)
+        first = [read.sequence for read in s]
+        s.reset()
+        self.assertEqual(first, [read.sequence for read in s])
+
+    def testBadValue(self):
+        """
+        A 'unique' value that is not a bool or a non-empty string must raise a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has a 'unique' value \\(3\\) that is not "
+            "true, false, or the name of a group of specifications\\.$"
+        )
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"unique": 3}])
+
+
+class TestMinDistance(TestCase):
+    """
+    Test specifications whose reads must be a minimum distance apart.
+    """
+
+    def testMinDistance(self):
+        """
+        Each pair of reads must differ at at least the minimum number of
+        sites.
+        """
+        reads = [
+            read.sequence
+            for read in Sequences(
+                [{"count": 30, "length": 8, "min distance": 3}], seed=1
+            )
+        ]
+        self.assertEqual(30, len(reads))
+        for i, first in enumerate(reads):
+            for second in reads[i + 1 :]:
+                self.assertGreaterEqual(sum(a != b for a, b in zip(first, second)), 3)
+
+    def testMutants(self):
+        """
+        Mutants of the same read must each be at least the minimum distance
+        from one another.
+        """
+        reads = [
+            read.sequence
+            for read in Sequences(
+                [
+                    {"id": "a", "length": 50, "skip": True},
+                    {
+                        "from id": "a",
+                        "count": 20,
+                        "mutation rate": 0.1,
+                        "min distance": 5,
+                    },
+                ],
+                seed=1,
+            )
+        ]
+        for i, first in enumerate(reads):
+            for second in reads[i + 1 :]:
+                self.assertGreaterEqual(sum(a != b for a, b in zip(first, second)), 5)
+
+    def testOnlyWithinSpec(self):
+        """
+        The reads of different specifications must not be checked against
+        one another.
+        """
+        reads = list(
+            Sequences(
+                [
+                    {"id prefix": "a-", "count": 4, "length": 1, "min distance": 1},
+                    {"id prefix": "b-", "count": 4, "length": 1, "min distance": 1},
+                ],
+                seed=1,
+            )
+        )
+        self.assertEqual(4, len(set(read.sequence for read in reads)))
+
+    def testSeed(self):
+        """
+        Reads with a minimum distance must be the same when the same seed is
+        given.
+        """
+        spec = [{"count": 30, "length": 8, "min distance": 3}]
+        self.assertEqual(
+            [read.sequence for read in Sequences(spec, seed=1)],
+            [read.sequence for read in Sequences(spec, seed=1)],
+        )
+
+    def testTooClose(self):
+        """
+        Asking for more reads than can be the minimum distance apart must
+        raise a ValueError.
+        """
+        error = (
+            "^Could not make a read that is different enough from the earlier "
+            "reads \\(for id prefix 'x-'\\) in 1000 attempts\\."
+        )
+        s = Sequences(
+            [{"id prefix": "x-", "count": 5, "length": 2, "min distance": 2}], seed=1
+        )
+        assertRaisesRegex(self, ValueError, error, list, s)
+
+    def testBadValue(self):
+        """
+        A 'min distance' value that is not a positive integer must raise a
+        ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has a 'min distance' value \\(0\\) that "
+            "is not a positive integer\\.$"
+        )
+        assertRaisesRegex(self, ValueError, error, Sequences, [{"min distance": 0}])
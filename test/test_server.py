@@ -0,0 +1,114 @@
+import os
+from json import dumps
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+
+from seqgen.server import SequencesServer, request
+
+
+class TestSequencesServer(TestCase):
+    """
+    Test the SequencesServer class.
+    """
+
+    def setUp(self):
+        self.tempdir = TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "socket")
+        self.server = SequencesServer(self.path)
+        self.thread = Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tempdir.cleanup()
+
+    def testOneSpecification(self):
+        """
+        A single specification must result in the expected reads.
+        """
+        result = request(self.path, '[{"id": "a", "sequence": "ACGT"}]')
+        self.assertEqual(">a\nACGT\n", result)
+
+    def testPrettyPrintedSpecification(self):
+        """
+        A specification spread over several lines must be accepted.
+        """
+        spec = dumps({"sequences": [{"id": "a", "sequence": "ACGT"}]}, indent=4)
+        self.assertEqual(">a\nACGT\n", request(self.path, spec))
+
+    def testJSONLines(self):
+        """
+        Specifications in JSON Lines format must each be processed, in order.
+        """
+        result = request(
+            self.path,
+            '[{"id": "a", "sequence": "ACGT"}]\n'
+            '{"sequences": [{"id": "b", "sequence": "TTT"}]}\n',
+        )
+        self.assertEqual(">a\nACGT\n>b\nTTT\n", result)
+
+    def testSpecificationIsCached(self):
+        """
+        A repeated specification must be parsed only once, and must give
+        results as though it had been parsed afresh.
+        """
+        spec = '[{"length": 5}, {"length": 5}]'
+        first = request(self.path, spec)
+        second = request(self.path, spec)
+        self.assertEqual(1, len(self.server.plans))
+        for result in first, second:
+            self.assertEqual(
+                [">seq-id-1", ">seq-id-2"],
+                [line for line in result.split("\n") if line.startswith(">")],
+            )
+
+    def testMaxPlans(self):
+        """
+        The number of cached specifications must not exceed the maximum.
+        """
+        self.server.maxPlans = 2
+        for length in 1, 2, 3:
+            request(self.path, '[{"length": %d}]' % length)
+        self.assertEqual(
+            ['[{"length": 2}]', '[{"length": 3}]'], list(self.server.plans)
+        )
+
+    def testSequenceFileIsCached(self):
+        """
+        The contents of a sequence file must be cached between requests.
+        """
+        filename = os.path.join(self.tempdir.name, "file.fasta")
+        with open(filename, "w") as fp:
+            fp.write(">id1\nACCT\n")
+        spec = dumps([{"sequence file": filename}])
+        self.assertEqual(">id1\nACCT\n", request(self.path, spec))
+        self.assertEqual(("id1", "ACCT"), self.server.sequenceFileCache[filename][1])
+        self.assertEqual(">id1\nACCT\n", request(self.path, spec))
+
+    def testInvalidJSON(self):
+        """
+        Invalid JSON must result in an error being reported.
+        """
+        error = "^JSONDecodeError: Expecting ',' delimiter"
+        self.assertRaisesRegex(ValueError, error, request, self.path, '{"id": 3')
+
+    def testInvalidSpecification(self):
+        """
+        An invalid specification must result in an error being reported.
+        """
+        error = (
+            "^ValueError: Sequence specification 1 contains an unknown key: " "xxx\\.$"
+        )
+        self.assertRaisesRegex(ValueError, error, request, self.path, '[{"xxx": 3}]')
+
+    def testServerContinuesAfterError(self):
+        """
+        After an error, the server must continue to handle requests.
+        """
+        self.assertRaises(ValueError, request, self.path, "[{")
+        self.assertEqual(
+            ">a\nAC\n", request(self.path, '[{"id": "a", "sequence": "AC"}]')
+        )
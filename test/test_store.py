@@ -0,0 +1,235 @@
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from seqgen.read import Read
+from seqgen.sequences import Sequences
+from seqgen.store import ReadStore
+
+
+class TestReadStore(TestCase):
+    """
+    Test the ReadStore class.
+    """
+
+    def testEmpty(self):
+        """
+        A new store must be empty.
+        """
+        store = ReadStore()
+        self.assertEqual(0, len(store))
+        self.assertNotIn("a", store)
+        self.assertEqual([], list(store))
+        self.assertIsNone(store.get("a"))
+        self.assertRaises(KeyError, store.__getitem__, "a")
+        store.close()
+
+    def testAddAndGet(self):
+        """
+        A read that is added must be found, with all its attributes.
+        """
+        store = ReadStore()
+        store["a"] = Read("a x", "ACGT", "!!!!", "ACGT")
+        self.assertIn("a", store)
+        self.assertEqual(1, len(store))
+        read = store["a"]
+        self.assertEqual(
+            ("a x", "ACGT", "!!!!", "ACGT"),
+            (read.id, read.sequence, read.quality, read.alphabet),
+        )
+        store.close()
+
+    def testReadFromFile(self):
+        """
+        Reads that are not in memory must be read from the file.
+        """
+        store = ReadStore(maxBytes=10)
+        for n in range(20):
+            store["id%d" % n] = Read("id%d" % n, "ACGT" * (n + 1))
+        for n in reversed(range(20)):
+            self.assertEqual("ACGT" * (n + 1), store["id%d" % n].sequence)
+        self.assertLess(store._lruBytes, 11)
+        self.assertGreater(store.misses, 0)
+        store.close()
+
+    def testRecentlyUsedKept(self):
+        """
+        Recently used reads must be kept in memory.
+        """
+        store = ReadStore(maxBytes=8)
+        store["a"] = Read("a", "AAAA")
+        store["b"] = Read("b", "CCCC")
+        store["a"]
+        store["c"] = Read("c", "GGGG")
+        self.assertEqual(["a", "c"], list(store._lru))
+        store["a"]
+        self.assertEqual(0, store.misses)
+        store["b"]
+        self.assertEqual(1, store.misses)
+        store.close()
+
+    def testGrowAfterMapping(self):
+        """
+        Reads added after the file has been mapped must be found.
+        """
+        store = ReadStore(maxBytes=0)
+        store["a"] = Read("a", "AAAA")
+        self.assertEqual("AAAA", store["a"].sequence)
+        store["b"] = Read("b", "CCCC")
+        self.assertEqual("CCCC", store["b"].sequence)
+        store.close()
+
+    def testReplace(self):
+        """
+        Adding a read with an id that is already present must replace it.
+        """
+        store = ReadStore(maxBytes=0)
+        store["a"] = Read("a", "AAAA")
+        store["a"] = Read("a", "CCCC")
+        self.assertEqual(1, len(store))
+        self.assertEqual("CCCC", store["a"].sequence)
+        store.close()
+
+    def testMutant(self):
+        """
+        A mutant must be read back as an ordinary read with its sequence.
+        """
+        store = ReadStore(maxBytes=0)
+        parent = Read("p", "AAAA")
+        mutant = Read.mutant(parent, [1], "C")
+        mutant.id = "m"
+        store["m"] = mutant
+        read = store["m"]
+        self.assertEqual("ACAA", read.sequence)
+        self.assertIsNone(read.parent)
+        store.close()
+
+    def testItems(self):
+        """
+        The items must be the ids and reads, in the order they were added.
+        """
+        store = ReadStore(maxBytes=0)
+        store["b"] = Read("b", "CCCC")
+        store["a"] = Read("a", "AAAA")
+        self.assertEqual(
+            [("b", "CCCC"), ("a", "AAAA")],
+            [(id_, read.sequence) for id_, read in store.items()],
+        )
+        store.close()
+
+    def testDirectory(self):
+        """
+        The file must be made in the given directory, and removed when the
+        store is closed.
+        """
+        with TemporaryDirectory() as tempdir:
+            store = ReadStore(tempdir)
+            store["a"] = Read("a", "AAAA")
+            store.close()
+            self.assertEqual([], os.listdir(tempdir))
+
+
+class TestSequencesStore(TestCase):
+    """
+    Test using a store with Sequences.
+    """
+
+    SPEC = [
+        {"id": "a", "length": 50},
+        {"id prefix": "unused-", "count": 5, "length": 50},
+        {"id prefix": "m-", "from id": "a", "count": 5, "mutation rate": 0.1},
+        {"id": "b", "from id": "m-3", "mutation rate": 0.1},
+        {"id prefix": "p-", "count": 20, "length": 50},
+        {"id prefix": "r-", "parent prefix": "p-", "count": 10, "breakpoints": 2},
+        {"id prefix": "s-", "parents": ["a", "b"], "count": 3},
+    ]
+
+    def output(self, **kwargs):
+        """
+        Get the output of generating the reads of C{SPEC}.
+
+        @param kwargs: Keyword arguments for L{Sequences}.
+        @return: The C{str} output.
+        """
+        fp = StringIO()
+        Sequences(self.SPEC, seed=1, **kwargs).write(fp)
+        return fp.getvalue()
+
+    def testSameOutput(self):
+        """
+        Using a store (with very little memory) must give the same output as
+        not using one.
+        """
+        with TemporaryDirectory() as tempdir:
+            self.assertEqual(self.output(), self.output(store=tempdir, storeMemory=100))
+
+    def testOnlyReferencedKept(self):
+        """
+        With a store, only the reads that are referred to must be kept.
+        """
+        with TemporaryDirectory() as tempdir:
+            s = Sequences(self.SPEC, seed=1, store=tempdir)
+            s.write(StringIO())
+            self.assertEqual(
+                {"a", "b", "m-3"} | {"p-%d" % n for n in range(1, 21)},
+                set(s._sequences),
+            )
+
+    def testCache(self):
+        """
+        Using a store and a cache must give the same output as not using
+        either.
+        """
+        with TemporaryDirectory() as tempdir:
+            store = os.path.join(tempdir, "store")
+            os.mkdir(store)
+            cache = os.path.join(tempdir, "cache")
+            expected = self.output()
+            self.assertEqual(expected, self.output(store=store, cache=cache))
+            self.assertEqual(expected, self.output(store=store, cache=cache))
+
+    def testCachedRatchet(self):
+        """
+        Reads of a ratchet that are loaded from the cache must be made from
+        the reads they are mutants of, even though those are not kept in the
+        store.
+        """
+        spec = [{"length": 50, "count": 4, "ratchet": True, "mutation rate": 0.01}]
+        with TemporaryDirectory() as tempdir:
+            store = os.path.join(tempdir, "store")
+            os.mkdir(store)
+            cache = os.path.join(tempdir, "cache")
+            results = []
+            for _ in range(2):
+                fp = StringIO()
+                Sequences(spec, seed=1, store=store, cache=cache).write(fp)
+                results.append(fp.getvalue())
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(1, len(os.listdir(cache)))
+
+    def testParentIdsOnly(self):
+        """
+        The parents of a specification of recombinants must be given by
+        their ids (so that their reads stay in the store until needed).
+        """
+        with TemporaryDirectory() as tempdir:
+            s = Sequences(self.SPEC, seed=1, store=tempdir)
+            s.write(StringIO())
+            self.assertEqual(
+                [("p-%d" % n, "p-%d" % n) for n in range(1, 21)],
+                s._parents({"parent prefix": "p-"}),
+            )
+
+    def testResetClosesStore(self):
+        """
+        Resetting must close (and so remove) the store used before.
+        """
+        with TemporaryDirectory() as tempdir:
+            s = Sequences(self.SPEC, seed=1, store=tempdir)
+            s.write(StringIO())
+            store = s._sequences
+            s.reset()
+            self.assertTrue(store._fp.closed)
+            self.assertIsNot(store, s._sequences)
+            self.assertEqual(0, len(s._sequences))
@@ -0,0 +1,168 @@
+import os
+from io import StringIO
+from json import load
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from seqgen.read import Read
+from seqgen.sequences import Sequences
+from seqgen.summary import Summary
+
+
+class TestSummary(TestCase):
+    """
+    Test the Summary class.
+    """
+
+    def testNoSpecs(self):
+        """
+        If there are no specifications, there must be no summaries.
+        """
+        summary = Summary()
+        Sequences([], summary=summary).write(StringIO())
+        self.assertEqual({"specs": []}, summary.toDict())
+
+    def testNoCurrentSpec(self):
+        """
+        Reads and mutations recorded when no specification has been started
+        must be ignored.
+        """
+        summary = Summary()
+        summary.produced(Read("id", "ACGT", alphabet="ACGT"))
+        summary.mutated(1, 4)
+        self.assertEqual({"specs": []}, summary.toDict())
+
+    def testLengthsAndComposition(self):
+        """
+        The lengths and composition of reads must be summarized.
+        """
+        summary = Summary()
+        summary.startSpec({"id prefix": "p-"})
+        summary.produced(Read("p-1", "AACG", alphabet="ACGT"))
+        summary.produced(Read("p-2", "AANNTT", alphabet="ACGT"))
+        summary.endSpec()
+        (result,) = summary.toDict()["specs"]
+        self.assertEqual("p-", result["name"])
+        self.assertEqual(2, result["reads"])
+        self.assertEqual(10, result["bases"])
+        self.assertEqual(
+            {"min": 4, "max": 6, "mean": 5.0, "counts": {"4": 1, "6": 1}},
+            result["lengths"],
+        )
+        self.assertEqual(
+            {"A": 0.4, "C": 0.1, "G": 0.1, "N": 0.2, "T": 0.2},
+            result["composition"],
+        )
+        self.assertEqual(0.25, result["gc content"])
+
+    def testPairwise(self):
+        """
+        The mean distance between pairs of reads of the same length must be
+        found.
+        """
+        summary = Summary()
+        summary.startSpec({})
+        for sequence in "AAAA", "AAAT", "AATT", "AAAAAA":
+            summary.produced(Read(None, sequence, alphabet="ACGT"))
+        (result,) = summary.toDict()["specs"]
+        self.assertEqual(
+            {"sampled reads": 4, "pairs": 3, "mean": 4 / 3, "mean per site": 1 / 3},
+            result["pairwise distance"],
+        )
+
+    def testSampleSize(self):
+        """
+        No more than the sample size of reads must be kept, and no more than
+        the maximum number of pairs compared.
+        """
+        summary = Summary(sampleSize=5, maxPairs=3)
+        summary.startSpec({})
+        for _ in range(100):
+            summary.produced(Read(None, "ACGT", alphabet="ACGT"))
+        (result,) = summary.toDict()["specs"]
+        self.assertEqual(5, result["pairwise distance"]["sampled reads"])
+        self.assertEqual(3, result["pairwise distance"]["pairs"])
+        self.assertEqual(0.0, result["pairwise distance"]["mean"])
+
+    def testSubstitutions(self):
+        """
+        The substitutions made by mutation must match the rate given.
+        """
+        summary = Summary()
+        Sequences(
+            [
+                {"id": "a", "length": 1000, "skip": True},
+                {"from id": "a", "count": 200, "mutation rate": 0.1},
+            ],
+            seed=1,
+            summary=summary,
+        ).write(StringIO())
+        first, second = summary.toDict()["specs"]
+        self.assertEqual(0, first["reads"])
+        self.assertEqual(0, first["substitutions"]["mutated reads"])
+        self.assertEqual(200, second["reads"])
+        self.assertEqual(200, second["substitutions"]["mutated reads"])
+        self.assertEqual(200000, second["substitutions"]["sites"])
+        self.assertAlmostEqual(0.1, second["substitutions"]["rate"], delta=0.005)
+        # Two reads that each differ from the parent at 10% of sites differ
+        # from each other at about 2 * 0.1 - 0.1 * 0.1 * (4/3) of sites.
+        self.assertAlmostEqual(
+            0.1867, second["pairwise distance"]["mean per site"], delta=0.01
+        )
+
+    def testRejections(self):
+        """
+        The number of reads rejected for a specification whose reads must be
+        unique must be given, along with the rejection rate.
+        """
+        summary = Summary()
+        Sequences(
+            [{"count": 3, "length": 20}, {"count": 16, "length": 2, "unique": True}],
+            seed=1,
+            summary=summary,
+        ).write(StringIO())
+        first, second = summary.toDict()["specs"]
+        self.assertEqual(
+            {"accepted reads": 0, "rejected": 0, "rejection rate": None},
+            first["rejections"],
+        )
+        rejections = second["rejections"]
+        self.assertEqual(16, rejections["accepted reads"])
+        self.assertGreater(rejections["rejected"], 0)
+        self.assertEqual(
+            rejections["rejected"] / (16 + rejections["rejected"]),
+            rejections["rejection rate"],
+        )
+
+    def testIter(self):
+        """
+        Iterating over reads must summarize them.
+        """
+        summary = Summary()
+        reads = list(Sequences([{"count": 3, "length": 20}], summary=summary))
+        self.assertEqual(3, len(reads))
+        (result,) = summary.toDict()["specs"]
+        self.assertEqual(3, result["reads"])
+
+    def testSave(self):
+        """
+        Saving must write the summaries as JSON.
+        """
+        summary = Summary()
+        Sequences([{"count": 2, "length": 10}], summary=summary).write(StringIO())
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "summary.json")
+            summary.save(filename)
+            with open(filename) as fp:
+                self.assertEqual(summary.toDict(), load(fp))
+
+    def testSameOutput(self):
+        """
+        Summarizing a seeded run must not change its output.
+        """
+        spec = [{"count": 20, "length": 50, "mutation rate": 0.2}]
+        expected = StringIO()
+        Sequences(spec, seed=3).write(expected)
+        fp = StringIO()
+        Sequences(spec, seed=3, summary=Summary()).write(fp)
+        self.assertEqual(expected.getvalue(), fp.getvalue())
@@ -0,0 +1,290 @@
+import os
+from io import BytesIO, StringIO, TextIOWrapper
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from dark.fasta import FastaReads
+
+from seqgen.sequences import Sequences, variableValues
+from seqgen.sweep import Sweep, isSweep
+
+
+class TestVariableValues(TestCase):
+    """
+    Test the variableValues function.
+    """
+
+    def testList(self):
+        """
+        A list of values must be returned as is.
+        """
+        self.assertEqual([1, 5, 3], variableValues("x", [1, 5, 3]))
+
+    def testEmptyList(self):
+        """
+        An empty list of values must result in a ValueError.
+        """
+        error = "^Variable 'x' has no values\\.$"
+        self.assertRaisesRegex(ValueError, error, variableValues, "x", [])
+
+    def testIntRange(self):
+        """
+        An integer range must not include its stop value.
+        """
+        self.assertEqual(
+            [10, 20, 30],
+            list(variableValues("x", {"start": 10, "stop": 40, "step": 10})),
+        )
+
+    def testIntRangeDefaultStep(self):
+        """
+        The default range step must be one.
+        """
+        self.assertEqual([1, 2, 3], list(variableValues("x", {"start": 1, "stop": 4})))
+
+    def testFloatRange(self):
+        """
+        A float range must give rounded values and not include its stop value.
+        """
+        self.assertEqual(
+            [0.1, 0.2, 0.3],
+            variableValues("x", {"start": 0.1, "stop": 0.4, "step": 0.1}),
+        )
+
+    def testRangeWithoutStop(self):
+        """
+        A range with no stop value must result in a ValueError.
+        """
+        error = "^Range for variable 'x' must have 'start' and 'stop' keys\\.$"
+        self.assertRaisesRegex(ValueError, error, variableValues, "x", {"start": 1})
+
+    def testRangeWithUnknownKey(self):
+        """
+        A range with an unknown key must result in a ValueError.
+        """
+        error = "^Range for variable 'x' contains unknown key: end\\.$"
+        self.assertRaisesRegex(
+            ValueError, error, variableValues, "x", {"start": 1, "end": 3}
+        )
+
+    def testRangeWithNegativeStep(self):
+        """
+        A range with a negative step must result in a ValueError.
+        """
+        error = "^Range for variable 'x' has a non-positive step\\.$"
+        self.assertRaisesRegex(
+            ValueError,
+            error,
+            variableValues,
+            "x",
+            {"start": 1, "stop": 3, "step": -1},
+        )
+
+
+class TestSweep(TestCase):
+    """
+    Test the Sweep class.
+    """
+
+    def testIsSweep(self):
+        """
+        A specification is a sweep if any variable has a list or range value.
+        """
+        self.assertFalse(isSweep([{}]))
+        self.assertFalse(isSweep({"variables": {"x": 3}, "sequences": []}))
+        self.assertTrue(isSweep({"variables": {"x": [3]}, "sequences": []}))
+        self.assertTrue(
+            isSweep({"variables": {"x": {"start": 1, "stop": 3}}, "sequences": []})
+        )
+
+    def testSequencesRejectsSweep(self):
+        """
+        Passing a sweep specification to Sequences must raise a ValueError.
+        """
+        error = "^Variable 'x' has a list or range value\\. Use seqgen\\.sweep\\."
+        self.assertRaisesRegex(
+            ValueError,
+            error,
+            Sequences,
+            {"variables": {"x": [1, 2]}, "sequences": []},
+        )
+
+    def testLength(self):
+        """
+        The length of a sweep must be the number of combinations of values.
+        """
+        sweep = Sweep(
+            {
+                "variables": {"a": [1, 2, 3], "b": {"start": 0, "stop": 4}, "c": 7},
+                "sequences": [],
+            }
+        )
+        self.assertEqual(12, len(sweep))
+
+    def testVariables(self):
+        """
+        The variables for each dataset must be as expected.
+        """
+        sweep = Sweep(
+            {"variables": {"a": [1, 2], "b": ["x", "y"], "c": 7}, "sequences": []}
+        )
+        self.assertEqual(
+            [
+                {"a": 1, "b": "x", "c": 7},
+                {"a": 1, "b": "y", "c": 7},
+                {"a": 2, "b": "x", "c": 7},
+                {"a": 2, "b": "y", "c": 7},
+            ],
+            list(sweep.variables()),
+        )
+
+    def testDatasets(self):
+        """
+        Each dataset must have its variables substituted.
+        """
+        sweep = Sweep(
+            {
+                "variables": {"length": [2, 3]},
+                "sequences": [{"id": "seq-%(length)d", "length": "%(length)d"}],
+            }
+        )
+        result = []
+        for variables, sequences in sweep.datasets():
+            (read,) = list(sequences)
+            result.append((read.id, len(read)))
+        self.assertEqual([("seq-2", 2), ("seq-3", 3)], result)
+
+    def testWriteToFileObjectInOrder(self):
+        """
+        Reads that are not written to a file must be written in dataset
+        order, for any number of processes.
+        """
+        sweep = Sweep(
+            {
+                "variables": {"n": {"start": 1, "stop": 9}},
+                "sequences": [{"id": "id-%(n)d", "sequence": "AC"}],
+            }
+        )
+        expected = "".join(">id-%d\nAC\n" % n for n in range(1, 9))
+        for processes in 1, 2:
+            fp = StringIO()
+            sweep.write(fp, processes=processes)
+            self.assertEqual(expected, fp.getvalue())
+
+    def testWriteFiles(self):
+        """
+        Each dataset must be written to its own file.
+        """
+        with TemporaryDirectory() as tempdir:
+            template = os.path.join(tempdir, "out-%(rate)s-%(length)d.fasta")
+            sweep = Sweep(
+                {
+                    "variables": {"rate": [0.0, 1.0], "length": [5, 10]},
+                    "sequences": [
+                        {
+                            "length": "%(length)d",
+                            "mutation rate": "%(rate)s",
+                            "count": 3,
+                            "filename": template,
+                        },
+                    ],
+                }
+            )
+            sweep.write(StringIO(), processes=2)
+            self.assertEqual(
+                [
+                    "out-0.0-10.fasta",
+                    "out-0.0-5.fasta",
+                    "out-1.0-10.fasta",
+                    "out-1.0-5.fasta",
+                ],
+                sorted(os.listdir(tempdir)),
+            )
+            with open(os.path.join(tempdir, "out-1.0-10.fasta")) as fp:
+                lines = fp.read().split("\n")
+            self.assertEqual([">seq-id-1", ">seq-id-2", ">seq-id-3"], lines[0:6:2])
+            self.assertEqual([10, 10, 10], list(map(len, lines[1:6:2])))
+
+    def testSameFile(self):
+        """
+        If two datasets would write to the same file, a ValueError must be
+        raised.
+        """
+        sweep = Sweep(
+            {
+                "variables": {"rate": [0.1, 0.2]},
+                "sequences": [{"mutation rate": "%(rate)s", "filename": "out.fasta"}],
+            }
+        )
+        error = (
+            "^Sweep datasets 1 and 2 both write to the file 'out\\.fasta'\\. Use "
+            "the sweep variables in the filename to give each dataset its own "
+            "output file\\.$"
+        )
+        self.assertRaisesRegex(ValueError, error, sweep.write, StringIO(), 1)
+
+    def testInvalidDataset(self):
+        """
+        If a dataset has an invalid specification, a ValueError must be raised
+        before anything is written.
+        """
+        sweep = Sweep(
+            {
+                "variables": {"count": [1, 2]},
+                "sequences": [{"id": "xxx", "count": "%(count)d"}],
+            }
+        )
+        fp = StringIO()
+        error = "^Sequence specification 1 with id 'xxx' has a count of 2\\."
+        self.assertRaisesRegex(ValueError, error, sweep.write, fp, 1)
+        self.assertEqual("", fp.getvalue())
+
+    def testSequenceFilesReadOnce(self):
+        """
+        Writing a sweep must read each sequence file only once, when the
+        datasets are checked.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "seq.fasta")
+            with open(filename, "w") as fp:
+                fp.write(">id\nACGTACGT\n")
+            sweep = Sweep(
+                {
+                    "variables": {"n": [1, 2, 3]},
+                    "sequences": [
+                        {"sequence file": filename, "count": "%(n)d"},
+                    ],
+                }
+            )
+            fp = StringIO()
+            with patch("dark.fasta.FastaReads", wraps=FastaReads) as reads:
+                sweep.write(fp, processes=1)
+            self.assertEqual(1, reads.call_count)
+            self.assertEqual(6, fp.getvalue().count(">id"))
+
+    def testBinaryStandardOutput(self):
+        """
+        The datasets of a sweep written in a binary format to a text file
+        pointer with an underlying binary buffer (such as standard output)
+        must be written to the buffer, in dataset order, for any number of
+        processes.
+        """
+        spec = {
+            "variables": {"n": [1, 2, 3]},
+            "sequences": [{"id": "id-%(n)d", "length": 8}],
+        }
+        results = []
+        for processes in 1, 2:
+            fp = TextIOWrapper(BytesIO())
+            Sweep(spec, _format="2bit", seed=1).write(fp, processes=processes)
+            fp.flush()
+            results.append(fp.buffer.getvalue())
+        expected = BytesIO()
+        for n in 1, 2, 3:
+            Sequences(
+                {"variables": {"n": n}, "sequences": spec["sequences"]},
+                _format="2bit",
+                seed=1,
+            ).write(expected)
+        self.assertEqual([expected.getvalue()] * 2, results)
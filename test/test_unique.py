@@ -0,0 +1,131 @@
+import pickle
+from unittest import TestCase
+from unittest.mock import patch
+
+from seqgen.unique import UniqueSet
+
+
+class TestUniqueSet(TestCase):
+    """
+    Test the UniqueSet class.
+    """
+
+    def testEmpty(self):
+        """
+        A new set must be empty and have no rejection rate.
+        """
+        s = UniqueSet()
+        self.assertEqual(0, len(s))
+        self.assertNotIn("ACGT", s)
+        self.assertIsNone(s.rejectionRate())
+
+    def testAdd(self):
+        """
+        Adding a new sequence must return True and add it.
+        """
+        s = UniqueSet()
+        self.assertTrue(s.add("ACGT"))
+        self.assertIn("ACGT", s)
+        self.assertNotIn("ACGA", s)
+        self.assertEqual(1, len(s))
+
+    def testAddDuplicate(self):
+        """
+        Adding a sequence that is already present must return False and count
+        the rejection.
+        """
+        s = UniqueSet()
+        s.add("ACGT")
+        self.assertFalse(s.add("ACGT"))
+        self.assertEqual(1, len(s))
+        self.assertEqual(1, s.rejected)
+        self.assertEqual(0.5, s.rejectionRate())
+
+    def testCaseMatters(self):
+        """
+        Sequences that differ only in case must be different.
+        """
+        s = UniqueSet()
+        self.assertTrue(s.add("ACGT"))
+        self.assertTrue(s.add("acgt"))
+
+    def testGrow(self):
+        """
+        Sequences must still be found after the table grows.
+        """
+        s = UniqueSet()
+        sequences = ["A" * n for n in range(1000)]
+        for sequence in sequences:
+            self.assertTrue(s.add(sequence))
+        self.assertEqual(1000, len(s))
+        for sequence in sequences:
+            self.assertIn(sequence, s)
+            self.assertFalse(s.add(sequence))
+        self.assertNotIn("C", s)
+        self.assertEqual(1000, s.rejected)
+
+    def testCapacity(self):
+        """
+        A set made for a given number of sequences must not need to grow to
+        hold them.
+        """
+        s = UniqueSet(1000)
+        size = len(s._table)
+        for n in range(1000):
+            s.add("A" * n)
+        self.assertEqual(size, len(s._table))
+
+    def testFingerprint(self):
+        """
+        Fingerprints must be non-zero, fit in 64 bits, and not depend on the
+        process (i.e., not use Python's randomized string hashing).
+        """
+        fingerprint = UniqueSet.fingerprint("ACGT")
+        self.assertTrue(0 < fingerprint < 2**64)
+        self.assertEqual(5148239889300062058, fingerprint)
+
+    def testSameFingerprint(self):
+        """
+        A sequence with the same fingerprint as one in the set must only be
+        rejected if it is the same sequence.
+        """
+        s = UniqueSet()
+        with patch.object(UniqueSet, "fingerprint", return_value=1):
+            self.assertTrue(s.add("ACGT"))
+            self.assertTrue(s.add("TTTT"))
+            self.assertFalse(s.add("TTTT"))
+            self.assertIn("ACGT", s)
+            self.assertNotIn("GGGG", s)
+        self.assertEqual(2, len(s))
+        self.assertEqual(1, s.rejected)
+        self.assertTrue(s.collisions > 0)
+
+    def testSameFingerprintAfterGrow(self):
+        """
+        Sequences with the same fingerprint must still be told apart after
+        the table grows.
+        """
+        s = UniqueSet()
+        sequences = ["A" * n for n in range(100)]
+        with patch.object(
+            UniqueSet, "fingerprint", side_effect=lambda seq: len(seq) % 3 + 1
+        ):
+            for sequence in sequences:
+                self.assertTrue(s.add(sequence))
+            for sequence in sequences:
+                self.assertFalse(s.add(sequence))
+        self.assertEqual(100, len(s))
+
+    def testPickle(self):
+        """
+        An unpickled set must hold the same sequences.
+        """
+        s = UniqueSet()
+        s.add("ACGT")
+        s.add("TTTT")
+        s = pickle.loads(pickle.dumps(s))
+        self.assertIn("ACGT", s)
+        self.assertFalse(s.add("TTTT"))
+        self.assertTrue(s.add("GGGG"))
+        self.assertIn("GGGG", s)
+        self.assertEqual(3, len(s))
@@ -0,0 +1,654 @@
+import os
+import struct
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+import numpy as np
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from seqgen.read import Read
+from seqgen.sequences import Sequences
+from seqgen.writers import (
+    ArrowWriter,
+    FastxWriter,
+    InterleavedPhylipWriter,
+    NexusWriter,
+    NpyWriter,
+    PhylipWriter,
+    TwoBitWriter,
+    VcfWriter,
+)
+
+
+def formatAll(writer, reads):
+    """
+    Format reads with a writer.
+
+    @param writer: A C{seqgen.writers.Writer} instance.
+    @param reads: An iterable of C{seqgen.read.Read} instances.
+    @return: The C{str} (or C{bytes}, for a binary writer) output.
+    """
+    fp = BytesIO() if writer.binary else StringIO()
+    for read in reads:
+        fp.write(writer.format(read))
+    writer.finish(fp)
+    return fp.getvalue()
+
+
+class TestFastxWriter(TestCase):
+    """
+    Test the FastxWriter class.
+    """
+
+    def testFastaAndFastq(self):
+        """
+        Reads without a quality must be written as FASTA and reads with a
+        quality as FASTQ.
+        """
+        self.assertEqual(
+            ">a\nAC\n@b\nGT\n+b\n!!\n",
+            formatAll(FastxWriter(2), [Read("a", "AC"), Read("b", "GT", "!!")]),
+        )
+
+
+class TestPhylipWriter(TestCase):
+    """
+    Test the PhylipWriter class.
+    """
+
+    def testSequential(self):
+        """
+        A sequential PHYLIP alignment must be as expected, with whitespace in
+        names replaced.
+        """
+        self.assertEqual(
+            "2 4\na_b ACGT\nc TTTT\n",
+            formatAll(PhylipWriter(2), [Read("a b", "ACGT"), Read("c", "TTTT")]),
+        )
+
+    def testDifferentLengths(self):
+        """
+        Sequences of different lengths must cause a ValueError.
+        """
+        writer = PhylipWriter(2)
+        writer.format(Read("a", "ACGT"))
+        error = (
+            "^Sequence 'b' has length 3, but the PHYLIP format requires all "
+            "sequences to have the same length \\(the first had length 4\\)\\.$"
+        )
+        self.assertRaisesRegex(ValueError, error, writer.format, Read("b", "TTT"))
+
+    def testInterleaved(self):
+        """
+        An interleaved PHYLIP alignment must be as expected.
+        """
+        self.assertEqual(
+            "2 5\na    ACG\nlong TTT\n\nTA\nGG\n",
+            formatAll(
+                InterleavedPhylipWriter(2, width=3),
+                [Read("a", "ACGTA"), Read("long", "TTTGG")],
+            ),
+        )
+
+    def testInterleavedNothingUntilFinished(self):
+        """
+        An interleaved PHYLIP writer must not produce any output until it is
+        finished.
+        """
+        writer = InterleavedPhylipWriter(2)
+        self.assertEqual("", writer.format(Read("a", "ACGTA")))
+        self.assertEqual("", writer.format(Read("b", "ACGTA")))
+
+
+class TestNexusWriter(TestCase):
+    """
+    Test the NexusWriter class.
+    """
+
+    def testDNA(self):
+        """
+        A NEXUS nucleotide alignment must be as expected, with names quoted if
+        necessary.
+        """
+        self.assertEqual(
+            "#NEXUS\n\nbegin data;\n\tdimensions ntax=2 nchar=3;\n"
+            "\tformat datatype=dna missing=? gap=-;\n\tmatrix\n"
+            "'a b' AC-\n'it''s' ACN\n\t;\nend;\n",
+            formatAll(NexusWriter(2), [Read("a b", "AC-"), Read("it's", "ACN")]),
+        )
+
+    def testProtein(self):
+        """
+        A NEXUS protein alignment must have the protein datatype.
+        """
+        self.assertIn(
+            "format datatype=protein",
+            formatAll(NexusWriter(1), [Read("a", "MEFL")]),
+        )
+
+    def testProteinAfterDNA(self):
+        """
+        A protein sequence after a nucleotide sequence must raise a
+        ValueError, as the datatype (taken from the first sequence) does not
+        fit it.
+        """
+        writer = NexusWriter(2)
+        writer.format(Read("a", "ACGT"))
+        error = (
+            "^Sequence 'b' is not a nucleotide sequence, but the NEXUS "
+            "alignment has the dna datatype \\(taken from its first "
+            "sequence\\)\\.$"
+        )
+        self.assertRaisesRegex(ValueError, error, writer.format, Read("b", "MEFL"))
+
+    def testDNAAfterProtein(self):
+        """
+        A nucleotide sequence after a protein sequence must be written in the
+        protein alignment.
+        """
+        self.assertIn(
+            "format datatype=protein",
+            formatAll(NexusWriter(2), [Read("a", "MEFL"), Read("b", "ACGT")]),
+        )
+
+
+def readTwoBit(data):
+    """
+    Read a 2bit file.
+
+    @param data: The C{bytes} 2bit file contents.
+    @return: A C{dict} mapping names to C{str} sequences, with N blocks
+        restored and masked blocks in lower case.
+    """
+    signature, version, count, _ = struct.unpack_from("<4I", data)
+    assert signature == TwoBitWriter.SIGNATURE and version == 0
+    position = 16
+    index = []
+    for _ in range(count):
+        nameSize = data[position]
+        name = data[position + 1 : position + 1 + nameSize].decode()
+        (offset,) = struct.unpack_from("<I", data, position + 1 + nameSize)
+        index.append((name, offset))
+        position += nameSize + 5
+
+    result = {}
+    for name, offset in index:
+        length, nBlockCount = struct.unpack_from("<2I", data, offset)
+        offset += 8
+        nBlocks = struct.unpack_from("<%dI" % (2 * nBlockCount), data, offset)
+        offset += 8 * nBlockCount
+        (maskBlockCount,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        maskBlocks = struct.unpack_from("<%dI" % (2 * maskBlockCount), data, offset)
+        offset += 8 * maskBlockCount + 4
+        bases = []
+        for byte in data[offset : offset + (length + 3) // 4]:
+            for shift in (6, 4, 2, 0):
+                bases.append("TCAG"[(byte >> shift) & 3])
+        bases = bases[:length]
+        for start, size in zip(nBlocks[:nBlockCount], nBlocks[nBlockCount:]):
+            bases[start : start + size] = "N" * size
+        for start, size in zip(
+            maskBlocks[:maskBlockCount], maskBlocks[maskBlockCount:]
+        ):
+            bases[start : start + size] = [
+                b.lower() for b in bases[start : start + size]
+            ]
+        result[name] = "".join(bases)
+
+    return result
+
+
+class TestNpyWriter(TestCase):
+    """
+    Test the NpyWriter class.
+    """
+
+    def testMatrix(self):
+        """
+        The output must be a .npy file with a uint8 matrix of character codes.
+        """
+        data = formatAll(
+            NpyWriter(3), [Read("a", "ACG"), Read("b", "TTT"), Read("c", "NA-")]
+        )
+        array = np.load(BytesIO(data))
+        self.assertEqual(np.uint8, array.dtype)
+        self.assertEqual((3, 3), array.shape)
+        self.assertEqual(b"NA-", array[2].tobytes())
+
+    def testHeaderAlignment(self):
+        """
+        The data in a .npy file must start at a multiple of 64 bytes.
+        """
+        data = formatAll(NpyWriter(1), [Read("a", "A" * 12345)])
+        self.assertEqual(0, (len(data) - 12345) % 64)
+
+    def testIdsAndMemoryMapping(self):
+        """
+        When writing to a file, the read ids must be written to a .ids file
+        and the array must be loadable with memory mapping.
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "out.npy")
+            Sequences(
+                [
+                    {"id": "a", "sequence": "ACGT", "filename": filename},
+                    {"id": "b", "sequence": "TTTT", "filename": filename},
+                ],
+                _format="npy",
+            ).write()
+            array = np.load(filename, mmap_mode="r")
+            self.assertEqual(b"TTTT", array[1].tobytes())
+            with open(filename + ".ids") as fp:
+                self.assertEqual("a\nb\n", fp.read())
+
+    def testDifferentLengths(self):
+        """
+        Sequences of different lengths must cause a ValueError.
+        """
+        writer = NpyWriter(2)
+        writer.format(Read("a", "ACGT"))
+        error = "^Sequence 'b' has length 3, but the npy format requires "
+        self.assertRaisesRegex(ValueError, error, writer.format, Read("b", "TTT"))
+
+
+class TestTwoBitWriter(TestCase):
+    """
+    Test the TwoBitWriter class.
+    """
+
+    def testSequences(self):
+        """
+        Sequences (including ambiguous and lower-case bases, and lengths that
+        are not a multiple of four) must be written correctly.
+        """
+        data = formatAll(
+            TwoBitWriter(3),
+            [Read("a", "ACGTACGTA"), Read("b", "ACNNRTacgTT"), Read("c", "")],
+        )
+        self.assertEqual(
+            {"a": "ACGTACGTA", "b": "ACNNNTacgTT", "c": ""}, readTwoBit(data)
+        )
+
+    def testWithoutNumpy(self):
+        """
+        Sequences must be packed in the same way without NumPy.
+        """
+        reads = [Read("a", "ACGTACGTA"), Read("b", "ACNNRTacgTT"), Read("c", "")]
+        expected = formatAll(TwoBitWriter(3), reads)
+        with patch("seqgen.writers._numpy", return_value=None):
+            self.assertEqual(expected, formatAll(TwoBitWriter(3), reads))
+
+    def testProtein(self):
+        """
+        A protein sequence must cause a ValueError.
+        """
+        error = (
+            "^Sequence 'a' cannot be written in the 2bit format because it is "
+            "not a nucleotide sequence\\.$"
+        )
+        self.assertRaisesRegex(
+            ValueError, error, TwoBitWriter(1).format, Read("a", "MEFL")
+        )
+
+    def testLongName(self):
+        """
+        A read id longer than 255 bytes must cause a ValueError.
+        """
+        error = "^Sequence id 'xxxx.*' is too long for the 2bit format"
+        self.assertRaisesRegex(
+            ValueError, error, TwoBitWriter(1).format, Read("x" * 256, "A")
+        )
+
+
+@skipUnless(pyarrow, "pyarrow is not installed")
+class TestArrowWriter(TestCase):
+    """
+    Test the ArrowWriter class.
+    """
+
+    def testBatches(self):
+        """
+        Reads must be written as an IPC stream of batches of the expected
+        size.
+        """
+        writer = ArrowWriter(5)
+        writer.BATCH_SIZE = 2
+        data = formatAll(writer, [Read("id%d" % i, "AC" * i) for i in range(5)])
+        reader = pyarrow.ipc.open_stream(data)
+        batches = list(reader)
+        self.assertEqual([2, 2, 1], [batch.num_rows for batch in batches])
+        table = pyarrow.Table.from_batches(batches)
+        self.assertEqual(["id%d" % i for i in range(5)], table["id"].to_pylist())
+        self.assertEqual("ACAC", table["sequence"][2].as_py())
+
+    def testStandardOutputBuffer(self):
+        """
+        Arrow output written to a text file pointer must go to its buffer.
+        """
+        buffer = BytesIO()
+
+        class TextFp(StringIO):
+            pass
+
+        fp = TextFp()
+        fp.buffer = buffer
+        Sequences([{"id": "a", "sequence": "AC"}], _format="arrow").write(fp)
+        table = pyarrow.ipc.open_stream(buffer.getvalue()).read_all()
+        self.assertEqual(["a"], table["id"].to_pylist())
+
+
+class TestSequencesWriters(TestCase):
+    """
+    Test writing alignment formats with the Sequences class.
+    """
+
+    def testUnknownFormat(self):
+        """
+        An unknown format in a specification must cause a ValueError.
+        """
+        error = (
+            "^Sequence specification 1 has an unknown format \\('xxx'\\)\\. Use "
+            "one of: 2bit, arrow, fasta, fastq, nexus, npy, phylip, "
+            "phylip-interleaved, vcf\\.$"
+        )
+        self.assertRaisesRegex(ValueError, error, Sequences, [{"format": "xxx"}])
+
+    def testUnknownDefaultFormat(self):
+        """
+        An unknown default format must cause a ValueError.
+        """
+        error = "^Unknown output format 'xxx'\\. Use one of: 2bit, arrow, fasta, "
+        self.assertRaisesRegex(ValueError, error, Sequences, [], _format="xxx")
+
+    def testPhylipCountFromSpecification(self):
+        """
+        The number of sequences in a PHYLIP header must come from the
+        specification, counting only sequences written to the file.
+        """
+        fp = StringIO()
+        Sequences(
+            [
+                {"id": "a", "sequence": "ACGT"},
+                {"id": "b", "sequence": "ACGT", "skip": True},
+                {"id": "c", "sequence": "ACGT", "filename": os.devnull},
+                {"from id": "a", "count": 2},
+            ],
+            _format="phylip",
+        ).write(fp)
+        self.assertEqual("3 4\na ACGT\nseq-id-1 ACGT\nseq-id-2 ACGT\n", fp.getvalue())
+
+    def testIncompatibleFormats(self):
+        """
+        Giving an alignment format and another format for the same file must
+        cause a ValueError.
+        """
+        s = Sequences([{"format": "phylip"}, {"format": "fasta"}])
+        error = (
+            "^Standard output is given incompatible formats \\(phylip and fasta\\)\\.$"
+        )
+        self.assertRaisesRegex(ValueError, error, s.write, StringIO())
+
+    def testFastaAndFastqMayBeMixed(self):
+        """
+        FASTA and FASTQ may be written to the same file.
+        """
+        fp = StringIO()
+        Sequences(
+            [
+                {"id": "a", "sequence": "AC", "format": "fasta"},
+                {"id": "b", "sequence": "GT", "format": "fastq"},
+            ],
+            defaultQuality=0,
+        ).write(fp)
+        self.assertEqual(">a\nAC\n@b\nGT\n+b\n!!\n", fp.getvalue())
+
+    def testAlignmentsInSeveralFiles(self):
+        """
+        Alignments must be routed to files and a file may be written to by
+        specifications that are not adjacent.
+        """
+        with TemporaryDirectory() as tempdir:
+            nexus = os.path.join(tempdir, "out.nex")
+            phylip = os.path.join(tempdir, "out.phy")
+            Sequences(
+                [
+                    {"id": "a", "sequence": "ACGT", "filename": nexus},
+                    {"id": "b", "sequence": "GGGG", "filename": phylip},
+                    {"id": "c", "sequence": "TTTT", "filename": nexus},
+                    {"id": "d", "sequence": "CC"},
+                ],
+                _format="nexus",
+            ).write(StringIO())
+            with open(nexus) as fp:
+                self.assertEqual(
+                    "#NEXUS\n\nbegin data;\n\tdimensions ntax=2 nchar=4;\n"
+                    "\tformat datatype=dna missing=? gap=-;\n\tmatrix\n"
+                    "a ACGT\nc TTTT\n\t;\nend;\n",
+                    fp.read(),
+                )
+            with open(phylip) as fp:
+                self.assertTrue(fp.read().startswith("#NEXUS\n"))
+
+    def testRepeatCount(self):
+        """
+        The number of sequences must include those from repeat specifications.
+        """
+        fp = StringIO()
+        Sequences(
+            [{"repeat": 3, "sequences": [{"id": "x-%(i)d", "sequence": "AC"}]}],
+            _format="phylip",
+        ).write(fp)
+        self.assertEqual("3 2\nx-1 AC\nx-2 AC\nx-3 AC\n", fp.getvalue())
+
+
+class TestVcfWriter(TestCase):
+    """
+    Test the VcfWriter class.
+    """
+
+    def testMutants(self):
+        """
+        The changes in mutants must be written as VCF records.
+        """
+        parent = Read("parent description", "ACGTACGT")
+        first = Read.mutant(parent, [0, 5], "TA")
+        first.id = "m1"
+        second = Read.mutant(parent, [], "")
+        second.id = "m2"
+        self.assertEqual(
+            "##fileformat=VCFv4.2\n##source=seqgen\n"
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+            "parent\t1\tm1\tA\tT\t.\t.\t.\n"
+            "parent\t6\tm1\tC\tA\t.\t.\t.\n",
+            formatAll(VcfWriter(2), [first, second]),
+        )
+
+    def testNotMutant(self):
+        """
+        A read that is not a mutant must cause a ValueError.
+        """
+        error = (
+            "^Sequence 'a' cannot be written in the VCF format because it is "
+            "not stored as a set of changes to another sequence "
+        )
+        self.assertRaisesRegex(
+            ValueError, error, VcfWriter(1).format, Read("a", "ACGT")
+        )
+
+    def testSequences(self):
+        """
+        Mutants made via 'from id' and 'ratchet' must be written.
+        """
+        fp = StringIO()
+        Sequences(
+            [
+                {"id": "parent", "length": 1000, "skip": True},
+                {"id prefix": "m", "from id": "parent", "mutation rate": 0.01},
+                {
+                    "id prefix": "r",
+                    "from id": "parent",
+                    "mutation rate": 0.01,
+                    "ratchet": True,
+                    "count": 3,
+                },
+            ],
+            _format="vcf",
+        ).write(fp)
+        ids = set()
+        for line in fp.getvalue().splitlines():
+            if not line.startswith("#"):
+                fields = line.split("\t")
+                self.assertEqual("parent", fields[0])
+                self.assertNotEqual(fields[3], fields[4])
+                ids.add(fields[2])
+        self.assertTrue(ids <= {"m1", "r1", "r2", "r3"})
+        self.assertIn("r3", ids)
+
+    def testSequencesNotMutants(self):
+        """
+        A specification whose reads are written in the VCF format but are not
+        made as mutants of the whole of another sequence must cause a
+        ValueError before anything is written.
+        """
+        error = (
+            "^Sequence specification %s is written in the VCF format, so it "
+            "must make mutants of the whole of another sequence "
+        )
+        parent = {"id": "parent", "length": 100, "format": "fasta"}
+        for spec in (
+            {"id prefix": "m", "mutation rate": 0.1, "count": 2},
+            {"id prefix": "m", "from id": "parent", "count": 2},
+            {"id prefix": "m", "mutation rate": 0.1, "count": 2, "ratchet": True},
+            {"id": "m", "from id": "parent", "mutation rate": 0.1, "length": 50},
+            {"id": "m", "from id": "parent", "mutation rate": 0.1, "rc": True},
+        ):
+            with TemporaryDirectory() as tempdir:
+                filename = os.path.join(tempdir, "out.vcf")
+                self.assertRaisesRegex(
+                    ValueError,
+                    error % 2,
+                    Sequences,
+                    [parent, dict(spec, filename=filename)],
+                    _format="vcf",
+                )
+                self.assertFalse(os.path.exists(filename))
+
+    def testSequencesRepeatNotMutants(self):
+        """
+        A repeat template whose reads are written in the VCF format but are
+        not made as mutants must cause a ValueError.
+        """
+        error = (
+            r"^Sequence specification 1 \(i=1, template 1\) is written in the "
+            "VCF format"
+        )
+        self.assertRaisesRegex(
+            ValueError,
+            error,
+            Sequences,
+            [{"repeat": 2, "sequences": [{"id": "x-%(i)d", "format": "vcf"}]}],
+        )
+
+    def testSequencesSkippedNotMutants(self):
+        """
+        A skipped specification must not need to make mutants when the
+        default format is VCF.
+        """
+        fp = StringIO()
+        Sequences(
+            [
+                {"id": "parent", "length": 100, "skip": True},
+                {"id": "m", "from id": "parent", "mutation rate": 0.1},
+            ],
+            _format="vcf",
+        ).write(fp)
+        self.assertTrue(fp.getvalue().startswith("##fileformat=VCFv4.2\n"))
+
+
+class TestEstimateSize(TestCase):
+    """
+    Test the estimateSize methods of the writers.
+    """
+
+    READS = [Read("id%d" % i, "ACGT" * (10 + i)) for i in range(1, 12)]
+    ALIGNED = [Read("id%d" % i, "ACGTT" * 25) for i in range(1, 12)]
+
+    def check(self, writerClass, reads, quality=False):
+        """
+        Check that the estimated size of the output of a writer is its size.
+
+        @param writerClass: A L{Writer} subclass.
+        @param reads: A C{list} of C{seqgen.read.Read} instances.
+        @param quality: If C{True}, give the reads a quality string.
+        """
+        if quality:
+            for read in reads:
+                read.quality = "!" * len(read)
+        output = formatAll(writerClass(len(reads)), reads)
+        self.assertEqual(
+            len(output),
+            writerClass.estimateSize(
+                len(reads),
+                sum(len(read.id) for read in reads),
+                sum(len(read) for read in reads),
+                quality,
+            ),
+        )
+
+    def testFasta(self):
+        """
+        The size of FASTA output must be estimated exactly.
+        """
+        self.check(FastxWriter, self.READS)
+
+    def testFastq(self):
+        """
+        The size of FASTQ output must be estimated exactly.
+        """
+        self.check(FastxWriter, self.READS, quality=True)
+
+    def testAlignments(self):
+        """
+        The sizes of PHYLIP, interleaved PHYLIP, NEXUS, and npy output must be
+        estimated exactly (for ids of the same length).
+        """
+        for writerClass in (
+            PhylipWriter,
+            InterleavedPhylipWriter,
+            NexusWriter,
+            NpyWriter,
+        ):
+            self.check(writerClass, self.ALIGNED[1:10])
+
+    def testTwoBit(self):
+        """
+        The size of 2bit output must be estimated exactly (for reads of the
+        same length, with no ambiguous or lower-case bases).
+        """
+        self.check(TwoBitWriter, self.ALIGNED)
+
+    def testNoReads(self):
+        """
+        The estimated size of the output for no reads must be zero.
+        """
+        for writerClass in (FastxWriter, PhylipWriter, TwoBitWriter, VcfWriter):
+            self.assertEqual(0, writerClass.estimateSize(0, 0, 0))
+
+    def testVcf(self):
+        """
+        The estimated size of VCF output must be the size of the header plus
+        the size of a record for each change.
+        """
+        self.assertEqual(len(VcfWriter.HEADER), VcfWriter.estimateSize(2, 4, 100))
+        # Records like "id\t25\tid\tA\tC\t.\t.\t.\n".
+        self.assertEqual(
+            len(VcfWriter.HEADER) + 3 * 19,
+            VcfWriter.estimateSize(2, 4, 100, changes=3),
+        )